@@ -0,0 +1,84 @@
+"""
+Task Queue Scale Benchmark
+--------------------------
+
+Measures the cost of the task queue operations behind the task routes at queue lengths from 100 to 1M tasks:
+enqueueing, the lookup and queue position of `GET /tasks/{task_id}`, the removal of `DELETE /tasks/{task_id}`,
+and starting and completing the task at the head of a layout. Every operation should cost the same at any
+length.
+
+Usage:
+------
+python benchmarks/queue_scale.py [lengths...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from easyapi.taskmodel.task import Task
+from easyapi.taskmodel.taskqueue import TaskQueue
+
+_RESOURCES = {'cpu': 1, 'cuda': 0}
+_PROBES = 1000
+
+
+def measure(n):
+    """
+    Measures the operations of a task queue holding `n` tasks.
+
+    Parameters:
+    ----------
+    n : int
+        The number of queued tasks.
+
+    Returns:
+    -------
+    dict
+        The time per operation in microseconds, by operation.
+    """
+    task_queue = TaskQueue([{'cpu': 1, 'cuda': 0}, {'cpu': 2, 'cuda': 0}])
+    # Distinct inputs, so that no task follows an identical one.
+    tasks = [Task(access_id='u', algorithm_id='f', input_data={'i': i}, required_resources=_RESOURCES)
+             for i in range(n)]
+    costs = {}
+    _begin = time.perf_counter()
+    for task in tasks:
+        task_queue.enqueue(task)
+    costs['enqueue'] = (time.perf_counter() - _begin) / n
+
+    _probe = tasks[1::max(1, n // _PROBES)]
+    _begin = time.perf_counter()
+    for task in _probe:
+        task_queue[task.task_id]
+        task_queue.queue_where(task=task)
+    costs['get+where'] = (time.perf_counter() - _begin) / len(_probe)
+
+    _begin = time.perf_counter()
+    for task in _probe:
+        del task_queue[task.task_id]
+    costs['delete'] = (time.perf_counter() - _begin) / len(_probe)
+
+    _queue_id = task_queue._index[tasks[0].key][0]
+    _count = 0
+    _begin = time.perf_counter()
+    while _count < _PROBES:
+        task = task_queue.header(_queue_id)
+        if task is None:
+            break
+        task_queue.start(task)
+        task._execute_finish(True, {})
+        task_queue.complete(task)
+        _count += 1
+    costs['start+complete'] = (time.perf_counter() - _begin) / max(_count, 1)
+    return {name: cost * 1e6 for name, cost in costs.items()}
+
+
+if __name__ == '__main__':
+    _lengths = [int(arg) for arg in sys.argv[1:]] or [100, 10000, 100000, 1000000]
+    print(f'{"tasks":>8} ' + ' '.join(f'{name:>16}' for name in ('enqueue', 'get+where', 'delete', 'start+complete')))
+    for n in _lengths:
+        costs = measure(n)
+        print(f'{n:>8} ' + ' '.join(f'{cost:>13.2f} us' for cost in costs.values()))
@@ -0,0 +1,85 @@
+"""
+Task Memory Benchmark
+---------------------
+
+Measures the memory held per task with tracemalloc: the Task objects alone, the tasks queued in a task queue
+with and without deduplication, and the finished tasks kept in the result store. Every task has a small input
+dictionary of its own, whose size is reported first, so that the remainder is the cost of the task itself.
+
+Usage:
+------
+python benchmarks/task_memory.py [tasks]
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from easyapi.taskmodel.resultstore import ResultStore
+from easyapi.taskmodel.task import Task
+from easyapi.taskmodel.taskqueue import TaskQueue
+
+_RESOURCES = {'cpu': 1, 'cuda': 0}
+
+
+def _tasks(n):
+    return [Task(access_id='u', algorithm_id='f', input_data={'x': i, 'y': 0.5}, required_resources=_RESOURCES)
+            for i in range(n)]
+
+
+def _queued(n, dedup):
+    task_queue = TaskQueue([{'cpu': 4, 'cuda': 0}], dedup=dedup)
+    task_queue.enqueue_many(_tasks(n))
+    return task_queue
+
+
+def _finished(n):
+    store = ResultStore(ttl=3600, max_memory=1 << 40)
+    for task in _tasks(n):
+        task._execute_start()
+        task._execute_finish(True, {'z': 1.0})
+        store.put(task)
+    return store
+
+
+def measure(n):
+    """
+    Measures the memory held by `n` tasks in each setting.
+
+    Parameters:
+    ----------
+    n : int
+        The number of tasks.
+
+    Returns:
+    -------
+    dict
+        The bytes per task, by setting.
+    """
+    settings = {'input dict': lambda: [{'x': i, 'y': 0.5} for i in range(n)],
+                'Task': lambda: _tasks(n),
+                'queued, dedup off': lambda: _queued(n, False),
+                'queued, dedup on': lambda: _queued(n, True),
+                'finished, in store': lambda: _finished(n)}
+    costs = {}
+    for name, build in settings.items():
+        gc.collect()
+        tracemalloc.start()
+        _before = tracemalloc.get_traced_memory()[0]
+        _kept = build()
+        gc.collect()
+        costs[name] = (tracemalloc.get_traced_memory()[0] - _before) / n
+        tracemalloc.stop()
+        del _kept
+    return costs
+
+
+if __name__ == '__main__':
+    _n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for name, cost in measure(_n).items():
+        print(f'{name:>20}: {cost:8.1f} B/task')
+    print(f'{"Task object":>20}: {sys.getsizeof(Task(input_data={})):8d} B, no __dict__: '
+          f'{not hasattr(Task(input_data={}), "__dict__")}')
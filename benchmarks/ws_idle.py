@@ -0,0 +1,147 @@
+"""
+Task WebSocket Idle Benchmark
+-----------------------------
+
+Measures the CPU time of an idle server holding thousands of open task WebSockets. The state changes of a task
+are pushed to its sockets when they happen, so sockets of queued tasks cost no CPU until their task starts;
+the benchmark then lets the tasks run and counts the frames pushed to every socket.
+
+Requires the `websockets` package.
+
+Usage:
+------
+python benchmarks/ws_idle.py [sockets]
+"""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ENTRIES = '''
+import time
+from easyapi import register, Types
+
+@register(required_resources={'cpu': 1, 'cuda': 0})
+def snooze(t: Types.Number['t'] = 0.01, resources={}) -> dict[Types.Number['t', 't']]:
+    """Snooze"""
+    time.sleep(t)
+    return dict(t=t)
+'''
+_HEADERS = {'easyapi-id': 'u', 'easyapi-key': 'k'}
+_IDLE = 5
+
+
+def _start(directory):
+    with open(os.path.join(directory, 'entries.py'), 'w') as _file:
+        _file.write(_ENTRIES)
+    with open(os.path.join(directory, 'config.json'), 'w') as _file:
+        json.dump({'server_name': 'ws_idle', 'modules': ['entries'],
+                   'task_queue': {'layouts': [{'cpu': 4, 'cuda': 0}], 'executor': 'thread'},
+                   'authenticator': {'type': 'memory', 'credentials': {'u': {'key': 'k', 'access': ['*']}}},
+                   'iolib': {'file': os.path.join(directory, 'iolib.json')}, 'cache': {'type': 'memory'}}, _file)
+    with socket.socket() as _sock:
+        _sock.bind(('127.0.0.1', 0))
+        _port = _sock.getsockname()[1]
+    _env = dict(os.environ, easyapi_config=os.path.join(directory, 'config.json'),
+                PYTHONPATH=os.pathsep.join([_ROOT, directory]))
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'easyapi:app', '--port', str(_port),
+                               '--log-level', 'warning'], cwd=directory, env=_env)
+    return server, f'127.0.0.1:{_port}'
+
+
+def _post(address, path, body):
+    _request = urllib.request.Request(f'http://{address}{path}', data=json.dumps(body).encode(), method='POST',
+                                      headers=dict(_HEADERS, **{'Content-Type': 'application/json'}))
+    return json.loads(urllib.request.urlopen(_request).read())
+
+
+def _cpu(server):
+    """
+    Returns the CPU time in seconds the server process has used.
+    """
+    with open(f'/proc/{server.pid}/stat') as _file:
+        _fields = _file.read().rsplit(')', 1)[1].split()
+    return (int(_fields[11]) + int(_fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+async def measure(server, address, n):
+    """
+    Measures the idle CPU time of the server without and with `n` open task WebSockets.
+
+    Parameters:
+    ----------
+    server : subprocess.Popen
+        The server process.
+    address : str
+        The host and port of the server.
+    n : int
+        The number of sockets.
+
+    Returns:
+    -------
+    dict
+        The idle CPU seconds without and with the sockets, the frames pushed per socket and the seconds until
+        every task was reported done.
+    """
+    for _ in range(100):
+        try:
+            _post(address, '/entries/snooze', {'t': 0.01})
+            break
+        except OSError:
+            await asyncio.sleep(0.2)
+    # Occupy the layout, so that the tasks watched by the sockets stay queued until the blockers are cancelled.
+    _blockers = [_post(address, '/entries/snooze', {'t': 600 + i * 1e-3})['task_id'] for i in range(4)]
+    _task_ids = _post(address, '/entries/snooze/batch', [{'t': 1e-3 + i * 1e-9} for i in range(n)])['task_ids']
+    await asyncio.sleep(1)
+    _begin = _cpu(server)
+    await asyncio.sleep(_IDLE)
+    results = {'idle cpu, no sockets': _cpu(server) - _begin}
+
+    _begin = time.perf_counter()
+    _sockets = [await websockets.connect(f'ws://{address}/tasks/{task_id}/ws', max_queue=None,
+                                         additional_headers=list(_HEADERS.items())) for task_id in _task_ids]
+    results['connect per socket, ms'] = (time.perf_counter() - _begin) / n * 1e3
+    await asyncio.sleep(1)
+    _begin = _cpu(server)
+    await asyncio.sleep(_IDLE)
+    results[f'idle cpu, {n} sockets'] = _cpu(server) - _begin
+
+    _frames = 0
+
+    async def _drain(ws):
+        nonlocal _frames
+        async for message in ws:
+            _frames += 1
+            if '"success"' in message:
+                return
+
+    _begin = time.perf_counter()
+    for task_id in _blockers:
+        _post(address, f'/tasks/{task_id}/cancel', {})
+    await asyncio.wait_for(asyncio.gather(*map(_drain, _sockets)), 300)
+    results['frames per socket'] = _frames / n
+    results['all done after'] = time.perf_counter() - _begin
+    for ws in _sockets:
+        await ws.close()
+    return results
+
+
+if __name__ == '__main__':
+    _n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as _directory:
+        _server, _address = _start(_directory)
+        try:
+            for name, value in asyncio.run(measure(_server, _address, _n)).items():
+                print(f'{name:>24}: {value:.3f}')
+        finally:
+            _server.terminate()
+            _server.wait()
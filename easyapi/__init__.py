@@ -8,20 +8,61 @@ main application instance.
 Dependencies:
 -------------
 - annotations: Provides type annotations for various components.
-- algorithm_stack: Contains the `register` decorator for registering algorithms.
+- algorithm_stack: Contains the `register` decorator for registering algorithms, and `pipeline` for
+  declaring pipelines of them.
 - cache: Provides cache management functionality.
 - main: Contains the main FastAPI application instance (`app`).
 
+The application is imported on first use of `easyapi.app`, so a remote worker importing
+the package (see `easyapi.worker`) does not build the server.
+
 Functions:
 ----------
-This module does not define any new functions but imports necessary components
-to initialize and configure the application.
+__getattr__(name)
+    Imports the main application instance on first use.
 """
 
 __version__ = '1.0.0'
 
 from . import annotations as Types
-from .algorithmodel.algorithm_stack import register
+from .algorithmodel.algorithm_stack import register, pipeline
 from .algorithmodel.cache import cache
 from .janalytics import stat
-from .main import app
+
+
+def __getattr__(name):
+    """
+    Imports the main application instance on first use.
+
+    Parameters:
+    ----------
+    name : str
+        The name of the attribute.
+
+    Returns:
+    -------
+    FastAPI
+        The main application instance, for the name 'app'.
+
+    Raises:
+    ------
+    AttributeError
+        If the name is not 'app'.
+    """
+    if name == 'app':
+        from .main import app
+        globals()['app'] = app
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    """
+    Lists the attributes of the package, including the application imported on first use.
+
+    Returns:
+    -------
+    list of str
+        The names of the attributes.
+    """
+    return sorted(set(globals()) | {'app'})
@@ -0,0 +1,68 @@
+"""
+Command Line Interface
+----------------------
+
+This module defines the `easyapi` command, also run as `python -m easyapi`. The server itself is started with
+`fastapi run easyapi` or `uvicorn easyapi:app`.
+
+Commands:
+---------
+- easyapi worker --connect ADDRESS --layout RESOURCES: Runs a remote worker for the server listening on ADDRESS,
+  'HOST:PORT' or the path of a Unix socket, with the given resources, e.g. 'cpu=32,cuda=0'.
+- easyapi scheduler: Runs the scheduler process shared by the API processes of a configuration with a
+  'scheduler' section, e.g. the workers of `uvicorn easyapi:app --workers 4`.
+
+Functions:
+----------
+main(argv)
+    Parses the command line and runs the command.
+"""
+
+import argparse
+import logging
+import os
+
+
+def main(argv=None):
+    """
+    Parses the command line and runs the command.
+
+    Parameters:
+    ----------
+    argv : list of str, optional
+        The arguments (default is None, the arguments of the process).
+    """
+    parser = argparse.ArgumentParser(prog='easyapi', description='Transform Python Function to RESTful API.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    worker = commands.add_parser('worker', help='Run a remote worker for a server.')
+    worker.add_argument('--connect', required=True,
+                        help="The address of the server's worker hub, HOST:PORT or the path of a Unix socket.")
+    worker.add_argument('--key', default=os.environ.get('easyapi_worker_key'),
+                        help="The shared key of the worker hub (default: the 'easyapi_worker_key' variable).")
+    worker.add_argument('--layout', required=True, help="The resources of the worker, e.g. 'cpu=32,cuda=0'.")
+    worker.add_argument('--executor', default='thread', choices=['thread', 'process'],
+                        help='Run the entries in threads or in worker processes (default: thread).')
+    worker.add_argument('--name', default=None, help='The name of the worker (default: host name and PID).')
+    worker.add_argument('--config', default=None,
+                        help="The configuration file listing the modules (default: the 'easyapi_config' variable).")
+    worker.add_argument('--reconnect', type=float, default=5.0,
+                        help='Seconds to wait before connecting again after the connection broke (default: 5).')
+    scheduler = commands.add_parser('scheduler', help='Run the scheduler shared by several API processes.')
+    scheduler.add_argument('--config', default=None,
+                           help="The configuration file (default: the 'easyapi_config' variable).")
+    args = parser.parse_args(argv)
+    if args.command == 'worker':
+        if not args.key:
+            parser.error('the key of the worker hub is required (--key or easyapi_worker_key)')
+        logging.basicConfig(level=logging.INFO, format='%(levelname)s:     %(message)s')
+        from .worker import serve
+        serve(args.connect, args.key, args.layout, executor=args.executor, name=args.name, config=args.config,
+              reconnect=args.reconnect)
+    elif args.command == 'scheduler':
+        logging.basicConfig(level=logging.INFO, format='%(levelname)s:     %(message)s')
+        from .scheduler import serve
+        serve(config=args.config)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,12 +16,16 @@ This module follows PEP 8 style guidelines.
 
 import os
 import sys
+import asyncio
+import inspect
 import logging
 import time
 from importlib.util import spec_from_file_location, module_from_spec
 from uuid import uuid4
 
 from .parameter import Parameter
+from .cache import AlgorithmCachePool
+from ..taskmodel.stream import merge_chunk
 
 
 class Algorithm:
@@ -50,11 +54,23 @@ class Algorithm:
         Resources required by the algorithm.
     iolib : dict
         Library of input/output types.
+    batchable : bool
+        Whether the function accepts the inputs of several tasks in one call.
+    max_batch : int
+        The maximum number of tasks in one batched call.
+    max_wait_ms : float
+        How long a task may wait for more tasks to fill its batch, in milliseconds.
+    timeout : float
+        How many seconds an execution may run before it is stopped, or None.
+    streaming : bool
+        Whether the function is a generator (or an async generator) yielding its output in chunks.
 
     Methods:
     -------
     __call__(params, resources={}):
         Executes the algorithm with the provided parameters and resources.
+    call_batch(params_list, resources={}):
+        Executes a batchable algorithm once for the parameters of several tasks.
     register_params(params):
         Registers input or output parameters.
     load(path, iolib=None):
@@ -63,7 +79,8 @@ class Algorithm:
 
     def __init__(self, func, id='', in_params=None, out_params=None,
                  name='Meta-Algorithm', description='Meta-Algorithm',
-                 version='0.0.0', references=None, required_resources=None, iolib=None):
+                 version='0.0.0', references=None, required_resources=None, iolib=None,
+                 batchable=False, max_batch=32, max_wait_ms=5, timeout=None):
         """
         Initializes the Algorithm class with metadata, parameters, and function.
 
@@ -89,8 +106,29 @@ class Algorithm:
             Resources required by the algorithm (default is None).
         iolib : dict, optional
             Library of input/output types (default is None).
+        batchable : bool, optional
+            Whether the function accepts the inputs of several tasks in one call (default is False).
+        max_batch : int, optional
+            The maximum number of tasks in one batched call (default is 32).
+        max_wait_ms : float, optional
+            How long a task may wait for more tasks to fill its batch, in milliseconds (default is 5).
+        timeout : float, optional
+            How many seconds an execution may run before it is stopped (default is None, no limit).
+
+        Raises:
+        ------
+        TypeError
+            If the function is both a generator and batchable.
         """
+        _func = inspect.unwrap(func)
+        self.streaming = inspect.isgeneratorfunction(_func) or inspect.isasyncgenfunction(_func)
+        if self.streaming and batchable:
+            raise TypeError('Generator Not Supported for Batchable.')
         self.iolib = iolib
+        self.batchable = batchable
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_ms = max_wait_ms
+        self.timeout = timeout
         self.id = id
         self.name = name
         self.description = description
@@ -139,10 +177,113 @@ class Algorithm:
                 _decoded_params[io_name] = io_type.io_type(params[io_name])
         return _decoded_params
 
+    def _decode_chunk(self, chunk):
+        """
+        Validates an output chunk of a streaming algorithm against the output parameters it holds.
+
+        Parameters:
+        ----------
+        chunk : dict
+            The output chunk, holding some of the output parameters.
+
+        Returns:
+        -------
+        dict
+            The decoded output chunk.
+
+        Raises:
+        ------
+        RuntimeError
+            If the chunk is not a dictionary or holds an unknown output parameter.
+        """
+        if not isinstance(chunk, dict):
+            raise RuntimeError(f'{self.id} yielded a chunk that is not a dictionary')
+        _decoded_chunk = {}
+        for io_name, value in chunk.items():
+            if io_name not in self.out_params:
+                raise RuntimeError(f'{io_name} is not an output')
+            _decoded_chunk[io_name] = self.out_params[io_name].io_type(value)
+        return _decoded_chunk
+
+    def _iterate(self, input_params, resources):
+        """
+        Runs a streaming algorithm and yields its raw output chunks. An async generator is driven by an event
+        loop private to the calling thread.
+
+        The function is called through its decorators, so `stat` records the call, but its cache is bypassed.
+
+        Parameters:
+        ----------
+        input_params : dict
+            The decoded input parameters.
+        resources : dict
+            Resources allocated to the execution.
+
+        Yields:
+        ------
+        dict
+            The raw output chunks.
+        """
+        # Outputs of generators are not cached: the cache would hold the generator itself.
+        with AlgorithmCachePool.bypass():
+            _generator = self.func(resources=resources, **input_params)
+        if not inspect.isasyncgen(_generator):
+            yield from _generator
+            return
+        _loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield _loop.run_until_complete(_generator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            _loop.run_until_complete(_generator.aclose())
+            _loop.close()
+
+    def _call_stream(self, params, resources):
+        """
+        Executes a streaming algorithm, validating every chunk as it is yielded.
+
+        With a sink in `resources['stream']`, each chunk is handed to it and not kept; otherwise the chunks are
+        merged (see `merge_chunk`) and the complete output is validated and returned.
+
+        Parameters:
+        ----------
+        params : dict
+            A dictionary of input parameters for the algorithm.
+        resources : dict
+            Resources required for the execution, and the optional chunk sink under 'stream'.
+
+        Returns:
+        -------
+        tuple
+            A tuple (success, output) as returned by `__call__`; output is None if the chunks went to the sink.
+        """
+        resources = dict(resources)
+        _sink = resources.pop('stream', None)
+        try:
+            _input_params = self._decode_params(params=params, schema=self.in_params)
+            _output = {}
+            for _chunk in self._iterate(_input_params, resources):
+                _chunk = self._decode_chunk(_chunk)
+                if _sink is not None:
+                    _sink(_chunk)
+                else:
+                    merge_chunk(_output, _chunk)
+            if _sink is not None:
+                return True, None
+            return True, self._decode_params(params=_output, schema=self.out_params)
+        except Exception as e:
+            return False, str(e)
+
     def __call__(self, params, resources=None):
         """
         Executes the algorithm with the provided parameters and resources.
 
+        A batchable algorithm is called as a batch of one task (see `call_batch`), and a streaming algorithm
+        chunk by chunk (see `_call_stream`).
+
         Parameters:
         ----------
         params : dict
@@ -157,7 +298,11 @@ class Algorithm:
             if the execution was successful, and output contains either the 
             decoded output parameters or an error message.
         """
+        if self.batchable:
+            return self.call_batch([params], resources=resources)[0]
         resources = resources if resources is not None else {}
+        if self.streaming:
+            return self._call_stream(params, resources)
         try:
             _input_params = self._decode_params(params=params, schema=self.in_params)
             _output = self.func(resources=resources, **_input_params)
@@ -166,6 +311,104 @@ class Algorithm:
         except Exception as e:
             return False, str(e)
 
+    def _call_columns(self, inputs, resources):
+        """
+        Calls the function once with the decoded inputs of several tasks as columns.
+
+        Parameters:
+        ----------
+        inputs : list of dicts
+            The decoded input parameters of each task.
+        resources : dict
+            Resources allocated to the execution.
+
+        Returns:
+        -------
+        list of dicts
+            The raw output of each task.
+
+        Raises:
+        ------
+        RuntimeError
+            If the function does not return one output per task.
+        """
+        _columns = {name: [_input[name] for _input in inputs] for name in self.in_params}
+        with AlgorithmCachePool.bypass():
+            _outputs = self.func(resources=resources, **_columns)
+        if isinstance(_outputs, dict):
+            if any(len(column) != len(inputs) for column in _outputs.values()):
+                raise RuntimeError(f'{self.id} returned a batch of the wrong size')
+            return [{name: column[i] for name, column in _outputs.items()} for i in range(len(inputs))]
+        _outputs = list(_outputs)
+        if len(_outputs) != len(inputs):
+            raise RuntimeError(f'{self.id} returned a batch of the wrong size')
+        return _outputs
+
+    def call_batch(self, params_list, resources=None):
+        """
+        Executes a batchable algorithm once for the parameters of several tasks.
+
+        Every input parameter is passed to the function as a list holding the value of each task, and the
+        function returns either a dictionary of lists or a list of dictionaries, one item per task. Each
+        task is decoded, cached and reported on its own: a task with invalid parameters fails alone, tasks
+        found in the cache are not computed, and if the batched call raises, the remaining tasks are run
+        one by one so that only the failing ones report the error.
+
+        Parameters:
+        ----------
+        params_list : list of dicts
+            The input parameters of each task.
+        resources : dict, optional
+            Resources required for the execution (default is None).
+
+        Returns:
+        -------
+        list of tuples
+            A tuple (success, output) for each task, as returned by `__call__`.
+        """
+        resources = resources if resources is not None else {}
+        _results = [None] * len(params_list)
+        _inputs = {}
+        for i, params in enumerate(params_list):
+            try:
+                _inputs[i] = self._decode_params(params=params, schema=self.in_params)
+            except Exception as e:
+                _results[i] = (False, str(e))
+
+        _cache_id = getattr(self.func, 'cache_id', None)
+        _cached = _cache_id is not None and not getattr(self.func, 'cache_disabled', True)
+        _outputs = {}
+        if _cached:
+            for i, _input in _inputs.items():
+                _value = AlgorithmCachePool.fetch(_cache_id, **_input)
+                if _value is not None:
+                    _outputs[i] = _value
+        _pending = [i for i in _inputs if i not in _outputs]
+        if len(_pending) > 0:
+            try:
+                _outputs.update(zip(_pending, self._call_columns([_inputs[i] for i in _pending], resources)))
+            except Exception as e:
+                if len(_pending) == 1:
+                    _results[_pending[0]] = (False, str(e))
+                else:
+                    # Isolate the failing tasks.
+                    for i in _pending:
+                        try:
+                            _outputs[i] = self._call_columns([_inputs[i]], resources)[0]
+                        except Exception as e:
+                            _results[i] = (False, str(e))
+            if _cached:
+                for i in _pending:
+                    if i in _outputs:
+                        AlgorithmCachePool.record(_cache_id, _outputs[i], **_inputs[i])
+
+        for i, _output in _outputs.items():
+            try:
+                _results[i] = (True, self._decode_params(params=_output, schema=self.out_params))
+            except Exception as e:
+                _results[i] = (False, str(e))
+        return _results
+
     def register_params(self, params=None):
         """
         Registers input or output parameters for the algorithm.
@@ -246,4 +489,8 @@ class Algorithm:
             'in_params': module.in_params,
             'required_resources': module.required_resources,
             'func': module.main,
+            'batchable': getattr(module, 'batchable', False),
+            'max_batch': getattr(module, 'max_batch', 32),
+            'max_wait_ms': getattr(module, 'max_wait_ms', 5),
+            'timeout': getattr(module, 'timeout', None),
         }
@@ -14,7 +14,7 @@ Functions:
 3. `get_id(func)`: Retrieves the unique identifier (name) of a function.
 4. `get_name(func)`: Extracts the name or first line of the docstring of a function.
 5. `get_doc(func)`: Extracts the full docstring of a function.
-6. `define_algorithm(func, version, references, required_resources)`: Encapsulates function metadata into an algorithm definition.
+6. `define_algorithm(func, version, references, required_resources, batchable, max_batch, max_wait_ms, timeout)`: Encapsulates function metadata into an algorithm definition.
 
 Dependencies:
 -------------
@@ -183,7 +183,8 @@ def get_doc(func):
     doc = inspect.getdoc(func)
     return '' if doc is None else '\n'.join(doc.split('\n')[1:])
 
-def define_algorithm(func, version='0.0.1', references=None, required_resources=None):
+def define_algorithm(func, version='0.0.1', references=None, required_resources=None,
+                     batchable=False, max_batch=32, max_wait_ms=5, timeout=None):
     """
     Encapsulates function metadata into an algorithm definition.
 
@@ -197,6 +198,14 @@ def define_algorithm(func, version='0.0.1', references=None, required_resources=
         A list of references for the algorithm (default is an empty list).
     required_resources : dict, optional
         A dictionary specifying required resources (default is `{'cpu': -1, 'cuda': -1}`).
+    batchable : bool, optional
+        Whether the function accepts the inputs of several tasks in one call (default is False).
+    max_batch : int, optional
+        The maximum number of tasks in one batched call (default is 32).
+    max_wait_ms : float, optional
+        How long a task may wait for more tasks to fill its batch, in milliseconds (default is 5).
+    timeout : float, optional
+        How many seconds an execution may run before it is stopped (default is None, no limit).
 
     Returns:
     --------
@@ -210,6 +219,8 @@ def define_algorithm(func, version='0.0.1', references=None, required_resources=
         - `version`: The algorithm version.
         - `references`: A list of references.
         - `required_resources`: Required resources.
+        - `batchable`, `max_batch`, `max_wait_ms`: Micro-batching options.
+        - `timeout`: The execution timeout.
     """
     if references is None:
         references = []
@@ -225,5 +236,9 @@ def define_algorithm(func, version='0.0.1', references=None, required_resources=
         'description': get_doc(func),
         'version': version,
         'references': references,
-        'required_resources': required_resources
+        'required_resources': required_resources,
+        'batchable': batchable,
+        'max_batch': max_batch,
+        'max_wait_ms': max_wait_ms,
+        'timeout': timeout,
     }
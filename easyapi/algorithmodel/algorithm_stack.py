@@ -16,10 +16,14 @@ Functions:
 1. register:
    - Decorator to register a function as an algorithm with versioning and resource requirements.
 
+2. pipeline:
+   - Declares a pipeline entry chaining registered algorithms (see `pipeline.Pipeline`).
+
 Dependencies:
 -------------
 - algorithm: Contains the `Algorithm` class.
 - algorithm_infer: Provides `define_algorithm` for defining algorithm metadata.
+- pipeline: Contains the `Pipeline` class.
 - logging: Standard Python logging library.
 - time: Standard Python time library.
 - functools: Provides utilities such as `wraps`.
@@ -30,6 +34,7 @@ import time
 from functools import wraps
 from .algorithm import Algorithm
 from .algorithm_infer import define_algorithm
+from .pipeline import Pipeline
 
 
 class AlgorithmStack:
@@ -40,6 +45,8 @@ class AlgorithmStack:
     ----------
     _registered_algorithm : list
         A class-level list to store registered algorithms.
+    _registered_pipeline : list
+        A class-level list to store the pipelines declared in code.
     paths : list
         Paths to algorithm definition files.
     iolib : dict
@@ -51,19 +58,22 @@ class AlgorithmStack:
     -------
     entries:
         Returns a list of registered algorithm IDs.
-    register(func, version, references, required_resources):
+    register(func, version, references, required_resources, batchable, max_batch, max_wait_ms):
         Registers a function as an algorithm.
-    add(func, version, references, required_resources):
+    add(func, version, references, required_resources, batchable, max_batch, max_wait_ms):
         Adds a function as an algorithm to the stack.
     _load_algorithm(path):
         Loads an algorithm from a file.
     _init_algorithm(algo_dict):
         Initializes an algorithm from a dictionary of attributes.
+    _init_pipeline(pipeline_dict):
+        Builds a pipeline from its declaration.
     """
 
     _registered_algorithm = []
+    _registered_pipeline = []
 
-    def __init__(self, *args, paths=None, iolib=None):
+    def __init__(self, *args, paths=None, iolib=None, pipelines=None):
         """
         Initializes the AlgorithmStack with the given paths and input/output library.
 
@@ -75,6 +85,9 @@ class AlgorithmStack:
             List of paths to algorithm definition files.
         iolib : dict, optional
             Input/Output library for validation and processing.
+        pipelines : dict, optional
+            The pipelines declared in the configuration, indexed by ID. They are built after the algorithms and
+            the pipelines declared in code, in order, so a pipeline may run the pipelines declared before it.
         """
         if paths is None:
             self.paths = args
@@ -85,6 +98,12 @@ class AlgorithmStack:
         _algorithms += [self._init_algorithm(algo) for algo in self._registered_algorithm]
         _algorithms = [_algorithm for _algorithm in _algorithms if _algorithm is not None]
         self.algorithms = {_algorithm.id: _algorithm for _algorithm in _algorithms}
+        _pipelines = self._registered_pipeline + [dict(pipeline_dict, id=pipeline_id)
+                                                  for pipeline_id, pipeline_dict in (pipelines or {}).items()]
+        for pipeline_dict in _pipelines:
+            _pipeline = self._init_pipeline(pipeline_dict)
+            if _pipeline is not None:
+                self.algorithms[_pipeline.id] = _pipeline
 
     def __len__(self):
         """
@@ -169,6 +188,30 @@ class AlgorithmStack:
             logger.warning(f'Load [FAILED] > ({algo_dict["id"]}) {algo_dict["name"]}')
             return None
 
+    def _init_pipeline(self, pipeline_dict):
+        """
+        Builds a pipeline from its declaration, on the entries loaded so far.
+
+        Parameters:
+        ----------
+        pipeline_dict : dict
+            The declaration of the pipeline, with its ID, steps and optional metadata.
+
+        Returns:
+        -------
+        Pipeline or None
+            The pipeline, or None if its declaration is invalid.
+        """
+        try:
+            _pipeline = Pipeline(self, **pipeline_dict, iolib=self.iolib)
+        except Exception as e:
+            logger = logging.getLogger('uvicorn.warning')
+            logger.warning(f'Load [FAILED] > ({pipeline_dict.get("id")}) pipeline: {e}')
+            return None
+        logger = logging.getLogger('uvicorn.info')
+        logger.info(f'Load [PIPELINE] > ({_pipeline.id}) {_pipeline.name}: {" -> ".join(_pipeline.steps)}')
+        return _pipeline
+
     @property
     def entries(self):
         """
@@ -182,7 +225,8 @@ class AlgorithmStack:
         return list(self.algorithms.keys())
 
     @staticmethod
-    def register(func, version='0.0.1', references=None, required_resources=None):
+    def register(func, version='0.0.1', references=None, required_resources=None,
+                 batchable=False, max_batch=32, max_wait_ms=5, timeout=None):
         """
         Registers a function as an algorithm with metadata.
 
@@ -196,15 +240,26 @@ class AlgorithmStack:
             List of references for the algorithm (default is None).
         required_resources : dict, optional
             Dictionary of required resources for the algorithm (default is {'cpu': -1, 'cuda': -1}).
+        batchable : bool, optional
+            Whether the function accepts the inputs of several tasks in one call (default is False).
+        max_batch : int, optional
+            The maximum number of tasks in one batched call (default is 32).
+        max_wait_ms : float, optional
+            How long a task may wait for more tasks to fill its batch, in milliseconds (default is 5).
+        timeout : float, optional
+            How many seconds an execution may run before it is stopped (default is None, no limit).
         """
         if references is None:
             references = []
         if required_resources is None:
             required_resources = {'cpu': -1, 'cuda': -1}
-        algo_dict = define_algorithm(func, version=version, references=references, required_resources=required_resources)
+        algo_dict = define_algorithm(func, version=version, references=references, required_resources=required_resources,
+                                     batchable=batchable, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                                     timeout=timeout)
         AlgorithmStack._registered_algorithm.append(algo_dict)
 
-    def add(self, func, version='0.0.1', references=None, required_resources=None):
+    def add(self, func, version='0.0.1', references=None, required_resources=None,
+            batchable=False, max_batch=32, max_wait_ms=5, timeout=None):
         """
         Adds a function as an algorithm to the stack.
 
@@ -218,18 +273,29 @@ class AlgorithmStack:
             List of references for the algorithm (default is None).
         required_resources : dict, optional
             Dictionary of required resources for the algorithm (default is {'cpu': -1, 'cuda': -1}).
+        batchable : bool, optional
+            Whether the function accepts the inputs of several tasks in one call (default is False).
+        max_batch : int, optional
+            The maximum number of tasks in one batched call (default is 32).
+        max_wait_ms : float, optional
+            How long a task may wait for more tasks to fill its batch, in milliseconds (default is 5).
+        timeout : float, optional
+            How many seconds an execution may run before it is stopped (default is None, no limit).
         """
         if references is None:
             references = []
         if required_resources is None:
             required_resources = {'cpu': -1, 'cuda': -1}
-        algo_dict = define_algorithm(func, version=version, references=references, required_resources=required_resources)
+        algo_dict = define_algorithm(func, version=version, references=references, required_resources=required_resources,
+                                     batchable=batchable, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                                     timeout=timeout)
         _algo = self._init_algorithm(algo_dict)
         if _algo is not None:
             self.algorithms[_algo.id] = _algo
 
 
-def register(version='0.0.1', references=None, required_resources=None):
+def register(version='0.0.1', references=None, required_resources=None,
+             batchable=False, max_batch=32, max_wait_ms=5, timeout=None):
     """
     Decorator to register a function as an algorithm.
 
@@ -241,6 +307,17 @@ def register(version='0.0.1', references=None, required_resources=None):
         List of references for the algorithm (default is None).
     required_resources : dict, optional
         Dictionary of required resources for the algorithm (default is {'cpu': -1, 'cuda': -1}).
+    batchable : bool, optional
+        Whether the function accepts the inputs of several tasks in one call (default is False).
+        A batchable function receives each input parameter as a list with one value per task, and
+        returns a dictionary of lists or a list of dictionaries, one item per task.
+    max_batch : int, optional
+        The maximum number of tasks in one batched call (default is 32).
+    max_wait_ms : float, optional
+        How long a task may wait for more tasks to fill its batch, in milliseconds (default is 5).
+    timeout : float, optional
+        How many seconds an execution may run before it is stopped and its tasks are reported as 'timed-out'
+        (default is None, no limit). A worker process running the entry is killed; a thread cannot be.
 
     Returns:
     -------
@@ -253,7 +330,45 @@ def register(version='0.0.1', references=None, required_resources=None):
         required_resources = {'cpu': -1, 'cuda': -1}
 
     def wrap(func):
-        AlgorithmStack.register(func, version=version, references=references, required_resources=required_resources)
+        AlgorithmStack.register(func, version=version, references=references, required_resources=required_resources,
+                                batchable=batchable, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                                     timeout=timeout)
         return func
 
     return wrap
+
+
+def pipeline(id, steps, outputs=None, name=None, description='', version='0.0.1', references=None,
+             required_resources=None, timeout=None):
+    """
+    Declares a pipeline entry chaining registered algorithms, built with the algorithm library.
+
+    Parameters:
+    ----------
+    id : str
+        The ID of the pipeline entry.
+    steps : dict
+        The steps, indexed by step ID: the ID of an entry, or a dictionary with the entry under 'entry' and the
+        source of its input parameters under 'inputs', 'step.name' for an output of an earlier step or the
+        name of an input of the pipeline.
+    outputs : dict, optional
+        The source of each output parameter of the pipeline, as 'step.name' (default is None, the outputs of the
+        steps no other step reads).
+    name : str, optional
+        The name of the pipeline (default is None, its ID).
+    description : str, optional
+        The description of the pipeline (default is '').
+    version : str, optional
+        The version of the pipeline (default is '0.0.1').
+    references : list, optional
+        List of references for the pipeline (default is None).
+    required_resources : dict, optional
+        Dictionary of required resources (default is None, the largest total requirement of the steps ready
+        together).
+    timeout : float, optional
+        How many seconds an execution of the whole pipeline may run (default is None, no limit).
+    """
+    AlgorithmStack._registered_pipeline.append({
+        'id': id, 'steps': steps, 'outputs': outputs, 'name': name, 'description': description,
+        'version': version, 'references': references, 'required_resources': required_resources,
+        'timeout': timeout})
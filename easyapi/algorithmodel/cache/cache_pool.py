@@ -6,6 +6,8 @@ This module provides a caching mechanism for algorithm results using a storage e
 It supports hashing and storing function results based on input parameters for future retrieval.
 The cache is implemented using a variety of hash methods, with the ability to switch between them.
 The `AlgorithmCachePool` class and the `cache` decorator enable transparent caching for functions.
+A micro-batched call bypasses the decorator and records one cache entry per task instead (see
+`Algorithm.call_batch`).
 
 Classes:
 --------
@@ -22,6 +24,8 @@ from .storage_engine.engine import StorageEngine
 import json
 import hashlib
 from functools import wraps
+from contextlib import contextmanager
+import threading
 
 class AlgorithmCachePool(object):
     """
@@ -36,6 +40,8 @@ class AlgorithmCachePool(object):
         The current hashing method used for generating signatures.
     _hash_methods : dict
         A dictionary of available hash methods and their corresponding hash functions.
+    _bypass : threading.local
+        A per-thread flag telling the cached functions to call through without caching.
 
     Methods:
     -------
@@ -47,6 +53,8 @@ class AlgorithmCachePool(object):
         Records a value in the cache using the generated signature.
     cache(cls, disable=False)
         A decorator function for caching the results of a function.
+    bypass(cls)
+        A context manager under which cached functions are called without caching.
     engine(cls, engine, hash="md5")
         Sets the storage engine and hash method used for caching.
     """
@@ -60,6 +68,7 @@ class AlgorithmCachePool(object):
         'sha256': lambda data: hashlib.sha256(data).hexdigest(),
         'sha512': lambda data: hashlib.sha512(data).hexdigest(),
     }
+    _bypass = threading.local()
     
     @classmethod
     def signature(cls, **kwargs):
@@ -124,6 +133,9 @@ class AlgorithmCachePool(object):
         """
         A decorator function for caching the results of a function.
 
+        The wrapped function exposes `cache_id` and `cache_disabled`, so that a micro-batched call can
+        fetch and record the cache entry of each task itself.
+
         Parameters:
         ----------
         disable : bool, optional
@@ -139,6 +151,8 @@ class AlgorithmCachePool(object):
             
             @wraps(func)
             def _wrap(**kwargs):
+                if getattr(cls._bypass, 'active', False):
+                    return func(**kwargs)
                 _value = None
                 if not disable:
                     _value = cls.fetch(_func_id, **kwargs)
@@ -148,10 +162,24 @@ class AlgorithmCachePool(object):
                         cls.record(_func_id, _value, **kwargs)
                 return _value
             
+            _wrap.cache_id = _func_id
+            _wrap.cache_disabled = disable
             return _wrap
         
         return cache_wrapper
         
+    @classmethod
+    @contextmanager
+    def bypass(cls):
+        """
+        A context manager under which cached functions are called without fetching or recording.
+        """
+        cls._bypass.active = True
+        try:
+            yield
+        finally:
+            cls._bypass.active = False
+
     @classmethod
     def engine(cls, engine, hash="md5"):
         """
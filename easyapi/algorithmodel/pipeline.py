@@ -0,0 +1,444 @@
+"""
+Pipeline Module
+---------------
+
+This module defines the `Pipeline` class, an entry chaining other entries of the algorithm library server-side.
+A pipeline is a directed acyclic graph of steps; each step runs an entry, and its input parameters are mapped
+from the inputs of the pipeline or from the outputs of earlier steps. A pipeline is submitted, queued, scheduled
+and read like any other entry, so a workflow costs one round trip instead of one per step.
+
+A pipeline is declared in the 'pipelines' section of the configuration, or in code with `easyapi.pipeline`:
+
+    pipeline('blur_and_count',
+             steps={'blur': 'gaussian_blur',
+                    'count': {'entry': 'count_cells', 'inputs': {'image': 'blur.image'}}},
+             outputs={'cells': 'count.count'})
+
+A source 'step.name' is the output `name` of an earlier step, and any other source is an input of the pipeline.
+The inputs of a step that are not mapped are inputs of the pipeline with the same name and type. Without
+`outputs`, the outputs of the pipeline are those of the steps no other step reads.
+
+A pipeline runs as one task, on the resources allocated to it. The intermediate values stay in the memory of the
+process running the task and are dropped once the steps reading them have run. The steps whose inputs are ready
+run in parallel threads, so independent branches overlap, as long as their requirements fit together in the
+allocation of the pipeline; the others wait for running steps to free their share. By default a pipeline requires
+what its widest set of steps ready together requires. Every step is called through `Algorithm.__call__`, so the
+entries decorated with `@cache` fetch and record their outputs as when they are submitted alone. A failing step
+fails the pipeline with its error, and the steps not started yet are not run.
+
+Classes:
+--------
+Pipeline
+    An entry running a graph of other entries.
+"""
+
+import copy
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .algorithm import Algorithm
+
+
+class _Step(object):
+    """
+    One step of a pipeline.
+
+    Attributes:
+    ----------
+    id : str
+        The ID of the step in the pipeline.
+    algorithm : Algorithm
+        The entry the step runs.
+    sources : dict
+        The source of each input parameter of the step, as a tuple (step ID, name), the step ID being None for
+        an input of the pipeline.
+    after : set of str
+        The IDs of the steps whose outputs the step reads.
+    requirements : dict
+        The resources the entry of the step requires.
+    """
+
+    def __init__(self, step_id, algorithm, sources):
+        self.id = step_id
+        self.algorithm = algorithm
+        self.sources = sources
+        self.after = {source_step for source_step, _ in sources.values() if source_step is not None}
+        self.requirements = algorithm.required_resources
+
+
+class Pipeline(Algorithm):
+    """
+    An entry running a graph of other entries of the algorithm library.
+
+    Attributes:
+    ----------
+    steps : dict
+        The steps of the pipeline (`_Step`), indexed by step ID, in a topological order.
+    outputs : dict
+        The source of each output parameter of the pipeline, as a tuple (step ID, name).
+    _readers : dict
+        The number of steps and outputs reading the outputs of each step, after which they are dropped.
+    """
+
+    def __init__(self, algorithmlib, id, steps, outputs=None, name=None, description='', version='0.0.1',
+                 references=None, required_resources=None, timeout=None, iolib=None):
+        """
+        Builds a pipeline from the entries of an algorithm library.
+
+        Parameters:
+        ----------
+        algorithmlib : AlgorithmStack
+            The algorithm library holding the entries of the steps.
+        id : str
+            The ID of the pipeline entry.
+        steps : dict
+            The steps, indexed by step ID: the ID of an entry, or a dictionary with the entry under 'entry' and
+            the source of its input parameters under 'inputs'.
+        outputs : dict, optional
+            The source of each output parameter of the pipeline, as 'step.name' (default is None, the outputs of
+            the steps no other step reads).
+        name : str, optional
+            The name of the pipeline (default is None, its ID).
+        description : str, optional
+            The description of the pipeline (default is '').
+        version : str, optional
+            The version of the pipeline (default is '0.0.1').
+        references : list, optional
+            References associated with the pipeline (default is None).
+        required_resources : dict, optional
+            The resources required by the pipeline (default is None, for each resource the largest total
+            requirement of the steps that become ready together).
+        timeout : float, optional
+            How many seconds an execution of the whole pipeline may run (default is None, no limit).
+        iolib : dict, optional
+            Library of input/output types (default is None).
+
+        Raises:
+        ------
+        ValueError
+            If an entry, a step or a parameter is not found, two outputs have the same name, or the steps form
+            a cycle.
+        """
+        if id in algorithmlib:
+            raise ValueError(f'{id} is already an entry')
+        _steps = {}
+        _in_params = {}
+        for step_id, step in steps.items():
+            if isinstance(step, str):
+                step = {'entry': step}
+            if '.' in step_id:
+                raise ValueError(f'step {step_id} has a dot in its ID')
+            if step['entry'] not in algorithmlib:
+                raise ValueError(f'{step["entry"]} not found')
+            _algorithm = algorithmlib[step['entry']]
+            _mapping = step.get('inputs', {})
+            _sources = {}
+            for param_name, param in _algorithm.in_params.items():
+                _source = self._source(_mapping.pop(param_name, param_name), steps)
+                if _source[0] is None and _source[1] not in _in_params:
+                    _in_params[_source[1]] = self._rename(param, _source[1])
+                _sources[param_name] = _source
+            if len(_mapping) > 0:
+                raise ValueError(f'{", ".join(_mapping)} not an input of {step["entry"]}')
+            _steps[step_id] = _Step(step_id, _algorithm, _sources)
+
+        _levels = self._order(_steps)
+        self.steps = {step_id: _steps[step_id] for level in _levels for step_id in level}
+        for step in self.steps.values():
+            for source_step, source_name in step.sources.values():
+                if source_step is not None and source_name not in _steps[source_step].algorithm.out_params:
+                    raise ValueError(f'{source_name} not an output of {source_step}')
+
+        if outputs is None:
+            _read = set().union(*(step.after for step in self.steps.values()))
+            outputs = {}
+            for step in self.steps.values():
+                if step.id in _read:
+                    continue
+                for param_name in step.algorithm.out_params:
+                    if param_name in outputs:
+                        raise ValueError(f'{param_name} is an output of several steps')
+                    outputs[param_name] = f'{step.id}.{param_name}'
+        self.outputs = {}
+        _out_params = {}
+        for param_name, source in outputs.items():
+            source_step, source_name = self._source(source, steps)
+            if source_step is None or source_name not in self.steps[source_step].algorithm.out_params:
+                raise ValueError(f'{source} not an output of a step')
+            self.outputs[param_name] = (source_step, source_name)
+            _out_params[param_name] = self._rename(self.steps[source_step].algorithm.out_params[source_name],
+                                                   param_name)
+
+        self._readers = {step_id: 0 for step_id in self.steps}
+        for step in self.steps.values():
+            for source_step in step.after:
+                self._readers[source_step] += 1
+        for source_step, _ in self.outputs.values():
+            self._readers[source_step] += 1
+
+        if required_resources is None:
+            required_resources = self._resources([[_steps[step_id].requirements for step_id in level]
+                                                  for level in _levels])
+        super().__init__(self._run, id=id, name=name if name is not None else id, description=description,
+                         version=version, references=references, required_resources=required_resources,
+                         iolib=iolib, timeout=timeout)
+        self.in_params = _in_params
+        self.out_params = _out_params
+
+    def __repr__(self):
+        """
+        Returns a string representation of the pipeline.
+
+        Returns:
+        -------
+        str
+            A string representing the pipeline, including its name, id, version and steps.
+        """
+        return f'<{self.name} {self.id}:{self.version} steps:{len(self.steps)}>'
+
+    @staticmethod
+    def _source(source, steps):
+        """
+        Parses the source of a parameter.
+
+        Parameters:
+        ----------
+        source : str
+            'step.name' for an output of a step, or the name of an input of the pipeline.
+        steps : dict
+            The declared steps.
+
+        Returns:
+        -------
+        tuple
+            A tuple (step ID, name), the step ID being None for an input of the pipeline.
+
+        Raises:
+        ------
+        ValueError
+            If the step of the source is not found.
+        """
+        source_step, _, source_name = source.partition('.')
+        if len(source_name) == 0:
+            return None, source
+        if source_step not in steps:
+            raise ValueError(f'step {source_step} not found')
+        return source_step, source_name
+
+    @staticmethod
+    def _rename(param, name):
+        """
+        Returns a copy of a parameter of a step under the name it has in the pipeline.
+
+        Parameters:
+        ----------
+        param : Parameter
+            The parameter of the step.
+        name : str
+            The name of the parameter in the pipeline.
+
+        Returns:
+        -------
+        Parameter
+            The renamed copy, sharing the type, description and default value.
+        """
+        if param.name == name:
+            return param
+        _param = copy.copy(param)
+        _param.name = name
+        return _param
+
+    @staticmethod
+    def _order(steps):
+        """
+        Orders the steps so that every step comes after the steps it reads.
+
+        Parameters:
+        ----------
+        steps : dict
+            The steps, indexed by step ID.
+
+        Returns:
+        -------
+        list of lists of str
+            The levels of the step IDs in a topological order, keeping the declared order where possible. The
+            steps of a level only read the steps of earlier levels, so they may all run at once.
+
+        Raises:
+        ------
+        ValueError
+            If the steps form a cycle.
+        """
+        _levels = []
+        _placed = set()
+        while len(_placed) < len(steps):
+            _ready = [step_id for step_id, step in steps.items() if step_id not in _placed and step.after <= _placed]
+            if len(_ready) == 0:
+                raise ValueError(f'steps {", ".join(sorted(set(steps) - _placed))} form a cycle')
+            _levels.append(_ready)
+            _placed.update(_ready)
+        return _levels
+
+    @staticmethod
+    def _resources(levels):
+        """
+        Returns the largest total requirement of the steps of a level for each resource.
+
+        Parameters:
+        ----------
+        levels : list of lists of dicts
+            The required resources of each step, by level.
+
+        Returns:
+        -------
+        dict
+            The resources required by the pipeline, -1 (the whole resource) if any step requires it.
+        """
+        _resources = {}
+        for level in levels:
+            _totals = {}
+            for requirement in level:
+                for resource_name, resource_quantity in requirement.items():
+                    _current = _totals.get(resource_name, 0)
+                    _totals[resource_name] = -1 if _current == -1 or resource_quantity == -1 \
+                        else _current + resource_quantity
+            for resource_name, resource_quantity in _totals.items():
+                _current = _resources.get(resource_name, 0)
+                if _current == -1 or resource_quantity == -1:
+                    _resources[resource_name] = -1
+                else:
+                    _resources[resource_name] = max(_current, resource_quantity)
+        return _resources
+
+    @staticmethod
+    def _share(step, resources):
+        """
+        Returns the share of the resources of the pipeline given to a step.
+
+        A quantity of -1 requests the whole resource, and requests larger than the allocation of the pipeline
+        are capped to it, as the task queue allocates the resources of a queue to a task.
+
+        Parameters:
+        ----------
+        step : _Step
+            The step.
+        resources : dict
+            The resources allocated to the pipeline.
+
+        Returns:
+        -------
+        dict
+            The quantities given to the step, for each resource allocated to the pipeline.
+        """
+        _share = {}
+        for resource_name, capacity in resources.items():
+            resource_quantity = step.requirements.get(resource_name, 0)
+            if resource_quantity == -1 or resource_quantity > capacity:
+                resource_quantity = capacity
+            _share[resource_name] = resource_quantity
+        return _share
+
+    def _call_step(self, step, inputs, values, resources):
+        """
+        Runs a step on its mapped inputs.
+
+        Parameters:
+        ----------
+        step : _Step
+            The step.
+        inputs : dict
+            The decoded inputs of the pipeline.
+        values : dict
+            The outputs of the finished steps, indexed by step ID.
+        resources : dict
+            The share of the resources of the pipeline given to the step.
+
+        Returns:
+        -------
+        dict
+            The decoded outputs of the step.
+
+        Raises:
+        ------
+        RuntimeError
+            If the step fails.
+        """
+        _params = {param_name: inputs[source_name] if source_step is None else values[source_step][source_name]
+                   for param_name, (source_step, source_name) in step.sources.items()}
+        _success, _output = step.algorithm(_params, resources=resources)
+        if not _success:
+            raise RuntimeError(f'{step.id}: {_output}')
+        return _output
+
+    def _run(self, resources=None, **inputs):
+        """
+        Runs the steps of the pipeline, each as soon as the steps it reads have finished.
+
+        A step ready alone runs in the calling thread; steps ready together run in a thread pool. A ready step
+        starts once its share of the resources fits in what the running steps leave free, and always when no
+        step is running, so the steps never hold more than the pipeline was allocated. The outputs of a step are
+        dropped once every step reading them has run. The progress of the pipeline is the share of finished
+        steps, reported through `resources['progress']` if it is given.
+
+        Parameters:
+        ----------
+        resources : dict, optional
+            The resources allocated to the pipeline (default is None).
+        **inputs
+            The decoded inputs of the pipeline.
+
+        Returns:
+        -------
+        dict
+            The outputs of the pipeline.
+        """
+        resources = dict(resources) if resources is not None else {}
+        resources.pop('stream', None)
+        _progress = resources.pop('progress', None)
+        _shares = {step_id: self._share(step, resources) for step_id, step in self.steps.items()}
+        _free = dict(resources)
+        _values = {}
+        _readers = dict(self._readers)
+        _waiting = {step_id: set(step.after) for step_id, step in self.steps.items()}
+        _running = {}
+        _pool = None
+        try:
+            while len(_waiting) > 0 or len(_running) > 0:
+                _ready = []
+                for step_id, after in _waiting.items():
+                    _share = _shares[step_id]
+                    if len(after) == 0 and (len(_running) + len(_ready) == 0
+                                            or all(_free[name] >= quantity for name, quantity in _share.items())):
+                        _ready.append(step_id)
+                        for resource_name, resource_quantity in _share.items():
+                            _free[resource_name] -= resource_quantity
+                for step_id in _ready:
+                    del _waiting[step_id]
+                if len(_ready) == 1 and len(_running) == 0:
+                    _finished = {_ready[0]: self._call_step(self.steps[_ready[0]], inputs, _values,
+                                                            _shares[_ready[0]])}
+                else:
+                    if _pool is None:
+                        _pool = ThreadPoolExecutor(max_workers=len(self.steps))
+                    for step_id in _ready:
+                        _future = _pool.submit(self._call_step, self.steps[step_id], inputs, _values,
+                                               _shares[step_id])
+                        _running[_future] = step_id
+                    _done, _ = wait(_running, return_when=FIRST_COMPLETED)
+                    _finished = {_running.pop(future): future.result() for future in _done}
+                for step_id, output in _finished.items():
+                    for resource_name, resource_quantity in _shares[step_id].items():
+                        _free[resource_name] += resource_quantity
+                    if _readers[step_id] > 0:
+                        _values[step_id] = output
+                    for source_step in self.steps[step_id].after:
+                        _readers[source_step] -= 1
+                        if _readers[source_step] == 0:
+                            del _values[source_step]
+                    for after in _waiting.values():
+                        after.discard(step_id)
+                if _progress is not None:
+                    _progress(1 - (len(_waiting) + len(_running)) / len(self.steps), ', '.join(_finished))
+        finally:
+            if _pool is not None:
+                _pool.shutdown(wait=True, cancel_futures=True)
+        return {param_name: _values[source_step][source_name]
+                for param_name, (source_step, source_name) in self.outputs.items()}
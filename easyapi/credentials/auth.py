@@ -24,8 +24,10 @@ from typing import Annotated
 from fastapi import Header
 from fastapi import HTTPException
 from uuid import uuid4
+import logging
 import string
 import random
+import math
 import json
 
 class Authenticator(object):
@@ -37,6 +39,8 @@ class Authenticator(object):
     _credentials : dict
         A dictionary holding user credentials and access control information, where each key is a user ID
         and each value is a dictionary containing 'key' and 'access' lists.
+    _invalid_weights : set
+        The user IDs whose invalid weight was already reported.
 
     Methods:
     -------
@@ -64,6 +68,12 @@ class Authenticator(object):
     access_check(self, id, entries)
         Checks if the given user ID has access to the provided list of entries.
 
+    priority(self, id)
+        Returns the priority class of the tasks submitted by the given user ID.
+
+    weight(self, id)
+        Returns the fair-share weight of the given user ID.
+
     _random_id(cls, len=12)
         Generates a random ID of the specified length.
 
@@ -84,6 +94,7 @@ class Authenticator(object):
             A dictionary of credentials to initialize the authenticator with (default is an empty dictionary).
         """
         self._credentials = credentials
+        self._invalid_weights = set()
 
     def __len__(self):
         """
@@ -194,6 +205,46 @@ class Authenticator(object):
             return entries
         return [entry for entry in entries if entry in self._credentials[id]['access']]
 
+    def priority(self, id):
+        """
+        Returns the priority class of the tasks submitted by the given user ID.
+
+        Parameters:
+        ----------
+        id : str
+            The user ID to look up.
+
+        Returns:
+        -------
+        str
+            The optional 'priority' of the credentials, 'normal' if it is not set.
+        """
+        return self._credentials.get(id, {}).get('priority', 'normal')
+
+    def weight(self, id):
+        """
+        Returns the fair-share weight of the given user ID.
+
+        Parameters:
+        ----------
+        id : str
+            The user ID to look up.
+
+        Returns:
+        -------
+        float
+            The optional 'weight' of the credentials, 1 if it is not set or not a positive number. A weight of 0
+            would divide by zero in the scheduler, and a negative one would let the ID starve all others.
+        """
+        weight = self._credentials.get(id, {}).get('weight', 1)
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not 0 < weight < math.inf:
+            if id not in self._invalid_weights:
+                self._invalid_weights.add(id)
+                logging.getLogger('uvicorn.warning').warning(
+                    f'Invalid weight {weight!r} of {id}: a positive number is required, using 1.')
+            return 1
+        return weight
+
     @staticmethod
     def _random_id(len=12):
         """
@@ -3,29 +3,74 @@ Main FastAPI Application for EasyAPI
 ------------------------------------
 
 This module defines the FastAPI application and includes the main routes for the API. It integrates multiple
-routers (iotype, entries, tasks) and provides a root endpoint for basic information about the server. 
+routers (iotype, entries, tasks, sweeps) and provides a root endpoint for basic information about the server. 
 
 The API is secured using the `authenticator` dependency to handle authentication. The root route provides
-server information along with the authenticated user's ID.
+server information along with the authenticated user's ID. When the server starts, the layout dispatchers are
+started so the tasks recovered from the journal run at once, and the hub of the remote workers starts
+listening; when it stops, the hub and the journal are closed. In a frontend of a scheduler process (see
+`easyapi.taskmodel.frontend`), the dispatchers, the hub and the journal run in the scheduler, and the frontend
+only connects its task queue to the event loop.
 
 Routes:
 -------
 - GET /: A root endpoint that returns the server name and the authenticated user's ID.
+- GET /stats: An endpoint that returns task queue statistics.
 
 Dependencies:
 ------------
 - `authenticator`: Dependency for authenticating users via URL-based authentication.
 - `server_name`: A string representing the server's name, imported from the settings.
+- `taskqueue`: The task queue, or the `SchedulerClient` of a frontend, imported from the settings.
+- `journal`: The task journal, or None, imported from the settings.
+- `admission`: The admission control, or None, imported from the settings.
+- `workerhub`: The hub of the remote workers, or None, imported from the settings.
+- `sweepmanager`: The parameter sweeps, or None, imported from the settings as `sweeps`.
 - `iotype.route`: Router for IO-related operations.
 - `entries.route`: Router for entries-related operations.
 - `tasks.route`: Router for task-related operations.
+- `sweeps.route`: Router for parameter sweeps.
 """
 
 from fastapi import FastAPI, Depends
-from .settings import authenticator, server_name
-from .routers import iotype, entries, tasks
+from contextlib import asynccontextmanager
+from .settings import authenticator, server_name, taskqueue, journal, admission, workerhub
+from .settings import sweeps as sweepmanager
+from .routers import iotype, entries, tasks, sweeps
+from .taskmodel.taskholder import get_dispatchers
+from .taskmodel.taskqueue import TaskQueue
+from .taskmodel.frontend import queue_stats
 from . import __version__
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the layout dispatchers when the server starts, so the tasks recovered from the journal run without
+    waiting for a new submission, and the hub of the remote workers. Closes the hub and the journal when the
+    server stops. A frontend only delivers the state changes sent by the scheduler on the event loop.
+
+    Parameters:
+    ----------
+    app : FastAPI
+        The application.
+    """
+    if not isinstance(taskqueue, TaskQueue):
+        taskqueue.start()
+        yield
+        taskqueue.close()
+        return
+    for dispatcher in get_dispatchers(taskqueue):
+        dispatcher.notify()
+    if workerhub is not None:
+        workerhub.start()
+    yield
+    if workerhub is not None:
+        workerhub.close()
+    if journal is not None:
+        journal.close()
+
+
 # Initialize the FastAPI app with specific configurations
 _description = """
 This project aims to transform a wide range of algorithms—currently implemented as functions, modules, or command-line tools—into accessible services by deploying them through a universal RESTful API server. By adhering to RESTful API standards, the project facilitates easy integration of these algorithms, enabling users to interact with them in a standardized and efficient manner.
@@ -38,12 +83,14 @@ app = FastAPI(title='EasyAPI',
               version=__version__,
               openapi_url='/openapi.json',
               docs_url='/docs',
-              redoc_url='/redoc')
+              redoc_url='/redoc',
+              lifespan=lifespan)
 
 # Include the different routers into the main app
 app.include_router(iotype.route)
 app.include_router(entries.route)
 app.include_router(tasks.route)
+app.include_router(sweeps.route)
 
 @app.get("/", tags=['Server Information'])
 async def root(auth_id: str = Depends(authenticator.url_auth)):
@@ -61,3 +108,29 @@ async def root(auth_id: str = Depends(authenticator.url_auth)):
         A dictionary containing the server name and the authenticated user's ID.
     """
     return {'server': server_name, 'id': auth_id}
+
+@app.get("/stats", tags=['Server Information'])
+async def stats(auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Statistics endpoint that returns counters of the task queue.
+    
+    Parameters:
+    ----------
+    auth_id : str
+        The authenticated user's ID, retrieved via URL-based authentication.
+        
+    Returns:
+    -------
+    dict
+        A dictionary containing the number of submitted and deduplicated tasks, the deduplication rate,
+        the number of stolen tasks, the number of results held, and the execution time statistics of each
+        entry. With a journal, it also contains the number of records and commits of the journal and the
+        number of tasks recovered from it. With queue limits, it also contains the numbers of admitted and
+        refused tasks and the queued tasks and drain rate of each layout. With remote workers, it also contains
+        the connected workers and their leases. With sweeps, it also contains the number of sweeps kept and
+        running and their tasks in the queue. In a frontend, the statistics are those of the scheduler, which
+        also contain the connected frontends.
+    """
+    if not isinstance(taskqueue, TaskQueue):
+        return taskqueue.stats()
+    return queue_stats(taskqueue, journal, admission, workerhub, sweepmanager)
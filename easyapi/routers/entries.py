@@ -10,6 +10,8 @@ Routes:
 -------
 - GET /entries/: Retrieves a list of algorithm entries.
 - POST /entries/{entry_name}: Submits a new task for the specified entry.
+- POST /entries/{entry_name}/batch: Submits a batch of tasks for the specified entry.
+- POST /entries/{entry_name}/sweep: Starts a sweep of the specified entry over a grid of input parameters.
 - GET /entries/{entry_name}: Retrieves detailed information about an algorithm entry.
 - Additional GET routes for retrieving entry metadata such as name, version, description, references, 
   input and output schemas.
@@ -22,14 +24,33 @@ _get_entry(entry_name)
 _check_entry_auth(entry_name, auth_id)
     Checks whether the user has authorization to access the specified algorithm entry.
 
+_task_priority(auth_id, priority)
+    Returns the priority class of a task submitted by the user.
+
+_read_ndjson(request)
+    Parses the rows of a newline-delimited JSON request body as they arrive.
+
+_admit(entry, auth_id, count)
+    Checks that tasks submitted by the user fit in the queue limits.
+
+_refusal(error)
+    Returns the response refusing a submission that exceeds the queue limits.
+
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+import json
 from ..settings import authenticator
 from ..settings import algorithmlib
 from ..settings import taskqueue
+from ..settings import journal
+from ..settings import admission
+from ..settings import sweeps
+from ..taskmodel.admission import AdmissionError
+from ..taskmodel.sweep import SweepLimitError
 from ..taskmodel.task import Task
-from ..taskmodel.taskholder import task_holder
+from ..taskmodel.taskholder import task_holder, task_holder_batch
+from ..taskmodel.fairqueue import priority_index
 
 # Initialize FastAPI router with the 'entries' prefix
 route = APIRouter(prefix='/entries', tags=['Algorithm Entries'])
@@ -120,18 +141,104 @@ def _check_entry_auth(entry_name, auth_id):
     if len(auth_response) < 1:
         raise HTTPException(status_code=403)
 
+def _task_priority(auth_id, priority):
+    """
+    Returns the priority class of a task submitted by the user.
+    
+    A request may lower the priority class of the credentials of the user, but never raise it.
+    
+    Parameters:
+    ----------
+    auth_id : str
+        The ID of the user submitting the task.
+    priority : str or None
+        The priority class requested, or None to use the class of the credentials.
+    
+    Returns:
+    -------
+    str
+        The priority class of the task.
+    
+    Raises:
+    ------
+    HTTPException
+        If the requested priority class is unknown, raises a 400 HTTPException.
+    """
+    _priority = authenticator.priority(auth_id)
+    if priority is not None:
+        try:
+            if priority_index(priority) > priority_index(_priority):
+                _priority = priority
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return _priority
+
+def _admit(entry, auth_id, count=1):
+    """
+    Checks that tasks submitted by the user fit in the queue limits of their layout, entry and access ID.
+    
+    Parameters:
+    ----------
+    entry : Algorithm
+        The entry of the tasks.
+    auth_id : str
+        The ID of the user submitting the tasks.
+    count : int, optional
+        The number of tasks submitted together (default is 1).
+    
+    Raises:
+    ------
+    HTTPException
+        If a limit is reached, raises a 429 HTTPException with a `Retry-After` header estimated from the
+        drain rate of the queue. If the tasks alone exceed a limit, raises a 413 HTTPException.
+    """
+    if admission is None:
+        return
+    try:
+        admission.check(entry, auth_id, count)
+    except AdmissionError as e:
+        raise _refusal(e)
+
+def _refusal(error):
+    """
+    Returns the response refusing a submission that exceeds the queue limits.
+    
+    Parameters:
+    ----------
+    error : AdmissionError
+        The error raised by the admission control.
+    
+    Returns:
+    -------
+    HTTPException
+        A 429 HTTPException with a `Retry-After` header, or a 413 HTTPException if the tasks alone exceed a limit.
+    """
+    if error.retry_after is None:
+        return HTTPException(status_code=413, detail=str(error))
+    return HTTPException(status_code=429, detail=str(error), headers={'Retry-After': str(error.retry_after)})
+
 @route.post('/{entry_name}')
-async def submit_task(entry_name, request: Request,
+async def submit_task(entry_name, request: Request, priority: str | None = None, deadline: float | None = None,
                       auth_id: str = Depends(authenticator.url_auth)):
     """
     Submits a task for execution on the specified algorithm entry.
     
+    The task runs in the priority class of the credentials of the user. A request may lower its own
+    priority class with the `priority` query parameter, but never raise it. With a journal, the response is
+    sent once the task is committed to it, unless `wait_commit` is disabled. A task exceeding the queue limits
+    is refused with 429 and a `Retry-After` header. The `deadline` orders the task in layouts using the 'edf'
+    policy.
+    
     Parameters:
     ----------
     entry_name : str
         The name of the algorithm entry for which to submit a task.
     request : Request
         The request object, used to extract the task parameters.
+    priority : str, optional
+        The priority class of the task: 'interactive', 'normal' or 'background'.
+    deadline : float, optional
+        How many seconds after its submission the task should finish.
     auth_id : str
         The ID of the user submitting the task.
     
@@ -143,10 +250,13 @@ async def submit_task(entry_name, request: Request,
     Raises:
     ------
     HTTPException
-        If the task parameters cannot be parsed, or if other errors occur.
+        If the task parameters cannot be parsed, if the priority class is unknown, if the queue limits are
+        reached, or if other errors occur.
     """
     _entry = _get_entry(entry_name)
     _check_entry_auth(entry_name, auth_id)
+    _priority = _task_priority(auth_id, priority)
+    _admit(_entry, auth_id)
     
     try:
         _task_params = await request.json()
@@ -155,10 +265,106 @@ async def submit_task(entry_name, request: Request,
     
     task = Task(access_id=auth_id, algorithm_id=_entry.id,
                 input_data=_task_params,
-                required_resources=_entry.required_resources)
+                required_resources=_entry.required_resources,
+                priority=_priority, weight=authenticator.weight(auth_id), deadline=deadline)
     task_holder(task_queue=taskqueue, task=task)
+    if journal is not None and journal.wait_commit:
+        await journal.committed()
     return {'task_id': task.task_id, 'create_time': task.create_time}
 
+async def _read_ndjson(request):
+    """
+    Parses the rows of a newline-delimited JSON request body as they arrive.
+    
+    Parameters:
+    ----------
+    request : Request
+        The request object streaming the body.
+    
+    Yields:
+    ------
+    object
+        The parsed row of each non-empty line.
+    """
+    _buffer = b''
+    async for chunk in request.stream():
+        _buffer += chunk
+        *_lines, _buffer = _buffer.split(b'\n')
+        for _line in _lines:
+            if _line.strip():
+                yield json.loads(_line)
+    if _buffer.strip():
+        yield json.loads(_buffer)
+
+@route.post('/{entry_name}/batch')
+async def submit_task_batch(entry_name, request: Request, priority: str | None = None,
+                            deadline: float | None = None, auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Submits a batch of tasks for execution on the specified algorithm entry.
+    
+    The body is either a JSON array of task parameters, or, with the content type `application/x-ndjson`,
+    one JSON object of task parameters per line. The user is authenticated once for the whole batch, and
+    the tasks are enqueued in one pass and committed to the journal in one transaction. Identical rows are collapsed onto one task, whose ID is returned
+    for each of them. The batch is admitted or refused as a whole against the queue limits.
+    
+    Parameters:
+    ----------
+    entry_name : str
+        The name of the algorithm entry for which to submit the tasks.
+    request : Request
+        The request object, used to extract the task parameters.
+    priority : str, optional
+        The priority class of the tasks: 'interactive', 'normal' or 'background'.
+    deadline : float, optional
+        How many seconds after their submission the tasks should finish.
+    auth_id : str
+        The ID of the user submitting the tasks.
+    
+    Returns:
+    -------
+    dict
+        A dictionary containing the task ID of each row in order, the number of rows, the number of
+        distinct tasks, and the creation time.
+    
+    Raises:
+    ------
+    HTTPException
+        If the body is not an array or a stream of JSON objects, if the priority class is unknown,
+        if the queue limits are reached, or if other errors occur.
+    """
+    _entry = _get_entry(entry_name)
+    _check_entry_auth(entry_name, auth_id)
+    _priority = _task_priority(auth_id, priority)
+    _weight = authenticator.weight(auth_id)
+    
+    try:
+        if request.headers.get('content-type', '').startswith('application/x-ndjson'):
+            _rows = [_row async for _row in _read_ndjson(request)]
+        else:
+            _rows = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Task parameters are not valid JSON')
+    if not isinstance(_rows, list) or not all(isinstance(_row, dict) for _row in _rows):
+        raise HTTPException(status_code=400, detail='Task parameters should be a list of objects')
+    
+    _tasks = {}
+    _task_ids = []
+    for _row in _rows:
+        _signature = json.dumps(_row, sort_keys=True, separators=(',', ':'))
+        task = _tasks.get(_signature)
+        if task is None:
+            task = _tasks[_signature] = Task(access_id=auth_id, algorithm_id=_entry.id,
+                                             input_data=_row,
+                                             required_resources=_entry.required_resources,
+                                             priority=_priority, weight=_weight, deadline=deadline)
+        _task_ids.append(task.task_id)
+    _admit(_entry, auth_id, len(_tasks))
+    task_holder_batch(task_queue=taskqueue, tasks=list(_tasks.values()))
+    if journal is not None and journal.wait_commit:
+        await journal.committed()
+    return {'task_ids': _task_ids, 'total': len(_task_ids), 'unique': len(_tasks),
+            'create_time': next(iter(_tasks.values())).create_time if _tasks else None}
+
 @route.get('/{entry_name}')
 async def get_entry_doc(entry_name, io: bool = False, auth_id: str = Depends(authenticator.url_auth)):
     """
@@ -337,3 +543,63 @@ async def get_entry_output_schema(entry_name, auth_id: str = Depends(authenticat
     _check_entry_auth(entry_name, auth_id)
     response = {name: param.property for name, param in _entry.out_params.items()}
     return response
+
+@route.post('/{entry_name}/sweep')
+async def submit_sweep(entry_name, request: Request, priority: str | None = None, deadline: float | None = None,
+                       window: int | None = None, auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Starts a sweep of the specified algorithm entry over a grid of input parameters.
+    
+    The body gives the axis of each input parameter: a list of values, {"start", "stop", "step"},
+    {"start", "stop", "num", "log"}, or a single value kept fixed. The entry runs on every point of the
+    Cartesian product of the axes. At most `window` tasks of the sweep are queued at once; the next points
+    are submitted as they finish, and the results are read from GET /sweeps/{sweep_id}. The first window is
+    admitted as a batch of as many tasks, and the next points only as far as the queue limits allow.
+    
+    Parameters:
+    ----------
+    entry_name : str
+        The name of the algorithm entry to sweep.
+    request : Request
+        The request object, used to extract the axes.
+    priority : str, optional
+        The priority class of the tasks: 'interactive', 'normal' or 'background'.
+    deadline : float, optional
+        How many seconds after its submission each task should finish.
+    window : int, optional
+        The largest number of tasks of the sweep queued at once, up to the configured window.
+    auth_id : str
+        The ID of the user starting the sweep.
+    
+    Returns:
+    -------
+    dict
+        The summary of the sweep: its ID, entry, status, and numbers of points in the grid, submitted,
+        queued, finished and failed.
+    
+    Raises:
+    ------
+    HTTPException
+        If the axes cannot be parsed or do not match the inputs of the entry, if the grid exceeds the sweep
+        limit, if the priority class is unknown, if the queue limits are reached, or if other errors occur.
+    """
+    _entry = _get_entry(entry_name)
+    _check_entry_auth(entry_name, auth_id)
+    _priority = _task_priority(auth_id, priority)
+    
+    try:
+        _specs = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Sweep parameters are not valid JSON')
+    try:
+        _summary = sweeps.start(_entry, auth_id, _specs, priority=_priority, weight=authenticator.weight(auth_id),
+                                deadline=deadline, window=window)
+    except SweepLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AdmissionError as e:
+        raise _refusal(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if journal is not None and journal.wait_commit:
+        await journal.committed()
+    return _summary
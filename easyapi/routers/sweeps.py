@@ -0,0 +1,169 @@
+"""
+FastAPI Routes for Parameter Sweeps
+-----------------------------------
+
+This module defines the API routes for reading and stopping the parameter sweeps started with
+POST /entries/{entry_name}/sweep. The results of a sweep are returned as columns in completion order: the index
+of each point in the grid, its inputs, the outputs of the entry and the error of each failed point. They can be
+read by blocks with `offset` and `limit`, or streamed as they arrive.
+
+Routes:
+-------
+- GET /sweeps/{sweep_id}: Retrieves the state of a sweep and a block of its results.
+- GET /sweeps/{sweep_id}/stream: Streams the results of a sweep as newline-delimited JSON as they arrive.
+- DELETE /sweeps/{sweep_id}: Stops a sweep, cancelling its queued and running tasks.
+
+Functions:
+----------
+get_sweep(sweep_id, offset, limit, auth_id)
+    Retrieves the state of a sweep and a block of its results.
+
+stream_sweep(sweep_id, auth_id)
+    Streams the results of a sweep as newline-delimited JSON over a chunked response.
+
+stop_sweep(sweep_id, auth_id)
+    Stops a sweep.
+
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+import json
+from ..settings import authenticator
+from ..settings import sweeps
+
+# Initialize FastAPI router with the 'sweeps' prefix
+route = APIRouter(prefix='/sweeps', tags=['Parameter Sweeps'])
+
+# The largest number of results sent in one line of a sweep stream.
+STREAM_BLOCK = 1000
+
+# How long a sweep stream waits for new results before reading the sweep again, in seconds.
+STREAM_WAIT = 15
+
+
+@route.get('/{sweep_id}')
+async def get_sweep(sweep_id, offset: int = 0, limit: int | None = None,
+                    auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Retrieves the state of a sweep and a block of its results.
+
+    Parameters:
+    ----------
+    sweep_id : str
+        The ID of the sweep.
+    offset : int
+        The first result of the block, in completion order.
+    limit : int, optional
+        The largest number of results of the block, all of them by default.
+    auth_id : str
+        The ID of the user making the request, used for authorization.
+
+    Returns:
+    -------
+    dict
+        A dictionary containing the sweep ID, the entry, the status ('running', 'done' or 'cancelled'), the
+        numbers of points in the grid, submitted, queued, finished and failed, the offset of the block, and its
+        columns: 'index', 'inputs' and 'outputs' by parameter name, and 'error'.
+
+    Raises:
+    ------
+    HTTPException
+        If the sweep is not found or if the user is not authorized to view it.
+    """
+    _response = sweeps.read(sweep_id, auth_id, offset, limit)
+    if _response is None:
+        raise HTTPException(status_code=404, detail=f'Sweep {sweep_id} not found')
+    return _response
+
+async def _stream_sweep(sweep_id, auth_id):
+    """
+    Yields the results of a sweep as JSON lines as they arrive.
+
+    Parameters:
+    ----------
+    sweep_id : str
+        The ID of the sweep.
+    auth_id : str
+        The ID of the user reading the sweep.
+
+    Yields:
+    ------
+    str
+        A line {"offset", "columns"} per block of new results, and a last line with the summary of the sweep
+        once it is finished.
+    """
+    _offset = 0
+    while True:
+        _response = sweeps.read(sweep_id, auth_id, _offset, STREAM_BLOCK)
+        if _response is None:
+            yield json.dumps({'sweep_id': sweep_id, 'status': 'deleted'}) + '\n'
+            return
+        _columns = _response.pop('columns')
+        _count = len(_columns['index'])
+        if _count > 0:
+            yield json.dumps({'offset': _response.pop('offset'), 'columns': _columns}, default=str) + '\n'
+            _offset += _count
+            continue
+        if _response['status'] != 'running' and _response['in_flight'] == 0:
+            del _response['offset']
+            yield json.dumps(_response, default=str) + '\n'
+            return
+        await sweeps.wait(sweep_id, auth_id, _offset, STREAM_WAIT)
+
+@route.get('/{sweep_id}/stream')
+async def stream_sweep(sweep_id, auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Streams the results of a sweep as newline-delimited JSON over a chunked response.
+
+    Each line holds a block of results, {"offset": ..., "columns": ...}, in completion order, sent as soon as
+    the points finish. The last line is the summary of the sweep, sent once it is done or cancelled.
+
+    Parameters:
+    ----------
+    sweep_id : str
+        The ID of the sweep to follow.
+    auth_id : str
+        The ID of the user making the request, used for authorization.
+
+    Returns:
+    -------
+    StreamingResponse
+        The `application/x-ndjson` response.
+
+    Raises:
+    ------
+    HTTPException
+        If the sweep is not found or if the user is not authorized to view it.
+    """
+    if sweeps.read(sweep_id, auth_id, 0, 0) is None:
+        raise HTTPException(status_code=404, detail=f'Sweep {sweep_id} not found')
+    return StreamingResponse(_stream_sweep(sweep_id, auth_id), media_type='application/x-ndjson')
+
+@route.delete('/{sweep_id}')
+async def stop_sweep(sweep_id, auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Stops a sweep: no more point is submitted and its queued and running tasks are cancelled. The results
+    already collected can still be read.
+
+    Parameters:
+    ----------
+    sweep_id : str
+        The ID of the sweep to stop.
+    auth_id : str
+        The ID of the user making the request, used for authorization.
+
+    Returns:
+    -------
+    dict
+        The summary of the sweep.
+
+    Raises:
+    ------
+    HTTPException
+        If the sweep is not found or if the user is not authorized to stop it.
+    """
+    _summary = sweeps.stop(sweep_id, auth_id)
+    if _summary is None:
+        raise HTTPException(status_code=404, detail=f'Sweep {sweep_id} not found')
+    return _summary
@@ -8,49 +8,135 @@ secured with user authentication via the `authenticator` dependency and interact
 
 Routes:
 -------
-- GET /tasks/{task_id}: Retrieves the status of a specific task.
-- POST /tasks/{task_id}/cancel: Cancels a task if it is not yet completed.
-- WebSocket /tasks/{task_id}/ws: Establishes a WebSocket connection for real-time updates of a task's progress.
+- GET /tasks/{task_id}: Retrieves the status of a specific task, optionally waiting for it to finish.
+- GET /tasks/{task_id}/events: Streams the state changes and progress of a task as Server-Sent Events.
+- GET /tasks/{task_id}/stream: Streams the output of a task, chunk by chunk for a streaming entry.
+- DELETE /tasks/{task_id}: Deletes a task, freeing its result or cancelling it if it is not yet completed.
+- POST /tasks/{task_id}/cancel: Stops a task that is not yet completed, keeping it with the 'cancelled' status.
+- WebSocket /tasks/ws: Establishes a WebSocket connection that pushes the state changes of the subscribed tasks.
+- WebSocket /tasks/{task_id}/ws: Establishes a WebSocket connection that pushes the state changes of a task.
 
 Classes:
 --------
 ConnectionManager:
     Manages WebSocket connections for task progress updates.
 
+TaskSubscriptions:
+    The tasks a multiplexed WebSocket connection is subscribed to, and the updates waiting to be sent.
+
 Functions:
 ----------
-build_task_response(task_id, task)
+build_task_response(task_id, task, output)
     Constructs a dictionary response containing the current status of a task.
+
+task_eta(task)
+    Estimates how many seconds a running task needs to finish from its last progress report.
+
+task_estimate(task)
+    Estimates when a queued or running task starts and finishes from the runtime model of the task queue.
+
+task_etag(task)
+    Returns the entity tag of the current status of a task.
+
+wait_task(task_id, timeout)
+    Waits until a task finishes or is deleted, or until the timeout passes.
     
-get_task(task_id, auth_id)
+get_task(task_id, request, response, wait, auth_id)
     Retrieves and returns the status of a specific task.
 
+format_sse(event, data, event_id)
+    Formats a Server-Sent Event.
+
+stream_task(task_id, auth_id)
+    Streams the state changes of a task as Server-Sent Events.
+
+stream_task_output(task_id, auth_id)
+    Streams the output of a task as newline-delimited JSON over a chunked response.
+
+build_task_event(task_id, task, state)
+    Constructs the message pushed to the subscribers of a task when its state changes.
+
+encode_frame(frame, encoding)
+    Encodes a frame of a multiplexed WebSocket connection.
+
+manage_tasks_ws(websocket, encoding, auth_id)
+    Manages a WebSocket connection multiplexing the updates of many tasks.
+
 manage_task_ws(websocket, task_id, auth_id)
     Manages a WebSocket connection for real-time task updates.
     
 cancel_task(task_id, auth_id)
-    Cancels a task and removes it from the task queue.
+    Stops a task that is not yet completed and keeps it as cancelled.
+
+delete_task(task_id, auth_id)
+    Deletes a task and frees its result.
 
 """
 
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, WebSocketException, status
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone, timedelta
+import asyncio
 import json
+import time
+from uuid import UUID
 from ..settings import authenticator
 from ..settings import taskqueue
+from ..taskmodel.notifier import TaskNotifier
+from ..taskmodel.task import task_key
 
 # Initialize FastAPI router with the 'tasks' prefix
 route = APIRouter(prefix='/tasks', tags=['Task Management'])
 
-def build_task_response(task_id, task):
+# The longest time a request may wait for a task to finish, in seconds.
+MAX_WAIT = 60
+
+# Futures of the requests waiting for each task to finish, by the binary task ID, so any spelling of an ID matches.
+_waiters = {}
+
+# How long the updates of a multiplexed WebSocket connection are gathered into one frame, in seconds.
+FRAME_INTERVAL = 0.02
+
+# How often an idle event stream sends a comment to keep the connection open, in seconds.
+SSE_KEEPALIVE = 15
+
+def _wake_waiters(task, state):
+    """
+    Resolves the futures of the requests waiting for a task once it is done or deleted.
+    
+    Parameters:
+    ----------
+    task : Task
+        The task whose state changed.
+    state : str
+        The new state of the task.
+    """
+    if state == taskqueue.DONE or state == taskqueue.DELETED:
+        for future in _waiters.pop(task.key, ()):
+            if not future.done():
+                future.set_result(state)
+
+taskqueue.add_listener(_wake_waiters)
+
+# Routes the state changes of the tasks to the WebSocket subscribers.
+notifier = TaskNotifier(taskqueue)
+
+def build_task_response(task_id, task, output=True):
     """
     Constructs a dictionary response containing the current status of a task.
     
+    Reading a finished task does not remove it: it stays in the result store until it expires, is evicted,
+    or is deleted, so the same result can be read again.
+    
     Parameters:
     ----------
     task_id : str
         The ID of the task to retrieve the status for.
     task : Task
         The task object containing information about the task's state.
+    output : bool, optional
+        Whether the output of a finished task is included (default is True).
     
     Returns:
     -------
@@ -64,10 +150,11 @@ def build_task_response(task_id, task):
             'create_time': task.create_time,
             'start_time': task.start_time,
             'done_time': task.done_time,
+            'status': task.interrupted or 'done',
             'success': task.error is None,
-            'output': task.output_data if task.error is None else task.error,
         }
-        del taskqueue[task_id]
+        if output or task.error is not None:
+            response['output'] = taskqueue.results.output(task) if task.error is None else task.error
     else:
         if task.in_progress:
             response = {
@@ -76,31 +163,142 @@ def build_task_response(task_id, task):
                 'create_time': task.create_time,
                 'start_time': task.start_time,
             }
+            if task.progress is not None:
+                response['progress'] = task.progress
+                response['message'] = task.progress_message
+                response['eta'] = task_eta(task)
+            response['estimated_finish'] = task_estimate(task)[1]
         else:
+            _start, _finish = task_estimate(task)
             response = {
                 'task_id': task.task_id,
                 'status': 'in-queue',
                 'create_time': task.create_time,
-                'queue_length': taskqueue.queue_where(task=task)
+                'queue_length': taskqueue.queue_where(task=task),
+                'estimated_start': _start,
+                'estimated_finish': _finish,
             }
+        if task.deadline is not None:
+            response['deadline'] = task.deadline
     return response
 
+def task_estimate(task):
+    """
+    Estimates when a queued or running task starts and finishes from the runtime model of the task queue.
+    
+    Parameters:
+    ----------
+    task : Task
+        The queued or running task.
+    
+    Returns:
+    -------
+    tuple
+        A tuple (start, finish) of the estimated times, or (None, None) if no runtime is known yet.
+    """
+    _estimate = taskqueue.estimate(task)
+    if _estimate is None:
+        return None, None
+    _now = datetime.now(timezone.utc)
+    return _now + timedelta(seconds=_estimate[0]), _now + timedelta(seconds=_estimate[1])
+
+def task_eta(task):
+    """
+    Estimates how many seconds a running task needs to finish from its last progress report, assuming
+    the rest of the work proceeds at the same rate.
+    
+    Parameters:
+    ----------
+    task : Task
+        The running task.
+    
+    Returns:
+    -------
+    float or None
+        The estimated remaining time in seconds, or None if no work was reported done yet.
+    """
+    if not task.progress or task.start_clock is None:
+        return None
+    _elapsed = time.monotonic() - task.start_clock
+    return round(_elapsed * (1.0 - task.progress) / task.progress, 3)
+
+def task_etag(task):
+    """
+    Returns the entity tag of the current status of a task.
+    
+    The tag changes whenever the response of `build_task_response` would change: when the task moves
+    forward in the queue, starts, or finishes or is stopped.
+    
+    Parameters:
+    ----------
+    task : Task
+        The task object containing information about the task's state.
+    
+    Returns:
+    -------
+    str
+        The quoted entity tag.
+    """
+    if task.is_done:
+        return f'"{task.task_id}-{task.interrupted or "done"}"'
+    if task.in_progress:
+        return f'"{task.task_id}-in-progress-{task.progress}"'
+    return f'"{task.task_id}-in-queue-{taskqueue.queue_where(task=task)}"'
+
+async def wait_task(task_id, timeout):
+    """
+    Waits until a task finishes or is deleted, or until the timeout passes.
+    
+    The request is parked on a future resolved by the task queue listener, so a waiting request costs
+    nothing until the task changes.
+    
+    Parameters:
+    ----------
+    task_id : str or bytes
+        The ID of the task to wait for, or its binary form.
+    timeout : float
+        The longest time to wait, in seconds.
+    """
+    task_id = task_key(task_id)
+    future = asyncio.get_running_loop().create_future()
+    _futures = _waiters.setdefault(task_id, set())
+    _futures.add(future)
+    try:
+        await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        _futures.discard(future)
+        if len(_futures) == 0 and _waiters.get(task_id) is _futures:
+            del _waiters[task_id]
+
 @route.get('/{task_id}')
-async def get_task(task_id, auth_id: str = Depends(authenticator.url_auth)):
+async def get_task(task_id, request: Request, response: Response, wait: float = 0,
+                   auth_id: str = Depends(authenticator.url_auth)):
     """
     Retrieves and returns the status of a specific task.
     
+    With `wait`, the request is held until the task finishes or `wait` seconds pass (at most `MAX_WAIT`),
+    so a client can poll once instead of in a loop. The response carries an `ETag` of the task status;
+    if it matches the `If-None-Match` header of the request, a 304 response without body is returned.
+    
     Parameters:
     ----------
     task_id : str
         The ID of the task to retrieve.
+    request : Request
+        The request object, used to read the `If-None-Match` header.
+    response : Response
+        The response object, used to set the `ETag` header.
+    wait : float, optional
+        How many seconds to wait for an unfinished task to finish (default is 0).
     auth_id : str
         The ID of the user making the request, used for authorization.
         
     Returns:
     -------
-    dict
-        A dictionary containing the task's status and related information.
+    dict or Response
+        A dictionary containing the task's status and related information, or an empty 304 response.
     
     Raises:
     ------
@@ -114,34 +312,234 @@ async def get_task(task_id, auth_id: str = Depends(authenticator.url_auth)):
     if task.access_id != auth_id:
         raise HTTPException(status_code=404, detail=f'Task {task_id} not found')
     
+    if wait > 0 and not task.is_done:
+        await wait_task(task_id, min(wait, MAX_WAIT))
+        task = taskqueue[task_id]
+        if task is None:
+            raise HTTPException(status_code=404, detail=f'Task {task_id} not found')
+    
+    _etag = task_etag(task)
+    if request.headers.get('if-none-match') == _etag:
+        return Response(status_code=304, headers={'ETag': _etag})
+    response.headers['ETag'] = _etag
     return build_task_response(task_id, task)
 
+def format_sse(event, data, event_id=None):
+    """
+    Formats a Server-Sent Event.
+    
+    Parameters:
+    ----------
+    event : str
+        The event type.
+    data : dict
+        The event data, sent as JSON.
+    event_id : str, optional
+        The event ID (default is None).
+    
+    Returns:
+    -------
+    str
+        The event in the `text/event-stream` format.
+    """
+    _lines = [f'event: {event}']
+    if event_id is not None:
+        _lines.append(f'id: {event_id}')
+    _lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(_lines) + '\n\n'
+
+def _task_state(task):
+    """
+    Returns the current state of a task, as the notifier would report it.
+    
+    Parameters:
+    ----------
+    task : Task or None
+        The task, or None if it no longer exists.
+    
+    Returns:
+    -------
+    str
+        One of the `TaskQueue` states.
+    """
+    if task is None:
+        return taskqueue.DELETED
+    return taskqueue.DONE if task.is_done else taskqueue.RUNNING if task.in_progress else taskqueue.QUEUED
+
+async def _stream_task_events(task_id, events: asyncio.Queue, sink):
+    """
+    Yields the Server-Sent Events of a task until it finishes or is deleted.
+    
+    Parameters:
+    ----------
+    task_id : str
+        The ID of the task.
+    events : asyncio.Queue
+        The states delivered by the notifier.
+    sink : callable
+        The sink subscribed to the notifier, unsubscribed when the stream ends.
+    
+    Yields:
+    ------
+    str
+        The events, each carrying the status of the task as returned by GET /tasks/{task_id}.
+    """
+    try:
+        # The task may have been deleted or evicted since the route checked it.
+        state = _task_state(taskqueue[task_id])
+        _last = None
+        while True:
+            task = taskqueue[task_id]
+            data = build_task_event(task_id, task, state)
+            if data != _last:
+                yield format_sse(state, data, task_etag(task).strip('"') if task is not None else None)
+                _last = data
+            if task is None or state == taskqueue.DELETED or task.is_done:
+                return
+            try:
+                state = await asyncio.wait_for(events.get(), SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+    finally:
+        notifier.unsubscribe(task_id, sink)
+
+@route.get('/{task_id}/events')
+async def stream_task(task_id, auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Streams the state changes of a task as Server-Sent Events.
+    
+    The first event carries the current status of the task, then an event is sent on every change: 'position'
+    when it moves forward in the queue, 'running' when it starts, 'progress' when its entry reports progress,
+    and finally 'done' or 'deleted', which ends the stream. The data of each event is the status of the task
+    as returned by GET /tasks/{task_id}. Progress events are sent at most once per `progress_interval` seconds
+    of the task queue, however often the entry reports.
+    
+    Parameters:
+    ----------
+    task_id : str
+        The ID of the task to follow.
+    auth_id : str
+        The ID of the user making the request, used for authorization.
+    
+    Returns:
+    -------
+    StreamingResponse
+        The `text/event-stream` response.
+    
+    Raises:
+    ------
+    HTTPException
+        If the task is not found or if the user is not authorized to view the task.
+    """
+    task = taskqueue[task_id]
+    if task is None or task.access_id != auth_id:
+        raise HTTPException(status_code=404, detail=f'Task {task_id} not found')
+    _events = asyncio.Queue()
+    _sink = lambda task, state: _events.put_nowait(state)
+    notifier.subscribe(task_id, _sink)
+    return StreamingResponse(_stream_task_events(task_id, _events, _sink), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache'})
+
+async def _stream_task_output(task_id, events: asyncio.Queue, sink):
+    """
+    Yields the output of a task as JSON lines, chunk by chunk for a streaming task.
+    
+    Parameters:
+    ----------
+    task_id : str
+        The ID of the task.
+    events : asyncio.Queue
+        The states delivered by the notifier.
+    sink : callable
+        The sink subscribed to the notifier, unsubscribed when the stream ends.
+    
+    Yields:
+    ------
+    str
+        The output chunks, the complete output of a task that is not streaming, or a last line with the
+        error of a failed task.
+    """
+    try:
+        _offset = 0
+        while True:
+            task = taskqueue[task_id]
+            if task is None:
+                yield json.dumps({'task_id': task_id, 'status': 'deleted'}) + '\n'
+                return
+            if task.stream is not None:
+                for chunk, _offset in task.stream.read(_offset):
+                    yield json.dumps(chunk, default=str) + '\n'
+            if task.is_done:
+                if task.error is not None:
+                    yield json.dumps({'success': False, 'output': task.error}) + '\n'
+                elif task.stream is None:
+                    yield json.dumps(taskqueue.results.output(task), default=str) + '\n'
+                return
+            await events.get()
+    finally:
+        notifier.unsubscribe(task_id, sink)
+
+@route.get('/{task_id}/stream')
+async def stream_task_output(task_id, auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Streams the output of a task as newline-delimited JSON over a chunked response.
+    
+    The output chunks of a streaming entry are sent while the task is still running, as soon as they are
+    produced and validated; the response ends when the task finishes. The output of any other entry is sent
+    as a single line once the task finishes. If the task fails, the last line is {"success": false, "output":
+    error}.
+    
+    Parameters:
+    ----------
+    task_id : str
+        The ID of the task to follow.
+    auth_id : str
+        The ID of the user making the request, used for authorization.
+    
+    Returns:
+    -------
+    StreamingResponse
+        The `application/x-ndjson` response.
+    
+    Raises:
+    ------
+    HTTPException
+        If the task is not found or if the user is not authorized to view the task.
+    """
+    task = taskqueue[task_id]
+    if task is None or task.access_id != auth_id:
+        raise HTTPException(status_code=404, detail=f'Task {task_id} not found')
+    _events = asyncio.Queue()
+    _sink = lambda task, state: _events.put_nowait(state)
+    notifier.subscribe(task_id, _sink)
+    return StreamingResponse(_stream_task_output(task_id, _events, _sink), media_type='application/x-ndjson')
+
 class ConnectionManager:
     """
     Manages WebSocket connections for task progress updates.
     
     Attributes:
     ----------
-    active_connections : list
-        A list of active WebSocket connections.
+    active_connections : set
+        The set of active WebSocket connections.
     
     Methods:
     -------
     connect(websocket: WebSocket)
-        Accepts a WebSocket connection and adds it to the active connections list.
+        Accepts a WebSocket connection and adds it to the active connections.
         
     disconnect(websocket: WebSocket)
-        Removes a WebSocket connection from the active connections list.
+        Removes a WebSocket connection from the active connections.
         
-    send_message(message: str, websocket: WebSocket)
+    send_message(message: str | bytes, websocket: WebSocket)
         Sends a message to a specific WebSocket connection.
     """
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: set[WebSocket] = set()
 
     async def connect(self, websocket: WebSocket):
         """
-        Accepts a WebSocket connection and adds it to the active connections list.
+        Accepts a WebSocket connection and adds it to the active connections.
         
         Parameters:
         ----------
@@ -149,40 +547,408 @@ class ConnectionManager:
             The WebSocket connection to accept.
         """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
         """
-        Removes a WebSocket connection from the active connections list.
+        Removes a WebSocket connection from the active connections.
         
         Parameters:
         ----------
         websocket : WebSocket
             The WebSocket connection to disconnect.
         """
-        self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
 
-    async def send_message(self, message: str, websocket: WebSocket):
+    async def send_message(self, message: str | bytes, websocket: WebSocket):
         """
-        Sends a message to a specific WebSocket connection.
+        Sends a message to a specific WebSocket connection, as a binary frame if the message is bytes.
         
         Parameters:
         ----------
-        message : str
+        message : str or bytes
             The message to send to the WebSocket connection.
         websocket : WebSocket
             The WebSocket connection to send the message to.
         """
-        await websocket.send_text(message)
+        if isinstance(message, bytes):
+            await websocket.send_bytes(message)
+        else:
+            await websocket.send_text(message)
 
 # Instantiate the WebSocket connection manager
 ws_manager = ConnectionManager()
 
+def build_task_event(task_id, task, state):
+    """
+    Constructs the message pushed to the subscribers of a task when its state changes.
+    
+    Parameters:
+    ----------
+    task_id : str
+        The ID of the task.
+    task : Task or None
+        The task object, or None if it no longer exists.
+    state : str
+        The new state of the task.
+    
+    Returns:
+    -------
+    dict
+        The current status of the task as built by `build_task_response`, or a 'deleted' status. The output
+        of a finished streaming task is not included, as it was streamed chunk by chunk; the number of its
+        chunks is given instead.
+    """
+    if state == taskqueue.DELETED or task is None:
+        return {'task_id': task_id, 'status': 'deleted'}
+    if task.is_done and task.stream is not None:
+        response = build_task_response(task_id, task, output=False)
+        response['chunks'] = len(task.stream)
+        return response
+    return build_task_response(task_id, task)
+
+async def _push_task_chunks(websocket: WebSocket, task, offset):
+    """
+    Sends the output chunks of a streaming task written after an offset to a WebSocket.
+    
+    Parameters:
+    ----------
+    websocket : WebSocket
+        The WebSocket connection to push to.
+    task : Task
+        The streaming task.
+    offset : int
+        The offset in the chunk spool of the first chunk to send.
+    
+    Returns:
+    -------
+    int
+        The offset after the last chunk sent.
+    """
+    for chunk, offset in task.stream.read(offset):
+        await ws_manager.send_message(
+            json.dumps({'task_id': task.task_id, 'status': 'chunk', 'chunk': chunk}, default=str), websocket
+        )
+    return offset
+
+async def _push_task_events(websocket: WebSocket, task_id, events: asyncio.Queue):
+    """
+    Sends the state changes of a task to a WebSocket as they are delivered by the notifier.
+    
+    The message is built from the task when it is sent, so an event that was overtaken by a later one would
+    repeat the previous message; such messages are skipped. The output chunks of a streaming task are sent as
+    they are produced, each in a 'chunk' message, before the final message of the task. Returns once the task
+    is done or deleted, as nothing more will be pushed.
+    
+    Parameters:
+    ----------
+    websocket : WebSocket
+        The WebSocket connection to push to.
+    task_id : str
+        The ID of the task.
+    events : asyncio.Queue
+        The states delivered by the notifier.
+    """
+    _last = None
+    _offset = 0
+    while True:
+        state = await events.get()
+        task = taskqueue[task_id]
+        if task is not None and task.stream is not None and state != taskqueue.DELETED:
+            _offset = await _push_task_chunks(websocket, task, _offset)
+        if state == taskqueue.CHUNK:
+            continue
+        message = json.dumps(build_task_event(task_id, task, state), default=str)
+        if message != _last:
+            await ws_manager.send_message(message, websocket)
+            _last = message
+        if task is None or state == taskqueue.DELETED or task.is_done:
+            return
+
+async def _answer_task_commands(websocket: WebSocket, task_id, auth_id):
+    """
+    Answers the commands sent by the client of a task WebSocket.
+    
+    Parameters:
+    ----------
+    websocket : WebSocket
+        The WebSocket connection.
+    task_id : str
+        The ID of the task.
+    auth_id : str
+        The ID of the user making the request, used for authorization.
+    """
+    while True:
+        command = await websocket.receive_text()
+        if command.lower() == 'get':
+            task = taskqueue[task_id]
+            if task is None or task.access_id != auth_id:
+                await ws_manager.send_message(
+                    json.dumps({'status': f'Task {task_id} not found', 'success': False}), websocket
+                )
+            else:
+                await ws_manager.send_message(
+                    json.dumps(build_task_response(task_id, task), default=str), websocket
+                )
+        else:
+            await ws_manager.send_message(
+                json.dumps({'status': f'{command} not supported.', 'success': False}), websocket
+            )
+
+class TaskSubscriptions(object):
+    """
+    The tasks a multiplexed WebSocket connection is subscribed to, and the updates waiting to be sent.
+    
+    The notifier calls `push` for every state change of a subscribed task. Only the latest state of each task
+    is kept until the next frame is sent, so the updates of a busy task coalesce, and all waiting updates
+    are sent together in one frame.
+    
+    Attributes:
+    ----------
+    auth_id : str
+        The ID of the user owning the connection.
+    tasks : set
+        The IDs of the subscribed tasks, in the form returned by `Task.task_id`, so any spelling of an ID matches.
+    pending : dict
+        The latest undelivered state of each task with waiting updates, in the order they arrived.
+    sent : dict
+        The entity tag of the last update sent for each subscribed task.
+    ready : asyncio.Event
+        Set when updates are waiting.
+    """
+    
+    def __init__(self, auth_id):
+        """
+        Initializes an empty set of subscriptions.
+        
+        Parameters:
+        ----------
+        auth_id : str
+            The ID of the user owning the connection.
+        """
+        self.auth_id = auth_id
+        self.tasks = set()
+        self.pending = {}
+        self.sent = {}
+        self.ready = asyncio.Event()
+    
+    def push(self, task, state):
+        """
+        Records a state change of a subscribed task; the sink given to the notifier.
+        
+        Parameters:
+        ----------
+        task : Task
+            The task whose state changed.
+        state : str
+            The new state of the task.
+        """
+        self.pending[task.task_id] = state
+        self.ready.set()
+    
+    def subscribe(self, task_ids):
+        """
+        Subscribes to tasks and queues their current status. Tasks that do not exist or belong to another
+        user are reported as not found.
+        
+        Parameters:
+        ----------
+        task_ids : list of str
+            The IDs of the tasks.
+        """
+        for task_id in task_ids:
+            task = taskqueue[task_id]
+            if task is None or task.access_id != self.auth_id:
+                self.pending[task_id] = None
+                continue
+            task_id = task.task_id
+            if task_id not in self.tasks:
+                self.tasks.add(task_id)
+                notifier.subscribe(task_id, self.push)
+                self.pending[task_id] = _task_state(task)
+        self.ready.set()
+    
+    def unsubscribe(self, task_ids):
+        """
+        Removes subscriptions and drops their waiting updates. Unknown task IDs are ignored.
+        
+        Parameters:
+        ----------
+        task_ids : list of str
+            The IDs of the tasks.
+        """
+        for task_id in task_ids:
+            _key = task_key(task_id)
+            if _key is not None:
+                task_id = str(UUID(bytes=_key))
+            if task_id in self.tasks:
+                self.tasks.discard(task_id)
+                notifier.unsubscribe(task_id, self.push)
+                self.pending.pop(task_id, None)
+                self.sent.pop(task_id, None)
+    
+    def close(self):
+        """
+        Removes all subscriptions.
+        """
+        self.unsubscribe(list(self.tasks))
+    
+    def collect(self):
+        """
+        Takes the waiting updates. A finished or deleted task is unsubscribed once its update is taken,
+        and an update identical to the last one sent for its task is dropped.
+        
+        Returns:
+        -------
+        list of dict
+            The updates to send, in the order their tasks changed.
+        """
+        _pending, self.pending = self.pending, {}
+        self.ready.clear()
+        updates = []
+        for task_id, state in _pending.items():
+            task = taskqueue[task_id]
+            if state is None:
+                updates.append({'task_id': task_id, 'status': 'not-found'})
+                continue
+            if task_id not in self.tasks:
+                continue
+            if task is None or state == taskqueue.DELETED or task.is_done:
+                updates.append(build_task_event(task_id, task, state))
+                self.unsubscribe([task_id])
+                continue
+            _etag = task_etag(task)
+            if self.sent.get(task_id) != _etag:
+                self.sent[task_id] = _etag
+                updates.append(build_task_response(task_id, task))
+        return updates
+
+def encode_frame(frame, encoding):
+    """
+    Encodes a frame of a multiplexed WebSocket connection.
+    
+    Parameters:
+    ----------
+    frame : dict
+        The frame to encode.
+    encoding : str
+        'json' for a text frame, or 'msgpack' for a binary frame.
+    
+    Returns:
+    -------
+    str or bytes
+        The encoded frame.
+    """
+    if encoding == 'msgpack':
+        import msgpack
+        return msgpack.packb(frame, default=str)
+    return json.dumps(frame, default=str)
+
+async def _push_task_frames(websocket: WebSocket, subscriptions: TaskSubscriptions, encoding):
+    """
+    Sends the waiting updates of a multiplexed WebSocket connection, batched into frames.
+    
+    After the first update arrives, the updates of the next `FRAME_INTERVAL` seconds are gathered into
+    the same frame.
+    
+    Parameters:
+    ----------
+    websocket : WebSocket
+        The WebSocket connection to push to.
+    subscriptions : TaskSubscriptions
+        The subscriptions of the connection.
+    encoding : str
+        The encoding of the frames, 'json' or 'msgpack'.
+    """
+    while True:
+        await subscriptions.ready.wait()
+        await asyncio.sleep(FRAME_INTERVAL)
+        updates = subscriptions.collect()
+        if len(updates) > 0:
+            await ws_manager.send_message(encode_frame({'updates': updates}, encoding), websocket)
+
+async def _answer_subscription_commands(websocket: WebSocket, subscriptions: TaskSubscriptions, encoding):
+    """
+    Applies the subscription commands sent by the client of a multiplexed WebSocket connection.
+    
+    A command is a JSON object with a 'subscribe' and/or an 'unsubscribe' list of task IDs.
+    
+    Parameters:
+    ----------
+    websocket : WebSocket
+        The WebSocket connection.
+    subscriptions : TaskSubscriptions
+        The subscriptions of the connection.
+    encoding : str
+        The encoding of the frames, 'json' or 'msgpack'.
+    """
+    while True:
+        command = await websocket.receive_text()
+        try:
+            command = json.loads(command)
+            _subscribe = list(command.get('subscribe', []))
+            _unsubscribe = list(command.get('unsubscribe', []))
+        except (ValueError, AttributeError, TypeError):
+            await ws_manager.send_message(
+                encode_frame({'status': 'Command not supported.', 'success': False}, encoding), websocket
+            )
+            continue
+        subscriptions.unsubscribe(_unsubscribe)
+        subscriptions.subscribe(_subscribe)
+
+@route.websocket('/ws')
+async def manage_tasks_ws(websocket: WebSocket, encoding: str = 'json',
+                          auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Manages a WebSocket connection multiplexing the updates of many tasks.
+    
+    The client sends JSON commands such as {"subscribe": [task IDs], "unsubscribe": [task IDs]}. The server
+    answers with frames {"updates": [...]}, each update being the current status of a task as returned by
+    GET /tasks/{task_id}, a 'deleted' status, or a 'not-found' status for a task that cannot be subscribed to.
+    A task is unsubscribed once its final update is sent. With `encoding=msgpack`, the frames are sent as
+    binary MessagePack, which is much smaller than JSON for large numeric outputs.
+    
+    Parameters:
+    ----------
+    websocket : WebSocket
+        The WebSocket connection for real-time communication.
+    encoding : str, optional
+        The encoding of the frames, 'json' (default) or 'msgpack'.
+    auth_id : str
+        The ID of the user making the request, used for authorization.
+    """
+    if encoding not in ('json', 'msgpack'):
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=f'{encoding} Not Supported for Encoding.')
+    if encoding == 'msgpack':
+        try:
+            import msgpack
+        except ImportError:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason='msgpack is not installed.')
+    await ws_manager.connect(websocket)
+    subscriptions = TaskSubscriptions(auth_id)
+    _workers = [asyncio.ensure_future(_answer_subscription_commands(websocket, subscriptions, encoding)),
+                asyncio.ensure_future(_push_task_frames(websocket, subscriptions, encoding))]
+    try:
+        _done, _ = await asyncio.wait(_workers, return_when=asyncio.FIRST_COMPLETED)
+        for _worker in _done:
+            _worker.exception()
+    finally:
+        for _worker in _workers:
+            _worker.cancel()
+        subscriptions.close()
+        ws_manager.disconnect(websocket)
+
 @route.websocket('/{task_id}/ws')
 async def manage_task_ws(websocket: WebSocket, task_id, auth_id: str = Depends(authenticator.url_auth)):
     """
     Manages a WebSocket connection for real-time task updates.
     
+    The current status of the task is pushed when the connection opens, then every state change as it
+    happens: a new queue position, the start, and the end with the result, after which the connection is
+    closed. The client may still send 'get' to receive the current status. The pushes are driven by the task
+    queue listener, so an idle connection costs no CPU. A task that is not found is reported once and the
+    connection closed.
+    
     Parameters:
     ----------
     websocket : WebSocket
@@ -193,32 +959,40 @@ async def manage_task_ws(websocket: WebSocket, task_id, auth_id: str = Depends(a
         The ID of the user making the request, used for authorization.
     """
     await ws_manager.connect(websocket)
-    try:
-        while True:
-            command = await websocket.receive_text()
-            if command.lower() == 'get':
-                task = taskqueue[task_id]
-                if task is None or task.access_id != auth_id:
-                    await ws_manager.send_message(
-                        json.dumps({'status': f'Task {task_id} not found', 'success': False}), websocket
-                    )
-                else:
-                    await ws_manager.send_message(
-                        json.dumps(build_task_response(task_id, task), default=str), websocket
-                    )
-            else:
-                await ws_manager.send_message(
-                    json.dumps({'status': f'{command} not supported.', 'success': False}), websocket
-                )
-    except WebSocketDisconnect:
+    task = taskqueue[task_id]
+    if task is None or task.access_id != auth_id:
+        await ws_manager.send_message(json.dumps({'status': f'Task {task_id} not found', 'success': False}),
+                                      websocket)
         ws_manager.disconnect(websocket)
-    except WebSocketException:
+        await websocket.close()
+        return
+    _events = asyncio.Queue()
+    _sink = lambda task, state: _events.put_nowait(state)
+    notifier.subscribe(task_id, _sink)
+    # The current status is pushed first, so a client needs no 'get' for a task that is not changing.
+    _events.put_nowait(_task_state(task))
+    _workers = [asyncio.ensure_future(_answer_task_commands(websocket, task_id, auth_id)),
+                asyncio.ensure_future(_push_task_events(websocket, task_id, _events))]
+    try:
+        _done, _ = await asyncio.wait(_workers, return_when=asyncio.FIRST_COMPLETED)
+        for _worker in _done:
+            _worker.exception()
+        if _workers[1] in _done and _workers[1].exception() is None:
+            # The task is done or deleted: nothing more will be pushed.
+            await websocket.close()
+    finally:
+        for _worker in _workers:
+            _worker.cancel()
+        notifier.unsubscribe(task_id, _sink)
         ws_manager.disconnect(websocket)
 
 @route.post('/{task_id}/cancel')
 async def cancel_task(task_id, auth_id: str = Depends(authenticator.url_auth)):
     """
-    Cancels a task and removes it from the task queue.
+    Stops a task that is not yet completed and keeps it as finished with the 'cancelled' status.
+    
+    The resources of the task are freed at once, and its execution is killed when the entry runs in a worker
+    process. Unlike `DELETE /tasks/{task_id}`, the task can still be read, so its waiters see how it ended.
     
     Parameters:
     ----------
@@ -230,7 +1004,8 @@ async def cancel_task(task_id, auth_id: str = Depends(authenticator.url_auth)):
     Returns:
     -------
     dict
-        A dictionary containing the task ID and a success flag.
+        A dictionary containing the task ID, the final status of the task and a success flag, False if the
+        task had already finished.
     
     Raises:
     ------
@@ -244,6 +1019,36 @@ async def cancel_task(task_id, auth_id: str = Depends(authenticator.url_auth)):
     if task.access_id != auth_id:
         raise HTTPException(status_code=404, detail=f'Task {task_id} not found')
     
-    # Remove the task from the queue
+    if task.is_done:
+        return {'task_id': task.task_id, 'status': task.interrupted or 'done', 'success': False}
+    task = taskqueue.stop(task_id, taskqueue.CANCELLED)
+    return {'task_id': task.task_id, 'status': task.interrupted, 'success': True}
+
+@route.delete('/{task_id}')
+async def delete_task(task_id, auth_id: str = Depends(authenticator.url_auth)):
+    """
+    Deletes a task and frees its result. A task that is not yet completed is cancelled.
+    
+    Parameters:
+    ----------
+    task_id : str
+        The ID of the task to delete.
+    auth_id : str
+        The ID of the user making the request, used for authorization.
+    
+    Returns:
+    -------
+    dict
+        A dictionary containing the task ID and a success flag.
+    
+    Raises:
+    ------
+    HTTPException
+        If the task is not found or if the user is not authorized to delete the task.
+    """
+    task = taskqueue[task_id]
+    if task is None or task.access_id != auth_id:
+        raise HTTPException(status_code=404, detail=f'Task {task_id} not found')
+    
     del taskqueue[task_id]
     return {'task_id': task.task_id, 'success': True}
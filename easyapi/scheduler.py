@@ -0,0 +1,68 @@
+"""
+Scheduler Module
+----------------
+
+This module runs the scheduler process shared by several API processes (see `easyapi.taskmodel.frontend`). The
+scheduler holds the task queue, its executors, the journal, the admission control, the worker hub and the sweeps,
+and serves the frontends connecting to it. It reads the same configuration as the frontends, whose 'scheduler'
+section gives the address it listens on and the shared key:
+
+    easyapi scheduler --config config.json
+    uvicorn easyapi:app --workers 4
+
+Functions:
+----------
+serve(config)
+    Builds the task queue from the configuration and serves the frontends until it is interrupted or terminated.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+
+
+async def _run(settings):
+    """
+    Starts the dispatchers and the hubs, and waits for SIGINT or SIGTERM.
+
+    Parameters:
+    ----------
+    settings : module
+        The settings of the scheduler.
+    """
+    from .taskmodel.taskholder import get_dispatchers
+    _stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, _stop.set)
+    for dispatcher in get_dispatchers(settings.taskqueue):
+        dispatcher.notify()
+    if settings.workerhub is not None:
+        settings.workerhub.start()
+    settings.frontendhub.start()
+    logging.getLogger('uvicorn.info').info(f'Scheduler listening for frontends on {settings.frontendhub.address}.')
+    try:
+        await _stop.wait()
+    finally:
+        settings.frontendhub.close()
+        if settings.workerhub is not None:
+            settings.workerhub.close()
+        if settings.journal is not None:
+            settings.journal.close()
+
+
+def serve(config=None):
+    """
+    Builds the task queue from the configuration and serves the frontends until it is interrupted or terminated.
+
+    Parameters:
+    ----------
+    config : str, optional
+        The path of the configuration file (default is None, the 'easyapi_config' environment variable).
+    """
+    os.environ['easyapi_role'] = 'scheduler'
+    if config is not None:
+        os.environ['easyapi_config'] = config
+    from . import settings
+    asyncio.run(_run(settings))
@@ -10,15 +10,36 @@ Components:
 -----------
 - Authenticator: Manages user authentication, supporting JSON and in-memory types.
 - IOTypeStack: Handles IO type configurations.
-- AlgorithmStack: Initializes the algorithm stack used by the system.
+- AlgorithmStack: Initializes the algorithm stack used by the system, with the pipelines of the configuration.
 - TaskQueue: Configures the task queue, supporting layouts for task distribution.
+- ResultStore: Configures how long and how much finished task results are kept.
+- AdmissionControl: Optionally limits the queued tasks of each layout, entry and access ID.
+- Journal: Optionally records the tasks in a SQLite database and recovers them on startup.
+- WorkerHub: Optionally accepts remote workers, whose resources are added to the task queue as layouts.
+- SweepManager: Runs the parameter sweeps, feeding the points of their grids to the task queue.
+- FrontendHub / SchedulerClient: Optionally share the task queue of a scheduler process with several API processes.
 - Cache: Configures the caching system using either MongoDB or in-memory storage.
 
+A remote worker (see `easyapi.worker`) reads the same kind of configuration, with the 'easyapi_role' environment
+variable set to 'worker'. It only builds the algorithm library and the cache: the task queue, the admission
+control, the journal, the worker hub and the sweeps live on the server, and are None in a worker.
+
+With a 'scheduler' section, the task queue, the admission control, the journal, the worker hub and the sweeps
+live in a scheduler process started with `easyapi scheduler` (the 'easyapi_role' environment variable set to
+'scheduler'), which also builds the `FrontendHub`. Every API process reading the same configuration is a frontend
+of the scheduler: its `taskqueue` is a `SchedulerClient`, and its `admission`, `journal` and `sweeps` forward to
+the scheduler.
+
 Dependencies:
 ------------
 - `AlgorithmStack`: Handles the algorithm-related operations.
 - `IOTypeStack`: Defines the stack of IO types.
 - `TaskQueue`: Manages the task queue and its layouts.
+- `AdmissionControl`: Refuses the submissions exceeding the queue limits.
+- `Journal`: Records the tasks of the task queue so that they survive a restart.
+- `WorkerHub`: Leases the queued tasks to the remote workers.
+- `SweepManager`: Expands the grids of the parameter sweeps and collects their results.
+- `FrontendHub` and `SchedulerClient`: Share the task queue of the scheduler process with the frontends.
 - `Authenticator`: Provides authentication services based on configuration.
 - `AlgorithmCachePool` and `Storage`: Handle caching, supporting both MongoDB and memory storage.
 """
@@ -50,6 +71,10 @@ def load_config(path):
 # Load configuration from environment variable or default to 'config.json'
 _path = os.environ.get('easyapi_config', 'config.json')
 _conf = load_config(_path)
+role = os.environ.get('easyapi_role', 'server')
+# A server configured with a scheduler is one of its frontends.
+if role == 'server' and _conf.get('scheduler'):
+    role = 'frontend'
 
 # Import specified modules from the configuration
 modules = _conf.get('modules', None)
@@ -119,37 +144,11 @@ iolib = _build_iotype_stack(_conf.get('iolib', {}))
 entries = []
 algorithmlib = AlgorithmStack(
     *entries,
-    iolib=iolib
+    iolib=iolib,
+    pipelines=_conf.get('pipelines', {})
 )
 
 
-def _build_task_queue(_task_queue_conf):
-    """
-    Builds and returns the task queue based on the configuration.
-
-    Parameters:
-    ----------
-    _task_queue_conf : dict
-        The configuration dictionary for the task queue.
-
-    Returns:
-    -------
-    TaskQueue
-        The initialized task queue instance.
-    """
-    from .taskmodel.taskqueue import TaskQueue
-    return TaskQueue(queue_configs=_task_queue_conf.get('layouts', [{'cuda': 0, 'cpu': 1},
-                                                                    {'cuda': 0, 'cpu': os.cpu_count() - 1}]),
-                     algorithmlib=algorithmlib)
-
-
-# Initialize the task queue
-taskqueue = _build_task_queue(_conf.get('task_queue', {}))
-
-# Set the server name from configuration or use default
-server_name = _conf.get('server_name', 'local_server')
-
-
 def _config_cache(_cache_config):
     """
     Configures the caching system based on the configuration.
@@ -185,7 +184,326 @@ def _config_cache(_cache_config):
 # Configure the cache system
 _config_cache(_conf.get('cache', {}))
 
+
+# Set the server name from configuration or use default
+server_name = _conf.get('server_name', 'local_server')
+
 if _conf.get('analystics') is not None:
     JAnalytics.load_config(_conf.get('analystics'))
 else:
-    JAnalytics.config(enable=False)
\ No newline at end of file
+    JAnalytics.config(enable=False)
+
+
+def _build_result_store(_results_conf):
+    """
+    Builds and returns the store of finished tasks based on the configuration.
+
+    Parameters:
+    ----------
+    _results_conf : dict
+        The configuration dictionary for the result store.
+
+    Returns:
+    -------
+    ResultStore
+        The initialized result store instance.
+    """
+    from .taskmodel.resultstore import ResultStore
+    return ResultStore(ttl=_results_conf.get('ttl', 3600),
+                       max_memory=_results_conf.get('max_memory', 268435456),
+                       spill_size=_results_conf.get('spill_size', 1048576),
+                       spill_dir=_results_conf.get('spill_dir', None))
+
+
+def _build_runtime_model(_runtime_conf):
+    """
+    Builds and returns the model of the execution times based on the configuration.
+
+    Parameters:
+    ----------
+    _runtime_conf : dict
+        The configuration dictionary for the runtime model.
+
+    Returns:
+    -------
+    RuntimeModel
+        The initialized runtime model instance.
+    """
+    from .taskmodel.runtime import RuntimeModel
+    return RuntimeModel(alpha=_runtime_conf.get('alpha', 0.2),
+                        window=_runtime_conf.get('window', 256),
+                        by_size=_runtime_conf.get('by_size', False))
+
+
+def _build_task_queue(_task_queue_conf, _results_conf):
+    """
+    Builds and returns the task queue based on the configuration.
+
+    Parameters:
+    ----------
+    _task_queue_conf : dict
+        The configuration dictionary for the task queue.
+    _results_conf : dict
+        The configuration dictionary for the result store.
+
+    Returns:
+    -------
+    TaskQueue
+        The initialized task queue instance.
+    """
+    from .taskmodel.taskqueue import TaskQueue
+    return TaskQueue(queue_configs=_task_queue_conf.get('layouts', [{'cuda': 0, 'cpu': 1},
+                                                                    {'cuda': 0, 'cpu': os.cpu_count() - 1}]),
+                     algorithmlib=algorithmlib,
+                     backfill=_task_queue_conf.get('backfill', 32),
+                     max_bypass=_task_queue_conf.get('max_bypass', 8),
+                     executor=_task_queue_conf.get('executor', 'thread'),
+                     dedup=_task_queue_conf.get('dedup', True),
+                     progress_interval=_task_queue_conf.get('progress_interval', 0.25),
+                     policy=_task_queue_conf.get('policy', 'fifo'),
+                     sjf_stretch=_task_queue_conf.get('sjf_stretch', 10),
+                     runtimes=_build_runtime_model(_task_queue_conf.get('runtime', {})),
+                     results=_build_result_store(_results_conf))
+
+
+# Initialize the task queue. Process executors fork their workers here, after the algorithm modules
+# are imported and the cache is configured, so the workers inherit both.
+taskqueue = (_build_task_queue(_conf.get('task_queue', {}), _conf.get('results', {}))
+             if role in ('server', 'scheduler') else None)
+
+
+def _build_admission(_admission_conf, task_queue):
+    """
+    Builds the admission control of the task queue based on the configuration.
+
+    Parameters:
+    ----------
+    _admission_conf : dict or None
+        The configuration dictionary for the admission control.
+    task_queue : TaskQueue
+        The task queue whose submissions are checked.
+
+    Returns:
+    -------
+    AdmissionControl or None
+        The admission control of the task queue, or None if no limit is configured.
+    """
+    if not _admission_conf:
+        return None
+    from .taskmodel.admission import AdmissionControl
+    return AdmissionControl(task_queue,
+                            layouts=_admission_conf.get('layouts', None),
+                            entries=_admission_conf.get('entries', None),
+                            access=_admission_conf.get('access', None),
+                            window=_admission_conf.get('window', 60))
+
+
+# Limit the queued work. The controller counts the tasks recovered from the journal, so it is built first.
+admission = (_build_admission(_conf.get('task_queue', {}).get('admission', None), taskqueue)
+             if role in ('server', 'scheduler') else None)
+
+
+def _build_journal(_journal_conf, task_queue):
+    """
+    Builds the task journal based on the configuration and recovers the task queue from it.
+
+    Parameters:
+    ----------
+    _journal_conf : dict
+        The configuration dictionary for the journal.
+    task_queue : TaskQueue
+        The task queue recorded by the journal.
+
+    Returns:
+    -------
+    Journal or None
+        The journal recording the task queue, or None if no journal is configured.
+
+    Raises:
+    ------
+    TypeError
+        If the specified journal type is not supported.
+    """
+    _type = _journal_conf.get('type', None)
+    if _type is None:
+        return None
+    elif _type == 'sqlite':
+        from .taskmodel.journal import Journal
+        _journal = Journal(path=_journal_conf.get('path', 'journal.db'),
+                           synchronous=_journal_conf.get('synchronous', 'normal'),
+                           wait_commit=_journal_conf.get('wait_commit', True),
+                           commit_interval=_journal_conf.get('commit_interval', 0.002))
+        _journal.recover(task_queue)
+        return _journal
+    else:
+        raise TypeError(f'{_type} Not Supported for Journal.')
+
+
+# Recover the task queue from the journal, if any. Its writer thread starts after the process executors forked.
+journal = _build_journal(_conf.get('journal', {}), taskqueue) if role in ('server', 'scheduler') else None
+
+
+def _build_worker_hub(_remote_conf, task_queue):
+    """
+    Builds the hub of the remote workers based on the configuration. It listens once the server starts.
+
+    Parameters:
+    ----------
+    _remote_conf : dict or None
+        The configuration dictionary for the remote workers.
+    task_queue : TaskQueue
+        The task queue the workers run tasks for.
+
+    Returns:
+    -------
+    WorkerHub or None
+        The hub of the remote workers, or None if remote workers are not configured.
+
+    Raises:
+    ------
+    TypeError
+        If no key is configured.
+    """
+    if not _remote_conf:
+        return None
+    if not _remote_conf.get('key'):
+        raise TypeError('Remote Workers Without Key Not Supported.')
+    from .taskmodel.remote import WorkerHub
+    if 'path' in _remote_conf:
+        _address = _remote_conf['path']
+    else:
+        _address = (_remote_conf.get('host', '127.0.0.1'), _remote_conf.get('port', 7700))
+    return WorkerHub(task_queue, _address, _remote_conf['key'],
+                     heartbeat=_remote_conf.get('heartbeat', 2.0),
+                     lease_timeout=_remote_conf.get('lease_timeout', 10.0),
+                     policy=_remote_conf.get('policy', 'fifo'))
+
+
+# Accept the remote workers, if any.
+workerhub = (_build_worker_hub(_conf.get('task_queue', {}).get('remote', None), taskqueue)
+             if role in ('server', 'scheduler') else None)
+
+
+def _build_sweeps(_sweeps_conf, task_queue, admission):
+    """
+    Builds the manager of the parameter sweeps of the task queue based on the configuration.
+
+    Parameters:
+    ----------
+    _sweeps_conf : dict
+        The configuration dictionary for the sweeps.
+    task_queue : TaskQueue
+        The task queue running the points of the sweeps.
+    admission : AdmissionControl or None
+        The admission control the points of the sweeps are submitted through.
+
+    Returns:
+    -------
+    SweepManager
+        The manager of the sweeps.
+    """
+    from .taskmodel.sweep import SweepManager
+    return SweepManager(task_queue, admission=admission, window=_sweeps_conf.get('window', 256),
+                        max_points=_sweeps_conf.get('max_points', 1000000), ttl=_sweeps_conf.get('ttl', 3600))
+
+
+# Run the parameter sweeps next to the task queue.
+sweeps = _build_sweeps(_conf.get('sweeps', {}), taskqueue, admission) if role in ('server', 'scheduler') else None
+
+
+def _scheduler_address(_scheduler_conf):
+    """
+    Returns the address of the scheduler process based on the configuration.
+
+    Parameters:
+    ----------
+    _scheduler_conf : dict
+        The configuration dictionary for the scheduler.
+
+    Returns:
+    -------
+    tuple or str
+        (host, port) for TCP, or the path of a Unix socket.
+
+    Raises:
+    ------
+    TypeError
+        If no key is configured.
+    """
+    if not _scheduler_conf.get('key'):
+        raise TypeError('Scheduler Without Key Not Supported.')
+    if 'path' in _scheduler_conf:
+        return _scheduler_conf['path']
+    return _scheduler_conf.get('host', '127.0.0.1'), _scheduler_conf.get('port', 7701)
+
+
+def _build_frontend_hub(_scheduler_conf, task_queue, journal, admission, workerhub, sweeps):
+    """
+    Builds the hub sharing the task queue of the scheduler process with the frontends. It listens once the
+    scheduler starts.
+
+    Parameters:
+    ----------
+    _scheduler_conf : dict or None
+        The configuration dictionary for the scheduler.
+    task_queue : TaskQueue
+        The shared task queue.
+    journal : Journal or None
+        The journal of the task queue.
+    admission : AdmissionControl or None
+        The admission control of the task queue.
+    workerhub : WorkerHub or None
+        The hub of the remote workers.
+    sweeps : SweepManager or None
+        The manager of the parameter sweeps.
+
+    Returns:
+    -------
+    FrontendHub
+        The hub of the frontends.
+
+    Raises:
+    ------
+    TypeError
+        If no scheduler or no key is configured.
+    """
+    if not _scheduler_conf:
+        raise TypeError('Scheduler Without Configuration Not Supported.')
+    from .taskmodel.frontend import FrontendHub
+    return FrontendHub(task_queue, _scheduler_address(_scheduler_conf), _scheduler_conf['key'],
+                       journal=journal, admission=admission, workerhub=workerhub, sweeps=sweeps)
+
+
+def _build_scheduler_client(_scheduler_conf):
+    """
+    Connects a frontend to the scheduler process based on the configuration.
+
+    Parameters:
+    ----------
+    _scheduler_conf : dict
+        The configuration dictionary for the scheduler.
+
+    Returns:
+    -------
+    SchedulerClient
+        The task queue of the frontend.
+
+    Raises:
+    ------
+    TypeError
+        If no key is configured.
+    """
+    from .taskmodel.frontend import SchedulerClient
+    return SchedulerClient(_scheduler_address(_scheduler_conf), _scheduler_conf['key'],
+                           timeout=_scheduler_conf.get('timeout', 30.0),
+                           connect_timeout=_scheduler_conf.get('connect_timeout', 30.0))
+
+
+# Share the task queue with the frontends, or reach it from a frontend.
+frontendhub = (_build_frontend_hub(_conf.get('scheduler', None), taskqueue, journal, admission, workerhub, sweeps)
+               if role == 'scheduler' else None)
+if role == 'frontend':
+    taskqueue = _build_scheduler_client(_conf['scheduler'])
+    admission = taskqueue.admission
+    journal = taskqueue.journal
+    sweeps = taskqueue.sweeps
@@ -0,0 +1,457 @@
+"""
+Admission Control Module
+------------------------
+
+This module defines the `AdmissionControl` class, which bounds the work queued in a task queue. Limits on the number
+of queued tasks and on their estimated wait are set for every layout, every entry and every access ID. A
+submission that would exceed one of them is refused with `AdmissionError` instead of being queued, and is told how
+long to wait before trying again, so an overloaded server answers at once instead of growing its queues without
+bound.
+
+The controller is driven by the listener hook of the `TaskQueue`. It counts the queued tasks of every layout,
+entry and access ID (a scope), and measures how fast each scope drains with a `DrainMeter`. The estimated wait of
+a scope is its number of queued tasks divided by its drain rate. As the tasks of an access ID are served by fair
+sharing, its drain rate is the share of the layout it actually gets, so a client flooding the server runs into its
+own limits long before the clients submitting a few tasks are affected.
+
+Classes:
+--------
+DrainMeter
+    A class that measures how many queued tasks of a scope start per second while the scope has queued tasks.
+
+AdmissionError
+    Exception raised when a submission exceeds a limit.
+
+AdmissionControl
+    A class that checks submissions against the queue limits of their layout, entry and access ID.
+"""
+
+import math
+import time
+
+
+class DrainMeter(object):
+    """
+    A class that measures how many queued tasks of a scope start per second while the scope has queued tasks.
+
+    The starts are counted with an exponential decay over `window` seconds. The clock of the meter only runs while
+    the scope has queued tasks: a scope that was idle for an hour resumes with the rate measured before, instead of
+    a rate decayed by the time nobody submitted anything.
+
+    Attributes:
+    ----------
+    window : float
+        The time constant of the decay, in seconds of busy time.
+    count : int
+        The number of starts recorded.
+    _sum : float
+        The decayed number of starts.
+    _clock : float
+        The busy time of the scope, in seconds.
+    _mark : float or None
+        The monotonic time up to which the busy time is counted, None while the scope is idle.
+    """
+
+    def __init__(self, window=60.0):
+        """
+        Initializes an idle meter without any start.
+
+        Parameters:
+        ----------
+        window : float, optional
+            The time constant of the decay, in seconds of busy time (default is 60).
+        """
+        self.window = window
+        self.count = 0
+        self._sum = 0.0
+        self._clock = 0.0
+        self._mark = None
+
+    def __repr__(self):
+        """
+        Returns a string representation of the meter.
+
+        Returns:
+        -------
+        str
+            A string representation of the meter, including its number of starts and busy time.
+        """
+        return f'<DrainMeter starts:{self.count} busy:{self._clock:.1f}s>'
+
+    def _advance(self, now):
+        """
+        Decays the starts and counts the busy time up to the given time.
+
+        Parameters:
+        ----------
+        now : float
+            The current monotonic time.
+        """
+        if self._mark is not None and now > self._mark:
+            _elapsed = now - self._mark
+            self._sum *= math.exp(-_elapsed / self.window)
+            self._clock += _elapsed
+            self._mark = now
+
+    def busy(self, now, busy):
+        """
+        Starts or stops the clock of the meter.
+
+        Parameters:
+        ----------
+        now : float
+            The current monotonic time.
+        busy : bool
+            Whether the scope has queued tasks.
+        """
+        self._advance(now)
+        if busy:
+            if self._mark is None:
+                self._mark = now
+        else:
+            self._mark = None
+
+    def record(self, now):
+        """
+        Records a start.
+
+        Parameters:
+        ----------
+        now : float
+            The current monotonic time.
+        """
+        self._advance(now)
+        self._sum += 1.0
+        self.count += 1
+
+    def rate(self, now):
+        """
+        Returns the drain rate of the scope.
+
+        The decayed count is divided by the decayed busy time, so the rate is not underestimated while the meter
+        has been busy for less than its window.
+
+        Parameters:
+        ----------
+        now : float
+            The current monotonic time.
+
+        Returns:
+        -------
+        float or None
+            The number of starts per second of busy time, or None if no start was recorded yet.
+        """
+        if self.count == 0:
+            return None
+        self._advance(now)
+        _weight = self.window * -math.expm1(-max(self._clock, 1.0) / self.window)
+        return self._sum / _weight
+
+
+class AdmissionError(RuntimeError):
+    """
+    Exception raised when a submission exceeds a limit.
+
+    Attributes:
+    ----------
+    retry_after : int or None
+        The number of seconds after which the submission is expected to be admitted, or None if it never will
+        (the submission alone exceeds a limit).
+    """
+
+    def __init__(self, message, retry_after=None):
+        """
+        Initializes the AdmissionError.
+
+        Parameters:
+        ----------
+        message : str
+            The description of the exceeded limit.
+        retry_after : int, optional
+            The number of seconds after which the submission is expected to be admitted (default is None).
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionControl(object):
+    """
+    A class that checks submissions against the queue limits of their layout, entry and access ID.
+
+    A limit is a dictionary with the optional keys 'max_queued' (the largest number of queued tasks) and
+    'max_wait' (the longest estimated wait in seconds of a new task). The wait limit only applies once the scope
+    has been seen draining; before that, only the number of queued tasks is limited.
+
+    Attributes:
+    ----------
+    task_queue : TaskQueue
+        The task queue whose submissions are checked.
+    layouts : list of dicts
+        The limit of each layout.
+    entries : dict
+        The limit of each entry ID, '*' being the limit of the other entries.
+    access : dict
+        The limit of each access ID, '*' being the limit of the other access IDs.
+    window : float
+        The time constant of the drain meters, in seconds.
+    admitted : int
+        The number of tasks admitted.
+    rejected : int
+        The number of tasks refused.
+    _queued : dict
+        The scopes of each queued task, indexed by the binary form of its task ID.
+    _depth : dict
+        The number of queued tasks of each scope.
+    _meters : dict
+        The drain meter of each scope.
+    """
+
+    def __init__(self, task_queue, layouts=None, entries=None, access=None, window=60.0):
+        """
+        Initializes the controller and registers it as a listener of the task queue.
+
+        Parameters:
+        ----------
+        task_queue : TaskQueue
+            The task queue whose submissions are checked.
+        layouts : dict or list of dicts, optional
+            The limit of every layout, or a list with the limit of each layout (default is None, no limit).
+        entries : dict, optional
+            The limit of each entry ID, '*' being the limit of the other entries (default is None, no limit).
+        access : dict, optional
+            The limit of each access ID, '*' being the limit of the other access IDs (default is None, no limit).
+        window : float, optional
+            The time constant of the drain meters, in seconds (default is 60).
+
+        Raises:
+        ------
+        TypeError
+            If the list of layout limits does not match the layouts of the task queue.
+        """
+        if isinstance(layouts, list):
+            if len(layouts) != len(task_queue):
+                raise TypeError(f'{len(layouts)} Limits Not Supported for {len(task_queue)} Layouts.')
+            layouts = [_limit or {} for _limit in layouts]
+        else:
+            layouts = [layouts or {} for _ in range(len(task_queue))]
+        self.task_queue = task_queue
+        self.layouts = layouts
+        self.entries = entries or {}
+        self.access = access or {}
+        self.window = window
+        self.admitted = 0
+        self.rejected = 0
+        self._queued = {}
+        self._depth = {}
+        self._meters = {}
+        task_queue.add_listener(self._on_change)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the controller.
+
+        Returns:
+        -------
+        str
+            A string representation of the controller, including its numbers of queued and refused tasks.
+        """
+        return f'<AdmissionControl queued:{len(self._queued)} rejected:{self.rejected}>'
+
+    def _scopes(self, queue_id, algorithm_id, access_id):
+        """
+        Returns the scopes of a task with their limits.
+
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the layout of the task.
+        algorithm_id : str
+            The entry ID of the task.
+        access_id : str
+            The access ID of the task.
+
+        Returns:
+        -------
+        list of tuples
+            A tuple (scope, limit) for the layout, the entry and the access ID.
+        """
+        return [(('layout', queue_id), self.layouts[queue_id]),
+                (('entry', algorithm_id), self.entries.get(algorithm_id, self.entries.get('*', {}))),
+                (('access', access_id), self.access.get(access_id, self.access.get('*', {})))]
+
+    def _move(self, scopes, now, step):
+        """
+        Changes the number of queued tasks of some scopes and starts or stops their drain meters.
+
+        Parameters:
+        ----------
+        scopes : tuple
+            The scopes of the task.
+        now : float
+            The current monotonic time.
+        step : int
+            1 when the task is queued, -1 when it leaves the queue.
+        """
+        for scope in scopes:
+            _depth = self._depth.get(scope, 0) + step
+            if _depth > 0:
+                self._depth[scope] = _depth
+            else:
+                self._depth.pop(scope, None)
+            if (_depth > 0) != (_depth - step > 0):
+                _meter = self._meters.get(scope)
+                if _meter is None:
+                    _meter = self._meters[scope] = DrainMeter(self.window)
+                _meter.busy(now, _depth > 0)
+
+    def _on_change(self, task, state):
+        """
+        Listener of the task queue: counts the tasks entering and leaving the queues and records the starts.
+
+        Parameters:
+        ----------
+        task : Task
+            The task whose state changed.
+        state : str
+            The new state of the task.
+        """
+        if state == self.task_queue.QUEUED:
+            if task.key not in self._queued:
+                _scopes = (('layout', self.task_queue.resource_distance(task.required_resources)),
+                           ('entry', task.algorithm_id), ('access', task.access_id))
+                self._queued[task.key] = _scopes
+                self._move(_scopes, time.monotonic(), 1)
+        elif state in (self.task_queue.RUNNING, self.task_queue.DONE, self.task_queue.DELETED):
+            _scopes = self._queued.pop(task.key, None)
+            if _scopes is None:
+                return
+            _now = time.monotonic()
+            if state == self.task_queue.RUNNING:
+                for scope in _scopes:
+                    self._meters[scope].record(_now)
+            self._move(_scopes, _now, -1)
+
+    def depth(self, scope):
+        """
+        Returns the number of queued tasks of a scope.
+
+        Parameters:
+        ----------
+        scope : tuple
+            The scope, e.g. ('layout', 0), ('entry', entry_id) or ('access', access_id).
+
+        Returns:
+        -------
+        int
+            The number of queued tasks of the scope.
+        """
+        return self._depth.get(scope, 0)
+
+    def rate(self, scope):
+        """
+        Returns the drain rate of a scope.
+
+        Parameters:
+        ----------
+        scope : tuple
+            The scope, e.g. ('layout', 0), ('entry', entry_id) or ('access', access_id).
+
+        Returns:
+        -------
+        float or None
+            The number of queued tasks of the scope starting per second, or None if none started yet.
+        """
+        _meter = self._meters.get(scope)
+        return _meter.rate(time.monotonic()) if _meter is not None else None
+
+    def check(self, entry, access_id, count=1):
+        """
+        Checks that tasks of an entry submitted by an access ID can be queued.
+
+        Parameters:
+        ----------
+        entry : Algorithm
+            The entry of the tasks.
+        access_id : str
+            The access ID submitting the tasks.
+        count : int, optional
+            The number of tasks submitted together (default is 1).
+
+        Raises:
+        ------
+        AdmissionError
+            If queuing the tasks would exceed the number of queued tasks or the estimated wait allowed for
+            their layout, entry or access ID.
+        """
+        _queue_id = self.task_queue.resource_distance(entry.required_resources)
+        _retry = 0.0
+        _exceeded = None
+        for scope, limit in self._scopes(_queue_id, entry.id, access_id):
+            if not limit:
+                continue
+            _depth = self._depth.get(scope, 0)
+            _rate = self.rate(scope)
+            _max_queued = limit.get('max_queued')
+            if _max_queued is not None and _depth + count > _max_queued:
+                if count > _max_queued:
+                    self.rejected += count
+                    raise AdmissionError(f'{count} tasks exceed the queue limit ({_max_queued}) of {scope[0]} '
+                                         f'{scope[1]}')
+                _exceeded = _exceeded or f'Queue limit ({_max_queued}) of {scope[0]} {scope[1]} reached'
+                _retry = max(_retry, (_depth + count - _max_queued) / _rate if _rate else 1.0)
+            _max_wait = limit.get('max_wait')
+            if _max_wait is not None and _rate and (_depth + count - 1) / _rate > _max_wait:
+                _exceeded = _exceeded or f'Estimated wait ({(_depth + count - 1) / _rate:.0f}s) of ' \
+                                         f'{scope[0]} {scope[1]} exceeds {_max_wait}s'
+                _retry = max(_retry, (_depth + count - 1) / _rate - _max_wait)
+        if _exceeded is not None:
+            self.rejected += count
+            raise AdmissionError(_exceeded, retry_after=max(1, math.ceil(_retry)))
+        self.admitted += count
+
+    def headroom(self, entry, access_id):
+        """
+        Returns how many tasks of an entry submitted by an access ID can be queued now.
+
+        Parameters:
+        ----------
+        entry : Algorithm
+            The entry of the tasks.
+        access_id : str
+            The access ID submitting the tasks.
+
+        Returns:
+        -------
+        int or None
+            The largest count `check` admits now, or None if no limit applies to the tasks.
+        """
+        _queue_id = self.task_queue.resource_distance(entry.required_resources)
+        _headroom = None
+        for scope, limit in self._scopes(_queue_id, entry.id, access_id):
+            if not limit:
+                continue
+            _depth = self._depth.get(scope, 0)
+            _max_queued = limit.get('max_queued')
+            if _max_queued is not None:
+                _room = _max_queued - _depth
+                _headroom = _room if _headroom is None else min(_headroom, _room)
+            _rate = self.rate(scope)
+            _max_wait = limit.get('max_wait')
+            if _max_wait is not None and _rate:
+                _room = math.floor(_max_wait * _rate) + 1 - _depth
+                _headroom = _room if _headroom is None else min(_headroom, _room)
+        return max(0, _headroom) if _headroom is not None else None
+
+    def stats(self):
+        """
+        Returns the counters of the controller and the state of each layout.
+
+        Returns:
+        -------
+        dict
+            A dictionary containing the numbers of admitted and refused tasks, and for each layout its number
+            of queued tasks and drain rate.
+        """
+        return {'admitted': self.admitted, 'rejected': self.rejected,
+                'layouts': [{'queued': self.depth(('layout', queue_id)), 'drain_rate': self.rate(('layout', queue_id))}
+                            for queue_id in range(len(self.layouts))]}
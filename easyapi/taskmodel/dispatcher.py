@@ -0,0 +1,216 @@
+"""
+Layout Dispatcher Module
+------------------------
+
+This module defines the `LayoutDispatcher` class, which drives task execution for a single layout of a
+`TaskQueue`. Instead of every task polling the queue until it reaches the head, exactly one coroutine per
+layout sleeps on an `asyncio.Event` and is woken when a task is enqueued or when a running task finishes. On
+every wake-up it starts as many queued tasks as fit in the free resources of the layout. An idle layout
+therefore costs no CPU, however deep its queue is. When a micro-batch waits for more tasks, the dispatcher also
+wakes up when the wait is over. An error while starting or completing tasks is logged and the dispatcher goes on,
+so one failing task does not stop its layout.
+
+Classes:
+--------
+LayoutDispatcher
+    A class that pulls tasks from one layout of a task queue and runs them in the executor of the layout.
+
+Methods:
+--------
+__init__(self, task_queue, layout_id)
+    Initializes the dispatcher for the given layout.
+
+start(self)
+    Starts the dispatcher coroutine on the running event loop.
+
+notify(self)
+    Wakes the dispatcher so it checks its layout for runnable tasks.
+
+stop(self)
+    Stops the dispatcher coroutine.
+"""
+
+import asyncio
+import logging
+from functools import partial
+
+
+class LayoutDispatcher(object):
+    """
+    A class that pulls tasks from one layout of a task queue and runs them in the executor of the layout.
+
+    Attributes:
+    ----------
+    task_queue : TaskQueue
+        The task queue holding the layout served by this dispatcher.
+    layout_id : int
+        The index of the layout in the task queue.
+    loop : asyncio.AbstractEventLoop
+        The event loop the dispatcher coroutine runs on.
+    peers : list of LayoutDispatcher
+        The dispatchers of all layouts of the task queue, woken to steal work from a backlogged layout.
+    """
+
+    def __init__(self, task_queue, layout_id):
+        """
+        Initializes the dispatcher for the given layout.
+
+        Parameters:
+        ----------
+        task_queue : TaskQueue
+            The task queue holding the layout served by this dispatcher.
+        layout_id : int
+            The index of the layout in the task queue.
+        """
+        self.task_queue = task_queue
+        self.layout_id = layout_id
+        self.loop = None
+        self.peers = []
+        self._wakeup = asyncio.Event()
+        self._runner = None
+
+    def __repr__(self):
+        """
+        Returns a string representation of the dispatcher.
+
+        Returns:
+        -------
+        str
+            A string representation of the dispatcher, including its layout ID and running state.
+        """
+        return f'<LayoutDispatcher layout:{self.layout_id} running:{self.running}>'
+
+    @property
+    def running(self):
+        """
+        Checks whether the dispatcher coroutine is alive.
+
+        Returns:
+        -------
+        bool
+            True if the dispatcher coroutine is running, False otherwise.
+        """
+        return self._runner is not None and not self._runner.done()
+
+    def start(self):
+        """
+        Starts the dispatcher coroutine on the running event loop.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._runner = self.loop.create_task(self._run())
+
+    def notify(self):
+        """
+        Wakes the dispatcher so it checks its layout for runnable tasks.
+        """
+        self._wakeup.set()
+
+    def stop(self):
+        """
+        Stops the dispatcher coroutine.
+        """
+        if self._runner is not None:
+            self._runner.cancel()
+
+    def _finish(self, tasks, execution, future):
+        """
+        Completes the tasks of a micro-batch once its execution future is done and wakes the dispatcher to
+        refill the layout.
+
+        Parameters:
+        ----------
+        tasks : list of Task
+            The tasks that finished.
+        execution : concurrent.futures.Future
+            The execution future returned by `TaskQueue.execute`.
+        future : asyncio.Future
+            The execution future of the tasks, wrapped for the event loop.
+        """
+        # A cancelled task has already been removed from the queue, and a task moved back to a queue when its
+        # layout was retired is no longer run by this execution.
+        try:
+            if not future.cancelled():
+                try:
+                    _results = future.result()
+                except Exception as e:
+                    _results = [(False, str(e))] * len(tasks)
+                for task, result in zip(tasks, _results):
+                    if self.task_queue.is_running(task, execution):
+                        task._execute_finish(result[0], result[1])
+                        # The executors also return the pickled output, see `executor.pickle_results`.
+                        self.task_queue.complete(task, result[2] if len(result) > 2 else None)
+        except Exception as e:
+            logging.getLogger('uvicorn.warning').warning(f'Dispatcher {self.layout_id} failed to complete tasks: {e}',
+                                                         exc_info=True)
+        finally:
+            self.notify()
+
+    def _fail(self, tasks, error):
+        """
+        Completes the tasks of a micro-batch that could not be submitted to the executor as failed, so that
+        their resources are released.
+
+        Parameters:
+        ----------
+        tasks : list of Task
+            The tasks started by `schedule`.
+        error : Exception
+            The error raised by `TaskQueue.execute`.
+        """
+        for task in tasks:
+            if self.task_queue.is_running(task):
+                task._execute_finish(False, str(error))
+                self.task_queue.complete(task)
+
+    def _dispatch(self):
+        """
+        Starts every queued task that fits in the free resources of the layout, and wakes the idle layouts if
+        tasks are left waiting for resources.
+
+        Returns:
+        -------
+        float or None
+            How many seconds a micro-batch waits for more tasks, or None.
+        """
+        for tasks in self.task_queue.schedule(self.layout_id):
+            try:
+                execution = self.task_queue.execute(tasks)
+            except Exception as e:
+                logging.getLogger('uvicorn.warning').warning(f'Execution of {tasks[0].algorithm_id} failed: {e}',
+                                                             exc_info=True)
+                self._fail(tasks, e)
+                continue
+            future = asyncio.wrap_future(execution, loop=self.loop)
+            if len(tasks) == 1:
+                tasks[0]._asyncio_task = future
+            future.add_done_callback(partial(self._finish, tasks, execution))
+        if self.task_queue.backlogged(self.layout_id):
+            # Let the idle layouts steal the tasks this layout cannot start now.
+            for peer in self.peers:
+                if peer is not self and self.task_queue.header(peer.layout_id) is None:
+                    peer.notify()
+        return self.task_queue.batch_wait(self.layout_id)
+
+    async def _run(self):
+        """
+        Starts every queued task that fits in the free resources of the layout, then sleeps until a task
+        is enqueued or a running task finishes. If tasks are left waiting for resources, the idle layouts
+        are woken so that they can steal them.
+
+        The future of a single task is stored in `Task._asyncio_task`, so cancelling the task releases its
+        resources immediately and the dispatcher refills the layout. The tasks of a micro-batch share one
+        future, which is not cancelled with any of them. An error of a pass is logged, and the dispatcher
+        sleeps until the next wake-up as after any pass.
+        """
+        while True:
+            self._wakeup.clear()
+            _wait = None
+            try:
+                _wait = self._dispatch()
+            except Exception as e:
+                logging.getLogger('uvicorn.warning').warning(f'Dispatcher {self.layout_id} failed: {e}',
+                                                             exc_info=True)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), _wait)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,682 @@
+"""
+Task Executor Module
+--------------------
+
+This module defines the executors that run algorithm entries for the task queue. An executor receives the ID of
+an entry, the input data of one or more tasks and the resources allocated to them, and runs the entry from the
+algorithm library: `Algorithm.__call__` for a single task, `Algorithm.call_batch` for a micro-batch. Nothing but
+these plain values crosses the executor boundary, so an entry never has to be pickled. The only exceptions are the
+progress callback `resources['progress']` and the chunk sink `resources['stream']` of a streaming entry, which a
+worker process replaces by callables sending through its pipe.
+
+The output of every successful task is pickled off the event loop, by the thread or the worker process that ran
+it, and returned with the result, so the result store sizes and spills it and the journal writes it without
+pickling it again. A worker process sends the pickled output through its pipe, and the thread serving it
+unpickles it.
+
+Two executors are provided:
+- `ThreadExecutor` runs entries in a thread pool of the server process. It is cheap, but CPU-bound pure-Python
+  algorithms serialize on the GIL, and a running entry cannot be stopped.
+- `ProcessExecutor` runs entries in a set of worker processes. The workers are forked after the algorithm modules
+  have been imported, so they share the loaded modules copy-on-write. A running entry is stopped by killing its
+  worker, which is then replaced.
+
+The server process runs threads, and a process forked from it only inherits the forking thread: a lock held by
+another thread at that moment stays locked in the child forever. So the workers are not forked from the server
+process but by a fork server, a single-threaded process forked when the first `ProcessExecutor` is created,
+before any of its threads starts. The fork server forks a worker whenever a slot needs one, including the
+replacement of a killed or dead worker, and hands the end of its pipe back to the server process.
+
+Classes:
+--------
+ThreadExecutor
+    An executor running entries in a thread pool.
+
+ProcessExecutor
+    An executor running entries in pre-forked worker processes.
+
+Functions:
+----------
+run_entries(algorithmlib, algorithm_id, inputs, resources)
+    Runs an entry of the algorithm library by its ID on the inputs of one or more tasks.
+
+pickle_results(results)
+    Adds the pickled output of each successful task to the results of an execution.
+
+pack_results(results)
+    Returns the results of an execution as they are sent through a connection.
+
+unpack_results(packed)
+    Rebuilds the results of an execution received through a connection.
+"""
+
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.reduction
+import pickle
+import signal
+import os
+import threading
+import queue
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from .progress import ProgressThrottle
+
+# The server ends of the pipes to all live worker processes and fork servers. A fork server forked later inherits
+# them and closes them, so that each worker sees the end of its pipe when the server process exits.
+_server_conns = set()
+
+
+def run_entries(algorithmlib, algorithm_id, inputs, resources):
+    """
+    Runs an entry of the algorithm library by its ID on the inputs of one or more tasks.
+
+    Parameters:
+    ----------
+    algorithmlib : AlgorithmStack
+        The algorithm library holding the entry.
+    algorithm_id : str
+        The ID of the entry to run.
+    inputs : list of dicts
+        The input parameters of each task.
+    resources : dict
+        The resources allocated to the execution.
+
+    Returns:
+    -------
+    list of tuples
+        A tuple (success, output) for each task, as returned by `Algorithm.__call__`.
+    """
+    if algorithm_id not in algorithmlib:
+        return [(False, f'{algorithm_id} not found')] * len(inputs)
+    if len(inputs) == 1:
+        return [algorithmlib[algorithm_id](inputs[0], resources=resources)]
+    return algorithmlib[algorithm_id].call_batch(inputs, resources=resources)
+
+
+def pickle_results(results):
+    """
+    Adds the pickled output of each successful task to the results of an execution.
+
+    Parameters:
+    ----------
+    results : list of tuples
+        A tuple (success, output) for each task.
+
+    Returns:
+    -------
+    list of tuples
+        A tuple (success, output, data) for each task, where data is the pickled output, or None if the task
+        failed or its output cannot be pickled.
+    """
+    _results = []
+    for succ, output in results:
+        data = None
+        if succ:
+            try:
+                data = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                pass
+        _results.append((succ, output, data))
+    return _results
+
+
+def pack_results(results):
+    """
+    Returns the results of an execution as they are sent through a connection: the output of a successful task
+    is sent pickled, so the receiving thread gets it in both forms.
+
+    Parameters:
+    ----------
+    results : list of tuples
+        A tuple (success, output) or (success, output, data) for each task.
+
+    Returns:
+    -------
+    list of tuples
+        A tuple (success, data) for each task, where data is the pickled output, or the error of a failed task.
+
+    Raises:
+    ------
+    Exception
+        If an output cannot be pickled.
+    """
+    _packed = []
+    for result in results:
+        succ, output = result[0], result[1]
+        data = result[2] if len(result) > 2 else None
+        if succ and data is None:
+            data = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+        _packed.append((succ, data if succ else output))
+    return _packed
+
+
+def unpack_results(packed):
+    """
+    Rebuilds the results of an execution received through a connection.
+
+    Parameters:
+    ----------
+    packed : list of tuples
+        The tuples (success, data) returned by `pack_results`.
+
+    Returns:
+    -------
+    list of tuples
+        A tuple (success, output, data) for each task, as returned by `pickle_results`.
+    """
+    return [(succ, pickle.loads(data), data) if succ else (succ, data, None) for succ, data in packed]
+
+
+def _run_pickled(algorithmlib, algorithm_id, inputs, resources):
+    """
+    Runs an entry like `run_entries` and pickles the outputs, in the thread running it.
+
+    Returns:
+    -------
+    list of tuples
+        A tuple (success, output, data) for each task, see `pickle_results`.
+    """
+    return pickle_results(run_entries(algorithmlib, algorithm_id, inputs, resources))
+
+
+class ThreadExecutor(object):
+    """
+    An executor running entries in a thread pool.
+
+    Attributes:
+    ----------
+    algorithmlib : AlgorithmStack
+        The algorithm library holding the entries.
+    _pool : concurrent.futures.ThreadPoolExecutor
+        The thread pool running the entries.
+    """
+
+    def __init__(self, algorithmlib, workers=None):
+        """
+        Initializes the executor with the given algorithm library.
+
+        Parameters:
+        ----------
+        algorithmlib : AlgorithmStack
+            The algorithm library holding the entries.
+        workers : int, optional
+            The number of threads (default is None, the `ThreadPoolExecutor` default).
+        """
+        self.algorithmlib = algorithmlib
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the executor.
+
+        Returns:
+        -------
+        str
+            A string representation of the executor.
+        """
+        return f'<ThreadExecutor workers:{self._pool._max_workers}>'
+
+    def submit(self, algorithm_id, inputs, resources):
+        """
+        Submits an entry for execution.
+
+        Parameters:
+        ----------
+        algorithm_id : str
+            The ID of the entry to run.
+        inputs : list of dicts
+            The input parameters of each task.
+        resources : dict
+            The resources allocated to the execution.
+
+        Returns:
+        -------
+        concurrent.futures.Future
+            A future resolving to the list of tuples (success, output, data) of the tasks, see `pickle_results`.
+        """
+        return self._pool.submit(_run_pickled, self.algorithmlib, algorithm_id, inputs, resources)
+
+    def kill(self, future):
+        """
+        Stops an execution. A thread cannot be stopped, so only an execution that has not started is.
+
+        Parameters:
+        ----------
+        future : concurrent.futures.Future
+            The future returned by `submit`.
+
+        Returns:
+        -------
+        bool
+            Whether the execution was stopped.
+        """
+        return future.cancel()
+
+    def shutdown(self):
+        """
+        Shuts the thread pool down without waiting for running entries.
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _worker_main(algorithmlib, conn, progress_interval=0.25, inherited=()):
+    """
+    The main loop of a worker process: receives jobs from the pipe, runs them and sends the results back.
+
+    The progress reports of an entry are sent as ('progress', fraction, message) messages, at most once per
+    `progress_interval` seconds, a report held in between being sent when the interval expires or before the
+    result; the output chunks of a streaming entry as ('chunk', chunk) messages, and the
+    result as a ('done', results) message, whose outputs are pickled by `pack_results`. A job is a tuple
+    (algorithm_id, inputs, resources, streaming).
+
+    Parameters:
+    ----------
+    algorithmlib : AlgorithmStack
+        The algorithm library inherited from the server process.
+    conn : multiprocessing.connection.Connection
+        The worker end of the pipe to the server process.
+    progress_interval : float, optional
+        The shortest time between two progress reports sent to the server process (default is 0.25).
+    inherited : iterable, optional
+        The server ends of the pipes to the workers, inherited by the fork and closed here, so the worker sees the
+        end of its pipe when the server process exits (default is empty).
+    """
+    for _conn in inherited:
+        _conn.close()
+    # A worker forked while the event loop runs inherits its signal handlers, which would ignore `terminate`.
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    # The held progress reports are sent by the timer thread of the throttle.
+    _lock = threading.Lock()
+
+    def _send(message):
+        with _lock:
+            conn.send(message)
+
+    _progress = ProgressThrottle(lambda fraction, message: _send(('progress', fraction, message)),
+                                 interval=progress_interval)
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                return
+            algorithm_id, inputs, resources, streaming = job
+            resources = dict(resources, progress=_progress)
+            if streaming:
+                resources['stream'] = lambda chunk: _send(('chunk', chunk))
+            try:
+                result = run_entries(algorithmlib, algorithm_id, inputs, resources)
+            except Exception as e:
+                result = [(False, str(e))] * len(inputs)
+            _progress.flush()
+            try:
+                _send(('done', pack_results(result)))
+            except Exception as e:
+                # The output could not be pickled.
+                _send(('done', [(False, str(e))] * len(inputs)))
+    except (EOFError, KeyboardInterrupt):
+        return
+
+
+def _fork_server_main(algorithmlib, conn, inherited=()):
+    """
+    The main loop of a fork server: forks a worker process for every request received from the pipe.
+
+    A request is the `progress_interval` of the worker. The fork server answers with the process ID of the
+    worker, then passes the file descriptor of the server end of the worker's pipe. The workers are reaped
+    as soon as they exit, and the fork server exits with the server process.
+
+    Parameters:
+    ----------
+    algorithmlib : AlgorithmStack
+        The algorithm library inherited from the server process, and from here by the workers.
+    conn : multiprocessing.connection.Connection
+        The fork server end of the pipe to the server process.
+    inherited : iterable, optional
+        The server ends of the pipes to the workers and fork servers, inherited by the fork and closed here
+        (default is empty).
+    """
+    for _conn in inherited:
+        _conn.close()
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    try:
+        while True:
+            progress_interval = conn.recv()
+            server_conn, worker_conn = multiprocessing.Pipe()
+            pid = os.fork()
+            if pid == 0:
+                conn.close()
+                server_conn.close()
+                try:
+                    _worker_main(algorithmlib, worker_conn, progress_interval)
+                finally:
+                    os._exit(0)
+            worker_conn.close()
+            conn.send(pid)
+            multiprocessing.reduction.send_handle(conn, server_conn.fileno(), os.getppid())
+            server_conn.close()
+    except (EOFError, KeyboardInterrupt):
+        return
+
+
+class _ForkServer(object):
+    """
+    The fork server of an algorithm library, shared by all the process executors running its entries.
+
+    Attributes:
+    ----------
+    algorithmlib : AlgorithmStack
+        The algorithm library inherited by the workers.
+    _conn : multiprocessing.connection.Connection
+        The server end of the pipe to the fork server.
+    _process : multiprocessing.Process
+        The fork server process.
+    _lock : threading.Lock
+        Serializes the requests of the threads replacing their workers.
+    _servers : list
+        The fork servers started, one per algorithm library.
+    """
+
+    _servers = []
+
+    def __init__(self, algorithmlib):
+        """
+        Forks the fork server of an algorithm library.
+
+        Parameters:
+        ----------
+        algorithmlib : AlgorithmStack
+            The algorithm library inherited by the workers.
+        """
+        self.algorithmlib = algorithmlib
+        _context = multiprocessing.get_context('fork')
+        self._conn, fork_conn = _context.Pipe()
+        self._process = _context.Process(target=_fork_server_main,
+                                         args=(algorithmlib, fork_conn, list(_server_conns) + [self._conn]),
+                                         daemon=True)
+        self._process.start()
+        fork_conn.close()
+        _server_conns.add(self._conn)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, algorithmlib):
+        """
+        Returns the fork server of an algorithm library, starting it if needed.
+
+        Parameters:
+        ----------
+        algorithmlib : AlgorithmStack
+            The algorithm library inherited by the workers.
+
+        Returns:
+        -------
+        _ForkServer
+            The running fork server of the algorithm library.
+        """
+        for server in cls._servers:
+            if server.algorithmlib is algorithmlib and server._process.is_alive():
+                return server
+        server = cls(algorithmlib)
+        cls._servers.append(server)
+        return server
+
+    def fork(self, progress_interval):
+        """
+        Has a worker process forked.
+
+        Parameters:
+        ----------
+        progress_interval : float
+            The shortest time between two progress reports sent by the worker, in seconds.
+
+        Returns:
+        -------
+        tuple
+            The process ID of the worker and the server end of its pipe.
+        """
+        with self._lock:
+            self._conn.send(progress_interval)
+            pid = self._conn.recv()
+            conn = multiprocessing.connection.Connection(multiprocessing.reduction.recv_handle(self._conn))
+        return pid, conn
+
+
+class ProcessExecutor(object):
+    """
+    An executor running entries in pre-forked worker processes.
+
+    Each worker process is served by a thread of the server process, which takes the next job from the shared
+    job queue, sends it through the worker's pipe and waits for the result. A worker that dies, or is killed to
+    stop its execution, is replaced by a new one from the fork server.
+
+    Attributes:
+    ----------
+    algorithmlib : AlgorithmStack
+        The algorithm library holding the entries.
+    workers : int
+        The number of worker processes.
+    progress_interval : float
+        The shortest time between two progress reports sent by a worker, in seconds.
+    _forkserver : _ForkServer
+        The fork server forking the workers.
+    _jobs : queue.SimpleQueue
+        The queue of submitted jobs.
+    _processes : list
+        The process ID of the worker of each slot.
+    _current : list
+        The future of the execution running in each slot, or None.
+    _killed : set
+        The slots whose worker was killed by `kill`.
+    _lock : threading.Lock
+        Guards `_current` and `_killed`, so that a kill never hits the next execution of a worker.
+    """
+
+    def __init__(self, algorithmlib, workers=1, progress_interval=0.25):
+        """
+        Initializes the executor and has its worker processes forked.
+
+        Parameters:
+        ----------
+        algorithmlib : AlgorithmStack
+            The algorithm library holding the entries.
+        workers : int, optional
+            The number of worker processes (default is 1).
+        progress_interval : float, optional
+            The shortest time between two progress reports sent by a worker, in seconds (default is 0.25).
+        """
+        self.algorithmlib = algorithmlib
+        self.workers = max(1, int(workers))
+        self.progress_interval = progress_interval
+        self._forkserver = _ForkServer.of(algorithmlib)
+        self._jobs = queue.SimpleQueue()
+        self._processes = [None] * self.workers
+        self._current = [None] * self.workers
+        self._killed = set()
+        self._lock = threading.Lock()
+        _conns = [self._spawn(slot) for slot in range(self.workers)]
+        for slot, conn in enumerate(_conns):
+            threading.Thread(target=self._serve, args=(slot, conn), daemon=True).start()
+
+    def __repr__(self):
+        """
+        Returns a string representation of the executor.
+
+        Returns:
+        -------
+        str
+            A string representation of the executor.
+        """
+        return f'<ProcessExecutor workers:{self.workers}>'
+
+    def _spawn(self, slot):
+        """
+        Has the worker process of a slot forked by the fork server.
+
+        Parameters:
+        ----------
+        slot : int
+            The slot of the worker.
+
+        Returns:
+        -------
+        multiprocessing.connection.Connection
+            The server end of the pipe to the worker.
+        """
+        pid, conn = self._forkserver.fork(self.progress_interval)
+        _server_conns.add(conn)
+        self._processes[slot] = pid
+        return conn
+
+    def _serve(self, slot, conn):
+        """
+        Feeds the jobs of the job queue to the worker of a slot until the executor is shut down.
+
+        Parameters:
+        ----------
+        slot : int
+            The slot of the worker.
+        conn : multiprocessing.connection.Connection
+            The server end of the pipe to the worker.
+        """
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                conn.send(None)
+                return
+            future, (algorithm_id, inputs, resources) = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self._current[slot] = future
+            _progress = resources.get('progress')
+            _stream = resources.get('stream')
+            # Whether the worker may still run the job or send messages about it.
+            _busy = False
+            try:
+                conn.send((algorithm_id, inputs, {name: value for name, value in resources.items()
+                                                  if name not in ('progress', 'stream')}, _stream is not None))
+                _busy = True
+                message = conn.recv()
+                while message[0] != 'done':
+                    if message[0] == 'chunk':
+                        _stream(message[1])
+                    elif _progress is not None:
+                        _progress(*message[1:])
+                    message = conn.recv()
+                _busy = False
+                results = unpack_results(message[1])
+                with self._lock:
+                    self._current[slot] = None
+                future.set_result(results)
+            except (EOFError, OSError):
+                with self._lock:
+                    self._current[slot] = None
+                    _killed = slot in self._killed
+                    self._killed.discard(slot)
+                if _killed:
+                    logging.getLogger('uvicorn.info').info(f'Worker {self._processes[slot]} killed, respawning.')
+                    future.set_result([(False, 'Execution stopped')] * len(inputs))
+                else:
+                    logging.getLogger('uvicorn.warning').warning(f'Worker {self._processes[slot]} died, respawning.')
+                    future.set_result([(False, 'Worker process died')] * len(inputs))
+                conn = self._respawn(slot, conn)
+            except Exception as e:
+                # The inputs could not be pickled, a callback failed or the results could not be unpickled.
+                with self._lock:
+                    self._current[slot] = None
+                    _killed = slot in self._killed
+                    self._killed.discard(slot)
+                logging.getLogger('uvicorn.warning').warning(f'Execution of {algorithm_id} failed: {e}')
+                future.set_result([(False, str(e))] * len(inputs))
+                if _busy or _killed:
+                    # The pipe may still carry messages of the job: the worker is replaced.
+                    try:
+                        os.kill(self._processes[slot], signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    conn = self._respawn(slot, conn)
+
+    def _respawn(self, slot, conn):
+        """
+        Closes the pipe to the worker of a slot and has a new worker forked.
+
+        Parameters:
+        ----------
+        slot : int
+            The slot of the worker.
+        conn : multiprocessing.connection.Connection
+            The server end of the pipe to the old worker.
+
+        Returns:
+        -------
+        multiprocessing.connection.Connection
+            The server end of the pipe to the new worker.
+        """
+        _server_conns.discard(conn)
+        conn.close()
+        return self._spawn(slot)
+
+    def submit(self, algorithm_id, inputs, resources):
+        """
+        Submits an entry for execution.
+
+        Parameters:
+        ----------
+        algorithm_id : str
+            The ID of the entry to run.
+        inputs : list of dicts
+            The input parameters of each task.
+        resources : dict
+            The resources allocated to the execution, the progress callback of the tasks and the chunk sink
+            of a streaming task.
+
+        Returns:
+        -------
+        concurrent.futures.Future
+            A future resolving to the list of tuples (success, output, data) of the tasks, see `pickle_results`.
+        """
+        future = Future()
+        self._jobs.put((future, (algorithm_id, inputs, resources)))
+        return future
+
+    def kill(self, future):
+        """
+        Stops an execution. An execution that has not started is cancelled; a running one is stopped by killing
+        its worker process, which is replaced by a fresh one.
+
+        Parameters:
+        ----------
+        future : concurrent.futures.Future
+            The future returned by `submit`.
+
+        Returns:
+        -------
+        bool
+            Whether the execution was stopped.
+        """
+        if future.cancel():
+            return True
+        with self._lock:
+            for slot, _future in enumerate(self._current):
+                if _future is future:
+                    self._killed.add(slot)
+                    try:
+                        os.kill(self._processes[slot], signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    return True
+        return False
+
+    def shutdown(self):
+        """
+        Stops the worker processes once they finish their current jobs.
+        """
+        for _ in range(self.workers):
+            self._jobs.put(None)
@@ -0,0 +1,264 @@
+"""
+Fair Queue Module
+-----------------
+
+This module defines the `FairQueue` class, which holds the queued tasks of one layout and decides which of them
+runs next. Tasks are grouped into priority classes, served strictly in the order of `PRIORITIES`. The
+'background' class is only served when the layout is otherwise idle. Within a class, tasks are grouped by their
+`access_id`, each group keeping FIFO order, and the groups share the layout by weighted fair queuing: every access
+ID has a virtual time that advances by `1 / weight` for each of its tasks started, and a heap always offers the
+access ID with the lowest virtual time. A client submitting thousands of tasks therefore cannot hold back a
+client submitting a few.
+
+A fair queue may be given a `key` computed for every task when it is pushed. The group of each access ID is then a
+heap serving the task with the lowest key first instead of the oldest, e.g. the shortest expected job or the
+earliest deadline. The fair sharing between access IDs and the priority classes are unchanged.
+
+Removal is lazy: tasks that were cancelled, started out of order or moved to another layout stay in their group
+until they reach its head, where the `live` predicate given by the task queue drops them.
+
+Classes:
+--------
+FairQueue
+    A class that orders the queued tasks of a layout by priority class and weighted fair sharing.
+
+Functions:
+----------
+priority_index(priority)
+    Returns the rank of a priority class.
+"""
+
+from collections import deque
+from itertools import count
+import heapq
+
+# Priority classes from the highest to the lowest.
+PRIORITIES = ('interactive', 'normal', 'background')
+DEFAULT_PRIORITY = 'normal'
+BACKGROUND = PRIORITIES.index('background')
+
+
+def priority_index(priority):
+    """
+    Returns the rank of a priority class.
+
+    Parameters:
+    ----------
+    priority : str
+        The name of the priority class.
+
+    Returns:
+    -------
+    int
+        The rank of the class, 0 being the highest.
+
+    Raises:
+    ------
+    ValueError
+        If the priority class is not supported.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f'{priority} Not Supported for Priority.')
+    return PRIORITIES.index(priority)
+
+
+class _PriorityClass(object):
+    """
+    The queued tasks of one priority class, grouped by access ID.
+
+    Attributes:
+    ----------
+    groups : dict
+        A deque of tasks for each active access ID.
+    vtimes : dict
+        The virtual time of each access ID.
+    heap : list
+        A heap of tuples (virtual_time, order, access_id), one for each active access ID.
+    clock : float
+        The virtual time of the class, the virtual time of the last access ID served.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.vtimes = {}
+        self.heap = []
+        self.clock = 0.0
+
+
+class FairQueue(object):
+    """
+    A class that orders the queued tasks of a layout by priority class and weighted fair sharing.
+
+    Attributes:
+    ----------
+    _live : callable
+        A predicate telling whether a task is still queued on this layout.
+    _classes : list of _PriorityClass
+        The tasks of each priority class.
+    _order : itertools.count
+        A counter breaking ties between access IDs with the same virtual time, and between tasks with the same key.
+    _key : callable or None
+        The function ordering the tasks of each access ID, or None to keep them in FIFO order. Each group is then a
+        heap of tuples (key, order, task) instead of a deque of tasks.
+    """
+
+    def __init__(self, live, key=None):
+        """
+        Initializes an empty fair queue.
+
+        Parameters:
+        ----------
+        live : callable
+            A predicate telling whether a task is still queued on this layout.
+        key : callable, optional
+            A function of a task ordering the tasks of each access ID, lowest first (default is None, FIFO).
+        """
+        self._live = live
+        self._key = key
+        self._classes = [_PriorityClass() for _ in PRIORITIES]
+        self._order = count()
+
+    def push(self, task):
+        """
+        Adds a task at the tail of the group of its access ID, or at its rank in the group with a `key`.
+
+        Parameters:
+        ----------
+        task : Task
+            The task to add.
+        """
+        _class = self._classes[priority_index(task.priority)]
+        group = _class.groups.get(task.access_id)
+        if group is None:
+            # A returning access ID does not keep credit from its idle time.
+            group = _class.groups[task.access_id] = deque() if self._key is None else []
+            vtime = max(_class.vtimes.get(task.access_id, 0.0), _class.clock)
+            _class.vtimes[task.access_id] = vtime
+            heapq.heappush(_class.heap, (vtime, next(self._order), task.access_id))
+        if self._key is None:
+            group.append(task)
+        else:
+            heapq.heappush(group, (self._key(task), next(self._order), task))
+
+    def _first(self, group):
+        """
+        Returns the task at the head of a group.
+
+        Parameters:
+        ----------
+        group : deque or list
+            The group of an access ID.
+
+        Returns:
+        -------
+        Task
+            The task served first in the group.
+        """
+        return group[0] if self._key is None else group[0][2]
+
+    def _tasks(self, group):
+        """
+        Iterates over the tasks of a group, in FIFO order or in heap order with a `key`.
+
+        Parameters:
+        ----------
+        group : deque or list
+            The group of an access ID.
+
+        Returns:
+        -------
+        iterable of Task
+            The tasks of the group.
+        """
+        return group if self._key is None else (_item[2] for _item in group)
+
+    def _prune(self, _class):
+        """
+        Drops dead tasks from the group at the top of the heap and refreshes stale heap entries,
+        until the top group has a live head or the class is empty.
+
+        Parameters:
+        ----------
+        _class : _PriorityClass
+            The priority class to prune.
+        """
+        while _class.heap:
+            vtime, _, access_id = _class.heap[0]
+            group = _class.groups[access_id]
+            while group and not self._live(self._first(group)):
+                if self._key is None:
+                    group.popleft()
+                else:
+                    heapq.heappop(group)
+            if not group:
+                heapq.heappop(_class.heap)
+                del _class.groups[access_id]
+            elif vtime != _class.vtimes[access_id]:
+                heapq.heapreplace(_class.heap, (_class.vtimes[access_id], next(self._order), access_id))
+            else:
+                return
+
+    def head(self, background=True):
+        """
+        Returns the task that should run next.
+
+        Parameters:
+        ----------
+        background : bool, optional
+            Whether the background class may be served (default is True).
+
+        Returns:
+        -------
+        Task or None
+            The next task, or None if there is no queued task.
+        """
+        for rank, _class in enumerate(self._classes):
+            if rank == BACKGROUND and not background:
+                break
+            self._prune(_class)
+            if _class.heap:
+                return self._first(_class.groups[_class.heap[0][2]])
+        return None
+
+    def candidates(self, limit, background=True):
+        """
+        Yields up to `limit` queued tasks in approximate serving order.
+
+        Parameters:
+        ----------
+        limit : int
+            The maximum number of tasks to yield.
+        background : bool, optional
+            Whether tasks of the background class may be yielded (default is True).
+
+        Yields:
+        ------
+        Task
+            The queued tasks, by class, then by virtual time of their access ID, then in FIFO order, or in
+            heap order with a `key` (the lowest key first, the others roughly ascending).
+        """
+        for rank, _class in enumerate(self._classes):
+            if rank == BACKGROUND and not background:
+                return
+            self._prune(_class)
+            for _, _, access_id in sorted(_class.heap):
+                for task in self._tasks(_class.groups[access_id]):
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                    if self._live(task):
+                        yield task
+
+    def served(self, task):
+        """
+        Advances the virtual time of the access ID of a task that is started by `1 / task.weight`.
+
+        Parameters:
+        ----------
+        task : Task
+            The task that is started.
+        """
+        _class = self._classes[priority_index(task.priority)]
+        vtime = _class.vtimes.get(task.access_id, _class.clock)
+        _class.clock = max(_class.clock, vtime)
+        _class.vtimes[task.access_id] = vtime + 1.0 / task.weight
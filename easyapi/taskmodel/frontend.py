@@ -0,0 +1,1169 @@
+"""
+Frontend Module
+---------------
+
+This module lets several API processes share one task queue. Started with `easyapi scheduler`, a scheduler process
+holds the task queue, its executors, the journal, the admission control, the worker hub and the sweeps, and its
+`FrontendHub` accepts the API processes, the frontends, e.g. the workers of `uvicorn easyapi:app --workers 4`. In
+each frontend, the task queue is replaced by a `SchedulerClient`, which submits, reads, stops and deletes the
+tasks, and starts and reads the sweeps, through the scheduler. The HTTP requests are parsed by all frontends in
+parallel, while every task is queued once and the resources are accounted in one place, so a task submitted through
+one frontend can be read through any other.
+
+A frontend watches the unfinished tasks it read. The scheduler sends it every state
+change of a watched task with a snapshot of the task, so the frontend keeps a copy of each watched task and
+reads it, its queue position and its estimated times without asking the scheduler, and its listeners (the
+notifier of the WebSockets, the requests waiting for a task) are called as in a single process. A task is no
+longer watched once it finishes; a finished task is read from the scheduler when it is requested. The output
+chunks of a streaming task are read from its spool file, and the times of the tasks are sent as they are held,
+`time.monotonic()` times, as the scheduler runs on the same host.
+
+The messages are tuples pickled by `multiprocessing.connection`, over a Unix socket or TCP, which authenticates
+both ends with the shared key before any message is read.
+
+Messages from the frontend:
+- ('call', request_id, method, args): Calls a method of the hub.
+
+Messages to the frontend:
+- ('reply', request_id, success, value): The result of a call, or the exception it raised.
+- ('event', snapshot, state): A state change of a watched task.
+
+Classes:
+--------
+FrontendHub
+    A server sharing the task queue of the scheduler process with the frontends.
+
+SchedulerClient
+    The task queue of a frontend, forwarding the tasks to the scheduler process.
+
+Functions:
+----------
+queue_stats(task_queue, journal, admission, workerhub, sweeps)
+    Returns the statistics of a task queue and of its journal, admission control, worker hub and sweeps.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Listener, Client, AuthenticationError
+from .task import Task, task_key
+from .taskqueue import TaskQueue
+from .stream import ChunkSpool
+from .notifier import TaskNotifier
+from .taskholder import task_holder_batch
+
+# The attributes of a task copied to the frontends.
+FIELDS = ('access_id', 'algorithm_id', 'priority', 'in_progress', 'is_done', 'create_clock', 'start_clock',
+          'done_clock', 'deadline_clock', 'error', 'progress', 'progress_message', 'expected_runtime', 'interrupted')
+
+
+def queue_stats(task_queue, journal=None, admission=None, workerhub=None, sweeps=None):
+    """
+    Returns the statistics of a task queue and of its journal, admission control, worker hub and sweeps.
+
+    Parameters:
+    ----------
+    task_queue : TaskQueue
+        The task queue.
+    journal : Journal, optional
+        The journal of the task queue (default is None).
+    admission : AdmissionControl, optional
+        The admission control of the task queue (default is None).
+    workerhub : WorkerHub, optional
+        The hub of the remote workers (default is None).
+    sweeps : SweepManager, optional
+        The sweeps of the task queue (default is None).
+
+    Returns:
+    -------
+    dict
+        The statistics returned by GET /stats.
+    """
+    _stats = {
+        'submitted': task_queue.submitted,
+        'deduplicated': task_queue.deduplicated,
+        'dedup_rate': task_queue.dedup_rate,
+        'stolen': task_queue.stolen,
+        'results': len(task_queue.results),
+        'runtimes': task_queue.runtimes.stats(),
+    }
+    if journal is not None:
+        _stats['journal'] = {'records': journal.records, 'commits': journal.commits, 'recovered': journal.recovered}
+    if admission is not None:
+        _stats['admission'] = admission.stats()
+    if workerhub is not None:
+        _stats['remote'] = workerhub.stats()
+    if sweeps is not None:
+        _stats['sweeps'] = sweeps.stats()
+    return _stats
+
+
+class _Frontend(object):
+    """
+    The connection of a frontend, on the scheduler side.
+
+    Attributes:
+    ----------
+    conn : multiprocessing.connection.Connection
+        The connection to the frontend.
+    watched : set
+        The binary IDs of the tasks whose state changes are sent to the frontend.
+    sink : callable
+        The sink subscribed to the notifier for the watched tasks.
+    _lock : threading.Lock
+        Guards the sends on the connection.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.watched = set()
+        self.sink = None
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        """
+        Sends a message to the frontend, ignoring a broken connection, which the serving thread notices.
+
+        Parameters:
+        ----------
+        message : tuple
+            The message.
+        """
+        with self._lock:
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                pass
+
+
+class FrontendHub(object):
+    """
+    A server sharing the task queue of the scheduler process with the frontends.
+
+    The calls of the frontends are run on the event loop of the task queue, in the order each frontend sent them.
+
+    Attributes:
+    ----------
+    task_queue : TaskQueue
+        The shared task queue.
+    address : tuple or str
+        The address the hub listens on, (host, port) for TCP or the path of a Unix socket.
+    journal : Journal or None
+        The journal of the task queue.
+    admission : AdmissionControl or None
+        The admission control of the task queue.
+    workerhub : WorkerHub or None
+        The hub of the remote workers.
+    sweeps : SweepManager or None
+        The sweeps of the task queue.
+    frontends : set
+        The connected frontends.
+    calls : int
+        The number of calls answered.
+    _key : bytes
+        The shared key authenticating the frontends.
+    _listener : multiprocessing.connection.Listener or None
+        The listening socket, None until started.
+    _loop : asyncio.AbstractEventLoop or None
+        The event loop of the task queue.
+    _notifier : TaskNotifier or None
+        Sends the state changes of the watched tasks, including their queue positions.
+    _methods : dict
+        The methods the frontends may call, by name.
+    _coroutines : dict
+        The methods the frontends may call that wait before replying, by name.
+    """
+
+    def __init__(self, task_queue, address, key, journal=None, admission=None, workerhub=None, sweeps=None):
+        """
+        Initializes the hub. It listens once started.
+
+        Parameters:
+        ----------
+        task_queue : TaskQueue
+            The shared task queue.
+        address : tuple or str
+            The address to listen on, (host, port) for TCP or the path of a Unix socket.
+        key : str or bytes
+            The shared key authenticating the frontends.
+        journal : Journal, optional
+            The journal of the task queue (default is None).
+        admission : AdmissionControl, optional
+            The admission control of the task queue (default is None).
+        workerhub : WorkerHub, optional
+            The hub of the remote workers (default is None).
+        sweeps : SweepManager, optional
+            The sweeps of the task queue (default is None).
+        """
+        self.task_queue = task_queue
+        self.address = address
+        self.journal = journal
+        self.admission = admission
+        self.workerhub = workerhub
+        self.sweeps = sweeps
+        self.frontends = set()
+        self.calls = 0
+        self._key = key.encode() if isinstance(key, str) else key
+        self._listener = None
+        self._loop = None
+        self._notifier = None
+        self._methods = {'hello': self._hello, 'enqueue': self._enqueue, 'get': self._get, 'output': self._output,
+                         'stop': self._stop, 'delete': self._delete, 'admit': self._admit, 'stats': self._stats,
+                         'sweep_start': self._sweep_start, 'sweep_read': self._sweep_read,
+                         'sweep_stop': self._sweep_stop}
+        self._coroutines = {'committed': self._committed, 'sweep_wait': self._sweep_wait}
+
+    def __repr__(self):
+        """
+        Returns a string representation of the hub.
+
+        Returns:
+        -------
+        str
+            A string representation of the hub, including its address and number of frontends.
+        """
+        return f'<FrontendHub address:{self.address} frontends:{len(self.frontends)}>'
+
+    def __len__(self):
+        """
+        Returns the number of connected frontends.
+
+        Returns:
+        -------
+        int
+            The number of connected frontends.
+        """
+        return len(self.frontends)
+
+    def start(self):
+        """
+        Starts listening for frontends. Must be called on the event loop of the task queue.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._notifier = TaskNotifier(self.task_queue)
+        self._listener = Listener(self.address, authkey=self._key)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        """
+        Stops listening and closes the connections of the frontends.
+        """
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        for frontend in list(self.frontends):
+            frontend.conn.close()
+
+    def _accept(self):
+        """
+        Accepts the connections of the frontends, each served by a thread of its own.
+        """
+        _listener = self._listener
+        while True:
+            try:
+                conn = _listener.accept()
+            except AuthenticationError:
+                logging.getLogger('uvicorn.warning').warning('Frontend refused: authentication failed.')
+                continue
+            except (OSError, EOFError):
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        """
+        Passes the calls of a frontend to the event loop until its connection breaks.
+
+        Parameters:
+        ----------
+        conn : multiprocessing.connection.Connection
+            The connection to the frontend.
+        """
+        frontend = _Frontend(conn)
+        frontend.sink = lambda task, state: self._forward(frontend, task, state)
+        self._loop.call_soon_threadsafe(self.frontends.add, frontend)
+        try:
+            while True:
+                message = conn.recv()
+                self._loop.call_soon_threadsafe(self._handle, frontend, message)
+        except (EOFError, OSError):
+            pass
+        except RuntimeError:
+            # The event loop is closed.
+            return
+        conn.close()
+        try:
+            self._loop.call_soon_threadsafe(self._drop, frontend)
+        except RuntimeError:
+            pass
+
+    def _drop(self, frontend):
+        """
+        Forgets a disconnected frontend and the tasks it watched.
+
+        Parameters:
+        ----------
+        frontend : _Frontend
+            The frontend.
+        """
+        self.frontends.discard(frontend)
+        for task_id in frontend.watched:
+            self._notifier.unsubscribe(task_id, frontend.sink)
+        frontend.watched.clear()
+
+    def _handle(self, frontend, message):
+        """
+        Runs a call of a frontend and sends the reply.
+
+        Parameters:
+        ----------
+        frontend : _Frontend
+            The frontend.
+        message : tuple
+            The message ('call', request_id, method, args).
+        """
+        _, request_id, method, args = message
+        self.calls += 1
+        if method in self._coroutines:
+            asyncio.ensure_future(self._reply_later(frontend, request_id, self._coroutines[method](frontend, *args)))
+            return
+        try:
+            value = self._methods[method](frontend, *args)
+        except Exception as e:
+            frontend.send(('reply', request_id, False, e))
+        else:
+            frontend.send(('reply', request_id, True, value))
+
+    @staticmethod
+    async def _reply_later(frontend, request_id, coroutine):
+        """
+        Sends the reply of a call once its coroutine returns.
+
+        Parameters:
+        ----------
+        frontend : _Frontend
+            The frontend.
+        request_id : int
+            The ID of the call.
+        coroutine : coroutine
+            The running call.
+        """
+        try:
+            value = await coroutine
+        except Exception as e:
+            frontend.send(('reply', request_id, False, e))
+        else:
+            frontend.send(('reply', request_id, True, value))
+
+    async def _committed(self, frontend):
+        """
+        Returns once the tasks submitted so far are committed to the journal.
+        """
+        await self.journal.committed()
+
+    def _snapshot(self, task):
+        """
+        Returns the state of a task sent to the frontends.
+
+        Parameters:
+        ----------
+        task : Task
+            The task.
+
+        Returns:
+        -------
+        dict
+            The attributes in `FIELDS`, the binary task ID, the path, chunk count and size of its spool, and for an
+            unfinished task its queue position and estimated times.
+        """
+        snapshot = {name: getattr(task, name) for name in FIELDS}
+        snapshot['task_id'] = task.key
+        snapshot['stream'] = (task.stream.path, task.stream.count, task.stream.size) \
+            if task.stream is not None else None
+        if not task.is_done:
+            snapshot['position'] = self.task_queue.queue_where(task=task)
+            snapshot['estimate'] = self.task_queue.estimate(task)
+        return snapshot
+
+    def _watch(self, frontend, task_id):
+        """
+        Sends the state changes of a task to a frontend until the task finishes.
+
+        Parameters:
+        ----------
+        frontend : _Frontend
+            The frontend.
+        task_id : str or bytes
+            The ID of the task.
+        """
+        task_id = task_key(task_id)
+        if task_id not in frontend.watched:
+            frontend.watched.add(task_id)
+            self._notifier.subscribe(task_id, frontend.sink)
+
+    def _forward(self, frontend, task, state):
+        """
+        Sends a state change of a watched task to a frontend; the sink given to the notifier.
+
+        Parameters:
+        ----------
+        frontend : _Frontend
+            The frontend.
+        task : Task
+            The task whose state changed.
+        state : str
+            The new state of the task.
+        """
+        frontend.send(('event', self._snapshot(task), state))
+        if state == self.task_queue.DONE or state == self.task_queue.DELETED:
+            frontend.watched.discard(task.key)
+            self._notifier.unsubscribe(task.key, frontend.sink)
+
+    def _hello(self, frontend):
+        """
+        Returns what a frontend needs to know about the task queue.
+
+        Returns:
+        -------
+        dict
+            Whether the task queue has a journal, whether the submissions wait for their commit, whether it
+            has an admission control, and the largest window of the sweeps (None without sweeps).
+        """
+        return {'journal': self.journal is not None,
+                'wait_commit': self.journal is not None and self.journal.wait_commit,
+                'admission': self.admission is not None,
+                'sweeps': self.sweeps.window if self.sweeps is not None else None}
+
+    def _enqueue(self, frontend, tasks):
+        """
+        Queues tasks submitted through a frontend. They are watched once the frontend reads them, so a task nobody
+        reads before it finishes costs no event.
+
+        Parameters:
+        ----------
+        frontend : _Frontend
+            The frontend.
+        tasks : list of Task
+            The tasks, in order.
+        """
+        task_holder_batch(task_queue=self.task_queue, tasks=tasks)
+
+    def _get(self, frontend, task_id):
+        """
+        Returns the state of a task. The frontend watches it if it is not finished.
+
+        Parameters:
+        ----------
+        frontend : _Frontend
+            The frontend.
+        task_id : str or bytes
+            The ID of the task.
+
+        Returns:
+        -------
+        dict or None
+            The snapshot of the task, or None if the task is not found.
+        """
+        task = self.task_queue[task_id]
+        if task is None:
+            return None
+        if not task.is_done:
+            self._watch(frontend, task_id)
+        return self._snapshot(task)
+
+    def _output(self, frontend, task_id):
+        """
+        Returns the output of a finished task.
+
+        Parameters:
+        ----------
+        frontend : _Frontend
+            The frontend.
+        task_id : bytes
+            The ID of the task.
+
+        Returns:
+        -------
+        object
+            The output data of the task, or None if the task is not found.
+        """
+        task = self.task_queue[task_id]
+        return self.task_queue.results.output(task) if task is not None else None
+
+    def _stop(self, frontend, task_id, status):
+        """
+        Stops a task, see `TaskQueue.stop`.
+
+        Returns:
+        -------
+        dict
+            The snapshot of the stopped task.
+        """
+        task = self.task_queue.stop(task_id, status)
+        return self._snapshot(task)
+
+    def _delete(self, frontend, task_id):
+        """
+        Deletes a task, see `TaskQueue.__delitem__`.
+        """
+        del self.task_queue[task_id]
+
+    def _admit(self, frontend, algorithm_id, access_id, count):
+        """
+        Checks that tasks fit in the queue limits, see `AdmissionControl.check`.
+        """
+        if self.admission is not None:
+            self.admission.check(self.task_queue.algorithmlib[algorithm_id], access_id, count)
+
+    def _stats(self, frontend):
+        """
+        Returns the statistics of the task queue and the number of frontends, see `queue_stats`.
+        """
+        _stats = queue_stats(self.task_queue, self.journal, self.admission, self.workerhub, self.sweeps)
+        _stats['frontends'] = self.stats()
+        return _stats
+
+    def _sweep_start(self, frontend, algorithm_id, access_id, specs, priority, weight, deadline, window):
+        """
+        Starts a sweep of an entry, see `SweepManager.start`.
+        """
+        return self.sweeps.start(self.task_queue.algorithmlib[algorithm_id], access_id, specs, priority=priority,
+                                 weight=weight, deadline=deadline, window=window)
+
+    def _sweep_read(self, frontend, sweep_id, access_id, offset, limit):
+        """
+        Returns the state of a sweep and a block of its results, see `SweepManager.read`.
+        """
+        return self.sweeps.read(sweep_id, access_id, offset, limit)
+
+    async def _sweep_wait(self, frontend, sweep_id, access_id, offset, timeout):
+        """
+        Returns once a sweep has more than `offset` results or is finished, see `SweepManager.wait`.
+        """
+        await self.sweeps.wait(sweep_id, access_id, offset, timeout)
+
+    def _sweep_stop(self, frontend, sweep_id, access_id):
+        """
+        Stops a sweep, see `SweepManager.stop`.
+        """
+        return self.sweeps.stop(sweep_id, access_id)
+
+    def stats(self):
+        """
+        Returns the state of the hub.
+
+        Returns:
+        -------
+        dict
+            A dictionary containing the number of connected frontends, the number of tasks they watch and the
+            number of calls answered.
+        """
+        return {'connected': len(self.frontends), 'watched': sum(len(frontend.watched) for frontend in self.frontends),
+                'calls': self.calls}
+
+
+class _AdmissionProxy(object):
+    """
+    The admission control of a frontend, checking the submissions in the scheduler process.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def check(self, entry, access_id, count=1):
+        """
+        Checks that tasks of an entry submitted by an access ID can be queued, see `AdmissionControl.check`.
+
+        Raises:
+        ------
+        AdmissionError
+            If the tasks do not fit in the queue limits.
+        """
+        self._client._call('admit', entry.id, access_id, count)
+
+
+class _JournalProxy(object):
+    """
+    The journal of a frontend, waiting for the commits of the scheduler process.
+
+    Attributes:
+    ----------
+    wait_commit : bool
+        Whether the submissions wait until their tasks are committed.
+    """
+
+    def __init__(self, client, wait_commit):
+        self._client = client
+        self.wait_commit = wait_commit
+
+    async def committed(self):
+        """
+        Waits until the tasks submitted so far are committed, see `Journal.committed`.
+        """
+        await asyncio.wrap_future(self._client._request('committed', ()))
+
+
+class _SweepProxy(object):
+    """
+    The sweeps of a frontend, run by the scheduler process.
+
+    Attributes:
+    ----------
+    window : int
+        The default and largest number of tasks of a sweep in the task queue.
+    """
+
+    def __init__(self, client, window):
+        self._client = client
+        self.window = window
+
+    def start(self, entry, access_id, specs, priority='normal', weight=1, deadline=None, window=None):
+        """
+        Starts a sweep of an entry, see `SweepManager.start`.
+        """
+        return self._client._call('sweep_start', entry.id, access_id, specs, priority, weight, deadline, window)
+
+    def read(self, sweep_id, access_id, offset=0, limit=None):
+        """
+        Returns the state of a sweep and a block of its results, see `SweepManager.read`.
+        """
+        return self._client._call('sweep_read', sweep_id, access_id, offset, limit)
+
+    async def wait(self, sweep_id, access_id, offset, timeout):
+        """
+        Waits until a sweep has more than `offset` results or is finished, see `SweepManager.wait`.
+        """
+        await asyncio.wrap_future(self._client._request('sweep_wait', (sweep_id, access_id, offset, timeout)))
+
+    def stop(self, sweep_id, access_id):
+        """
+        Stops a sweep, see `SweepManager.stop`.
+        """
+        return self._client._call('sweep_stop', sweep_id, access_id)
+
+
+class _ResultProxy(object):
+    """
+    The result store of a frontend, reading the outputs from the scheduler process.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def output(self, task):
+        """
+        Returns the output data of a finished task. The chunks of a streaming task are read from its spool.
+
+        Parameters:
+        ----------
+        task : Task
+            The finished task.
+
+        Returns:
+        -------
+        object
+            The output data of the task.
+        """
+        if task.stream is not None:
+            return task.stream.collect()
+        return self._client._call('output', task.key)
+
+
+class SchedulerClient(object):
+    """
+    The task queue of a frontend, forwarding the tasks to the scheduler process.
+
+    It offers the part of the `TaskQueue` interface used by the API routes. The calls made on the event loop
+    block it for one round trip to the scheduler; reading a watched task, its position and its estimated times
+    costs none.
+
+    Attributes:
+    ----------
+    address : tuple or str
+        The address of the scheduler, (host, port) for TCP or the path of a Unix socket.
+    timeout : float
+        How many seconds a call may wait for its reply.
+    results : _ResultProxy
+        Reads the outputs of the finished tasks.
+    admission : _AdmissionProxy or None
+        Checks the submissions, None if the scheduler has no admission control.
+    journal : _JournalProxy or None
+        Waits for the commits, None if the scheduler has no journal.
+    sweeps : _SweepProxy or None
+        Starts and reads the sweeps, None if the scheduler has no sweeps.
+    _key : bytes
+        The shared key authenticating the frontend.
+    _conn : multiprocessing.connection.Connection or None
+        The connection to the scheduler, None once it broke.
+    _lock : threading.Lock
+        Guards the connection and `_pending`.
+    _ids : itertools.count
+        The IDs of the calls.
+    _pending : dict
+        The future of each call waiting for its reply, indexed by call ID.
+    _tasks : dict
+        The copies of the watched tasks, indexed by binary task ID.
+    _positions : dict
+        The queue position of each watched task.
+    _estimates : dict
+        The estimated times of each watched task, as tuples (start, finish, monotonic time of the estimate).
+    _listeners : list
+        The callables called on every state change of a watched task.
+    _loop : asyncio.AbstractEventLoop or None
+        The event loop the listeners are called on, set by `start`.
+    """
+
+    QUEUED = TaskQueue.QUEUED
+    RUNNING = TaskQueue.RUNNING
+    DONE = TaskQueue.DONE
+    DELETED = TaskQueue.DELETED
+    PROGRESS = TaskQueue.PROGRESS
+    CHUNK = TaskQueue.CHUNK
+    CANCELLED = TaskQueue.CANCELLED
+    TIMED_OUT = TaskQueue.TIMED_OUT
+
+    def __init__(self, address, key, timeout=30.0, connect_timeout=30.0):
+        """
+        Connects to the scheduler, waiting for it to listen.
+
+        Parameters:
+        ----------
+        address : tuple or str
+            The address of the scheduler, (host, port) for TCP or the path of a Unix socket.
+        key : str or bytes
+            The shared key authenticating the frontend.
+        timeout : float, optional
+            How many seconds a call may wait for its reply (default is 30).
+        connect_timeout : float, optional
+            How many seconds to wait for the scheduler to listen (default is 30).
+
+        Raises:
+        ------
+        ConnectionError
+            If the scheduler cannot be reached.
+        """
+        self.address = address
+        self.timeout = timeout
+        self.results = _ResultProxy(self)
+        self._key = key.encode() if isinstance(key, str) else key
+        self._conn = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending = {}
+        self._tasks = {}
+        self._positions = {}
+        self._estimates = {}
+        self._listeners = []
+        self._loop = None
+        self._connect(connect_timeout)
+        _hello = self._call('hello')
+        self.admission = _AdmissionProxy(self) if _hello['admission'] else None
+        self.journal = _JournalProxy(self, _hello['wait_commit']) if _hello['journal'] else None
+        self.sweeps = _SweepProxy(self, _hello['sweeps']) if _hello['sweeps'] is not None else None
+
+    def __repr__(self):
+        """
+        Returns a string representation of the client.
+
+        Returns:
+        -------
+        str
+            A string representation of the client, including the address of the scheduler and the number of
+            watched tasks.
+        """
+        return f'<SchedulerClient address:{self.address} watched:{len(self._tasks)}>'
+
+    def _connect(self, connect_timeout=0):
+        """
+        Connects to the scheduler and starts the thread reading its messages. Must be called with `_lock`
+        held or before the client is used.
+
+        Parameters:
+        ----------
+        connect_timeout : float, optional
+            How many seconds to keep trying (default is 0, once).
+
+        Raises:
+        ------
+        ConnectionError
+            If the scheduler cannot be reached.
+        """
+        _deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                conn = Client(self.address, authkey=self._key)
+                break
+            except AuthenticationError as e:
+                raise ConnectionError('Scheduler refused the frontend: authentication failed.') from e
+            except OSError as e:
+                if time.monotonic() >= _deadline:
+                    raise ConnectionError(f'Scheduler not reachable at {self.address}: {e}') from e
+                time.sleep(0.2)
+        self._conn = conn
+        threading.Thread(target=self._read, args=(conn,), daemon=True).start()
+
+    def _read(self, conn):
+        """
+        Reads the messages of the scheduler: resolves the calls and passes the events to the event loop.
+
+        Parameters:
+        ----------
+        conn : multiprocessing.connection.Connection
+            The connection to the scheduler.
+        """
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == 'reply':
+                    _, request_id, success, value = message
+                    with self._lock:
+                        future = self._pending.pop(request_id, None)
+                    if future is None:
+                        continue
+                    if success:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+                elif self._loop is not None:
+                    self._loop.call_soon_threadsafe(self._apply, message[1], message[2])
+        except (EOFError, OSError, RuntimeError):
+            pass
+        logging.getLogger('uvicorn.warning').warning('Frontend lost the scheduler.')
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            _pending, self._pending = self._pending, {}
+        conn.close()
+        for future in _pending.values():
+            future.set_exception(ConnectionError('Scheduler lost.'))
+        if self._loop is not None:
+            try:
+                # The watches ended with the connection.
+                self._loop.call_soon_threadsafe(self._forget_all)
+            except RuntimeError:
+                pass
+
+    def _request(self, method, args):
+        """
+        Sends a call to the scheduler, connecting again if the connection broke.
+
+        Parameters:
+        ----------
+        method : str
+            The method of the hub.
+        args : tuple
+            Its arguments.
+
+        Returns:
+        -------
+        concurrent.futures.Future
+            The future of the reply.
+
+        Raises:
+        ------
+        ConnectionError
+            If the scheduler cannot be reached.
+        """
+        future = Future()
+        with self._lock:
+            if self._conn is None:
+                self._connect()
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self._conn.send(('call', request_id, method, args))
+            except (OSError, ValueError) as e:
+                del self._pending[request_id]
+                raise ConnectionError('Scheduler lost.') from e
+        return future
+
+    def _call(self, method, *args):
+        """
+        Calls a method of the hub and waits for its reply.
+
+        Parameters:
+        ----------
+        method : str
+            The method of the hub.
+        *args
+            Its arguments.
+
+        Returns:
+        -------
+        object
+            The value returned by the method. An exception raised by the method is raised here.
+        """
+        return self._request(method, args).result(self.timeout)
+
+    def start(self):
+        """
+        Calls the listeners on the running event loop from now on. Must be called before tasks are submitted.
+        """
+        self._loop = asyncio.get_running_loop()
+
+    def close(self):
+        """
+        Closes the connection to the scheduler.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _update(self, task, snapshot):
+        """
+        Copies a snapshot sent by the scheduler into a task.
+
+        Parameters:
+        ----------
+        task : Task
+            The copy of the task.
+        snapshot : dict
+            The snapshot.
+        """
+        for name in FIELDS:
+            setattr(task, name, snapshot[name])
+        _stream = snapshot['stream']
+        if _stream is not None:
+            if task.stream is None:
+                task.stream = ChunkSpool.attach(_stream[0])
+            task.stream.count, task.stream.size = _stream[1], _stream[2]
+        if task.key in self._tasks:
+            self._positions[task.key] = snapshot.get('position')
+            _estimate = snapshot.get('estimate')
+            if _estimate is not None:
+                self._estimates[task.key] = (_estimate[0], _estimate[1], time.monotonic())
+            else:
+                self._estimates.pop(task.key, None)
+
+    def _task(self, snapshot):
+        """
+        Builds a task from a snapshot sent by the scheduler.
+
+        Parameters:
+        ----------
+        snapshot : dict
+            The snapshot.
+
+        Returns:
+        -------
+        Task
+            The task, without its input data.
+        """
+        task = Task(task_id=snapshot['task_id'], create_clock=snapshot['create_clock'])
+        self._update(task, snapshot)
+        return task
+
+    def _apply(self, snapshot, state):
+        """
+        Applies a state change of a watched task and calls the listeners. A finished task is no longer watched.
+
+        Parameters:
+        ----------
+        snapshot : dict
+            The snapshot of the task.
+        state : str
+            The new state of the task.
+        """
+        task = self._tasks.get(snapshot['task_id'])
+        if task is None:
+            return
+        self._update(task, snapshot)
+        if state == self.DONE or state == self.DELETED:
+            self._forget(task.key)
+        for listener in self._listeners:
+            try:
+                listener(task, state)
+            except Exception:
+                pass
+
+    def _forget(self, task_id):
+        """
+        Drops the copy of a task.
+
+        Parameters:
+        ----------
+        task_id : bytes
+            The binary ID of the task.
+        """
+        self._tasks.pop(task_id, None)
+        self._positions.pop(task_id, None)
+        self._estimates.pop(task_id, None)
+
+    def _forget_all(self):
+        """
+        Drops the copies of all tasks, after the connection broke.
+        """
+        self._tasks.clear()
+        self._positions.clear()
+        self._estimates.clear()
+
+    def add_listener(self, listener):
+        """
+        Registers a callable called on every state change of a watched task, see `TaskQueue.add_listener`.
+
+        Parameters:
+        ----------
+        listener : callable
+            A callable taking (task, state).
+        """
+        self._listeners.append(listener)
+
+    def enqueue(self, task):
+        """
+        Submits a task to the scheduler.
+
+        Parameters:
+        ----------
+        task : Task
+            The task.
+        """
+        self.enqueue_many([task])
+
+    def enqueue_many(self, tasks):
+        """
+        Submits a batch of tasks to the scheduler in one call. They are watched once read, and the submitted
+        copies are not kept, so their inputs are released.
+
+        Parameters:
+        ----------
+        tasks : list of Task
+            The tasks, in order.
+        """
+        self._call('enqueue', tasks)
+
+    def __getitem__(self, task_id):
+        """
+        Retrieves a task, from its copy if it is watched, otherwise from the scheduler.
+
+        Parameters:
+        ----------
+        task_id : str
+            The ID of the task to retrieve.
+
+        Returns:
+        -------
+        Task or None
+            The task with the specified task ID, or None if the task is not found.
+        """
+        _key = task_key(task_id)
+        if _key is None:
+            return None
+        task = self._tasks.get(_key)
+        if task is not None:
+            return task
+        snapshot = self._call('get', _key)
+        if snapshot is None:
+            return None
+        task = self._tasks.get(_key)
+        if task is None:
+            task = Task(task_id=_key, create_clock=snapshot['create_clock'])
+            if not snapshot['is_done']:
+                self._tasks[_key] = task
+            self._update(task, snapshot)
+        return task
+
+    def __contains__(self, task_id):
+        """
+        Checks if a task with the specified task ID is held by the task queue of the scheduler.
+
+        Parameters:
+        ----------
+        task_id : str
+            The ID of the task to check.
+
+        Returns:
+        -------
+        bool
+            True if the task is queued, running or done, False otherwise.
+        """
+        return self[task_id] is not None
+
+    def __delitem__(self, task_id):
+        """
+        Deletes a task, see `TaskQueue.__delitem__`.
+
+        Parameters:
+        ----------
+        task_id : str
+            The ID of the task to delete.
+
+        Raises:
+        ------
+        LookupError
+            If the task is not found.
+        """
+        self._call('delete', task_id)
+
+    def stop(self, task_id, status=TaskQueue.CANCELLED):
+        """
+        Stops a queued or running task, see `TaskQueue.stop`.
+
+        Parameters:
+        ----------
+        task_id : str
+            The ID of the task to stop.
+        status : str, optional
+            `CANCELLED` or `TIMED_OUT` (default is `CANCELLED`).
+
+        Returns:
+        -------
+        Task
+            The stopped task, or the task itself if it had already finished.
+
+        Raises:
+        ------
+        LookupError
+            If the task is not found.
+        """
+        return self._task(self._call('stop', task_id, status))
+
+    def queue_where(self, task):
+        """
+        Returns the position of a watched task in its queue, as last reported by the scheduler.
+
+        Parameters:
+        ----------
+        task : Task
+            The task.
+
+        Returns:
+        -------
+        int or None
+            The position of the task in the queue (1-based index), or None if the task is not in a queue.
+        """
+        return self._positions.get(task.key)
+
+    def estimate(self, task):
+        """
+        Estimates how many seconds until a watched task starts and finishes, from the last estimate of the
+        scheduler.
+
+        Parameters:
+        ----------
+        task : Task
+            The queued or running task.
+
+        Returns:
+        -------
+        tuple or None
+            A tuple (start, finish) of the estimated seconds from now, or None if no estimate is known.
+        """
+        _estimate = self._estimates.get(task.key)
+        if _estimate is None:
+            return None
+        _elapsed = time.monotonic() - _estimate[2]
+        return max(_estimate[0] - _elapsed, 0.0), max(_estimate[1] - _elapsed, 0.0)
+
+    def stats(self):
+        """
+        Returns the statistics of the task queue of the scheduler, see `queue_stats`.
+
+        Returns:
+        -------
+        dict
+            The statistics returned by GET /stats, with the state of the frontend hub.
+        """
+        return self._call('stats')
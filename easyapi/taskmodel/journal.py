@@ -0,0 +1,636 @@
+"""
+Task Journal Module
+-------------------
+
+This module defines the `Journal` class, which records the tasks of a task queue in a SQLite database, so that
+they survive a restart or a crash of the server. The journal is a listener of the `TaskQueue`: every submission,
+state change and result is appended to a buffer on the event loop thread, and a writer thread commits the buffer
+in one transaction. Submissions arriving while a transaction commits are written together by the next one (group
+commit), so the cost of a commit is shared by all of them and submit throughput does not depend on the disk.
+
+A record is a snapshot taken on the event loop thread: the row number of the task, its timestamps, its status
+and, once it finished, its pickled output as sized by the result store. The writer thread never reads a task or
+the result store, which may evict or spill the output meanwhile. The output chunks of a streaming task are not
+loaded: the spool file, opened when the task finished, is linked or copied into the directory `<path>.chunks`
+next to the database.
+
+The database runs in WAL mode, so a commit only appends to the write-ahead log. A client may wait until its
+submission is committed with `committed()`; all waiters of one transaction are released together.
+
+On startup, `recover` rebuilds the task queue from the journal: the finished tasks whose TTL has not passed are
+registered in the result store and only loaded from the database when they are requested, and the queued tasks,
+together with the tasks interrupted while running, are enqueued again in their submission order.
+
+Classes:
+--------
+Journal
+    A class that records the tasks of a task queue in SQLite and rebuilds the task queue from it.
+
+Methods:
+--------
+__init__(self, path='journal.db', synchronous='normal', wait_commit=True, commit_interval=0.002)
+    Opens the journal database, creating it if needed.
+
+recover(self, task_queue)
+    Rebuilds the task queue from the journal and starts recording its state changes.
+
+committed(self)
+    Returns a future resolved once everything recorded so far is committed.
+
+close(self)
+    Commits the pending records, stops the writer thread and closes the database.
+"""
+
+from .task import Task, EPOCH
+import threading
+import shutil
+import asyncio
+import logging
+import sqlite3
+import pickle
+import time
+import os
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    access_id TEXT,
+    algorithm_id TEXT,
+    input BLOB,
+    priority TEXT,
+    weight REAL,
+    create_time REAL,
+    start_time REAL,
+    done_time REAL,
+    state TEXT,
+    error TEXT,
+    output BLOB,
+    deadline REAL,
+    interrupted TEXT,
+    spool TEXT,
+    chunks INTEGER
+)
+"""
+
+# The columns added since the first schema, added to the databases created before them.
+_ADDED = (('deadline', 'REAL'), ('interrupted', 'TEXT'), ('spool', 'TEXT'), ('chunks', 'INTEGER'))
+
+_INSERT = """
+INSERT INTO tasks (seq, task_id, access_id, algorithm_id, input, priority, weight, create_time, deadline,
+                   start_time, done_time, state, error, interrupted, output, spool, chunks)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_UPDATE = """
+UPDATE tasks SET start_time = ?, done_time = ?, state = ?, error = ?, interrupted = ?, output = ?, spool = ?,
+                 chunks = ?
+WHERE seq = ?
+"""
+
+_SELECT = """
+SELECT seq, task_id, access_id, algorithm_id, input, priority, weight, create_time, start_time, done_time, error,
+       output, deadline, interrupted, spool, chunks
+FROM tasks
+"""
+
+
+def _timestamp(clock):
+    """
+    Converts a monotonic time of this process to a POSIX timestamp.
+
+    Parameters:
+    ----------
+    clock : float or None
+        The `time.monotonic()` time to convert.
+
+    Returns:
+    -------
+    float or None
+        The POSIX timestamp, or None.
+    """
+    return clock + EPOCH if clock is not None else None
+
+
+def _clock(timestamp):
+    """
+    Converts a POSIX timestamp to a monotonic time of this process.
+
+    Parameters:
+    ----------
+    timestamp : float or None
+        The POSIX timestamp to convert.
+
+    Returns:
+    -------
+    float or None
+        The `time.monotonic()` time, negative before the clock started, or None.
+    """
+    return timestamp - EPOCH if timestamp is not None else None
+
+
+def _duplicate(path, target, source=None):
+    """
+    Makes a file available under a second path: as a hard link if possible, otherwise as a copy.
+
+    Parameters:
+    ----------
+    path : str
+        The path of the file.
+    target : str
+        The new path, replaced if it exists.
+    source : file object, optional
+        The file opened for reading, copied if `path` was deleted since (default is None, `path` is opened).
+
+    Raises:
+    ------
+    OSError
+        If the file can neither be linked nor read.
+    """
+    try:
+        os.remove(target)
+    except OSError:
+        pass
+    try:
+        os.link(path, target)
+        return
+    except OSError:
+        pass
+    if source is None:
+        with open(path, 'rb') as f_, open(target, 'wb') as t_:
+            shutil.copyfileobj(f_, t_)
+    else:
+        source.seek(0)
+        with open(target, 'wb') as t_:
+            shutil.copyfileobj(source, t_)
+
+
+class Journal(object):
+    """
+    A class that records the tasks of a task queue in SQLite and rebuilds the task queue from it.
+
+    Attributes:
+    ----------
+    path : str
+        The path of the SQLite database.
+    synchronous : str
+        The SQLite `synchronous` setting: 'off', 'normal' or 'full'. With 'normal', a committed transaction
+        survives a crash of the server but not of the operating system; 'full' also syncs every commit to disk.
+    wait_commit : bool
+        Whether a submission is only acknowledged once it is committed.
+    commit_interval : float
+        The shortest time between the start of two transactions, in seconds. The records arriving in between
+        are committed together by the next one.
+    task_queue : TaskQueue or None
+        The task queue recorded by the journal.
+    recovered : dict
+        The number of finished, queued and interrupted tasks restored by `recover`.
+    commits : int
+        The number of transactions committed.
+    records : int
+        The number of state changes recorded.
+    COMPACT_INTERVAL : float
+        How often, in seconds, the finished tasks whose TTL has passed are removed from the database.
+    _conn : sqlite3.Connection
+        The connection to the database, used by the writer thread once recovery is over.
+    _reader : sqlite3.Connection
+        The connection loading the finished tasks requested on the event loop thread.
+    chunks_dir : str
+        The directory of the output chunks of the finished streaming tasks, `<path>.chunks`.
+    _pending : list
+        The records not yet taken by the writer thread, tuples (seq, submission, state, start time, done time,
+        error, interrupted, output, spool) built by `_record`. The submission holds the columns written with the
+        first record of a task, including its input data, which the result store releases once the task has run;
+        it is None for a task already written. The spool is a tuple (file, path, chunks) of a finished streaming
+        task, else None.
+    _appended : int
+        The number of records appended to `_pending` so far.
+    _committed : int
+        The number of records committed so far.
+    _waiters : list
+        Tuples (appended, loop, future) of the clients waiting for a commit.
+    _seq : int
+        The sequence number of the last row assigned, on the event loop thread.
+    _cond : threading.Condition
+        Guards the pending records and the waiters, and wakes the writer thread.
+    _writer : threading.Thread or None
+        The writer thread.
+    _closed : bool
+        Whether the journal is closing.
+    _compacted : float
+        The monotonic time of the last removal of the expired finished tasks.
+    """
+
+    COMPACT_INTERVAL = 300
+
+    def __init__(self, path='journal.db', synchronous='normal', wait_commit=True, commit_interval=0.002):
+        """
+        Opens the journal database, creating it if needed.
+
+        Parameters:
+        ----------
+        path : str, optional
+            The path of the SQLite database (default is 'journal.db').
+        synchronous : str, optional
+            The SQLite `synchronous` setting, 'off', 'normal' or 'full' (default is 'normal').
+        wait_commit : bool, optional
+            Whether a submission is only acknowledged once it is committed (default is True).
+        commit_interval : float, optional
+            The shortest time between the start of two transactions, in seconds (default is 0.002).
+
+        Raises:
+        ------
+        TypeError
+            If the `synchronous` setting is not supported.
+        """
+        if synchronous not in ('off', 'normal', 'full'):
+            raise TypeError(f'{synchronous} Not Supported for Journal.')
+        self.path = path
+        self.synchronous = synchronous
+        self.wait_commit = wait_commit
+        self.commit_interval = commit_interval
+        self.task_queue = None
+        self.recovered = {'done': 0, 'queued': 0, 'interrupted': 0}
+        self.commits = 0
+        self.records = 0
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f'PRAGMA synchronous={synchronous.upper()}')
+        self._conn.execute(_SCHEMA)
+        _columns = {row[1] for row in self._conn.execute('PRAGMA table_info(tasks)')}
+        for name, kind in _ADDED:
+            if name not in _columns:
+                self._conn.execute(f'ALTER TABLE tasks ADD COLUMN {name} {kind}')
+        self.chunks_dir = f'{path}.chunks'
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._pending = []
+        self._appended = 0
+        self._committed = 0
+        self._waiters = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._writer = None
+        self._closed = False
+        self._compacted = time.monotonic()
+
+    def __repr__(self):
+        """
+        Returns a string representation of the journal.
+
+        Returns:
+        -------
+        str
+            A string representation of the journal, including its path and the number of commits.
+        """
+        return f'<Journal path:{self.path} commits:{self.commits} records:{self.records}>'
+
+    def recover(self, task_queue):
+        """
+        Rebuilds the task queue from the journal and starts recording its state changes.
+
+        The tasks that were running when the server stopped are queued again. The finished tasks whose TTL has
+        passed are removed from the database, and the others are registered in the result store without being
+        loaded.
+
+        Parameters:
+        ----------
+        task_queue : TaskQueue
+            The task queue to rebuild, which must be empty.
+
+        Returns:
+        -------
+        dict
+            The number of finished, queued and interrupted tasks restored.
+        """
+        _begin = time.perf_counter()
+        self.task_queue = task_queue
+        _ttl = task_queue.results.ttl
+        _now = time.time()
+        _expired = _now - _ttl if _ttl is not None and _ttl > 0 else float('-inf')
+        with self._conn:
+            self._conn.execute('BEGIN')
+            # A finished task whose output was lost cannot be restored either.
+            self._delete_done("done_time < ? OR (error IS NULL AND output IS NULL AND spool IS NULL)", (_expired,))
+            _interrupted = self._conn.execute("UPDATE tasks SET state = 'queued', start_time = NULL "
+                                              "WHERE state = 'running'").rowcount
+
+        self._seq = self._conn.execute('SELECT MAX(seq) FROM tasks').fetchone()[0] or 0
+
+        # The finished tasks stay in the database until they are requested.
+        _finished = self._conn.execute("SELECT task_id, seq, done_time FROM tasks WHERE state = 'done' "
+                                       "ORDER BY done_time")
+        task_queue.results.restore(((task_id, seq, _now - done_time) for task_id, seq, done_time in _finished),
+                                   self._load)
+        self.recovered['done'] = len(task_queue.results)
+
+        _tasks = [self._restore(row)
+                  for row in self._conn.execute(_SELECT + "WHERE state = 'queued' ORDER BY seq")]
+        task_queue.enqueue_many(_tasks)
+        self.recovered['queued'] = len(_tasks)
+        self.recovered['interrupted'] = _interrupted
+
+        task_queue.add_listener(self._record)
+        self._writer = threading.Thread(target=self._run, name='easyapi-journal', daemon=True)
+        self._writer.start()
+        logger = logging.getLogger('uvicorn.info')
+        logger.info(f'Journal [{time.perf_counter() - _begin:.3f}s] > {self.recovered["done"]} done, '
+                    f'{self.recovered["queued"]} queued ({_interrupted} interrupted) from {self.path}')
+        return self.recovered
+
+    def _restore(self, row, finished=False):
+        """
+        Rebuilds a task from a row of the database. The task requires the resources its entry requires now.
+
+        Parameters:
+        ----------
+        row : tuple
+            The columns selected by `_SELECT`.
+        finished : bool, optional
+            Whether the task has run, so its input data is not loaded (default is False).
+
+        Returns:
+        -------
+        Task
+            The task, as it was submitted.
+        """
+        _algorithmlib = self.task_queue.algorithmlib
+        _entry = _algorithmlib[row[3]] if _algorithmlib is not None and row[3] in _algorithmlib else None
+        task = Task(access_id=row[2], algorithm_id=row[3], input_data=None if finished else pickle.loads(row[4]),
+                    required_resources=getattr(_entry, 'required_resources', {}), priority=row[5], weight=row[6],
+                    task_id=row[1], create_clock=_clock(row[7]))
+        task.deadline_clock = _clock(row[12])
+        task._journal_seq = row[0]
+        return task
+
+    def _load(self, seq):
+        """
+        Loads a finished task from the database, when the result store is first asked for it.
+
+        Parameters:
+        ----------
+        seq : int
+            The sequence number of the row of the task.
+
+        Returns:
+        -------
+        tuple or None
+            The finished task and its pickled output, or None if its row or its output chunks were deleted.
+        """
+        row = self._reader.execute(_SELECT + "WHERE seq = ? AND state = 'done'", (seq,)).fetchone()
+        if row is None:
+            return None
+        task = self._restore(row, finished=True)
+        task.start_clock, task.done_clock = _clock(row[8]), _clock(row[9])
+        task.in_progress, task.is_done = False, True
+        task.interrupted = row[13]
+        if row[14] is not None:
+            # The result store deletes the chunks of the tasks it drops, so it reads a copy of them.
+            task.stream = self.task_queue.results.spool(task.task_id)
+            task.stream.close()
+            try:
+                _duplicate(row[14], task.stream.path)
+            except OSError:
+                task.stream.discard()
+                return None
+            task.stream.count, task.stream.size = row[15], os.path.getsize(task.stream.path)
+        if row[10] is not None:
+            task.error = row[10]
+        elif row[14] is None:
+            task.output_data = pickle.loads(row[11])
+        return task, row[11]
+
+    def _record(self, task, state):
+        """
+        Listener of the task queue: appends a snapshot of a state change to the pending records. The row of a
+        task is numbered by its first record, so rows are appended in order and no index on the random task IDs
+        has to be maintained.
+
+        Parameters:
+        ----------
+        task : Task
+            The task whose state changed.
+        state : str
+            The new state of the task.
+        """
+        _queue = self.task_queue
+        if state not in (_queue.QUEUED, _queue.RUNNING, _queue.DONE, _queue.DELETED):
+            return
+        _submission = None
+        if task._journal_seq is None:
+            if state == _queue.DELETED:
+                return
+            self._seq += 1
+            task._journal_seq = self._seq
+            _submission = (task.task_id, task.access_id, task.algorithm_id, task.input_data, task.priority,
+                           task.weight, _timestamp(task.create_clock), _timestamp(task.deadline_clock))
+        _error, _output, _spool = None, None, None
+        if state == _queue.DONE:
+            _error = task.error
+            if task.stream is not None:
+                # Opened now, so the chunks can be copied even if the result store deletes them meanwhile.
+                try:
+                    _spool = (open(task.stream.path, 'rb'), task.stream.path, task.stream.count)
+                except OSError:
+                    _spool = None
+            elif _error is None:
+                _output = _queue.results.pickled(task)
+        _record = (task._journal_seq, _submission, state, _timestamp(task.start_clock),
+                   _timestamp(task.done_clock), _error, task.interrupted, _output, _spool)
+        with self._cond:
+            self._pending.append(_record)
+            self._appended += 1
+            self._cond.notify()
+
+    def committed(self):
+        """
+        Returns a future resolved once everything recorded so far is committed.
+
+        Returns:
+        -------
+        asyncio.Future
+            A future of the running event loop, resolved with None.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._cond:
+            if self._committed >= self._appended or self._writer is None:
+                future.set_result(None)
+            else:
+                self._waiters.append((self._appended, loop, future))
+        return future
+
+    def close(self):
+        """
+        Commits the pending records, stops the writer thread and closes the database.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        self._conn.close()
+        self._reader.close()
+
+    def _run(self):
+        """
+        The writer thread: commits the pending records in one transaction whenever there are some, at most once
+        per `commit_interval`, and releases the clients waiting for them.
+        """
+        _next = 0.0
+        while True:
+            with self._cond:
+                while len(self._pending) == 0 and not self._closed:
+                    self._cond.wait()
+            _delay = _next - time.monotonic()
+            if _delay > 0 and not self._closed:
+                time.sleep(_delay)
+            with self._cond:
+                if len(self._pending) == 0:
+                    return
+                _records, self._pending = self._pending, []
+                _appended = self._appended
+            _next = time.monotonic() + self.commit_interval
+            try:
+                self._write(_records)
+            except Exception as e:
+                logger = logging.getLogger('uvicorn.warning')
+                logger.warning(f'Journal [FAILED] > {len(_records)} records lost: {e}')
+            with self._cond:
+                self._committed = _appended
+                _released = [waiter for waiter in self._waiters if waiter[0] <= _appended]
+                self._waiters = [waiter for waiter in self._waiters if waiter[0] > _appended]
+            for _, loop, future in _released:
+                try:
+                    loop.call_soon_threadsafe(self._release, future)
+                except RuntimeError:
+                    # The event loop is closed.
+                    pass
+
+    @staticmethod
+    def _release(future):
+        """
+        Resolves the future of a client waiting for a commit, unless it gave up.
+
+        Parameters:
+        ----------
+        future : asyncio.Future
+            The future returned by `committed`.
+        """
+        if not future.done():
+            future.set_result(None)
+
+    def _write(self, records):
+        """
+        Writes records in one transaction. Only the last state of each task is written, with the submission
+        captured by its first record if it was not written yet.
+
+        Parameters:
+        ----------
+        records : list of tuples
+            The records built by `_record`, in the order they were recorded.
+        """
+        _rows = {}
+        for record in records:
+            if record[0] in _rows:
+                record = (record[0], _rows[record[0]][1]) + record[2:]
+            _rows[record[0]] = record
+        _inserts, _updates, _deletes = [], [], []
+        try:
+            for seq, submission, state, start_time, done_time, error, interrupted, output, spool in _rows.values():
+                if state == self.task_queue.DELETED:
+                    if submission is None:
+                        _deletes.append(seq)
+                    continue
+                _spool, _chunks = None, None
+                if spool is not None:
+                    _spool, _chunks = self._keep_chunks(seq, spool), spool[2]
+                if submission is None:
+                    _updates.append((start_time, done_time, state, error, interrupted, output, _spool, _chunks,
+                                     seq))
+                else:
+                    _inserts.append((seq,) + submission[:3]
+                                    + (pickle.dumps(submission[3], protocol=pickle.HIGHEST_PROTOCOL),)
+                                    + submission[4:] + (start_time, done_time, state, error, interrupted, output,
+                                                        _spool, _chunks))
+        finally:
+            for record in records:
+                if record[8] is not None:
+                    record[8][0].close()
+        with self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(_INSERT, _inserts)
+            self._conn.executemany(_UPDATE, _updates)
+            self._conn.executemany('DELETE FROM tasks WHERE seq = ?', [(seq,) for seq in _deletes])
+            if time.monotonic() - self._compacted > self.COMPACT_INTERVAL:
+                self._compact()
+        for seq in _deletes:
+            self._remove_chunks(os.path.join(self.chunks_dir, f'{seq}.chunks'))
+        self.commits += 1
+        self.records += len(records)
+
+    def _keep_chunks(self, seq, spool):
+        """
+        Keeps the output chunks of a finished streaming task in the chunks directory of the journal.
+
+        Parameters:
+        ----------
+        seq : int
+            The sequence number of the row of the task.
+        spool : tuple
+            The spool file opened by `_record`, its path and its number of chunks.
+
+        Returns:
+        -------
+        str or None
+            The path of the chunks kept, or None if they could not be read.
+        """
+        _path = os.path.join(self.chunks_dir, f'{seq}.chunks')
+        try:
+            os.makedirs(self.chunks_dir, exist_ok=True)
+            _duplicate(spool[1], _path, spool[0])
+        except OSError:
+            return None
+        return _path
+
+    @staticmethod
+    def _remove_chunks(path):
+        """
+        Deletes the output chunks kept for a task, if any.
+
+        Parameters:
+        ----------
+        path : str
+            The path of the chunks.
+        """
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _delete_done(self, condition, parameters):
+        """
+        Deletes the rows of finished tasks and the output chunks kept for them, in the current transaction.
+
+        Parameters:
+        ----------
+        condition : str
+            The SQL condition selecting the rows among the finished tasks.
+        parameters : tuple
+            The parameters of the condition.
+        """
+        _where = f"state = 'done' AND ({condition})"
+        for (path,) in self._conn.execute(f'SELECT spool FROM tasks WHERE {_where} AND spool IS NOT NULL',
+                                          parameters).fetchall():
+            self._remove_chunks(path)
+        self._conn.execute(f'DELETE FROM tasks WHERE {_where}', parameters)
+
+    def _compact(self):
+        """
+        Removes the finished tasks whose TTL has passed from the database.
+        """
+        self._compacted = time.monotonic()
+        _ttl = self.task_queue.results.ttl
+        if _ttl is not None and _ttl > 0:
+            self._delete_done('done_time < ?', (time.time() - _ttl,))
@@ -0,0 +1,186 @@
+"""
+Task Notifier Module
+--------------------
+
+This module defines the `TaskNotifier` class, which delivers the state changes of a task queue to the
+subscribers of individual tasks. It is driven by the listener hook of the `TaskQueue`: nothing runs while no
+task changes, however many subscriptions are open.
+
+Besides the states reported by the task queue (queued, running, done, deleted), subscribers of a queued task are
+told when its queue position changes. Positions only move when a task leaves a queue, and recomputing them for
+every such event would cost O(subscriptions) each time, and push as many frames to every subscriber of a
+draining queue. The check is therefore done at most once every `POSITION_INTERVAL` seconds, for all events of
+that interval.
+
+Classes:
+--------
+TaskNotifier
+    A class that routes the state changes of tasks to their subscribers.
+
+Methods:
+--------
+__init__(self, task_queue)
+    Initializes the notifier and registers it as a listener of the task queue.
+
+subscribe(self, task_id, sink)
+    Subscribes a sink to the state changes of a task.
+
+unsubscribe(self, task_id, sink)
+    Removes a subscription.
+"""
+
+import asyncio
+from .task import task_key
+
+
+class TaskNotifier(object):
+    """
+    A class that routes the state changes of tasks to their subscribers.
+
+    A sink is a callable taking (task, state), where state is one of the `TaskQueue` states or `POSITION`. It is
+    called on the event loop thread and must not block, e.g. it puts the event in an `asyncio.Queue`.
+
+    Attributes:
+    ----------
+    task_queue : TaskQueue
+        The task queue whose tasks are watched.
+    _sinks : dict
+        The set of sinks subscribed to each task, indexed by the binary form of its task ID.
+    _positions : dict
+        The last queue position reported for each subscribed queued task, indexed like `_sinks`.
+    _flush : asyncio.Handle or None
+        The pending position check, if any.
+    """
+
+    POSITION = 'position'
+    # The shortest time between two position checks, in seconds.
+    POSITION_INTERVAL = 0.25
+
+    def __init__(self, task_queue):
+        """
+        Initializes the notifier and registers it as a listener of the task queue.
+
+        Parameters:
+        ----------
+        task_queue : TaskQueue
+            The task queue whose tasks are watched.
+        """
+        self.task_queue = task_queue
+        self._sinks = {}
+        self._positions = {}
+        self._flush = None
+        task_queue.add_listener(self._on_change)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the notifier.
+
+        Returns:
+        -------
+        str
+            A string representation of the notifier, including the number of watched tasks.
+        """
+        return f'<TaskNotifier tasks:{len(self._sinks)}>'
+
+    def __len__(self):
+        """
+        Returns the number of tasks with at least one subscriber.
+
+        Returns:
+        -------
+        int
+            The number of watched tasks.
+        """
+        return len(self._sinks)
+
+    def subscribe(self, task_id, sink):
+        """
+        Subscribes a sink to the state changes of a task.
+
+        Parameters:
+        ----------
+        task_id : str or bytes
+            The ID of the task, or its binary form.
+        sink : callable
+            A callable taking (task, state).
+        """
+        task_id = task_key(task_id)
+        self._sinks.setdefault(task_id, set()).add(sink)
+        task = self.task_queue[task_id]
+        if task is not None and not task.is_done and not task.in_progress:
+            self._positions[task_id] = self.task_queue.queue_where(task=task)
+
+    def unsubscribe(self, task_id, sink):
+        """
+        Removes a subscription. Unknown subscriptions are ignored.
+
+        Parameters:
+        ----------
+        task_id : str or bytes
+            The ID of the task, or its binary form.
+        sink : callable
+            The sink given to `subscribe`.
+        """
+        task_id = task_key(task_id)
+        _sinks = self._sinks.get(task_id)
+        if _sinks is None:
+            return
+        _sinks.discard(sink)
+        if len(_sinks) == 0:
+            del self._sinks[task_id]
+            self._positions.pop(task_id, None)
+
+    def _deliver(self, task, state):
+        """
+        Calls the sinks subscribed to a task.
+
+        Parameters:
+        ----------
+        task : Task
+            The task whose state changed.
+        state : str
+            The new state of the task.
+        """
+        for sink in list(self._sinks.get(task.key, ())):
+            try:
+                sink(task, state)
+            except Exception:
+                pass
+
+    def _on_change(self, task, state):
+        """
+        Listener of the task queue: delivers a state change and schedules a position check when a task
+        leaves a queue.
+
+        Parameters:
+        ----------
+        task : Task
+            The task whose state changed.
+        state : str
+            The new state of the task.
+        """
+        if task.key in self._sinks:
+            if state != self.task_queue.QUEUED:
+                self._positions.pop(task.key, None)
+            self._deliver(task, state)
+        if state in (self.task_queue.DONE, self.task_queue.DELETED) and len(self._positions) > 0 \
+                and self._flush is None:
+            try:
+                self._flush = asyncio.get_running_loop().call_later(self.POSITION_INTERVAL, self._flush_positions)
+            except RuntimeError:
+                self._flush_positions()
+
+    def _flush_positions(self):
+        """
+        Reports the queue positions of the subscribed queued tasks that changed since they were last reported.
+        """
+        self._flush = None
+        for task_id, _position in list(self._positions.items()):
+            task = self.task_queue[task_id]
+            if task is None or task.is_done or task.in_progress:
+                self._positions.pop(task_id, None)
+                continue
+            position = self.task_queue.queue_where(task=task)
+            if position != _position:
+                self._positions[task_id] = position
+                self._deliver(task, self.POSITION)
@@ -0,0 +1,254 @@
+"""
+Queue Position Index Module
+---------------------------
+
+This module defines the `PositionIndex` class, which answers "how many tasks are ahead of this one" for a
+first-in-first-out queue in O(log n), even when tasks leave the queue out of order (cancellation, completion).
+Every task entering the queue receives an increasing sequence number. A Fenwick (binary indexed) tree over the
+sequence numbers counts the tasks still in the queue, so the position of a task is a prefix sum. When many
+tasks enter at once (e.g. the queued tasks recovered from the journal), the tree updates can be deferred and the
+tree rebuilt once in linear time.
+
+Classes:
+--------
+PositionIndex
+    A class that tracks the live sequence numbers of a queue and ranks them.
+
+Methods:
+--------
+__init__(self, capacity=1024)
+    Initializes an empty position index.
+
+__len__(self)
+    Returns the number of live entries.
+
+add(self)
+    Adds an entry at the tail and returns its sequence number.
+
+defer(self, count)
+    Defers the tree updates of the entries about to be added, if rebuilding the tree once costs less.
+
+resume(self)
+    Ends the deferral and brings the tree up to date.
+
+remove(self, seq)
+    Removes the entry with the given sequence number.
+
+rank(self, seq)
+    Returns the 1-based position of the entry with the given sequence number.
+"""
+
+from array import array
+
+
+class PositionIndex(object):
+    """
+    A class that tracks the live sequence numbers of a queue and ranks them.
+
+    Sequence numbers are absolute and never reused. Internally they are stored relative to `_base`; when the
+    slots run out, the dead prefix is dropped and the tree is rebuilt, so memory follows the live span of the
+    queue rather than the total number of tasks ever enqueued.
+
+    Attributes:
+    ----------
+    _base : int
+        The sequence number stored in slot 0.
+    _next : int
+        The sequence number given to the next entry.
+    _low : int
+        The lowest slot that may still be live.
+    _count : int
+        The number of live entries.
+    _flags : bytearray
+        One byte per slot, 1 if the slot is live.
+    _tree : array
+        The Fenwick tree over `_flags` (1-based).
+    _deferred : bool
+        Whether the tree updates of the added entries are deferred.
+    _stale : bool
+        Whether the tree misses entries added while deferred.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Initializes an empty position index.
+
+        Parameters:
+        ----------
+        capacity : int, optional
+            The initial number of slots (default is 1024).
+        """
+        self._base = 0
+        self._next = 0
+        self._low = 0
+        self._count = 0
+        self._deferred = False
+        self._build(bytearray(capacity))
+
+    def __len__(self):
+        """
+        Returns the number of live entries.
+
+        Returns:
+        -------
+        int
+            The number of live entries.
+        """
+        return self._count
+
+    def _build(self, flags):
+        """
+        Rebuilds the Fenwick tree from the slot flags in linear time.
+
+        Parameters:
+        ----------
+        flags : bytearray
+            The slot flags to build the tree from.
+        """
+        size = len(flags)
+        tree = array('q', [0])
+        tree.extend(iter(flags))
+        for i in range(1, size + 1):
+            j = i + (i & -i)
+            if j <= size:
+                tree[j] += tree[i]
+        self._flags = flags
+        self._tree = tree
+        self._stale = False
+
+    def _update(self, slot, delta):
+        """
+        Adds `delta` to the given slot of the Fenwick tree.
+
+        Parameters:
+        ----------
+        slot : int
+            The 0-based slot to update.
+        delta : int
+            The value to add.
+        """
+        tree, size = self._tree, len(self._flags)
+        i = slot + 1
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+    def _grow(self, count=1):
+        """
+        Makes room for new entries, dropping the dead prefix and doubling the slots if needed.
+
+        Parameters:
+        ----------
+        count : int, optional
+            The number of entries to make room for (default is 1).
+        """
+        live = self._flags[self._low:self._next - self._base]
+        capacity = len(self._flags)
+        if len(live) * 2 > capacity:
+            capacity *= 2
+        while len(live) + count > capacity:
+            capacity *= 2
+        flags = bytearray(capacity)
+        flags[:len(live)] = live
+        self._base += self._low
+        self._low = 0
+        if self._deferred:
+            self._flags = flags
+            self._stale = True
+        else:
+            self._build(flags)
+
+    def add(self):
+        """
+        Adds an entry at the tail and returns its sequence number.
+
+        Returns:
+        -------
+        int
+            The sequence number of the new entry.
+        """
+        if self._next - self._base >= len(self._flags):
+            self._grow()
+        seq = self._next
+        slot = seq - self._base
+        self._flags[slot] = 1
+        if self._deferred:
+            self._stale = True
+        else:
+            self._update(slot, 1)
+        self._next += 1
+        self._count += 1
+        return seq
+
+    def defer(self, count):
+        """
+        Defers the tree updates of the entries about to be added, if rebuilding the tree once costs less than
+        updating it for each of them, and makes room for them at once. The tree is rebuilt by `resume`, or before
+        it is next read.
+
+        Parameters:
+        ----------
+        count : int
+            The number of entries about to be added.
+        """
+        _size = len(self._flags) + count
+        if count * _size.bit_length() > _size:
+            self._deferred = True
+            if self._next - self._base + count > len(self._flags):
+                self._grow(count)
+
+    def resume(self):
+        """
+        Ends the deferral and brings the tree up to date.
+        """
+        self._deferred = False
+        if self._stale:
+            self._build(self._flags)
+
+    def remove(self, seq):
+        """
+        Removes the entry with the given sequence number. Unknown or removed entries are ignored.
+
+        Parameters:
+        ----------
+        seq : int
+            The sequence number of the entry to remove.
+        """
+        slot = seq - self._base
+        if slot < 0 or slot >= len(self._flags) or not self._flags[slot]:
+            return
+        if self._stale:
+            self._build(self._flags)
+        self._flags[slot] = 0
+        self._update(slot, -1)
+        self._count -= 1
+        # Skip the dead prefix so that it can be dropped on the next growth.
+        end = self._next - self._base
+        while self._low < end and not self._flags[self._low]:
+            self._low += 1
+
+    def rank(self, seq):
+        """
+        Returns the 1-based position of the entry with the given sequence number.
+
+        Parameters:
+        ----------
+        seq : int
+            The sequence number of the entry.
+
+        Returns:
+        -------
+        int
+            The number of live entries with a sequence number lower than or equal to `seq`.
+        """
+        slot = min(seq - self._base, len(self._flags) - 1)
+        if slot < 0:
+            return 0
+        if self._stale:
+            self._build(self._flags)
+        tree, total = self._tree, 0
+        i = slot + 1
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
@@ -0,0 +1,232 @@
+"""
+Progress Reporting Module
+-------------------------
+
+This module defines the callables handed to the entries as `resources['progress']`, through which a running entry
+reports how far it is, e.g. `resources['progress'](0.4, 'aligning')`. An entry may report as often as it likes:
+the reports are rate-limited before they reach the event loop, so a chatty entry cannot flood it.
+
+`ProgressReporter` is created by the task queue for every execution. It may be called from any thread; it keeps
+the latest report and hands it to the event loop at most once per `interval` seconds, so the last report before
+a quiet period is never lost. In a worker process, the entry is given a `ProgressThrottle` instead, which sends
+the reports through the pipe at most once per `interval` seconds: a report made too early is held, replaced by
+any later one, and sent when the interval expires or when the throttle is flushed at the end of the execution.
+
+Classes:
+--------
+ProgressReporter
+    A thread-safe callable that hands the latest progress report to the event loop at a bounded rate.
+
+ProgressThrottle
+    A callable that forwards progress reports at a bounded rate, holding the latest one in between.
+
+Functions:
+----------
+clip_progress(fraction, message)
+    Normalizes a progress report.
+"""
+
+import threading
+import time
+
+
+def clip_progress(fraction, message=None):
+    """
+    Normalizes a progress report.
+
+    Parameters:
+    ----------
+    fraction : float
+        The completed fraction of the work.
+    message : str, optional
+        A short description of the current step (default is None).
+
+    Returns:
+    -------
+    tuple
+        A tuple (fraction, message), with the fraction clipped to [0, 1] and the message a string or None.
+    """
+    fraction = min(max(float(fraction), 0.0), 1.0)
+    return fraction, (str(message) if message is not None else None)
+
+
+class ProgressReporter(object):
+    """
+    A thread-safe callable that hands the latest progress report to the event loop at a bounded rate.
+
+    Attributes:
+    ----------
+    loop : asyncio.AbstractEventLoop or None
+        The event loop `flush` runs on, or None to call it directly.
+    flush : callable
+        Called on the event loop with (fraction, message) for the reports that get through.
+    interval : float
+        The shortest time between two calls of `flush`, in seconds.
+    _latest : tuple or None
+        The latest report not yet flushed.
+    _scheduled : bool
+        Whether a flush is scheduled on the event loop.
+    _last : float
+        The monotonic time of the last flush.
+    _lock : threading.Lock
+        Guards the latest report and the scheduling flag.
+    """
+
+    def __init__(self, loop, flush, interval=0.25):
+        """
+        Initializes the reporter.
+
+        Parameters:
+        ----------
+        loop : asyncio.AbstractEventLoop or None
+            The event loop `flush` runs on, or None to call it directly.
+        flush : callable
+            Called on the event loop with (fraction, message) for the reports that get through.
+        interval : float, optional
+            The shortest time between two calls of `flush`, in seconds (default is 0.25).
+        """
+        self.loop = loop
+        self.flush = flush
+        self.interval = interval
+        self._latest = None
+        self._scheduled = False
+        self._last = float('-inf')
+        self._lock = threading.Lock()
+
+    def __call__(self, fraction, message=None):
+        """
+        Reports the progress of the running entry.
+
+        Parameters:
+        ----------
+        fraction : float
+            The completed fraction of the work, between 0 and 1.
+        message : str, optional
+            A short description of the current step (default is None).
+        """
+        _report = clip_progress(fraction, message)
+        with self._lock:
+            self._latest = _report
+            if self._scheduled:
+                return
+            self._scheduled = True
+        if self.loop is None:
+            self._flush()
+        else:
+            self.loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        """
+        Schedules the flush of the latest report on the event loop, once the interval since the last flush
+        has passed.
+        """
+        _delay = self._last + self.interval - time.monotonic()
+        if _delay > 0:
+            self.loop.call_later(_delay, self._flush)
+        else:
+            self._flush()
+
+    def _flush(self):
+        """
+        Hands the latest report to `flush`.
+        """
+        with self._lock:
+            _report, self._latest = self._latest, None
+            self._scheduled = False
+        self._last = time.monotonic()
+        if _report is not None:
+            self.flush(*_report)
+
+
+class ProgressThrottle(object):
+    """
+    A callable that forwards progress reports at a bounded rate, holding the latest one in between. A report of
+    a complete fraction is always forwarded at once.
+
+    The held report is sent by a timer thread when the interval expires, so `send` must be safe to call from
+    another thread than the entry's. `flush` sends it at once and must be called before the end of the
+    execution is reported, so that no report of an execution follows its end.
+
+    Attributes:
+    ----------
+    send : callable
+        Called with (fraction, message) for the reports that get through.
+    interval : float
+        The shortest time between two forwarded reports, in seconds.
+    _last : float
+        The monotonic time of the last forwarded report.
+    _pending : tuple or None
+        The latest report not forwarded yet.
+    _timer : threading.Timer or None
+        The timer forwarding the pending report, if any.
+    _lock : threading.Lock
+        Guards the pending report and keeps the reports in order.
+    """
+
+    def __init__(self, send, interval=0.25):
+        """
+        Initializes the throttle.
+
+        Parameters:
+        ----------
+        send : callable
+            Called with (fraction, message) for the reports that get through.
+        interval : float, optional
+            The shortest time between two forwarded reports, in seconds (default is 0.25).
+        """
+        self.send = send
+        self.interval = interval
+        self._last = float('-inf')
+        self._pending = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __call__(self, fraction, message=None):
+        """
+        Reports the progress of the running entry.
+
+        Parameters:
+        ----------
+        fraction : float
+            The completed fraction of the work, between 0 and 1.
+        message : str, optional
+            A short description of the current step (default is None).
+        """
+        _report = clip_progress(fraction, message)
+        with self._lock:
+            _now = time.monotonic()
+            if _now - self._last < self.interval and _report[0] < 1.0:
+                self._pending = _report
+                if self._timer is None:
+                    self._timer = threading.Timer(self._last + self.interval - _now, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            self._forward(_report)
+
+    def _forward(self, report):
+        """
+        Sends a report and drops the pending one, which it supersedes. Called with the lock held.
+
+        Parameters:
+        ----------
+        report : tuple
+            The report (fraction, message).
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = None
+        self._last = time.monotonic()
+        self.send(*report)
+
+    def flush(self):
+        """
+        Sends the pending report at once, if any. Called by the timer when the interval expires.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._forward(self._pending)
+            elif self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
@@ -0,0 +1,504 @@
+"""
+Remote Worker Module
+--------------------
+
+This module defines the server side of the remote workers, which run entries on other hosts for the task queue.
+A worker started with `easyapi worker --connect HOST:PORT --layout cpu=32` connects to the `WorkerHub` of the
+server over TCP (or a Unix socket), proves it knows the shared key, and registers its resources and the entries
+it serves. The hub adds a layout with these resources to the task queue, served by a `RemoteExecutor`: the
+dispatcher of the layout pulls the queued tasks the local layouts cannot start now and leases them to the
+worker, which sends back their progress, output chunks and results.
+
+The worker sends a heartbeat every `heartbeat` seconds. A worker that is silent for `lease_timeout` seconds, or
+whose connection breaks, is lost: its layout is retired and the tasks it held are queued again on the other
+layouts, so they are run by another worker or locally.
+
+The messages are tuples pickled by `multiprocessing.connection`, which also authenticates both ends with the
+shared key before any message is read. Only give the key to trusted hosts.
+
+Messages from the worker:
+- ('register', name, layout, entries): The first message, with the resources and the entry IDs of the worker.
+- ('heartbeat',): Sent every `heartbeat` seconds.
+- ('progress', lease_id, fraction, message): A progress report of a leased execution.
+- ('chunk', lease_id, chunk): An output chunk of a leased streaming execution.
+- ('done', lease_id, results): The results of a leased execution, packed by `executor.pack_results`.
+
+Messages to the worker:
+- ('registered', layout_id, heartbeat): The reply to the registration.
+- ('lease', lease_id, algorithm_id, inputs, resources, streaming): An execution to run.
+- ('kill', lease_id): Stops a leased execution.
+- None: The server is shutting down.
+
+Classes:
+--------
+RemoteExecutor
+    An executor leasing the executions of a layout to a remote worker.
+
+WorkerHub
+    A server accepting remote workers and adding their resources to the task queue as layouts.
+
+Functions:
+----------
+parse_address(address)
+    Parses the address of a hub, 'HOST:PORT' for TCP or a path for a Unix socket.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+from multiprocessing.connection import Listener, AuthenticationError
+from .taskholder import get_dispatchers
+from .executor import unpack_results
+
+
+def parse_address(address):
+    """
+    Parses the address of a hub, 'HOST:PORT' for TCP or a path for a Unix socket.
+
+    Parameters:
+    ----------
+    address : str
+        The address.
+
+    Returns:
+    -------
+    tuple or str
+        A tuple (host, port) for TCP, or the path of the Unix socket.
+    """
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+class RemoteExecutor(object):
+    """
+    An executor leasing the executions of a layout to a remote worker.
+
+    Each submitted execution is sent to the worker as a lease. A serving thread receives the messages of the
+    worker and resolves the futures of the leases; when the worker is lost, the leases still open are handed to
+    `on_lost` and resolved as failed once their tasks were queued again.
+
+    Attributes:
+    ----------
+    name : str
+        The name the worker registered with.
+    layout : dict
+        The resources of the worker.
+    entries : set
+        The IDs of the entries the worker serves.
+    address : str
+        The address of the worker.
+    layout_id : int or None
+        The ID (index) of the layout of the worker in the task queue.
+    alive : bool
+        Whether the connection to the worker is open.
+    _conn : multiprocessing.connection.Connection
+        The connection to the worker.
+    _leases : dict
+        The tuple (future, progress, stream, count) of each open lease, indexed by lease ID.
+    _lease_ids : itertools.count
+        The source of the lease IDs.
+    _lock : threading.Lock
+        Guards the sends on the connection and `_leases`.
+    """
+
+    def __init__(self, conn, name, layout, entries, address=''):
+        """
+        Initializes the executor of a registered worker.
+
+        Parameters:
+        ----------
+        conn : multiprocessing.connection.Connection
+            The connection to the worker.
+        name : str
+            The name the worker registered with.
+        layout : dict
+            The resources of the worker.
+        entries : list of str
+            The IDs of the entries the worker serves.
+        address : str, optional
+            The address of the worker (default is '').
+        """
+        self.name = name
+        self.layout = layout
+        self.entries = set(entries)
+        self.address = address
+        self.layout_id = None
+        self.alive = True
+        self._conn = conn
+        self._leases = {}
+        self._lease_ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """
+        Returns a string representation of the executor.
+
+        Returns:
+        -------
+        str
+            A string representation of the executor, including the worker name and its open leases.
+        """
+        return f'<RemoteExecutor worker:{self.name} leases:{len(self._leases)}>'
+
+    def __len__(self):
+        """
+        Returns the number of open leases.
+
+        Returns:
+        -------
+        int
+            The number of executions leased to the worker and not finished yet.
+        """
+        return len(self._leases)
+
+    def send(self, message):
+        """
+        Sends a message to the worker, ignoring a broken connection, which the serving thread notices.
+
+        Parameters:
+        ----------
+        message : object
+            The message.
+        """
+        with self._lock:
+            self._send(message)
+
+    def _send(self, message):
+        """
+        Sends a message to the worker while holding the lock.
+
+        Parameters:
+        ----------
+        message : object
+            The message.
+        """
+        try:
+            self._conn.send(message)
+        except (OSError, ValueError):
+            pass
+
+    def submit(self, algorithm_id, inputs, resources):
+        """
+        Leases an execution to the worker.
+
+        Parameters:
+        ----------
+        algorithm_id : str
+            The ID of the entry to run.
+        inputs : list of dicts
+            The input parameters of each task.
+        resources : dict
+            The resources allocated to the execution, the progress callback of the tasks and the chunk sink
+            of a streaming task.
+
+        Returns:
+        -------
+        concurrent.futures.Future
+            A future resolving to the list of tuples (success, output, data) of the tasks, see
+            `executor.pickle_results`.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        _progress = resources.get('progress')
+        _stream = resources.get('stream')
+        with self._lock:
+            if not self.alive:
+                future.set_result([(False, 'Worker lost')] * len(inputs))
+                return future
+            lease_id = next(self._lease_ids)
+            self._leases[lease_id] = (future, _progress, _stream, len(inputs))
+            self._send(('lease', lease_id, algorithm_id, inputs,
+                        {name: value for name, value in resources.items() if name not in ('progress', 'stream')},
+                        _stream is not None))
+        return future
+
+    def kill(self, future):
+        """
+        Asks the worker to stop a leased execution. Whether it can depends on the executor of the worker.
+
+        Parameters:
+        ----------
+        future : concurrent.futures.Future
+            The future returned by `submit`.
+
+        Returns:
+        -------
+        bool
+            Whether the execution was leased and still open.
+        """
+        with self._lock:
+            for lease_id, (_future, _, _, _) in self._leases.items():
+                if _future is future:
+                    self._send(('kill', lease_id))
+                    return True
+        return False
+
+    def serve(self, lease_timeout, on_lost):
+        """
+        Receives the messages of the worker until it is lost. Runs on the serving thread of the worker.
+
+        Parameters:
+        ----------
+        lease_timeout : float
+            How many seconds the worker may stay silent before it is lost.
+        on_lost : callable
+            Called with the executor once the worker is lost.
+        """
+        try:
+            while self._conn.poll(lease_timeout):
+                message = self._conn.recv()
+                if message[0] == 'heartbeat':
+                    continue
+                if message[0] == 'done':
+                    with self._lock:
+                        _lease = self._leases.pop(message[1], None)
+                    if _lease is not None:
+                        _lease[0].set_result(unpack_results(message[2]))
+                    continue
+                _lease = self._leases.get(message[1])
+                if _lease is None:
+                    continue
+                if message[0] == 'chunk' and _lease[2] is not None:
+                    _lease[2](message[2])
+                elif message[0] == 'progress' and _lease[1] is not None:
+                    _lease[1](*message[2:])
+            logging.getLogger('uvicorn.warning').warning(f'Worker {self.name} silent for {lease_timeout} seconds.')
+        except (EOFError, OSError):
+            pass
+        with self._lock:
+            self.alive = False
+            self._conn.close()
+        on_lost(self)
+
+    def abandon(self):
+        """
+        Resolves the futures of the leases still open when the worker was lost as failed.
+        """
+        with self._lock:
+            _leases, self._leases = self._leases, {}
+        for future, _, _, count in _leases.values():
+            future.set_result([(False, 'Worker lost')] * count)
+
+    def close(self):
+        """
+        Tells the worker the server is shutting down.
+        """
+        self.send(None)
+
+
+class WorkerHub(object):
+    """
+    A server accepting remote workers and adding their resources to the task queue as layouts.
+
+    Attributes:
+    ----------
+    task_queue : TaskQueue
+        The task queue the workers run tasks for.
+    address : tuple or str
+        The address the hub listens on, (host, port) for TCP or the path of a Unix socket.
+    heartbeat : float
+        How often the workers send a heartbeat, in seconds.
+    lease_timeout : float
+        How many seconds a worker may stay silent before it is lost and its tasks are queued again.
+    policy : str
+        The policy of the layouts of the workers.
+    workers : dict
+        The executors of the connected workers, indexed by their layout IDs.
+    lost : int
+        The number of workers lost.
+    requeued : int
+        The number of leases whose tasks were queued again after their worker was lost.
+    _key : bytes
+        The shared key authenticating the workers.
+    _listener : multiprocessing.connection.Listener or None
+        The listening socket, None until started.
+    _loop : asyncio.AbstractEventLoop or None
+        The event loop of the task queue.
+    """
+
+    def __init__(self, task_queue, address, key, heartbeat=2.0, lease_timeout=10.0, policy='fifo'):
+        """
+        Initializes the hub. It listens once started.
+
+        Parameters:
+        ----------
+        task_queue : TaskQueue
+            The task queue the workers run tasks for.
+        address : tuple or str
+            The address to listen on, (host, port) for TCP or the path of a Unix socket.
+        key : str or bytes
+            The shared key authenticating the workers.
+        heartbeat : float, optional
+            How often the workers send a heartbeat, in seconds (default is 2).
+        lease_timeout : float, optional
+            How many seconds a worker may stay silent before it is lost (default is 10).
+        policy : str, optional
+            The policy of the layouts of the workers (default is 'fifo').
+        """
+        self.task_queue = task_queue
+        self.address = address
+        self.heartbeat = heartbeat
+        self.lease_timeout = lease_timeout
+        self.policy = policy
+        self.workers = {}
+        self.lost = 0
+        self.requeued = 0
+        self._key = key.encode() if isinstance(key, str) else key
+        self._listener = None
+        self._loop = None
+
+    def __repr__(self):
+        """
+        Returns a string representation of the hub.
+
+        Returns:
+        -------
+        str
+            A string representation of the hub, including its address and number of workers.
+        """
+        return f'<WorkerHub address:{self.address} workers:{len(self.workers)}>'
+
+    def __len__(self):
+        """
+        Returns the number of connected workers.
+
+        Returns:
+        -------
+        int
+            The number of connected workers.
+        """
+        return len(self.workers)
+
+    def start(self):
+        """
+        Starts listening for workers. Must be called on the event loop of the task queue.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._listener = Listener(self.address, authkey=self._key)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        """
+        Stops listening and tells the connected workers the server is shutting down.
+        """
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        for executor in list(self.workers.values()):
+            executor.close()
+
+    def _accept(self):
+        """
+        Accepts the connections of the workers, each served by a thread of its own.
+        """
+        _listener = self._listener
+        while True:
+            try:
+                conn = _listener.accept()
+            except AuthenticationError:
+                logging.getLogger('uvicorn.warning').warning('Worker refused: authentication failed.')
+                continue
+            except (OSError, EOFError):
+                return
+            threading.Thread(target=self._serve, args=(conn, _listener.last_accepted), daemon=True).start()
+
+    def _serve(self, conn, address):
+        """
+        Registers a worker and serves it until it is lost.
+
+        Parameters:
+        ----------
+        conn : multiprocessing.connection.Connection
+            The connection to the worker.
+        address : object
+            The address of the worker.
+        """
+        try:
+            if not conn.poll(self.lease_timeout):
+                raise EOFError
+            _, name, layout, entries = conn.recv()
+        except (EOFError, OSError, ValueError, TypeError):
+            conn.close()
+            return
+        executor = RemoteExecutor(conn, name, layout, entries, address=str(address or ''))
+        try:
+            asyncio.run_coroutine_threadsafe(self._attach(executor), self._loop).result()
+        except Exception as e:
+            logging.getLogger('uvicorn.warning').warning(f'Worker {name} refused: {e}')
+            conn.close()
+            return
+        executor.serve(self.lease_timeout, self._on_lost)
+
+    async def _attach(self, executor):
+        """
+        Adds the layout of a worker to the task queue and wakes its dispatcher.
+
+        Parameters:
+        ----------
+        executor : RemoteExecutor
+            The executor of the worker.
+        """
+        executor.layout_id = self.task_queue.add_layout(executor.layout, executor, policy=self.policy)
+        self.workers[executor.layout_id] = executor
+        # Sent before the dispatcher of the layout may lease anything.
+        executor.send(('registered', executor.layout_id, self.heartbeat))
+        get_dispatchers(self.task_queue)[executor.layout_id].notify()
+        logging.getLogger('uvicorn.info').info(
+            f'Worker {executor.name} joined as layout {executor.layout_id} with {executor.layout}.')
+
+    def _on_lost(self, executor):
+        """
+        Called by the serving thread of a lost worker: retires its layout on the event loop.
+
+        Parameters:
+        ----------
+        executor : RemoteExecutor
+            The executor of the worker.
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._retire, executor)
+        except RuntimeError:
+            # The event loop is closed.
+            pass
+
+    def _retire(self, executor):
+        """
+        Queues the tasks of a lost worker again on the other layouts and wakes their dispatchers.
+
+        Parameters:
+        ----------
+        executor : RemoteExecutor
+            The executor of the worker.
+        """
+        self.workers.pop(executor.layout_id, None)
+        _leased = len(executor)
+        _queue_ids = self.task_queue.retire_layout(executor.layout_id)
+        # The tasks are queued again, so the failed results of their leases are ignored.
+        executor.abandon()
+        self.lost += 1
+        self.requeued += _leased
+        logging.getLogger('uvicorn.warning').warning(
+            f'Worker {executor.name} lost, {_leased} leases queued again.')
+        _dispatchers = get_dispatchers(self.task_queue)
+        for queue_id in _queue_ids:
+            _dispatchers[queue_id].notify()
+
+    def stats(self):
+        """
+        Returns the state of the hub and of each connected worker.
+
+        Returns:
+        -------
+        dict
+            A dictionary containing the numbers of workers lost and of leases queued again, and for each worker
+            its name, address, layout ID, resources, free resources and open leases.
+        """
+        return {'lost': self.lost, 'requeued': self.requeued,
+                'workers': [{'name': executor.name, 'address': executor.address, 'layout_id': layout_id,
+                             'layout': executor.layout, 'free': self.task_queue.free_resources[layout_id],
+                             'leases': len(executor)}
+                            for layout_id, executor in self.workers.items()]}
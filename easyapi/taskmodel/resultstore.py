@@ -0,0 +1,462 @@
+"""
+Result Store Module
+-------------------
+
+This module defines the `ResultStore` class, which holds the finished tasks of a task queue until their results
+are read. A finished task is kept for `ttl` seconds after it finished, and reading it does not remove it, so a
+client that lost a response can read it again. The store is bounded: the outputs kept in memory may not exceed
+`max_memory` bytes, and when they do, the least recently read tasks holding an output in memory are evicted.
+Outputs larger than `spill_size` bytes are written to a file under `spill_dir` and only read back when
+requested. The output of a streaming task is already on disk, in the `ChunkSpool` created by `spool` while the
+task ran. The tasks whose output is on disk free no memory when evicted, so they are only removed when their
+TTL passes or they are deleted.
+
+The finished tasks recovered from the journal after a restart are registered with `restore` but not loaded:
+each is read back from the journal the first time it is requested, so recovery does not depend on how many
+results the journal holds.
+
+The size of an output is the length of its pickled form, which is also what is written to disk when it spills.
+The output is pickled by the executor that ran the task, off the event loop, and handed to `put` with the task;
+the store only pickles the outputs it is given without their pickled form. The pickled output of the task last
+put stays readable with `pickled` while the listeners of its completion run, so the journal writes it as is.
+The input data of a task is released when it is put in the store, as the task has run.
+
+The tasks are indexed by the binary form of their task ID (`Task.key`).
+
+Classes:
+--------
+ResultStore
+    A class that keeps finished tasks with a TTL, a memory budget and LRU eviction.
+
+Methods:
+--------
+__init__(self, ttl=3600, max_memory=268435456, spill_size=1048576, spill_dir=None)
+    Initializes an empty result store.
+
+__len__(self)
+    Returns the number of finished tasks held by the store.
+
+__contains__(self, task_id)
+    Checks if a finished task is held by the store.
+
+__delitem__(self, task_id)
+    Removes a finished task from the store, deleting its spilled output.
+
+put(self, task, data=None)
+    Adds a finished task to the store.
+
+pickled(self, task)
+    Returns the pickled output of the task last put in the store.
+
+release(self)
+    Drops the pickled output of the task last put in the store.
+
+get(self, task_id)
+    Returns a finished task and marks it as recently read.
+
+output(self, task)
+    Returns the output data of a finished task, reading it back from disk if it was spilled.
+
+spool(self, task_id, notify=None)
+    Creates the chunk spool of a streaming task in the spill directory.
+
+restore(self, finished, loader)
+    Registers finished tasks kept on disk by the journal, to be loaded when they are first requested.
+"""
+
+from collections import OrderedDict, deque
+from .stream import ChunkSpool
+from .task import task_key
+import tempfile
+import pickle
+import time
+import sys
+import os
+
+
+class ResultStore(object):
+    """
+    A class that keeps finished tasks with a TTL, a memory budget and LRU eviction.
+
+    Attributes:
+    ----------
+    ttl : float
+        How many seconds a finished task is kept, 0 or less to keep it until it is evicted or deleted.
+    max_memory : int
+        The maximum total size in bytes of the outputs kept in memory.
+    spill_size : int
+        The size in bytes above which an output is written to disk.
+    spill_dir : str or None
+        The directory of the spilled outputs, a temporary directory created on the first spill if None.
+    memory : int
+        The total size in bytes of the outputs kept in memory.
+    evicted : int
+        The number of tasks evicted to stay within the memory budget.
+    expired : int
+        The number of tasks removed because their TTL passed.
+    _tasks : collections.OrderedDict
+        The finished tasks indexed by the binary form of their task ID, from the least to the most recently read.
+    _resident : collections.OrderedDict
+        The binary IDs of the tasks holding an output or error in memory, in the order of `_tasks`: the
+        candidates for eviction.
+    _sizes : dict
+        The in-memory size of the output of each task, 0 for spilled outputs.
+    _spilled : dict
+        The path of the spilled output of each task.
+    _expiry : collections.deque
+        Tuples (expire_time, binary task ID) in the order the tasks finished.
+    _cold : dict
+        The key of each restored task not loaded yet, indexed by the binary form of its task ID.
+    _loader : callable or None
+        Loads a restored task and its pickled output from its key, returning None if it is gone.
+    _pickled : tuple or None
+        The binary task ID and the pickled output of the task last put, until `release`.
+    """
+
+    def __init__(self, ttl=3600, max_memory=268435456, spill_size=1048576, spill_dir=None):
+        """
+        Initializes an empty result store.
+
+        Parameters:
+        ----------
+        ttl : float, optional
+            How many seconds a finished task is kept (default is 3600).
+        max_memory : int, optional
+            The maximum total size in bytes of the outputs kept in memory (default is 256 MiB).
+        spill_size : int, optional
+            The size in bytes above which an output is written to disk (default is 1 MiB).
+        spill_dir : str, optional
+            The directory of the spilled outputs (default is None, a temporary directory).
+        """
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.spill_size = spill_size
+        self.spill_dir = spill_dir
+        self.memory = 0
+        self.evicted = 0
+        self.expired = 0
+        self._tasks = OrderedDict()
+        self._resident = OrderedDict()
+        self._sizes = {}
+        self._spilled = {}
+        self._expiry = deque()
+        self._cold = {}
+        self._loader = None
+        self._pickled = None
+
+    def __repr__(self):
+        """
+        Returns a string representation of the store.
+
+        Returns:
+        -------
+        str
+            A string representation of the store, including the number of tasks and the memory used.
+        """
+        return (f'<ResultStore tasks:{len(self._tasks)} memory:{self.memory} spilled:{len(self._spilled)} '
+                f'cold:{len(self._cold)}>')
+
+    def __len__(self):
+        """
+        Returns the number of finished tasks held by the store.
+
+        Returns:
+        -------
+        int
+            The number of finished tasks.
+        """
+        self._expire()
+        return len(self._tasks) + len(self._cold)
+
+    def __contains__(self, task_id):
+        """
+        Checks if a finished task is held by the store.
+
+        Parameters:
+        ----------
+        task_id : bytes
+            The binary ID of the task.
+
+        Returns:
+        -------
+        bool
+            True if the task is held by the store, False otherwise.
+        """
+        self._expire()
+        return task_id in self._tasks or task_id in self._cold
+
+    def __delitem__(self, task_id):
+        """
+        Removes a finished task from the store, deleting its spilled output.
+
+        Parameters:
+        ----------
+        task_id : bytes
+            The binary ID of the task.
+
+        Raises:
+        ------
+        KeyError
+            If the task is not held by the store.
+        """
+        if self._cold.pop(task_id, None) is not None:
+            return
+        if task_id not in self._tasks:
+            raise KeyError(task_id)
+        self._discard(task_id)
+
+    def _discard(self, task_id):
+        """
+        Removes a task from the store and deletes its spilled output.
+
+        Parameters:
+        ----------
+        task_id : bytes
+            The binary ID of the task.
+        """
+        task = self._tasks.pop(task_id)
+        self._resident.pop(task_id, None)
+        self.memory -= self._sizes.pop(task_id)
+        if task.stream is not None:
+            task.stream.discard()
+        _path = self._spilled.pop(task_id, None)
+        if _path is not None:
+            try:
+                os.remove(_path)
+            except OSError:
+                pass
+
+    def _expire(self):
+        """
+        Removes the tasks whose TTL has passed.
+        """
+        _now = time.monotonic()
+        while len(self._expiry) > 0 and self._expiry[0][0] <= _now:
+            _, task_id = self._expiry.popleft()
+            if task_id in self._tasks:
+                self._discard(task_id)
+                self.expired += 1
+            elif self._cold.pop(task_id, None) is not None:
+                self.expired += 1
+
+    def _spill_dir(self):
+        """
+        Returns the directory of the spilled outputs, creating it if needed.
+
+        Returns:
+        -------
+        str
+            The directory of the spilled outputs.
+        """
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='easyapi-results-')
+        os.makedirs(self.spill_dir, exist_ok=True)
+        return self.spill_dir
+
+    def spool(self, task_id, notify=None):
+        """
+        Creates the chunk spool of a streaming task in the spill directory.
+
+        Parameters:
+        ----------
+        task_id : str
+            The ID of the task.
+        notify : callable, optional
+            Called without arguments after every appended chunk (default is None).
+
+        Returns:
+        -------
+        ChunkSpool
+            The empty chunk spool.
+        """
+        return ChunkSpool(os.path.join(self._spill_dir(), f'{task_id}.chunks'), notify=notify)
+
+    def _spill(self, task_id, data):
+        """
+        Writes a pickled output to disk.
+
+        Parameters:
+        ----------
+        task_id : str
+            The ID of the task.
+        data : bytes
+            The pickled output.
+
+        Returns:
+        -------
+        str
+            The path of the spilled output.
+        """
+        _path = os.path.join(self._spill_dir(), f'{task_id}.pkl')
+        with open(_path, 'wb') as f_:
+            f_.write(data)
+        return _path
+
+    def put(self, task, data=None):
+        """
+        Adds a finished task to the store.
+
+        A successful output larger than `spill_size` is moved to disk, and the chunk spool of a streaming task
+        is closed and kept on disk. If the outputs in memory then exceed `max_memory`, the least recently read
+        tasks holding an output in memory are evicted. The input data of the task is released.
+
+        Parameters:
+        ----------
+        task : Task
+            The finished task.
+        data : bytes, optional
+            The pickled output of the task (default is None, pickled here).
+        """
+        self._expire()
+        task.input_data = None
+        self._pickled = (task.key, self._keep(task, data))
+        if self.ttl is not None and self.ttl > 0:
+            self._expiry.append((time.monotonic() + self.ttl, task.key))
+
+    def _keep(self, task, data=None):
+        """
+        Holds a finished task, spilling its output if it is large and evicting the least recently read tasks
+        holding an output in memory if the memory budget is exceeded.
+
+        Parameters:
+        ----------
+        task : Task
+            The finished task.
+        data : bytes, optional
+            The pickled output of the task (default is None, pickled here).
+
+        Returns:
+        -------
+        bytes or None
+            The pickled output of a successful task, or None if the task failed, streamed its output or its
+            output cannot be pickled.
+        """
+        _size = 0
+        _data = None
+        if task.stream is not None:
+            # The chunks of a streaming task are already on disk.
+            task.stream.close()
+            if task.error is not None:
+                _size = sys.getsizeof(task.error)
+        elif task.error is None:
+            try:
+                _data = data if data is not None else pickle.dumps(task.output_data, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                # The output cannot be pickled, so it cannot spill either.
+                _data, _size = None, sys.getsizeof(task.output_data)
+            if _data is not None and len(_data) > self.spill_size:
+                self._spilled[task.key] = self._spill(task.task_id, _data)
+                task.output_data = None
+            elif _data is not None:
+                _size = len(_data)
+        else:
+            _size = sys.getsizeof(task.error)
+        self._tasks[task.key] = task
+        self._sizes[task.key] = _size
+        if _size > 0:
+            self._resident[task.key] = None
+        self.memory += _size
+        # Evicting a task whose output is on disk would free no memory.
+        while self.memory > self.max_memory and len(self._resident) > 1:
+            self._discard(next(iter(self._resident)))
+            self.evicted += 1
+        return _data
+
+    def pickled(self, task):
+        """
+        Returns the pickled output of the task last put in the store, as it was sized. It is kept until
+        `release`, which the task queue calls once the listeners of the completion have run.
+
+        Parameters:
+        ----------
+        task : Task
+            The finished task.
+
+        Returns:
+        -------
+        bytes or None
+            The pickled output, or None if the task was not the last put, failed, streamed its output or its
+            output cannot be pickled.
+        """
+        if self._pickled is None or self._pickled[0] != task.key:
+            return None
+        return self._pickled[1]
+
+    def release(self):
+        """
+        Drops the pickled output of the task last put in the store.
+        """
+        self._pickled = None
+
+    def get(self, task_id):
+        """
+        Returns a finished task and marks it as recently read.
+
+        Parameters:
+        ----------
+        task_id : bytes
+            The binary ID of the task.
+
+        Returns:
+        -------
+        Task or None
+            The finished task, or None if it is not held by the store.
+        """
+        self._expire()
+        task = self._tasks.get(task_id)
+        if task is not None:
+            self._tasks.move_to_end(task_id)
+            if task_id in self._resident:
+                self._resident.move_to_end(task_id)
+        elif task_id in self._cold:
+            _loaded = self._loader(self._cold.pop(task_id))
+            if _loaded is not None:
+                # Its expiry was scheduled by `restore`.
+                task = _loaded[0]
+                self._keep(task, _loaded[1])
+        return task
+
+    def restore(self, finished, loader):
+        """
+        Registers finished tasks kept on disk by the journal, to be loaded when they are first requested. Must
+        be called before any task is put in the store.
+
+        Parameters:
+        ----------
+        finished : iterable of tuples
+            Tuples (task_id, key, age) in the order the tasks finished, where key is passed to `loader` and age
+            is how many seconds ago the task finished.
+        loader : callable
+            Takes the key of a task and returns a tuple (task, pickled output or None), or None if it is gone.
+        """
+        self._loader = loader
+        _now = time.monotonic()
+        _ttl = self.ttl if self.ttl is not None and self.ttl > 0 else None
+        for task_id, key, age in finished:
+            task_id = task_key(task_id)
+            self._cold[task_id] = key
+            if _ttl is not None:
+                self._expiry.append((_now + _ttl - age, task_id))
+
+    def output(self, task):
+        """
+        Returns the output data of a finished task, reading it back from disk if it was spilled. The chunks of
+        a streaming task are merged into its complete output.
+
+        Parameters:
+        ----------
+        task : Task
+            The finished task.
+
+        Returns:
+        -------
+        object
+            The output data of the task.
+        """
+        if task.stream is not None:
+            return task.stream.collect()
+        _path = self._spilled.get(task.key)
+        if _path is None:
+            return task.output_data
+        with open(_path, 'rb') as f_:
+            return pickle.load(f_)
@@ -0,0 +1,276 @@
+"""
+Runtime Model Module
+--------------------
+
+This module defines the `RuntimeModel` class, which learns how long the tasks of each entry run. Every successful
+task that finishes adds its execution time (`done_clock - start_clock`) to the statistics of its entry: an
+exponentially weighted moving average (EWMA), which follows changes of the workload quickly, and the percentiles
+of the last `window` executions, which show how much it varies.
+
+With `by_size`, the statistics are also kept for the input size of the tasks, rounded to a power of two, so an
+entry whose runtime grows with its input is predicted from the tasks of similar size. The size of an input is the
+total length of its strings, lists and dictionaries, any other value counting as 1.
+
+The task queue uses the model to predict the runtime of each queued task, which orders the queues of the layouts
+using the shortest-expected-job-first policy and gives the estimated start and finish times of the queued tasks.
+
+Classes:
+--------
+RuntimeModel
+    A class that learns the execution time of the tasks of each entry.
+
+Functions:
+----------
+input_size(input_data)
+    Returns the size of the input of a task.
+"""
+
+# The fewest executions of an input size bucket before it is used for predictions.
+MIN_SAMPLES = 3
+
+
+def input_size(input_data):
+    """
+    Returns the size of the input of a task.
+
+    Parameters:
+    ----------
+    input_data : dict
+        The input parameters of the task.
+
+    Returns:
+    -------
+    int
+        The total length of the strings, bytes, lists and dictionaries of the input, any other value counting as 1.
+    """
+    size = 0
+    for value in input_data.values():
+        size += len(value) if isinstance(value, (str, bytes, list, tuple, dict)) else 1
+    return size
+
+
+class _RuntimeStats(object):
+    """
+    The execution times of one entry, or of one input size bucket of an entry.
+
+    Attributes:
+    ----------
+    count : int
+        The number of executions observed.
+    ewma : float or None
+        The exponentially weighted moving average of the execution times, in seconds.
+    samples : list of float
+        The last execution times, used as a ring buffer.
+    _sorted : list of float or None
+        The sorted samples, cached until the next execution.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.ewma = None
+        self.samples = []
+        self._sorted = None
+
+    def add(self, seconds, alpha, window):
+        """
+        Adds an execution time.
+
+        Parameters:
+        ----------
+        seconds : float
+            The execution time, in seconds.
+        alpha : float
+            The weight of the new execution time in the average.
+        window : int
+            The number of execution times kept for the percentiles.
+        """
+        self.ewma = seconds if self.ewma is None else self.ewma + alpha * (seconds - self.ewma)
+        if len(self.samples) < window:
+            self.samples.append(seconds)
+        else:
+            self.samples[self.count % window] = seconds
+        self.count += 1
+        self._sorted = None
+
+    def percentile(self, q):
+        """
+        Returns a percentile of the kept execution times.
+
+        Parameters:
+        ----------
+        q : float
+            The percentile, between 0 and 100.
+
+        Returns:
+        -------
+        float
+            The execution time below which q percent of the kept ones are, in seconds.
+        """
+        if self._sorted is None:
+            self._sorted = sorted(self.samples)
+        return self._sorted[min(int(len(self._sorted) * q / 100), len(self._sorted) - 1)]
+
+
+class RuntimeModel(object):
+    """
+    A class that learns the execution time of the tasks of each entry.
+
+    Attributes:
+    ----------
+    alpha : float
+        The weight of a new execution time in the moving averages.
+    window : int
+        The number of execution times kept for the percentiles of each entry.
+    by_size : bool
+        Whether the execution times are also learnt by input size.
+    _entries : dict
+        The statistics of each entry ID.
+    _sizes : dict
+        The statistics of each pair (entry ID, size bucket), with `by_size`.
+    _overall : _RuntimeStats
+        The statistics of all executions, predicting the entries never seen running.
+    """
+
+    def __init__(self, alpha=0.2, window=256, by_size=False):
+        """
+        Initializes an empty model.
+
+        Parameters:
+        ----------
+        alpha : float, optional
+            The weight of a new execution time in the moving averages (default is 0.2).
+        window : int, optional
+            The number of execution times kept for the percentiles of each entry (default is 256).
+        by_size : bool, optional
+            Whether the execution times are also learnt by input size (default is False).
+        """
+        self.alpha = alpha
+        self.window = window
+        self.by_size = by_size
+        self._entries = {}
+        self._sizes = {}
+        self._overall = _RuntimeStats()
+
+    def __repr__(self):
+        """
+        Returns a string representation of the model.
+
+        Returns:
+        -------
+        str
+            A string representation of the model, including its numbers of entries and executions.
+        """
+        return f'<RuntimeModel entries:{len(self._entries)} executions:{self._overall.count}>'
+
+    def __len__(self):
+        """
+        Returns the number of entries with observed executions.
+
+        Returns:
+        -------
+        int
+            The number of entries.
+        """
+        return len(self._entries)
+
+    @staticmethod
+    def _bucket(task):
+        """
+        Returns the input size bucket of a task.
+
+        Parameters:
+        ----------
+        task : Task
+            The task.
+
+        Returns:
+        -------
+        int
+            The number of bits of the input size, so sizes within a factor of two share a bucket.
+        """
+        try:
+            return input_size(task.input_data).bit_length()
+        except (AttributeError, TypeError):
+            return 0
+
+    def observe(self, task):
+        """
+        Adds the execution time of a finished task. Failed tasks are ignored, as they often stop early.
+
+        Parameters:
+        ----------
+        task : Task
+            The finished task.
+        """
+        if task.error is not None or task.start_clock is None or task.done_clock is None:
+            return
+        seconds = task.done_clock - task.start_clock
+        _stats = self._entries.get(task.algorithm_id)
+        if _stats is None:
+            _stats = self._entries[task.algorithm_id] = _RuntimeStats()
+        _stats.add(seconds, self.alpha, self.window)
+        self._overall.add(seconds, self.alpha, self.window)
+        if self.by_size:
+            _key = (task.algorithm_id, self._bucket(task))
+            _stats = self._sizes.get(_key)
+            if _stats is None:
+                _stats = self._sizes[_key] = _RuntimeStats()
+            _stats.add(seconds, self.alpha, self.window)
+
+    def expected(self, task):
+        """
+        Predicts the execution time of a task.
+
+        The prediction is the moving average of its input size bucket if enough tasks of that size ran, else
+        of its entry, else of all entries.
+
+        Parameters:
+        ----------
+        task : Task
+            The task.
+
+        Returns:
+        -------
+        float or None
+            The expected execution time in seconds, or None if no task ran yet.
+        """
+        if self.by_size:
+            _stats = self._sizes.get((task.algorithm_id, self._bucket(task)))
+            if _stats is not None and _stats.count >= MIN_SAMPLES:
+                return _stats.ewma
+        _stats = self._entries.get(task.algorithm_id)
+        if _stats is not None:
+            return _stats.ewma
+        return self._overall.ewma
+
+    def summary(self, algorithm_id):
+        """
+        Returns the statistics of an entry.
+
+        Parameters:
+        ----------
+        algorithm_id : str
+            The entry ID.
+
+        Returns:
+        -------
+        dict or None
+            A dictionary containing the number of executions, their moving average and their 50th, 90th and
+            99th percentiles in seconds, or None if the entry never ran.
+        """
+        _stats = self._entries.get(algorithm_id)
+        if _stats is None:
+            return None
+        return {'count': _stats.count, 'ewma': _stats.ewma, 'p50': _stats.percentile(50),
+                'p90': _stats.percentile(90), 'p99': _stats.percentile(99)}
+
+    def stats(self):
+        """
+        Returns the statistics of every entry.
+
+        Returns:
+        -------
+        dict
+            The statistics of each entry ID, as returned by `summary`.
+        """
+        return {algorithm_id: self.summary(algorithm_id) for algorithm_id in self._entries}
@@ -0,0 +1,221 @@
+"""
+Output Stream Module
+--------------------
+
+This module defines the `ChunkSpool` class, which holds the output chunks of a task whose entry is a generator.
+A streaming entry yields its output piece by piece; every validated chunk is appended to a spool file as soon as
+it is produced, and the clients following the task read the chunks back from the file. Neither the server nor
+the worker keeps more than one chunk in memory, however large the whole output is.
+
+When the complete output of a streaming task is requested, its chunks are merged with `merge_chunk`: lists are
+concatenated, strings are joined and any other value is replaced by the latest one.
+
+Classes:
+--------
+ChunkSpool
+    An append-only file of the output chunks of a task.
+
+Functions:
+----------
+merge_chunk(output, chunk)
+    Merges an output chunk into the output collected so far.
+"""
+
+import pickle
+import os
+
+
+def merge_chunk(output, chunk):
+    """
+    Merges an output chunk into the output collected so far.
+
+    Parameters:
+    ----------
+    output : dict
+        The output collected so far, updated in place.
+    chunk : dict
+        The output chunk, holding some of the output parameters.
+
+    Returns:
+    -------
+    dict
+        The updated output.
+    """
+    for name, value in chunk.items():
+        _value = output.get(name)
+        if isinstance(_value, list) and isinstance(value, list):
+            _value.extend(value)
+        elif isinstance(_value, str) and isinstance(value, str):
+            output[name] = _value + value
+        else:
+            output[name] = list(value) if isinstance(value, list) else value
+    return output
+
+
+class ChunkSpool(object):
+    """
+    An append-only file of the output chunks of a task.
+
+    Chunks are appended by the thread running the entry and read by the event loop. A chunk is only visible to
+    readers once it is completely written, so a reader never sees a partial record.
+
+    Attributes:
+    ----------
+    path : str
+        The path of the spool file.
+    count : int
+        The number of chunks written.
+    size : int
+        The number of bytes of the complete chunks written.
+    _file : file object or None
+        The spool file opened for appending, None once closed.
+    _notify : callable or None
+        Called without arguments after every appended chunk.
+    """
+
+    def __init__(self, path, notify=None):
+        """
+        Creates an empty spool file.
+
+        Parameters:
+        ----------
+        path : str
+            The path of the spool file.
+        notify : callable, optional
+            Called without arguments after every appended chunk (default is None).
+        """
+        self.path = path
+        self.count = 0
+        self.size = 0
+        self._file = open(path, 'wb')
+        self._notify = notify
+
+    @classmethod
+    def attach(cls, path, count=0, size=0):
+        """
+        Opens the spool of a task run by another process for reading, e.g. in a frontend of a scheduler.
+
+        Parameters:
+        ----------
+        path : str
+            The path of the spool file.
+        count : int, optional
+            The number of chunks written (default is 0).
+        size : int, optional
+            The number of bytes of the complete chunks written (default is 0).
+
+        Returns:
+        -------
+        ChunkSpool
+            A spool that can only be read. Its `count` and `size` are updated by the caller.
+        """
+        spool = cls.__new__(cls)
+        spool.path = path
+        spool.count = count
+        spool.size = size
+        spool._file = None
+        spool._notify = None
+        return spool
+
+    def __repr__(self):
+        """
+        Returns a string representation of the spool.
+
+        Returns:
+        -------
+        str
+            A string representation of the spool, including its number of chunks and size.
+        """
+        return f'<ChunkSpool chunks:{self.count} size:{self.size}>'
+
+    def __len__(self):
+        """
+        Returns the number of chunks written.
+
+        Returns:
+        -------
+        int
+            The number of chunks written.
+        """
+        return self.count
+
+    def append(self, chunk):
+        """
+        Appends a chunk to the spool.
+
+        Parameters:
+        ----------
+        chunk : dict
+            The validated output chunk.
+        """
+        try:
+            pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            self._file.flush()
+            self.size = self._file.tell()
+        except (AttributeError, ValueError):
+            # The spool was discarded while the entry was running.
+            return
+        self.count += 1
+        _notify = self._notify
+        if _notify is not None:
+            _notify()
+
+    def close(self):
+        """
+        Closes the spool for writing. The chunks can still be read.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._notify = None
+
+    def discard(self):
+        """
+        Closes the spool and deletes its file.
+        """
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def read(self, offset=0):
+        """
+        Reads the complete chunks written after an offset, one at a time.
+
+        Parameters:
+        ----------
+        offset : int, optional
+            The offset in bytes to read from, as returned with the last chunk read (default is 0).
+
+        Yields:
+        ------
+        tuple
+            A tuple (chunk, offset), where offset is the position after the chunk.
+        """
+        _size = self.size
+        if offset >= _size:
+            return
+        try:
+            f_ = open(self.path, 'rb')
+        except OSError:
+            return
+        with f_:
+            f_.seek(offset)
+            while f_.tell() < _size:
+                chunk = pickle.load(f_)
+                yield chunk, f_.tell()
+
+    def collect(self):
+        """
+        Merges all chunks into the complete output.
+
+        Returns:
+        -------
+        dict
+            The complete output.
+        """
+        output = {}
+        for chunk, _ in self.read():
+            merge_chunk(output, chunk)
+        return output
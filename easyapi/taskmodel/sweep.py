@@ -0,0 +1,714 @@
+"""
+Parameter Sweep Module
+----------------------
+
+This module defines the `SweepManager` class, which runs an entry on every point of a grid of input parameters.
+A sweep is given one axis per input parameter: a list of values, a range {"start", "stop", "step"}, an evenly
+or logarithmically spaced range {"start", "stop", "num", "log"}, or a single value kept fixed. The grid is the
+Cartesian product of the axes; a point is computed from its index when it is submitted, so a sweep of millions
+of points holds neither the points nor their tasks.
+
+A sweep keeps at most `window` of its tasks in the task queue. When one finishes, its output is appended to the
+columns of the sweep, the task is deleted, and the next points are submitted, so the sweep follows the capacity
+freed by the layouts and competes with the other tasks of its access ID under fair sharing. With an admission
+control, the first window is admitted as a batch of as many tasks, and the next points are submitted only as far
+as the queue limits of the access ID, the entry and the layout allow, so a sweep cannot queue more than a batch
+would. A sweep blocked by the limits with no task in the queue tries again every `RETRY` seconds. The results are
+kept as columns in completion order: the index of each point, its inputs (computed again from the index), the
+outputs of the entry and the error of each failed point.
+
+Classes:
+--------
+SweepLimitError
+    The error raised when a sweep has more points than allowed.
+
+SweepManager
+    A class that runs the sweeps of a task queue and collects their results.
+
+Functions:
+----------
+parse_axis(spec)
+    Parses the values of one swept input parameter.
+"""
+
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+from .task import Task
+from .admission import AdmissionError
+from .taskholder import task_holder_batch
+
+# The relative tolerance on the number of steps of a range, absorbing the rounding error of its bounds.
+_EPSILON = 1e-9
+
+
+class SweepLimitError(ValueError):
+    """
+    The error raised when a sweep has more points than allowed.
+    """
+
+
+class _Axis(object):
+    """
+    The values of one swept input parameter, computed from their index.
+
+    Attributes:
+    ----------
+    values : list or None
+        The listed values, or None for a range.
+    start : float
+        The first value of a range, or its decimal logarithm for a logarithmic range.
+    step : float
+        The difference between two values of a range, or between their decimal logarithms.
+    log : bool
+        Whether the range is logarithmic.
+    count : int
+        The number of values.
+    """
+
+    def __init__(self, values=None, start=0, step=1, log=False, count=0):
+        self.values = values
+        self.start = start
+        self.step = step
+        self.log = log
+        self.count = len(values) if values is not None else count
+
+    def __len__(self):
+        """
+        Returns the number of values.
+
+        Returns:
+        -------
+        int
+            The number of values.
+        """
+        return self.count
+
+    def __getitem__(self, index):
+        """
+        Returns a value of the axis.
+
+        Parameters:
+        ----------
+        index : int
+            The index of the value.
+
+        Returns:
+        -------
+        object
+            The value.
+        """
+        if self.values is not None:
+            return self.values[index]
+        if self.log:
+            return 10 ** (self.start + self.step * index)
+        return self.start + self.step * index
+
+
+def parse_axis(spec):
+    """
+    Parses the values of one swept input parameter.
+
+    Parameters:
+    ----------
+    spec : object
+        A list of values; {"values": [...]}; {"start", "stop", "step"} for the values start + i * step in the
+        half-open range from start (included) to stop (excluded), as with `range`; {"start", "stop", "num"} for
+        `num` evenly spaced values from start to stop (included), with "log": true for logarithmically spaced
+        ones; or any other value, kept fixed.
+
+    Returns:
+    -------
+    _Axis
+        The values of the parameter.
+
+    Raises:
+    ------
+    ValueError
+        If the axis has no value or its range is invalid.
+    """
+    if isinstance(spec, dict) and 'values' in spec:
+        spec = spec['values']
+    elif isinstance(spec, dict) and 'start' in spec and 'stop' in spec:
+        start, stop = float(spec['start']), float(spec['stop'])
+        if 'num' in spec:
+            _num = int(spec['num'])
+            if _num < 1:
+                raise ValueError('num should be at least 1')
+            if spec.get('log', False):
+                if start <= 0 or stop <= 0:
+                    raise ValueError('a logarithmic range should be positive')
+                start, stop = math.log10(start), math.log10(stop)
+                return _Axis(start=start, step=(stop - start) / max(_num - 1, 1), log=True, count=_num)
+            return _Axis(start=start, step=(stop - start) / max(_num - 1, 1), count=_num)
+        _step = float(spec.get('step', 1))
+        if _step == 0:
+            raise ValueError('step should not be 0')
+        # The rounding error of the quotient would otherwise count stop itself, e.g. 1.1 from 1 by steps of 0.1.
+        _span = (stop - start) / _step
+        return _Axis(start=start, step=_step, count=max(0, math.ceil(_span - _EPSILON * max(1.0, abs(_span)))))
+    elif not isinstance(spec, list):
+        spec = [spec]
+    if len(spec) == 0:
+        raise ValueError('an axis should have a value')
+    return _Axis(values=list(spec))
+
+
+class _Sweep(object):
+    """
+    A running or finished sweep.
+
+    Attributes:
+    ----------
+    sweep_id : str
+        The ID of the sweep.
+    access_id : str
+        The access ID the tasks of the sweep are submitted by.
+    entry : Algorithm
+        The swept entry.
+    algorithm_id : str
+        The ID of the swept entry.
+    required_resources : dict
+        The resources required by the entry.
+    priority : str
+        The priority class of the tasks.
+    weight : float
+        The share weight of the access ID.
+    deadline : float or None
+        How many seconds after its submission each task should finish.
+    window : int
+        The largest number of tasks of the sweep in the task queue.
+    names : list of str
+        The names of the swept input parameters.
+    axes : list of _Axis
+        The values of each swept input parameter.
+    total : int
+        The number of points of the grid.
+    submitted : int
+        The number of points submitted, which are the first ones of the grid.
+    failed : int
+        The number of points whose task failed.
+    status : str
+        'running', 'done' once every point finished, or 'cancelled'.
+    create_time : datetime
+        When the sweep was started.
+    expires : float or None
+        The monotonic time after which a finished sweep is forgotten.
+    columns : dict
+        The results in completion order: 'index', 'inputs' and 'outputs' (dictionaries of columns) and 'error'.
+    in_flight : dict
+        The index of the point of each task of the sweep in the task queue, by binary task ID.
+    waiters : list of asyncio.Future
+        The futures of the readers waiting for more results.
+    """
+
+    def __init__(self, entry, access_id, axes, priority, weight, deadline, window):
+        self.sweep_id = str(uuid4())
+        self.entry = entry
+        self.access_id = access_id
+        self.algorithm_id = entry.id
+        self.required_resources = entry.required_resources
+        self.priority = priority
+        self.weight = weight
+        self.deadline = deadline
+        self.window = window
+        self.names = list(axes)
+        self.axes = [axes[name] for name in self.names]
+        self.total = math.prod(len(axis) for axis in self.axes)
+        self.submitted = 0
+        self.failed = 0
+        self.status = 'running'
+        self.create_time = datetime.now(timezone.utc)
+        self.expires = None
+        self.columns = {'index': [], 'inputs': {name: [] for name in self.names},
+                        'outputs': {name: [] for name in entry.out_params}, 'error': []}
+        self.in_flight = {}
+        self.waiters = []
+
+    def point(self, index):
+        """
+        Returns the input parameters of a point of the grid, the last axis varying fastest.
+
+        Parameters:
+        ----------
+        index : int
+            The index of the point.
+
+        Returns:
+        -------
+        dict
+            The input parameters.
+        """
+        _point = {}
+        for name, axis in zip(reversed(self.names), reversed(self.axes)):
+            index, _position = divmod(index, len(axis))
+            _point[name] = axis[_position]
+        return {name: _point[name] for name in self.names}
+
+    def next_tasks(self, limit=None):
+        """
+        Creates the tasks of the next points, filling the window of the sweep.
+
+        Parameters:
+        ----------
+        limit : int, optional
+            The largest number of tasks created (default is None, as many as the window holds).
+
+        Returns:
+        -------
+        list of Task
+            The tasks, recorded in `in_flight`.
+        """
+        _tasks = []
+        _room = self.window - len(self.in_flight) if limit is None else min(limit, self.window - len(self.in_flight))
+        while self.status == 'running' and self.submitted < self.total and len(_tasks) < _room:
+            task = Task(access_id=self.access_id, algorithm_id=self.algorithm_id,
+                        input_data=self.point(self.submitted), required_resources=self.required_resources,
+                        priority=self.priority, weight=self.weight, deadline=self.deadline)
+            self.in_flight[task.key] = self.submitted
+            self.submitted += 1
+            _tasks.append(task)
+        return _tasks
+
+    def record(self, index, success, output):
+        """
+        Appends the result of a point to the columns.
+
+        Parameters:
+        ----------
+        index : int
+            The index of the point.
+        success : bool
+            Whether its task succeeded.
+        output : dict or str
+            The output data of the task, or its error.
+        """
+        self.columns['index'].append(index)
+        for name, column in self.columns['outputs'].items():
+            column.append(output.get(name) if success and isinstance(output, dict) else None)
+        self.columns['error'].append(None if success else output)
+        if not success:
+            self.failed += 1
+
+    @property
+    def done(self):
+        """
+        Returns the number of finished points.
+
+        Returns:
+        -------
+        int
+            The number of points whose result is in the columns.
+        """
+        return len(self.columns['index'])
+
+    def summary(self):
+        """
+        Returns the state of the sweep.
+
+        Returns:
+        -------
+        dict
+            The sweep ID, the entry, the status, the numbers of points of the grid, submitted, in the task
+            queue, finished and failed, and the creation time.
+        """
+        return {'sweep_id': self.sweep_id, 'entry': self.algorithm_id, 'status': self.status, 'total': self.total,
+                'submitted': self.submitted, 'in_flight': len(self.in_flight), 'done': self.done,
+                'failed': self.failed, 'create_time': self.create_time}
+
+    def read(self, offset=0, limit=None):
+        """
+        Returns the state of the sweep and a block of its result columns.
+
+        Parameters:
+        ----------
+        offset : int, optional
+            The first result of the block, in completion order (default is 0).
+        limit : int, optional
+            The largest number of results of the block (default is None, all).
+
+        Returns:
+        -------
+        dict
+            The summary of the sweep, the offset of the block and its columns.
+        """
+        _stop = self.done if limit is None else min(self.done, offset + max(0, limit))
+        _indices = self.columns['index'][offset:_stop]
+        _points = [self.point(index) for index in _indices]
+        _response = self.summary()
+        _response['offset'] = offset
+        _response['columns'] = {
+            'index': _indices,
+            'inputs': {name: [point[name] for point in _points] for name in self.names},
+            'outputs': {name: column[offset:_stop] for name, column in self.columns['outputs'].items()},
+            'error': self.columns['error'][offset:_stop],
+        }
+        return _response
+
+    def wake(self):
+        """
+        Resolves the futures of the readers waiting for more results.
+        """
+        _waiters, self.waiters = self.waiters, []
+        for future in _waiters:
+            if not future.done():
+                future.set_result(None)
+
+
+class SweepManager(object):
+    """
+    A class that runs the sweeps of a task queue and collects their results.
+
+    The results of the tasks are collected on the event loop once the listeners of the task queue are done with
+    the state change, and the next points are submitted together.
+
+    Attributes:
+    ----------
+    RETRY : float
+        How often, in seconds, a sweep blocked by the queue limits with no task in the queue tries again.
+    task_queue : TaskQueue
+        The task queue running the points.
+    admission : AdmissionControl or None
+        The admission control checking the points submitted.
+    window : int
+        The default and largest number of tasks of a sweep in the task queue.
+    max_points : int
+        The largest number of points of a sweep.
+    ttl : float
+        How many seconds a finished sweep is kept.
+    sweeps : dict
+        The sweeps, indexed by sweep ID.
+    _owners : dict
+        The sweep of each task in the task queue, by binary task ID.
+    _finished : list
+        The tasks of sweeps finished since the last collection, as tuples (sweep, task, state).
+    """
+
+    RETRY = 1.0
+
+    def __init__(self, task_queue, admission=None, window=256, max_points=1000000, ttl=3600):
+        """
+        Initializes the manager and listens to the state changes of the tasks.
+
+        Parameters:
+        ----------
+        task_queue : TaskQueue
+            The task queue running the points.
+        admission : AdmissionControl, optional
+            The admission control checking the points submitted (default is None, no limit).
+        window : int, optional
+            The default and largest number of tasks of a sweep in the task queue (default is 256).
+        max_points : int, optional
+            The largest number of points of a sweep (default is 1000000).
+        ttl : float, optional
+            How many seconds a finished sweep is kept (default is 3600).
+        """
+        self.task_queue = task_queue
+        self.admission = admission
+        self.window = max(1, int(window))
+        self.max_points = max_points
+        self.ttl = ttl
+        self.sweeps = {}
+        self._owners = {}
+        self._finished = []
+        task_queue.add_listener(self._on_task)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the manager.
+
+        Returns:
+        -------
+        str
+            A string representation of the manager, including its number of sweeps.
+        """
+        return f'<SweepManager sweeps:{len(self.sweeps)} in_flight:{len(self._owners)}>'
+
+    def __len__(self):
+        """
+        Returns the number of sweeps kept.
+
+        Returns:
+        -------
+        int
+            The number of sweeps.
+        """
+        return len(self.sweeps)
+
+    def start(self, entry, access_id, specs, priority='normal', weight=1, deadline=None, window=None):
+        """
+        Starts a sweep of an entry and submits its first points.
+
+        Parameters:
+        ----------
+        entry : Algorithm
+            The swept entry.
+        access_id : str
+            The access ID the tasks are submitted by.
+        specs : dict
+            The axis of each input parameter (see `parse_axis`). The inputs not given take their default value.
+        priority : str, optional
+            The priority class of the tasks (default is 'normal').
+        weight : float, optional
+            The share weight of the access ID (default is 1).
+        deadline : float, optional
+            How many seconds after its submission each task should finish (default is None).
+        window : int, optional
+            The largest number of tasks of the sweep in the task queue (default is None, `window`). It cannot
+            exceed `window`.
+
+        Returns:
+        -------
+        dict
+            The summary of the sweep.
+
+        Raises:
+        ------
+        ValueError
+            If a parameter is not an input of the entry, a required input is missing or an axis is invalid.
+        SweepLimitError
+            If the grid has more than `max_points` points.
+        AdmissionError
+            If the first window of tasks does not fit in the queue limits.
+        """
+        if not isinstance(specs, dict):
+            raise ValueError('Sweep parameters should be an object')
+        for name in specs:
+            if name not in entry.in_params:
+                raise ValueError(f'{name} is not an input of {entry.id}')
+        for name, param in entry.in_params.items():
+            if name not in specs and not param.optional:
+                raise ValueError(f'{name} not found')
+        _axes = {name: parse_axis(spec) for name, spec in specs.items()}
+        _window = self.window if window is None else max(1, min(int(window), self.window))
+        sweep = _Sweep(entry, access_id, _axes, priority, weight, deadline, _window)
+        if sweep.total > self.max_points:
+            raise SweepLimitError(f'{sweep.total} points exceed the sweep limit ({self.max_points})')
+        if self.admission is not None and sweep.total > 0:
+            self.admission.check(entry, access_id, min(sweep.window, sweep.total))
+        self._expire()
+        self.sweeps[sweep.sweep_id] = sweep
+        if sweep.total == 0:
+            self._end(sweep, 'done')
+        self._feed(sweep, admitted=True)
+        return sweep.summary()
+
+    def _feed(self, sweep, admitted=False):
+        """
+        Submits the next points of a sweep, filling its window as far as the queue limits allow.
+
+        Parameters:
+        ----------
+        sweep : _Sweep
+            The sweep.
+        admitted : bool, optional
+            Whether the points were already admitted, as the first window is (default is False).
+        """
+        if sweep.status != 'running':
+            return
+        _count = min(sweep.window - len(sweep.in_flight), sweep.total - sweep.submitted)
+        if _count <= 0:
+            return
+        if self.admission is not None and not admitted:
+            _headroom = self.admission.headroom(sweep.entry, sweep.access_id)
+            if _headroom is not None:
+                _count = min(_count, _headroom)
+            if _count > 0:
+                try:
+                    self.admission.check(sweep.entry, sweep.access_id, _count)
+                except AdmissionError:
+                    _count = 0
+            if _count == 0:
+                if len(sweep.in_flight) == 0:
+                    asyncio.get_running_loop().call_later(self.RETRY, self._feed, sweep)
+                return
+        _tasks = sweep.next_tasks(_count)
+        for task in _tasks:
+            self._owners[task.key] = sweep
+        task_holder_batch(task_queue=self.task_queue, tasks=_tasks)
+
+    def _on_task(self, task, state):
+        """
+        Schedules the collection of a finished task of a sweep; the listener of the task queue.
+
+        Parameters:
+        ----------
+        task : Task
+            The task whose state changed.
+        state : str
+            The new state of the task.
+        """
+        if state != self.task_queue.DONE and state != self.task_queue.DELETED:
+            return
+        sweep = self._owners.pop(task.key, None)
+        if sweep is None:
+            return
+        if len(self._finished) == 0:
+            # The task is deleted and the next ones submitted once every listener saw the state change.
+            asyncio.get_running_loop().call_soon(self._collect)
+        self._finished.append((sweep, task, state))
+
+    def _collect(self):
+        """
+        Appends the results of the finished tasks to their sweeps, deletes the tasks and submits the next points.
+        """
+        _finished, self._finished = self._finished, []
+        _sweeps = {}
+        for sweep, task, state in _finished:
+            index = sweep.in_flight.pop(task.key)
+            _sweeps[sweep.sweep_id] = sweep
+            if state == self.task_queue.DELETED:
+                sweep.record(index, False, 'Task deleted')
+                continue
+            if task.error is None:
+                sweep.record(index, True, self.task_queue.results.output(task))
+            else:
+                sweep.record(index, False, task.error)
+            try:
+                del self.task_queue[task.key]
+            except LookupError:
+                pass
+        for sweep in _sweeps.values():
+            self._feed(sweep)
+            if sweep.status == 'running' and sweep.done == sweep.total:
+                self._end(sweep, 'done')
+            sweep.wake()
+
+    def _end(self, sweep, status):
+        """
+        Marks a sweep as finished.
+
+        Parameters:
+        ----------
+        sweep : _Sweep
+            The sweep.
+        status : str
+            'done' or 'cancelled'.
+        """
+        sweep.status = status
+        sweep.expires = time.monotonic() + self.ttl
+        sweep.wake()
+
+    def _expire(self):
+        """
+        Forgets the finished sweeps whose time to live has passed.
+        """
+        _now = time.monotonic()
+        for sweep_id in [sweep_id for sweep_id, sweep in self.sweeps.items()
+                         if sweep.expires is not None and sweep.expires < _now and len(sweep.in_flight) == 0]:
+            del self.sweeps[sweep_id]
+
+    def _get(self, sweep_id, access_id):
+        """
+        Returns a sweep of an access ID.
+
+        Parameters:
+        ----------
+        sweep_id : str
+            The ID of the sweep.
+        access_id : str
+            The access ID reading the sweep.
+
+        Returns:
+        -------
+        _Sweep or None
+            The sweep, or None if it is not found or belongs to another access ID.
+        """
+        self._expire()
+        sweep = self.sweeps.get(sweep_id)
+        if sweep is None or sweep.access_id != access_id:
+            return None
+        return sweep
+
+    def read(self, sweep_id, access_id, offset=0, limit=None):
+        """
+        Returns the state of a sweep and a block of its results.
+
+        Parameters:
+        ----------
+        sweep_id : str
+            The ID of the sweep.
+        access_id : str
+            The access ID reading the sweep.
+        offset : int, optional
+            The first result of the block, in completion order (default is 0).
+        limit : int, optional
+            The largest number of results of the block (default is None, all).
+
+        Returns:
+        -------
+        dict or None
+            The summary of the sweep with the offset and the columns of the block (see `_Sweep.read`), or None
+            if the sweep is not found.
+        """
+        sweep = self._get(sweep_id, access_id)
+        return sweep.read(max(0, offset), limit) if sweep is not None else None
+
+    async def wait(self, sweep_id, access_id, offset, timeout):
+        """
+        Waits until a sweep has more than `offset` results or is finished, or until the timeout passes.
+
+        Parameters:
+        ----------
+        sweep_id : str
+            The ID of the sweep.
+        access_id : str
+            The access ID reading the sweep.
+        offset : int
+            The number of results already read.
+        timeout : float
+            The longest time to wait, in seconds.
+        """
+        sweep = self._get(sweep_id, access_id)
+        if sweep is None or sweep.done > offset or (sweep.status != 'running' and len(sweep.in_flight) == 0):
+            return
+        future = asyncio.get_running_loop().create_future()
+        sweep.waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self, sweep_id, access_id):
+        """
+        Stops a sweep: no more point is submitted and its tasks in the task queue are cancelled.
+
+        Parameters:
+        ----------
+        sweep_id : str
+            The ID of the sweep.
+        access_id : str
+            The access ID stopping the sweep.
+
+        Returns:
+        -------
+        dict or None
+            The summary of the sweep, or None if the sweep is not found.
+        """
+        sweep = self._get(sweep_id, access_id)
+        if sweep is None:
+            return None
+        if sweep.status == 'running':
+            self._end(sweep, 'cancelled')
+            for task_id in list(sweep.in_flight):
+                try:
+                    self.task_queue.stop(task_id, self.task_queue.CANCELLED)
+                except LookupError:
+                    pass
+        return sweep.summary()
+
+    def stats(self):
+        """
+        Returns the state of the sweeps.
+
+        Returns:
+        -------
+        dict
+            A dictionary containing the number of sweeps kept, of running sweeps and of their tasks in the task
+            queue.
+        """
+        return {'sweeps': len(self.sweeps),
+                'running': sum(1 for sweep in self.sweeps.values() if sweep.status == 'running'),
+                'in_flight': len(self._owners)}
@@ -5,21 +5,34 @@ Task Management Module
 This module defines the `Task` class, which represents a computational task that can be executed asynchronously.
 The class handles task initialization, tracking execution progress, storing task-related data, and managing task resources.
 
+A task is kept compact, as millions of them may be queued: its attributes are slots, its ID is held in its
+16-byte binary form (`key`), under which the task queue, the result store and the other indexes file it, and
+its times are `time.monotonic()` floats. The string ID and the datetimes read by the API responses are computed
+when they are read. The input data of a task is released once it has run and is held by the result store.
+
 Classes:
 --------
 Task
     A class that represents a computational task. It manages task states, execution times, and the handling of resources.
 
+Functions:
+----------
+task_key(task_id)
+    Returns the binary form of a task ID.
+
+to_datetime(clock)
+    Converts a monotonic time to a datetime in UTC.
+
 Methods:
 --------
-__init__(self, access_id='', algorithm_id='', input_data={}, required_resources={})
+__init__(self, access_id='', algorithm_id='', input_data={}, required_resources={}, priority='normal', weight=1, task_id=None, create_clock=None, deadline=None)
     Initializes a new task with the given parameters.
 
 __repr__(self)
     Returns a string representation of the task's state.
 
-_get_time(self)
-    Returns the current time in UTC.
+_get_clock(self)
+    Returns the current monotonic time.
 
 _execute_start(self)
     Marks the task as in progress and records the start time.
@@ -27,6 +40,9 @@ _execute_start(self)
 _execute_end(self)
     Marks the task as complete and records the end time.
 
+_execute_finish(self, succ, output)
+    Records the result of the execution and marks the task as complete.
+
 execute(self, algorithmlib, resources={})
     Executes the task using the specified algorithm and resources.
 
@@ -34,9 +50,61 @@ cancel(self)
     Cancels the task if it is running asynchronously.
 """
 
-from uuid import uuid4
+import time
+from uuid import uuid4, UUID
 from datetime import datetime, timezone
 
+# The POSIX time at which the monotonic clock read zero, converting the times of the tasks to wall-clock times.
+EPOCH = time.time() - time.monotonic()
+
+
+def task_key(task_id):
+    """
+    Returns the binary form of a task ID, under which the task is indexed.
+
+    Parameters:
+    ----------
+    task_id : str or bytes
+        The task ID, as a UUID string or already in its binary form.
+
+    Returns:
+    -------
+    bytes or None
+        The 16 bytes of the UUID, or None if the string is not a task ID, so it is found nowhere.
+    """
+    if isinstance(task_id, bytes):
+        return task_id
+    try:
+        # The plain hex form, with or without hyphens, is read directly; any other spelling is left to UUID.
+        _hex = task_id.replace('-', '')
+        if len(_hex) == 32:
+            _key = bytes.fromhex(_hex)
+            if len(_key) == 16:
+                return _key
+    except (TypeError, ValueError, AttributeError):
+        pass
+    try:
+        return UUID(task_id).bytes
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def to_datetime(clock):
+    """
+    Converts a monotonic time to a datetime in UTC.
+
+    Parameters:
+    ----------
+    clock : float or None
+        The `time.monotonic()` time to convert.
+
+    Returns:
+    -------
+    datetime or None
+        The datetime in UTC, or None.
+    """
+    return datetime.fromtimestamp(clock + EPOCH, timezone.utc) if clock is not None else None
+
 
 class Task(object):
     """
@@ -44,14 +112,16 @@ class Task(object):
     
     Attributes:
     ----------
+    key : bytes
+        The ID of the task in its 16-byte binary form.
     task_id : str
-        A unique identifier for the task.
+        A unique identifier for the task, the UUID string of `key`.
     access_id : str
         The ID used for access control of the task.
     algorithm_id : str
         The ID of the algorithm to be used for executing the task.
     input_data : dict
-        The input data required by the algorithm.
+        The input data required by the algorithm, None once the task is held by the result store.
     output_data : object
         The output data generated by the task after execution.
     in_progress : bool
@@ -60,19 +130,52 @@ class Task(object):
         A flag indicating whether the task has been completed.
     required_resources : dict
         The resources required to execute the task.
+    priority : str
+        The priority class of the task, one of 'interactive', 'normal' and 'background'.
+    weight : float
+        The share weight of the access ID among the tasks of the same priority class.
+    create_clock : float
+        The monotonic time when the task was created.
+    start_clock : float
+        The monotonic time when the task started executing, or None.
+    done_clock : float
+        The monotonic time when the task finished executing, or None.
+    deadline_clock : float
+        The monotonic time by which the task should finish, or None. Queues using the 'edf' policy run the
+        earliest first.
     create_time : datetime
         The timestamp when the task was created.
     start_time : datetime
         The timestamp when the task started executing.
     done_time : datetime
         The timestamp when the task finished executing.
+    deadline : datetime
+        The time by which the task should finish, or None.
     error : str
         The error message if the task fails during execution.
+    progress : float
+        The completed fraction of the work last reported by the running entry, or None.
+    progress_message : str
+        The message of the last progress report, or None.
+    stream : ChunkSpool
+        The output chunks of a task run by a streaming entry, or None.
+    expected_runtime : float
+        The execution time in seconds predicted by the runtime model when the task was queued, or None.
+    interrupted : str
+        'cancelled' or 'timed-out' if the task was stopped before its execution finished, otherwise None.
+    _journal_seq : int
+        The sequence number of the row of the task in the journal, or None if it was not written.
     _asyncio_task : object
         A reference to the asynchronous task if executed in an async context.
     """
     
-    def __init__(self, access_id='', algorithm_id='', input_data={}, required_resources={}):
+    __slots__ = ('key', 'access_id', 'algorithm_id', 'input_data', 'output_data', 'in_progress', 'is_done',
+                 'required_resources', 'priority', 'weight', 'create_clock', 'start_clock', 'done_clock',
+                 'deadline_clock', 'error', 'progress', 'progress_message', 'stream', 'expected_runtime',
+                 'interrupted', '_journal_seq', '_asyncio_task')
+    
+    def __init__(self, access_id='', algorithm_id='', input_data={}, required_resources={}, priority='normal', weight=1,
+                 task_id=None, create_clock=None, deadline=None):
         """
         Initializes a new task with the given parameters.
         
@@ -86,8 +189,18 @@ class Task(object):
             The input data required by the algorithm (default is an empty dictionary).
         required_resources : dict, optional
             The resources required to execute the task (default is an empty dictionary).
+        priority : str, optional
+            The priority class of the task (default is 'normal').
+        weight : float, optional
+            The share weight of the access ID (default is 1).
+        task_id : str or bytes, optional
+            The ID of the task, e.g. of a task recovered from the journal (default is None, a new UUID).
+        create_clock : float, optional
+            The monotonic time when the task was created (default is None, the current time).
+        deadline : float, optional
+            How many seconds after its creation the task should finish (default is None, no deadline).
         """
-        self.task_id = str(uuid4())
+        self.key = task_key(task_id) if task_id is not None else uuid4().bytes
         self.access_id = access_id
         self.algorithm_id = algorithm_id
         self.input_data = input_data
@@ -95,10 +208,19 @@ class Task(object):
         self.in_progress = False
         self.is_done = False
         self.required_resources = required_resources
-        self.create_time = self._get_time()
-        self.start_time = None
-        self.done_time = None
+        self.priority = priority
+        self.weight = weight
+        self.create_clock = create_clock if create_clock is not None else self._get_clock()
+        self.start_clock = None
+        self.done_clock = None
+        self.deadline_clock = self.create_clock + deadline if deadline is not None else None
         self.error = None
+        self.progress = None
+        self.progress_message = None
+        self.stream = None
+        self.expected_runtime = None
+        self.interrupted = None
+        self._journal_seq = None
         self._asyncio_task = None
     
     def __repr__(self):
@@ -112,23 +234,83 @@ class Task(object):
         """
         return f'<({self.create_time}){self.task_id} is_done:{self.is_done}>'
     
-    def _get_time(self):
+    @property
+    def task_id(self):
+        """
+        Returns the ID of the task.
+        
+        Returns:
+        -------
+        str
+            The UUID string of the task.
+        """
+        return str(UUID(bytes=self.key))
+    
+    @property
+    def create_time(self):
         """
-        Returns the current time in UTC.
+        Returns when the task was created.
         
         Returns:
         -------
         datetime
-            The current time in UTC.
+            The creation time in UTC.
+        """
+        return to_datetime(self.create_clock)
+    
+    @property
+    def start_time(self):
+        """
+        Returns when the task started executing.
+        
+        Returns:
+        -------
+        datetime or None
+            The start time in UTC, or None if the task has not started.
+        """
+        return to_datetime(self.start_clock)
+    
+    @property
+    def done_time(self):
+        """
+        Returns when the task finished executing.
+        
+        Returns:
+        -------
+        datetime or None
+            The end time in UTC, or None if the task has not finished.
+        """
+        return to_datetime(self.done_clock)
+    
+    @property
+    def deadline(self):
+        """
+        Returns the time by which the task should finish.
+        
+        Returns:
+        -------
+        datetime or None
+            The deadline in UTC, or None if the task has none.
         """
-        return datetime.now(timezone.utc)
+        return to_datetime(self.deadline_clock)
+    
+    def _get_clock(self):
+        """
+        Returns the current monotonic time.
+        
+        Returns:
+        -------
+        float
+            The current `time.monotonic()` time.
+        """
+        return time.monotonic()
     
     def _execute_start(self):
         """
         Marks the task as in progress and records the start time.
         """
         self.in_progress = True
-        self.start_time = self._get_time()
+        self.start_clock = self._get_clock()
     
     def _execute_end(self):
         """
@@ -136,7 +318,31 @@ class Task(object):
         """
         self.in_progress = False
         self.is_done = True
-        self.done_time = self._get_time()
+        self.done_clock = self._get_clock()
+    
+    def _execute_finish(self, succ, output):
+        """
+        Records the result of the execution and marks the task as complete.
+        
+        Parameters:
+        ----------
+        succ : bool
+            Whether the execution was successful.
+        output : object
+            The output data if the execution was successful, otherwise the error message.
+        
+        Returns:
+        -------
+        object
+            The output data or the error message.
+        """
+        if not succ:
+            self.error = output
+        else:
+            self.output_data = output
+        
+        self._execute_end()
+        return output
     
     def execute(self, algorithmlib, resources={}):
         """
@@ -157,14 +363,7 @@ class Task(object):
         self._execute_start()
         algorithm = algorithmlib[self.algorithm_id]
         succ, output = algorithm(self.input_data, resources=resources)
-        
-        if not succ:
-            self.error = output
-        else:
-            self.output_data = output
-        
-        self._execute_end()
-        return output
+        return self._execute_finish(succ, output)
     
     def cancel(self):
         """
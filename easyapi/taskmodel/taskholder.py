@@ -2,79 +2,73 @@
 Task Management and Execution Module
 -------------------------------------
 
-This module defines functions and an asynchronous runner to handle task execution within a task queue. It uses
-asyncio to manage the scheduling and execution of tasks in an efficient, non-blocking manner. The tasks are executed
-with the help of a thread pool executor and managed within a task queue.
+This module defines functions to hand tasks over to the task queue and to the layout dispatchers that execute
+them. Each layout of a task queue is served by exactly one `LayoutDispatcher` coroutine, which is woken when a
+task is enqueued on its layout and when one of its running tasks finishes. The tasks are executed by the
+executors of the task queue. In a frontend of a scheduler process (see `easyapi.taskmodel.frontend`), the
+task queue is a `SchedulerClient`: the tasks are sent to the scheduler, whose dispatchers execute them.
 
 Functions:
 ----------
-_task_runner(task_queue: TaskQueue, task: Task)
-    An asynchronous function that runs the given task when it becomes the first task in the queue.
-    
+get_dispatchers(task_queue: TaskQueue)
+    Returns the layout dispatchers of the task queue, starting them on the running event loop if needed.
+
 task_holder(task_queue: TaskQueue, task: Task)
-    A function that adds the task to the task queue and initiates the asynchronous task runner.
+    A function that adds the task to the task queue and wakes the dispatcher of its layout.
+
+task_holder_batch(task_queue: TaskQueue, tasks: list)
+    A function that adds a batch of tasks to the task queue and wakes the dispatchers of their layouts once.
 """
 
 from .task import Task
 from .taskqueue import TaskQueue
+from .dispatcher import LayoutDispatcher
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
-# Executor for running tasks in a separate thread.
-executor = ThreadPoolExecutor()
+# Layout dispatchers of each task queue.
+_dispatchers = {}
 
-async def _task_runner(task_queue: TaskQueue, task: Task):
+def get_dispatchers(task_queue: TaskQueue):
     """
-    An asynchronous function that runs the given task when it becomes the first task in the queue.
-    
-    This function waits for the task to be the first in the queue, executes it using a thread pool executor, and 
-    then moves the task to the done queue after completion.
-    
+    Returns the layout dispatchers of the task queue, starting them on the running event loop if needed.
+
+    The dispatchers are bound to the event loop they were started on. If that loop is no longer the running
+    one (e.g. the application was restarted in the same process), new dispatchers are started. A dispatcher is
+    started for every layout added to the task queue since the last call.
+
     Parameters:
     ----------
     task_queue : TaskQueue
-        The task queue containing the tasks.
-    task : Task
-        The task to be executed.
-    
-    Raises:
-    ------
-    asyncio.CancelledError
-        If the task is cancelled during execution.
+        The task queue whose dispatchers are requested.
+
+    Returns:
+    -------
+    list of LayoutDispatcher
+        One dispatcher for each layout of the task queue.
     """
-    try:
-        # Wait until the task becomes the first task in the queue.
-        while not task_queue.is_header(task):
-            await asyncio.sleep(0.1)
-        
-        # Get the event loop and run the task using the executor.
-        loop = asyncio.get_event_loop()
-
-        def _run_task():
-            """
-            Helper function to execute the task using the executor.
-            """
-            task_queue.execute(task)
-        
-        # Run the task in a separate thread.
-        await loop.run_in_executor(executor, _run_task)
-
-        # Wait for the task execution to finish (loop will run forever in this case).
-        await loop.run_forever()
-
-        # Dequeue the task and move it to the done queue after completion.
-        task = task_queue.dequeue(task)
-        task_queue.done_queue.append(task)
-    except asyncio.CancelledError:
-        # Handle task cancellation
-        return
+    loop = asyncio.get_running_loop()
+    dispatchers = _dispatchers.get(task_queue)
+    if dispatchers is None or any(dispatcher.loop is not loop or not dispatcher.running
+                                  for dispatcher in dispatchers):
+        for dispatcher in dispatchers or []:
+            dispatcher.stop()
+        dispatchers = [LayoutDispatcher(task_queue=task_queue, layout_id=layout_id)
+                       for layout_id in range(len(task_queue))]
+        for dispatcher in dispatchers:
+            dispatcher.peers = dispatchers
+            dispatcher.start()
+        _dispatchers[task_queue] = dispatchers
+    for layout_id in range(len(dispatchers), len(task_queue)):
+        dispatcher = LayoutDispatcher(task_queue=task_queue, layout_id=layout_id)
+        dispatcher.peers = dispatchers
+        dispatchers.append(dispatcher)
+        dispatcher.start()
+    return dispatchers
 
 def task_holder(task_queue: TaskQueue, task: Task):
     """
-    A function that adds the task to the task queue and initiates the asynchronous task runner.
-    
-    This function schedules the execution of the task by creating an asyncio task and assigning it to the task queue.
-    
+    A function that adds the task to the task queue and wakes the dispatcher of its layout.
+
     Parameters:
     ----------
     task_queue : TaskQueue
@@ -82,11 +76,31 @@ def task_holder(task_queue: TaskQueue, task: Task):
     task : Task
         The task to be held and executed.
     """
-    # Create an asyncio task to run the task asynchronously.
-    _asyncio_task = asyncio.create_task(_task_runner(task_queue=task_queue, task=task))
-    
-    # Store the asyncio task reference in the task object.
-    task._asyncio_task = _asyncio_task
-    
+    if not isinstance(task_queue, TaskQueue):
+        task_queue.enqueue(task)
+        return
+    dispatchers = get_dispatchers(task_queue)
+
     # Add the task to the task queue for scheduling.
-    task_queue.enqueue(task)
+    queue_id = task_queue.enqueue(task)
+
+    # Wake the dispatcher serving the task's layout.
+    dispatchers[queue_id].notify()
+
+def task_holder_batch(task_queue: TaskQueue, tasks: list):
+    """
+    A function that adds a batch of tasks to the task queue and wakes the dispatchers of their layouts once.
+
+    Parameters:
+    ----------
+    task_queue : TaskQueue
+        The task queue to which the tasks will be added.
+    tasks : list of Task
+        The tasks to be held and executed, in order.
+    """
+    if not isinstance(task_queue, TaskQueue):
+        task_queue.enqueue_many(tasks)
+        return
+    dispatchers = get_dispatchers(task_queue)
+    for queue_id in task_queue.enqueue_many(tasks):
+        dispatchers[queue_id].notify()
@@ -3,9 +3,33 @@ Task Queue Management Module
 -----------------------------
 
 This module defines the `TaskQueue` class, which manages a queue of computational tasks. It handles task scheduling,
-resource allocation, task execution, and tracking task statuses. The class provides functionality for managing
-multiple task queues with different resource configurations and assigning tasks to the appropriate queues based on
-resource requirements.
+resource allocation, task execution, and tracking task statuses. Every task is indexed by the binary form of its
+task ID (`Task.key`), so lookups, deletions and queue positions do not scan the queues. The class provides
+functionality for managing multiple task queues with different resource configurations and assigning tasks to the
+appropriate queues based on resource requirements. Finished tasks are handed over to a `ResultStore`, which keeps
+them until they expire or are evicted.
+
+Listeners registered with `add_listener` are called on every state change of a task (queued, started, done,
+deleted), so the API can push updates instead of polling. A running entry may also report its progress through
+`resources['progress']`; the reports reach the listeners at most once per `progress_interval` seconds. The
+output chunks of a streaming entry are written to the `ChunkSpool` of its task as they are produced.
+
+A task identical to one already queued or running (same entry, same input data) is not queued again: it follows
+the running one and receives its result when it finishes (single-flight deduplication). Tasks of streaming
+entries are never deduplicated, as their output is streamed to the followers of each task.
+
+A queued or running task can be stopped with `stop`, which kills its execution if its executor can (see
+`ProcessExecutor.kill`), frees its resources at once and stores it as finished with the 'cancelled' status. An
+entry registered with a `timeout` is stopped the same way when an execution outlives it, with the 'timed-out'
+status.
+
+Layouts can be added while the server runs with `add_layout`, e.g. for a remote worker (see `WorkerHub`). Such a
+layout is never routed to: it only pulls the queued tasks the other layouts cannot start now (see `steal`). When
+it goes away, `retire_layout` moves its queued and running tasks back to the other layouts.
+
+The execution times of the finished tasks are learnt by a `RuntimeModel`, which predicts the runtime of every
+queued task. The prediction gives the estimated start and finish times of a task (see `estimate`) and orders the
+layouts using the 'sjf' policy.
 
 Classes:
 --------
@@ -14,7 +38,7 @@ TaskQueue
 
 Methods:
 --------
-__init__(self, queue_configs=[{'cpu':os.cpu_count(), 'cuda':0}], algorithmlib=None)
+__init__(self, queue_configs=[{'cpu':os.cpu_count(), 'cuda':0}], algorithmlib=None, backfill=32, max_bypass=8, executor='thread', results=None, dedup=True, progress_interval=0.25, policy='fifo', runtimes=None, sjf_stretch=10)
     Initializes the task queue with the given configurations and algorithm library.
 
 __len__(self)
@@ -23,31 +47,95 @@ __len__(self)
 queue_where(self, task)
     Returns the position of the given task in the queue.
 
+estimate(self, task)
+    Estimates how many seconds until the given task starts and finishes.
+
 __getitem__(self, task_id)
-    Retrieves the task with the specified task ID from the queue or the done queue.
+    Retrieves the task with the specified task ID from the queue or the result store.
 
 __delitem__(self, task_id)
-    Deletes the task with the specified task ID from the queue or done queue.
+    Deletes the task with the specified task ID from the queue or the result store.
+
+stop(self, task_id, status='cancelled')
+    Stops a queued or running task and stores it as finished with the given status.
+
+__contains__(self, task_id)
+    Checks if a task with the specified task ID is held by the task queue.
 
 is_header(self, task)
     Checks if the task is the first task in any of the queues.
 
+is_running(self, task, execution=None)
+    Checks if the task is being executed by the task queue.
+
+add_layout(self, queue_config, executor, policy='fifo')
+    Adds a layout served by the given executor, which only pulls the tasks other layouts cannot start now.
+
+retire_layout(self, queue_id)
+    Removes a layout added by `add_layout`, moving its queued and running tasks back to the other layouts.
+
+add_listener(self, listener)
+    Registers a callable called on every state change of a task.
+
+header(self, queue_id)
+    Returns the queued task of the specified queue that should run next.
+
+resource_distances(self, resources_list)
+    Calculates the resource distance of a batch of tasks and returns the queue ID with the minimum resource distance for each task.
+
 resource_distance(self, resources)
     Calculates the resource distance for task scheduling and returns the queue ID with the minimum resource distance.
 
 enqueue(self, task)
     Adds a task to the appropriate queue based on its resource requirements.
 
+enqueue_many(self, tasks)
+    Adds a batch of tasks to the appropriate queues in one pass.
+
+allocation(self, queue_id, resources)
+    Returns the share of a queue's resources allocated to a task with the given requirements.
+
+schedule(self, queue_id)
+    Starts as many queued tasks of the specified queue as fit in its free resources, in micro-batches where the entry allows it.
+
+batch_wait(self, queue_id)
+    Returns how many seconds the specified queue waits to fill a micro-batch.
+
+steal(self, queue_id)
+    Moves one queued task from another queue to the specified queue.
+
+backlogged(self, queue_id)
+    Checks if the specified queue has queued tasks it cannot start now.
+
+start(self, task)
+    Marks a queued task as running and reserves its resources.
+
+start_batch(self, tasks)
+    Marks a micro-batch of queued tasks as running and reserves the resources of one execution.
+
+complete(self, task, data=None)
+    Moves a running task to the result store and releases its resources.
+
 dequeue(self, task)
-    Removes a task from the queue and returns it.
+    Removes a queued or running task from the queue and returns it.
 
-execute(self, task)
-    Executes the specified task using the available resources and algorithm library.
+execute(self, tasks)
+    Submits the specified micro-batch of tasks to the executor of its queue with the resources allocated to it.
 """
 
-from .task import Task
-import pandas as pd
+from .task import Task, task_key
+from .position import PositionIndex
+from .executor import ThreadExecutor, ProcessExecutor
+from .resultstore import ResultStore
+from .fairqueue import FairQueue, PRIORITIES, BACKGROUND, priority_index
+from .progress import ProgressReporter
+from .runtime import RuntimeModel
+from functools import partial
 import numpy as np
+import asyncio
+import copy
+import json
+import time
 import os
 
 
@@ -58,16 +146,106 @@ class TaskQueue(object):
     Attributes:
     ----------
     queues : list of tuples
-        A list of queues, each containing resource configurations and the associated tasks.
-    resource_matrix : pandas.DataFrame
-        A matrix of resources and their quantities available in the system.
-    done_queue : list
-        A list of tasks that have completed execution.
+        A list of queues, each containing resource configurations and a fair queue of the associated tasks.
+    resource_names : list of str
+        The names of the resources provided by the queues, one for each column of the resource matrix.
+    resource_matrix : numpy.ndarray
+        A matrix of the quantity of each resource (column) in each queue (row), NaN where a queue does not list it.
+    results : ResultStore
+        The store of the tasks that have completed execution.
+    runtimes : RuntimeModel
+        The model of the execution time of the tasks of each entry.
+    policies : list of str
+        The policy ordering the tasks of each access ID in each queue: 'fifo', 'sjf' or 'edf'.
+    sjf_stretch : float
+        How many seconds of waiting a task of the 'sjf' policy trades for one second less of expected runtime.
     algorithmlib : dict
         A dictionary of available algorithms for executing tasks.
+    _tasks : dict
+        A dictionary of all queued and running tasks, indexed by their task ID.
+    _index : dict
+        A dictionary mapping each task ID to a tuple (queue_id, state, seq), where seq is the
+        sequence number of the task in the position index of its queue.
+    _positions : list of PositionIndex
+        The position index of each queue.
+    free_resources : list of dicts
+        The resources of each queue not allocated to running tasks.
+    backfill : int
+        How many tasks behind a blocked queue head are checked for tasks that fit the free resources.
+    max_bypass : int
+        How many tasks may start ahead of a blocked queue head before the queue stops backfilling
+        and waits for the head to fit.
+    _allocations : dict
+        A dictionary of the resources allocated to each running execution, indexed by the task ID of
+        the task (or the first task of the micro-batch) it runs.
+    _batches : dict
+        The task IDs still running in each micro-batch of more than one task, indexed by the task ID of
+        its first task.
+    _batch_of : dict
+        The task ID of the first task of the micro-batch of each running task of such a batch.
+    _batch_deadline : list
+        For each queue, the `time.monotonic()` time at which a micro-batch stops waiting for more tasks,
+        or None.
+    _bypass : list of tuples
+        A tuple (task_id, count) for each queue, recording how often its blocked head was bypassed.
+    _running : list of lists
+        The number of running tasks of each priority class in each queue.
+    _queued_count : list of int
+        The number of queued tasks of each queue.
+    _queued_work : list of float
+        The sum of the expected runtimes of the queued tasks of each queue, in seconds.
+    _routes : dict
+        The memoized queue ID for each distinct set of resource requirements.
+    _compatibility : dict
+        The memoized result of `_compatible` for each set of resource requirements and pair of queues.
+    stolen : int
+        The number of tasks moved between queues by work stealing.
+    dedup : bool
+        Whether a task identical to a queued or running task follows it instead of being queued.
+    submitted : int
+        The number of tasks submitted to the task queue.
+    deduplicated : int
+        The number of submitted tasks that followed an identical task.
+    _flights : dict
+        The task ID of the queued or running task (the leader) for each signature (algorithm_id, input data).
+    _signature_of : dict
+        The signature of each leader, indexed by its task ID.
+    _followers : dict
+        The tasks following each leader, indexed by the task ID of the leader.
+    _leader_of : dict
+        The task ID of the leader of each following task.
+    _detached : dict
+        The deleted leaders that keep running for their followers, indexed by their task IDs.
+    _listeners : list
+        The callables called with (task, state) on every state change of a task.
+    progress_interval : float
+        The shortest time between two progress reports of an execution reaching the listeners, in seconds.
+    _chunk_pending : set
+        The task IDs of the streaming tasks with a `CHUNK` notification scheduled on the event loop.
+    executors : list
+        The executor of each queue, a shared `ThreadExecutor` or one `ProcessExecutor` per queue.
+    _futures : dict
+        The execution future of each running execution, indexed by the task ID of its first task.
+    _timers : dict
+        The timer stopping each running execution of an entry with a timeout, indexed like `_futures`.
+    _pulling : set
+        The IDs (indices) of the layouts added by `add_layout`, which tasks are never routed to.
+    _retired : set
+        The IDs (indices) of the retired layouts, reused by the next `add_layout`.
     """
     
-    def __init__(self, queue_configs=[{'cpu': os.cpu_count(), 'cuda': 0}], algorithmlib=None):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    DELETED = 'deleted'
+    PROGRESS = 'progress'
+    CHUNK = 'chunk'
+    CANCELLED = 'cancelled'
+    TIMED_OUT = 'timed-out'
+    
+    def __init__(self, queue_configs=[{'cpu': os.cpu_count(), 'cuda': 0}], algorithmlib=None, backfill=32, max_bypass=8,
+                 executor='thread', results=None, dedup=True, progress_interval=0.25, policy='fifo', runtimes=None,
+                 sjf_stretch=10):
         """
         Initializes the task queue with the given configurations and algorithm library.
         
@@ -77,11 +255,280 @@ class TaskQueue(object):
             A list of dictionaries representing resource configurations for each queue (default is CPU and CUDA configurations).
         algorithmlib : dict, optional
             A dictionary of algorithms available for task execution (default is None).
+        backfill : int, optional
+            How many tasks behind a blocked queue head are checked for tasks that fit (default is 32).
+        max_bypass : int, optional
+            How many tasks may start ahead of a blocked queue head (default is 8).
+        executor : str, optional
+            'thread' to run all queues in one thread pool, or 'process' to fork a pool of worker processes
+            for each queue, one worker per CPU of the queue (default is 'thread').
+        results : ResultStore, optional
+            The store of the finished tasks (default is None, a `ResultStore` with its default limits).
+        dedup : bool, optional
+            Whether a task identical to a queued or running task follows it instead of being queued
+            (default is True).
+        progress_interval : float, optional
+            The shortest time between two progress reports of an execution reaching the listeners, in seconds
+            (default is 0.25).
+        policy : str or list of str, optional
+            The policy of every queue, or a list with the policy of each queue (default is 'fifo'):
+            'fifo' runs the tasks of each access ID in submission order, 'sjf' the shortest expected job first,
+            and 'edf' the earliest deadline first, the tasks without a deadline last.
+        runtimes : RuntimeModel, optional
+            The model of the execution times (default is None, a `RuntimeModel` with its default settings).
+        sjf_stretch : float, optional
+            How many seconds of waiting a task of the 'sjf' policy trades for one second less of expected
+            runtime, so long tasks are not starved by a stream of short ones (default is 10).
+        
+        Raises:
+        ------
+        TypeError
+            If the specified executor type or policy is not supported.
         """
-        self.queues = [(queue_config, []) for queue_config in queue_configs]
-        self.resource_matrix = pd.DataFrame(queue_configs, dtype=float)
-        self.done_queue = []
+        self.policies = policy if isinstance(policy, list) else [policy for _ in queue_configs]
+        if len(self.policies) != len(queue_configs):
+            raise TypeError(f'{len(self.policies)} Policies Not Supported for {len(queue_configs)} Layouts.')
+        self.sjf_stretch = sjf_stretch
+        self.queues = [(queue_config, FairQueue(live=partial(self._queued_on, queue_id),
+                                                key=self._policy_key(self.policies[queue_id])))
+                       for queue_id, queue_config in enumerate(queue_configs)]
+        self._pulling = set()
+        self._retired = set()
+        self._update_resources()
+        self.stolen = 0
+        self.results = results if results is not None else ResultStore()
+        self.runtimes = runtimes if runtimes is not None else RuntimeModel()
         self.algorithmlib = algorithmlib
+        self.progress_interval = progress_interval
+        self.executors = self._build_executors(executor)
+        self._tasks = {}
+        self._index = {}
+        self._positions = [PositionIndex() for _ in queue_configs]
+        self.free_resources = [dict(queue_config) for queue_config in queue_configs]
+        self.backfill = backfill
+        self.max_bypass = max_bypass
+        self._allocations = {}
+        self._batches = {}
+        self._batch_of = {}
+        self._batch_deadline = [None for _ in queue_configs]
+        self.dedup = dedup
+        self.submitted = 0
+        self.deduplicated = 0
+        self._flights = {}
+        self._signature_of = {}
+        self._followers = {}
+        self._leader_of = {}
+        self._detached = {}
+        self._listeners = []
+        self._chunk_pending = set()
+        self._bypass = [(None, 0) for _ in queue_configs]
+        self._running = [[0] * len(PRIORITIES) for _ in queue_configs]
+        self._queued_count = [0 for _ in queue_configs]
+        self._queued_work = [0.0 for _ in queue_configs]
+        self._futures = {}
+        self._timers = {}
+    
+    def _update_resources(self):
+        """
+        Rebuilds the resource matrix from the layouts and forgets the memoized routes.
+        """
+        _configs = [queue_config for queue_config, _ in self.queues]
+        self.resource_names = list(dict.fromkeys(name for queue_config in _configs for name in queue_config))
+        self.resource_matrix = np.array([[queue_config.get(name, np.nan) for name in self.resource_names]
+                                         for queue_config in _configs], dtype=float)
+        self._resource_columns = {name: column for column, name in enumerate(self.resource_names)}
+        with np.errstate(invalid='ignore'):
+            self._resource_max = np.nanmax(self.resource_matrix, axis=0)
+        self._routes = {}
+        self._compatibility = {}
+    
+    def _policy_key(self, policy):
+        """
+        Returns the function ordering the tasks of each access ID in a queue of the given policy.
+        
+        Parameters:
+        ----------
+        policy : str
+            The policy of the queue: 'fifo', 'sjf' or 'edf'.
+        
+        Returns:
+        -------
+        callable or None
+            A function of a task returning its key in the fair queue, lowest first, or None for FIFO order.
+        
+        Raises:
+        ------
+        TypeError
+            If the specified policy is not supported.
+        """
+        if policy == 'fifo':
+            return None
+        elif policy == 'sjf':
+            # Keyed on the submission time, so a long task eventually overtakes the short tasks submitted after it.
+            return lambda task: task.create_clock + self.sjf_stretch * (task.expected_runtime or 0.0)
+        elif policy == 'edf':
+            return lambda task: task.deadline_clock if task.deadline_clock is not None else float('inf')
+        else:
+            raise TypeError(f'{policy} Not Supported for Policy.')
+    
+    def _count_queued(self, queue_id, task, step):
+        """
+        Counts a task entering (step 1) or leaving (step -1) the queued tasks of a queue.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        task : Task
+            The task.
+        step : int
+            1 if the task is queued, -1 if it leaves the queue.
+        """
+        self._queued_count[queue_id] += step
+        if self._queued_count[queue_id] > 0:
+            self._queued_work[queue_id] += step * (task.expected_runtime or 0.0)
+        else:
+            self._queued_work[queue_id] = 0.0
+    
+    def _build_executors(self, executor):
+        """
+        Builds the executor of each queue.
+        
+        Parameters:
+        ----------
+        executor : str
+            The executor type, 'thread' or 'process'.
+        
+        Returns:
+        -------
+        list
+            The executor of each queue.
+        
+        Raises:
+        ------
+        TypeError
+            If the specified executor type is not supported.
+        """
+        if executor == 'thread':
+            _executor = ThreadExecutor(self.algorithmlib)
+            return [_executor for _ in self.queues]
+        elif executor == 'process':
+            return [ProcessExecutor(self.algorithmlib, workers=queue_config.get('cpu', 1),
+                                    progress_interval=self.progress_interval)
+                    for (queue_config, _) in self.queues]
+        else:
+            raise TypeError(f'{executor} Not Supported for Executor.')
+    
+    def add_layout(self, queue_config, executor, policy='fifo'):
+        """
+        Adds a layout served by the given executor, e.g. the resources of a remote worker.
+        
+        Tasks are never routed to the new layout: it pulls the queued tasks the other layouts cannot start now
+        (see `steal`), limited to the entries its executor serves if it has an `entries` attribute. The slot of
+        a retired layout is reused. Must be called on the event loop thread.
+        
+        Parameters:
+        ----------
+        queue_config : dict
+            The resources of the layout.
+        executor : object
+            The executor running the tasks of the layout, with the methods `submit` and `kill`.
+        policy : str, optional
+            The policy of the layout (default is 'fifo').
+        
+        Returns:
+        -------
+        int
+            The ID (index) of the layout.
+        
+        Raises:
+        ------
+        TypeError
+            If the specified policy is not supported.
+        """
+        _key = self._policy_key(policy)
+        if self._retired:
+            queue_id = min(self._retired)
+            self._retired.discard(queue_id)
+        else:
+            queue_id = len(self.queues)
+            self.queues.append(None)
+            self.policies.append(None)
+            self.executors.append(None)
+            self.free_resources.append(None)
+            self._positions.append(None)
+            self._batch_deadline.append(None)
+            self._bypass.append(None)
+            self._running.append(None)
+            self._queued_count.append(0)
+            self._queued_work.append(0.0)
+        self.policies[queue_id] = policy
+        self.queues[queue_id] = (dict(queue_config), FairQueue(live=partial(self._queued_on, queue_id), key=_key))
+        self.executors[queue_id] = executor
+        self.free_resources[queue_id] = dict(queue_config)
+        self._positions[queue_id] = PositionIndex()
+        self._batch_deadline[queue_id] = None
+        self._bypass[queue_id] = (None, 0)
+        self._running[queue_id] = [0] * len(PRIORITIES)
+        self._pulling.add(queue_id)
+        self._update_resources()
+        return queue_id
+    
+    def retire_layout(self, queue_id):
+        """
+        Removes a layout added by `add_layout`, e.g. when its remote worker is lost.
+        
+        Its queued tasks and the tasks of its running executions are routed to the other layouts again, in their
+        order, and the results of those executions are ignored when they arrive. The resources of the layout
+        become zero until its slot is reused. Must be called on the event loop thread.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The ID (index) of the layout.
+        
+        Returns:
+        -------
+        set of int
+            The IDs (indices) of the layouts the tasks were moved to.
+        """
+        _moved = sorted(((seq, task_id, state) for task_id, (_queue_id, state, seq) in self._index.items()
+                         if _queue_id == queue_id))
+        self._retired.add(queue_id)
+        _config = {resource_name: 0 for resource_name in self.queues[queue_id][0]}
+        self.queues[queue_id] = (_config, FairQueue(live=partial(self._queued_on, queue_id),
+                                                    key=self._policy_key(self.policies[queue_id])))
+        self._update_resources()
+        _queue_ids = set()
+        for _, task_id, state in _moved:
+            task = self._tasks.get(task_id, self._detached.get(task_id))
+            if state == self.RUNNING:
+                self._release(queue_id, task)
+                for _task in [task] + self._followers.get(task_id, []):
+                    _task.in_progress = False
+                    _task.start_clock = None
+                    _task.progress = None
+                    _task.progress_message = None
+                if task.stream is not None:
+                    task.stream.discard()
+                    task.stream = None
+            target_id = self.resource_distance(task.required_resources)
+            self._index[task_id] = (target_id, self.QUEUED, self._positions[target_id].add())
+            self._count_queued(target_id, task, 1)
+            self.queues[target_id][1].push(task)
+            _queue_ids.add(target_id)
+            if state == self.RUNNING:
+                for _task in [task] + self._followers.get(task_id, []):
+                    if _task.key not in self._detached:
+                        self._emit(_task, self.QUEUED)
+        self.free_resources[queue_id] = dict(_config)
+        self._positions[queue_id] = PositionIndex()
+        self._batch_deadline[queue_id] = None
+        self._bypass[queue_id] = (None, 0)
+        self._running[queue_id] = [0] * len(PRIORITIES)
+        self._queued_count[queue_id] = 0
+        self._queued_work[queue_id] = 0.0
+        return _queue_ids
     
     def __len__(self):
         """
@@ -94,10 +541,32 @@ class TaskQueue(object):
         """
         return len(self.queues)
     
+    def __contains__(self, task_id):
+        """
+        Checks if a task with the specified task ID is held by the task queue.
+        
+        Parameters:
+        ----------
+        task_id : str or bytes
+            The ID of the task to check, or its binary form.
+        
+        Returns:
+        -------
+        bool
+            True if the task is queued, running or done, False otherwise.
+        """
+        task_id = task_key(task_id)
+        return task_id in self._tasks or task_id in self.results
+    
     def queue_where(self, task):
         """
         Returns the position of the given task in the queue.
         
+        The position counts the running and queued tasks of the same queue that were enqueued before the
+        given task, so the first task of a queue is at position 1. A task following an identical task has
+        the position of that task. Under priority classes and fair sharing
+        tasks may start out of arrival order, so the position is an estimate of the work ahead of the task.
+        
         Parameters:
         ----------
         task : Task
@@ -105,62 +574,242 @@ class TaskQueue(object):
         
         Returns:
         -------
-        int
-            The position of the task in the queue (1-based index).
+        int or None
+            The position of the task in the queue (1-based index), or None if the task is not in a queue.
         """
-        for (_, queue) in self.queues:
-            for pos, task_ in enumerate(queue):
-                if task_.task_id == task.task_id:
-                    return pos + 1
+        _entry = self._index.get(self._leader_of.get(task.key, task.key))
+        if _entry is None:
+            return None
+        queue_id, _, seq = _entry
+        return self._positions[queue_id].rank(seq)
+    
+    def estimate(self, task):
+        """
+        Estimates how many seconds until the given task starts and finishes.
+        
+        The running executions of the queue and the queued tasks ahead of the given one (see `queue_where`)
+        are assumed to take their expected runtime and to share the queue as if it ran as many tasks as the
+        given one at the same time.
+        
+        Parameters:
+        ----------
+        task : Task
+            The queued or running task.
+        
+        Returns:
+        -------
+        tuple or None
+            A tuple (start, finish) of the estimated seconds from now until the task starts and finishes (start
+            is 0 for a running task), or None if the task is not in a queue or no runtime is known yet.
+        """
+        _leader_id = self._leader_of.get(task.key, task.key)
+        _entry = self._index.get(_leader_id)
+        if _entry is None:
+            return None
+        queue_id, state, _ = _entry
+        _leader = self._tasks.get(_leader_id, task)
+        _expected = _leader.expected_runtime
+        if _expected is None:
+            _expected = self.runtimes.expected(_leader)
+            if _expected is None:
+                return None
+        _now = time.monotonic()
+        if state == self.RUNNING:
+            return 0.0, max(_expected - (_now - _leader.start_clock), 0.0)
+        # The running executions, with the time they still need.
+        _busy = 0.0
+        _running = 0
+        for _task_id in self._allocations:
+            _running_entry = self._index.get(_task_id)
+            if _running_entry is None or _running_entry[0] != queue_id:
+                continue
+            _task = self._tasks.get(_task_id)
+            if _task is None or _task.start_clock is None:
+                continue
+            _running += 1
+            if _task.expected_runtime is not None:
+                _busy += max(_task.expected_runtime - (_now - _task.start_clock), 0.0)
+        # The queued tasks ahead, at the average expected runtime of the queued tasks.
+        _ahead = max(self.queue_where(_leader) - 1 - _running, 0)
+        if self._queued_count[queue_id] > 0:
+            _busy += _ahead * self._queued_work[queue_id] / self._queued_count[queue_id]
+        _allocation = self.allocation(queue_id, _leader.required_resources)
+        _config = self.queues[queue_id][0]
+        _slots = min((_config[name] // quantity for name, quantity in _allocation.items() if quantity > 0),
+                     default=1)
+        _start = _busy / max(_slots, 1)
+        return _start, _start + _expected
     
     def __getitem__(self, task_id):
         """
-        Retrieves the task with the specified task ID from the queue or the done queue.
+        Retrieves the task with the specified task ID from the queue or the result store.
         
         Parameters:
         ----------
-        task_id : str
-            The ID of the task to retrieve.
+        task_id : str or bytes
+            The ID of the task to retrieve, or its binary form.
         
         Returns:
         -------
         Task or None
             The task with the specified task ID, or None if the task is not found.
         """
-        for (_, queue) in self.queues:
-            for task in queue:
-                if task.task_id == task_id:
-                    return task
-        for task in self.done_queue:
-            if task.task_id == task_id:
-                return task
-        return None
+        task_id = task_key(task_id)
+        task = self._tasks.get(task_id)
+        if task is None:
+            task = self.results.get(task_id)
+        return task
     
     def __delitem__(self, task_id):
         """
-        Deletes the task with the specified task ID from the queue or done queue.
+        Deletes the task with the specified task ID from the queue or the result store.
+        
+        A queued task is left in its queue as a tombstone and skipped when it reaches the head,
+        so deletion does not shift the queue. A task followed by identical tasks is hidden but keeps
+        running for its followers.
         
         Parameters:
         ----------
-        task_id : str
-            The ID of the task to delete.
+        task_id : str or bytes
+            The ID of the task to delete, or its binary form.
         
         Raises:
         ------
         LookupError
-            If the task is not found in any of the queues or the done queue.
+            If the task is not found in any of the queues or the result store.
         """
-        for i in range(len(self.done_queue)):
-            if task_id == self.done_queue[i].task_id:
-                del self.done_queue[i]
-                return
-        for (_, queue) in self.queues:
-            for i in range(len(queue)):
-                if task_id == queue[i].task_id:
-                    queue[i].cancel()
-                    del queue[i]
-                    return
-        raise LookupError('Task not found')
+        task_id = task_key(task_id)
+        task = self.results.get(task_id)
+        if task is not None:
+            del self.results[task_id]
+            self._emit(task, self.DELETED)
+            return
+        task = self._tasks.get(task_id)
+        if task is None:
+            raise LookupError('Task not found')
+        if task_id in self._leader_of:
+            self._followers[self._leader_of.pop(task_id)].remove(task)
+            del self._tasks[task_id]
+        elif len(self._followers.get(task_id, [])) > 0:
+            self._detached[task_id] = task
+            del self._tasks[task_id]
+        else:
+            self.dequeue(task)
+            task.cancel()
+            if task.stream is not None:
+                task.stream.discard()
+        self._emit(task, self.DELETED)
+    
+    def stop(self, task_id, status=CANCELLED):
+        """
+        Stops a queued or running task and stores it as finished with the given status.
+        
+        The resources of the task are freed at once. Its execution is killed if no other task of its
+        micro-batch still needs it and its executor can stop it; a thread of the `ThreadExecutor` cannot be
+        stopped and runs to its end unobserved. A task followed by identical tasks keeps running for its
+        followers, and a following task is only removed from its leader. The output chunks a streaming task
+        produced before it was stopped are kept.
+        
+        Parameters:
+        ----------
+        task_id : str or bytes
+            The ID of the task to stop, or its binary form.
+        status : str, optional
+            `CANCELLED` or `TIMED_OUT`, stored in `Task.interrupted` (default is `CANCELLED`).
+        
+        Returns:
+        -------
+        Task
+            The stopped task, or the task itself if it had already finished.
+        
+        Raises:
+        ------
+        LookupError
+            If the task is not found in any of the queues or the result store.
+        """
+        task_id = task_key(task_id)
+        task = self._tasks.get(task_id)
+        if task is None:
+            task = self.results.get(task_id)
+            if task is None:
+                raise LookupError('Task not found')
+            return task
+        if task_id in self._leader_of:
+            self._followers[self._leader_of.pop(task_id)].remove(task)
+            del self._tasks[task_id]
+        elif len(self._followers.get(task_id, [])) > 0:
+            self._detached[task_id] = task
+            del self._tasks[task_id]
+            # The record of the stopped task, while the leader keeps running for its followers.
+            task = copy.copy(task)
+        else:
+            self._halt(task)
+        task.interrupted = status
+        if status == self.TIMED_OUT:
+            task._execute_finish(False, f'Task timed out after {self._timeout(task.algorithm_id)} seconds')
+        else:
+            task._execute_finish(False, 'Task cancelled')
+        self._store(task)
+        return task
+    
+    def _halt(self, task):
+        """
+        Removes a queued or running task from the queue, killing its execution if no other task of its
+        micro-batch still needs it.
+        
+        Parameters:
+        ----------
+        task : Task
+            The task to remove.
+        """
+        _entry = self._index.get(task.key)
+        if _entry is not None and _entry[1] == self.RUNNING:
+            _key = self._batch_of.get(task.key, task.key)
+            _members = self._batches.get(_key)
+            _future = self._futures.get(_key)
+            if _future is not None and (_members is None or _members == {task.key}):
+                self.executors[_entry[0]].kill(_future)
+        self.dequeue(task)
+        task.cancel()
+    
+    def _timeout(self, algorithm_id):
+        """
+        Returns the execution timeout of an entry.
+        
+        Parameters:
+        ----------
+        algorithm_id : str
+            The ID of the entry.
+        
+        Returns:
+        -------
+        float or None
+            The timeout in seconds, or None if the entry has none or is unknown.
+        """
+        try:
+            return getattr(self.algorithmlib[algorithm_id], 'timeout', None)
+        except Exception:
+            return None
+    
+    def _expire(self, tasks):
+        """
+        Stops the tasks of an execution that outlived the timeout of its entry, with their followers.
+        
+        Parameters:
+        ----------
+        tasks : list of Task
+            The tasks of the execution.
+        """
+        for task in tasks:
+            if not self.is_running(task):
+                continue
+            for follower in list(self._followers.get(task.key, [])):
+                self.stop(follower.key, self.TIMED_OUT)
+            if task.key in self._detached:
+                # A deleted leader was only running for its followers.
+                self._halt(task)
+            else:
+                self.stop(task.key, self.TIMED_OUT)
     
     def is_header(self, task):
         """
@@ -176,16 +825,271 @@ class TaskQueue(object):
         bool
             True if the task is the first task in the queue, False otherwise.
         """
-        task_id = task.task_id
-        for (_, queue) in self.queues:
-            if len(queue) > 0 and task_id == queue[0].task_id:
-                return True
-        return False
+        _entry = self._index.get(task.key)
+        if _entry is None or _entry[1] != self.QUEUED:
+            return False
+        return self.header(_entry[0]) is task
+    
+    def add_listener(self, listener):
+        """
+        Registers a callable called on every state change of a task.
+        
+        The listener is called on the event loop thread with the task and its new state: `QUEUED` when it is
+        enqueued, `RUNNING` when it starts, `PROGRESS` when its entry reports progress, `CHUNK` when its
+        streaming entry produced output chunks, `DONE` when its result is stored and `DELETED` when it is deleted before finishing or its result is deleted. Exceptions raised
+        by a listener are ignored.
+        
+        Parameters:
+        ----------
+        listener : callable
+            A callable taking (task, state).
+        """
+        self._listeners.append(listener)
+    
+    def _emit(self, task, state):
+        """
+        Calls the listeners for a state change of a task.
+        
+        Parameters:
+        ----------
+        task : Task
+            The task whose state changed.
+        state : str
+            The new state of the task.
+        """
+        for listener in self._listeners:
+            try:
+                listener(task, state)
+            except Exception:
+                pass
+    
+    def is_running(self, task, execution=None):
+        """
+        Checks if the task is being executed by the task queue.
+        
+        Parameters:
+        ----------
+        task : Task
+            The task to check.
+        execution : concurrent.futures.Future, optional
+            The execution future returned by `execute`, to check that the task is still run by it and was not
+            moved back to a queue and started again (default is None, any execution).
+        
+        Returns:
+        -------
+        bool
+            True if the task was started and has neither completed nor been deleted, False otherwise.
+        """
+        _entry = self._index.get(task.key)
+        if _entry is None or _entry[1] != self.RUNNING:
+            return False
+        return execution is None or self._futures.get(self._batch_of.get(task.key, task.key)) is execution
+    
+    @property
+    def dedup_rate(self):
+        """
+        Returns the share of the submitted tasks that followed an identical task instead of running.
+        
+        Returns:
+        -------
+        float
+            The number of deduplicated tasks divided by the number of submitted tasks, 0 if none.
+        """
+        return self.deduplicated / self.submitted if self.submitted > 0 else 0.0
+    
+    def _follow(self, task):
+        """
+        Makes a task follow an identical queued or running task, or records it as the leader of its signature.
+        
+        Parameters:
+        ----------
+        task : Task
+            The task being enqueued.
+        
+        Returns:
+        -------
+        int or None
+            The ID (index) of the queue of the leader if the task follows it, None if the task is to be queued.
+        """
+        self.submitted += 1
+        if not self.dedup or self._streaming(task.algorithm_id):
+            return None
+        try:
+            _signature = (task.algorithm_id, json.dumps(task.input_data, sort_keys=True))
+        except (TypeError, ValueError):
+            return None
+        _leader_id = self._flights.get(_signature)
+        if _leader_id is None:
+            self._flights[_signature] = task.key
+            self._signature_of[task.key] = _signature
+            return None
+        self._followers.setdefault(_leader_id, []).append(task)
+        self._leader_of[task.key] = _leader_id
+        self._tasks[task.key] = task
+        self.deduplicated += 1
+        queue_id, state, _ = self._index[_leader_id]
+        if state == self.RUNNING:
+            task._execute_start()
+        self._emit(task, state)
+        return queue_id
+    
+    def _store(self, task, data=None):
+        """
+        Puts a finished task in the result store and calls the listeners for its completion, which may read its
+        pickled output with `ResultStore.pickled` until it is released.
+        
+        Parameters:
+        ----------
+        task : Task
+            The finished task.
+        data : bytes, optional
+            The pickled output of the task, if it was pickled by the executor (default is None).
+        """
+        self.results.put(task, data)
+        try:
+            self._emit(task, self.DONE)
+        finally:
+            self.results.release()
+    
+    def _land(self, task, data=None):
+        """
+        Ends the flight of a leader that left the queue, handing its result to its followers if it finished.
+        
+        Parameters:
+        ----------
+        task : Task
+            The leader that completed or was deleted.
+        data : bytes, optional
+            The pickled output of the leader, shared by its followers (default is None).
+        """
+        _signature = self._signature_of.pop(task.key, None)
+        if _signature is not None:
+            del self._flights[_signature]
+        self._detached.pop(task.key, None)
+        for follower in self._followers.pop(task.key, []):
+            del self._leader_of[follower.key]
+            del self._tasks[follower.key]
+            follower._execute_finish(task.error is None, task.output_data if task.error is None else task.error)
+            self._store(follower, data)
+    
+    def header(self, queue_id):
+        """
+        Returns the queued task of the specified queue that should run next.
+        
+        The task is chosen by priority class and weighted fair sharing across access IDs (see `FairQueue`).
+        Background tasks are only offered while the queue runs no task of a higher class.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        
+        Returns:
+        -------
+        Task or None
+            The next queued task of the queue, or None if the queue is empty.
+        """
+        return self.queues[queue_id][1].head(background=self._background_allowed(queue_id))
+    
+    def _queued_on(self, queue_id, task):
+        """
+        Checks if a task is still queued on the specified queue.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        task : Task
+            The task to check.
+        
+        Returns:
+        -------
+        bool
+            True if the task is queued on the queue, False if it was deleted, started or stolen.
+        """
+        _entry = self._index.get(task.key)
+        return _entry is not None and _entry[0] == queue_id and _entry[1] == self.QUEUED
+    
+    def _background_allowed(self, queue_id):
+        """
+        Checks if background tasks may start on the specified queue, i.e. the queue runs no task of a higher class.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        
+        Returns:
+        -------
+        bool
+            True if background tasks may start, False otherwise.
+        """
+        return sum(self._running[queue_id][:BACKGROUND]) == 0
+    
+    def _resource_vectors(self, resources_list):
+        """
+        Converts resource requirements into a quantity matrix and a mask matrix over the resource columns.
+        
+        Parameters:
+        ----------
+        resources_list : list of dicts
+            A list of dictionaries of resource names and quantities required by the tasks.
+        
+        Returns:
+        -------
+        tuple
+            A tuple (quantities, requested) of arrays shaped (tasks, resources). A quantity of -1 is replaced
+            with the largest quantity of the resource among the queues. Resources no queue provides are ignored.
+        """
+        _quantities = np.zeros((len(resources_list), len(self.resource_names)))
+        _requested = np.zeros((len(resources_list), len(self.resource_names)), dtype=bool)
+        for row, resources in enumerate(resources_list):
+            for resource_name, resource_quantity in resources.items():
+                column = self._resource_columns.get(resource_name)
+                if column is None:
+                    continue
+                if resource_quantity == -1:
+                    resource_quantity = self._resource_max[column]
+                _quantities[row, column] = resource_quantity
+                _requested[row, column] = True
+        return _quantities, _requested
+    
+    def resource_distances(self, resources_list):
+        """
+        Calculates the resource distance of a batch of tasks to every queue in one vectorized pass and returns
+        the queue ID with the minimum resource distance for each task.
+        
+        For a requested resource, the distance to a queue is the requested quantity minus the quantity of the queue,
+        or infinity if the queue has none of a non-zero request. A resource that is not requested contributes the
+        quantity of the queue, so smaller queues are preferred. The layouts added by `add_layout` are never chosen.
+        
+        Parameters:
+        ----------
+        resources_list : list of dicts
+            A list of dictionaries of resource names and quantities required by the tasks.
+        
+        Returns:
+        -------
+        numpy.ndarray
+            The queue ID (index) with the minimum resource distance for each task.
+        """
+        _quantities, _requested = self._resource_vectors(resources_list)
+        _quantities, _requested = _quantities[:, None, :], _requested[:, None, :]
+        _matrix = self.resource_matrix[None, :, :]
+        with np.errstate(invalid='ignore'):
+            _dis = np.where(_requested, _quantities - _matrix, _matrix)
+            _dis = np.where(_requested & (_quantities != 0) & (_matrix == 0), np.inf, _dis)
+            _dis = np.abs(np.nansum(_dis, axis=2))
+        if self._pulling:
+            _dis[:, sorted(self._pulling)] = np.inf
+        return np.argmin(_dis, axis=1)
     
     def resource_distance(self, resources):
         """
         Calculates the resource distance for task scheduling and returns the queue ID with the minimum resource distance.
         
+        The route only depends on the requirements, so it is memoized for every distinct set of requirements.
+        
         Parameters:
         ----------
         resources : dict
@@ -196,15 +1100,11 @@ class TaskQueue(object):
         int
             The queue ID (index) with the minimum resource distance.
         """
-        _dis = self.resource_matrix.copy(deep=True)
-        for resource_name, resource_quantity in resources.items():
-            if resource_quantity == -1:
-                resource_quantity = self.resource_matrix[resource_name].max()
-            _dis[resource_name] = resource_quantity - _dis[resource_name]
-            if resource_quantity != 0:
-                _dis.loc[self.resource_matrix[resource_name] == 0, resource_name] = np.inf
-        _dis = np.abs(np.nansum(_dis.values, axis=1))
-        _queue_id = np.argmin(_dis)
+        _signature = tuple(sorted(resources.items()))
+        _queue_id = self._routes.get(_signature)
+        if _queue_id is None:
+            _queue_id = int(self.resource_distances([resources])[0])
+            self._routes[_signature] = _queue_id
         return _queue_id
     
     def enqueue(self, task):
@@ -215,14 +1115,457 @@ class TaskQueue(object):
         ----------
         task : Task
             The task to enqueue.
+        
+        Returns:
+        -------
+        int
+            The ID (index) of the queue the task was added to.
         """
+        _leader_queue_id = self._follow(task)
+        if _leader_queue_id is not None:
+            return _leader_queue_id
         _required_resources = task.required_resources
         queue_id = self.resource_distance(_required_resources)
-        self.queues[queue_id][1].append(task)
+        seq = self._positions[queue_id].add()
+        self._index[task.key] = (queue_id, self.QUEUED, seq)
+        self._tasks[task.key] = task
+        task.expected_runtime = self.runtimes.expected(task)
+        self._count_queued(queue_id, task, 1)
+        self.queues[queue_id][1].push(task)
+        self._emit(task, self.QUEUED)
+        return queue_id
+    
+    def enqueue_many(self, tasks):
+        """
+        Adds a batch of tasks to the appropriate queues in one pass.
+        
+        Tasks sharing the same resource requirements object (e.g. the tasks of one entry) are routed once. The
+        position indexes are updated once for a large batch (e.g. the queued tasks recovered from the journal),
+        instead of once per task.
+        
+        Parameters:
+        ----------
+        tasks : list of Task
+            The tasks to enqueue, in order.
+        
+        Returns:
+        -------
+        set of int
+            The IDs (indices) of the queues the tasks were added to.
+        """
+        _routes = {}
+        _positions = [positions for positions in self._positions if positions is not None]
+        for positions in _positions:
+            positions.defer(len(tasks))
+        try:
+            self._enqueue_each(tasks, _routes)
+        finally:
+            for positions in _positions:
+                positions.resume()
+        return set(_routes.values())
+    
+    def _enqueue_each(self, tasks, routes):
+        """
+        Adds the tasks of a batch to their queues one by one.
+    
+        Parameters:
+        ----------
+        tasks : list of Task
+            The tasks to enqueue, in order.
+        routes : dict
+            The queue ID of each resource requirements object already routed, filled in here.
+        """
+        for task in tasks:
+            if self._follow(task) is not None:
+                continue
+            _required_resources = task.required_resources
+            queue_id = routes.get(id(_required_resources))
+            if queue_id is None:
+                queue_id = routes[id(_required_resources)] = self.resource_distance(_required_resources)
+            seq = self._positions[queue_id].add()
+            self._index[task.key] = (queue_id, self.QUEUED, seq)
+            self._tasks[task.key] = task
+            task.expected_runtime = self.runtimes.expected(task)
+            self._count_queued(queue_id, task, 1)
+            self.queues[queue_id][1].push(task)
+            self._emit(task, self.QUEUED)
+    
+    def allocation(self, queue_id, resources):
+        """
+        Returns the share of a queue's resources allocated to a task with the given requirements.
+        
+        A quantity of -1 requests the whole resource of the queue. Resources the task does not mention are
+        not allocated, and requests larger than the queue are capped to the queue's resources.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        resources : dict
+            A dictionary of resource names and quantities required by the task.
+        
+        Returns:
+        -------
+        dict
+            A dictionary of resource names and the quantities allocated to the task.
+        """
+        _allocation = {}
+        for resource_name, capacity in self.queues[queue_id][0].items():
+            resource_quantity = resources.get(resource_name, 0)
+            if resource_quantity == -1 or resource_quantity > capacity:
+                resource_quantity = capacity
+            _allocation[resource_name] = resource_quantity
+        return _allocation
+    
+    def _fits(self, queue_id, task):
+        """
+        Checks if a task fits in the free resources of a queue.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        task : Task
+            The task to check.
+        
+        Returns:
+        -------
+        bool
+            True if every resource allocated to the task is free, False otherwise.
+        """
+        _free = self.free_resources[queue_id]
+        _allocation = self.allocation(queue_id, task.required_resources)
+        return all(_free[resource_name] >= quantity for resource_name, quantity in _allocation.items())
+    
+    def schedule(self, queue_id):
+        """
+        Starts as many queued tasks of the specified queue as fit in its free resources.
+        
+        Tasks are started in the order of the fair queue (see `FairQueue`). When the head of the queue
+        does not fit, up to `backfill` tasks behind it may start instead if they fit, but only
+        `max_bypass` times for the same head. After that the queue waits until enough resources are
+        released for the head, so large tasks are not starved by a stream of small ones. When the queue
+        runs out of tasks while resources are still free, it steals tasks from other queues (see `steal`).
+        
+        A head of a batchable entry starts together with the queued tasks of the same entry behind it, as
+        one micro-batch sharing the resources of one execution (see `_gather`).
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        
+        Returns:
+        -------
+        list of lists of Task
+            The micro-batches that were started, each to be run by one call of `execute`.
+        """
+        _started = []
+        self._batch_deadline[queue_id] = None
+        while True:
+            head = self.header(queue_id)
+            if head is None and self.steal(queue_id) is None:
+                return _started
+            if head is None:
+                continue
+            if not self._fits(queue_id, head):
+                break
+            _batch = self._gather(queue_id, head)
+            if _batch is None:
+                # The head waits for more tasks to fill its batch.
+                return _started
+            self.start_batch(_batch)
+            _started.append(_batch)
+        
+        # The head is blocked, backfill with tasks behind it while the head may still be bypassed.
+        _head_id, _bypassed = self._bypass[queue_id]
+        if _head_id != head.key:
+            _bypassed = 0
+        for task in self.queues[queue_id][1].candidates(self.backfill + 1,
+                                                        background=self._background_allowed(queue_id)):
+            if _bypassed >= self.max_bypass:
+                break
+            if task is head or not self._queued_on(queue_id, task):
+                continue
+            if task.priority == PRIORITIES[BACKGROUND] and not self._background_allowed(queue_id):
+                continue
+            if self._fits(queue_id, task):
+                self.start(task)
+                _started.append([task])
+                _bypassed += 1
+        self._bypass[queue_id] = (head.key, _bypassed)
+        return _started
+    
+    def _gather(self, queue_id, head):
+        """
+        Collects the micro-batch started with the head of a queue.
+        
+        If the entry of the head is batchable, up to `max_batch - 1` queued tasks of the same entry and
+        priority class are taken from the queue in serving order. A batch that is not full waits until
+        the head is `max_wait_ms` old, in case more tasks arrive.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        head : Task
+            The head of the queue.
+        
+        Returns:
+        -------
+        list of Task or None
+            The tasks of the micro-batch, starting with the head, or None if the batch waits.
+        """
+        _entry = None
+        if self.algorithmlib is not None and head.algorithm_id in self.algorithmlib:
+            _entry = self.algorithmlib[head.algorithm_id]
+        if not getattr(_entry, 'batchable', False) or _entry.max_batch <= 1:
+            return [head]
+        _batch = [head]
+        for task in self.queues[queue_id][1].candidates(self.backfill + _entry.max_batch,
+                                                        background=self._background_allowed(queue_id)):
+            if len(_batch) >= _entry.max_batch:
+                break
+            if task is not head and task.algorithm_id == head.algorithm_id and task.priority == head.priority:
+                _batch.append(task)
+        if len(_batch) < _entry.max_batch:
+            _waited = head._get_clock() - head.create_clock
+            if _waited * 1000 < _entry.max_wait_ms:
+                self._batch_deadline[queue_id] = time.monotonic() + _entry.max_wait_ms / 1000 - _waited
+                return None
+        return _batch
+    
+    def batch_wait(self, queue_id):
+        """
+        Returns how many seconds the specified queue waits to fill a micro-batch.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        
+        Returns:
+        -------
+        float or None
+            The seconds until the waiting micro-batch starts anyway, or None if no batch is waiting.
+        """
+        _deadline = self._batch_deadline[queue_id]
+        if _deadline is None:
+            return None
+        return max(0.0, _deadline - time.monotonic())
+    
+    def _compatible(self, task, source_id, target_id):
+        """
+        Checks if a task routed to the source queue can run on the target queue.
+        
+        The target must provide every resource the task requests and at least as much of it as the task
+        is allocated on the source queue. The result is memoized per set of requirements.
+        
+        Parameters:
+        ----------
+        task : Task
+            The task to check.
+        source_id : int
+            The index of the queue the task is routed to.
+        target_id : int
+            The index of the queue that would run the task.
+        
+        Returns:
+        -------
+        bool
+            True if the target queue can satisfy the task, False otherwise.
+        """
+        _key = (tuple(sorted(task.required_resources.items())), source_id, target_id)
+        _compatible = self._compatibility.get(_key)
+        if _compatible is None:
+            _allocation = self.allocation(source_id, task.required_resources)
+            _target = self.queues[target_id][0]
+            _compatible = True
+            for resource_name, resource_quantity in task.required_resources.items():
+                if resource_quantity == 0:
+                    continue
+                capacity = _target.get(resource_name, 0)
+                if capacity <= 0 or capacity < _allocation.get(resource_name, 0):
+                    _compatible = False
+                    break
+            self._compatibility[_key] = _compatible
+        return _compatible
+    
+    def steal(self, queue_id):
+        """
+        Moves one queued task from another queue to the specified queue.
+        
+        Queues are visited from the longest to the shortest. From each, up to `backfill` queued tasks are
+        checked from the head, and the first one that its own queue cannot start now, that the specified
+        queue can satisfy, whose entry its executor serves, and that fits in the free resources of the specified
+        queue is moved to its tail. Tasks that are not stolen keep their order. A retired queue steals nothing.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue stealing a task.
+        
+        Returns:
+        -------
+        Task or None
+            The stolen task, or None if no task could be stolen.
+        """
+        if queue_id in self._retired:
+            return None
+        _entries = getattr(self.executors[queue_id], 'entries', None)
+        _victims = sorted((victim_id for victim_id in range(len(self.queues)) if victim_id != queue_id),
+                          key=lambda victim_id: len(self._positions[victim_id]), reverse=True)
+        for victim_id in _victims:
+            if self.header(victim_id) is None:
+                continue
+            for task in self.queues[victim_id][1].candidates(self.backfill,
+                                                             background=self._background_allowed(queue_id)):
+                if (self._fits(victim_id, task) or not self._compatible(task, victim_id, queue_id)
+                        or (_entries is not None and task.algorithm_id not in _entries)
+                        or not self._fits(queue_id, task)):
+                    continue
+                # The stolen task stays in the fair queue of the victim and is skipped there.
+                self._positions[victim_id].remove(self._index[task.key][2])
+                self._count_queued(victim_id, task, -1)
+                seq = self._positions[queue_id].add()
+                self._index[task.key] = (queue_id, self.QUEUED, seq)
+                self._count_queued(queue_id, task, 1)
+                self.queues[queue_id][1].push(task)
+                self.stolen += 1
+                return task
+        return None
+    
+    def backlogged(self, queue_id):
+        """
+        Checks if the specified queue has queued tasks it cannot start now.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue.
+        
+        Returns:
+        -------
+        bool
+            True if the head of the queue is waiting for resources, False otherwise.
+        """
+        head = self.header(queue_id)
+        return head is not None and not self._fits(queue_id, head)
+    
+    def start(self, task):
+        """
+        Marks a queued task as running and reserves its resources.
+        
+        Parameters:
+        ----------
+        task : Task
+            The task to start.
+        
+        Returns:
+        -------
+        int
+            The ID (index) of the queue running the task.
+        """
+        queue_id, _, seq = self._index[task.key]
+        self._index[task.key] = (queue_id, self.RUNNING, seq)
+        self.queues[queue_id][1].served(task)
+        self._count_queued(queue_id, task, -1)
+        self._running[queue_id][priority_index(task.priority)] += 1
+        _allocation = self.allocation(queue_id, task.required_resources)
+        _free = self.free_resources[queue_id]
+        for resource_name, quantity in _allocation.items():
+            _free[resource_name] -= quantity
+        self._allocations[task.key] = _allocation
+        return queue_id
+    
+    def start_batch(self, tasks):
+        """
+        Marks a micro-batch of queued tasks as running and reserves the resources of one execution.
+        
+        The resources are reserved for the first task and released when the last task of the batch
+        completes or is deleted.
+        
+        Parameters:
+        ----------
+        tasks : list of Task
+            The tasks of the micro-batch, all queued on the same queue.
+        
+        Returns:
+        -------
+        int
+            The ID (index) of the queue running the tasks.
+        """
+        queue_id = self.start(tasks[0])
+        if len(tasks) > 1:
+            _key = tasks[0].key
+            self._batches[_key] = {task.key for task in tasks}
+            for task in tasks[1:]:
+                seq = self._index[task.key][2]
+                self._index[task.key] = (queue_id, self.RUNNING, seq)
+                self.queues[queue_id][1].served(task)
+                self._count_queued(queue_id, task, -1)
+                self._batch_of[task.key] = _key
+        return queue_id
+    
+    def _release(self, queue_id, task):
+        """
+        Releases the resources reserved by a running task.
+        
+        Parameters:
+        ----------
+        queue_id : int
+            The index of the queue running the task.
+        task : Task
+            The task whose resources are released.
+        """
+        _key = self._batch_of.pop(task.key, task.key)
+        _members = self._batches.get(_key)
+        if _members is not None:
+            # The resources of a micro-batch are released with its last task.
+            _members.discard(task.key)
+            if len(_members) > 0:
+                return
+            del self._batches[_key]
+        _allocation = self._allocations.pop(_key, None)
+        if _allocation is None:
+            return
+        self._futures.pop(_key, None)
+        _timer = self._timers.pop(_key, None)
+        if _timer is not None:
+            _timer.cancel()
+        self._running[queue_id][priority_index(task.priority)] -= 1
+        _free = self.free_resources[queue_id]
+        for resource_name, quantity in _allocation.items():
+            _free[resource_name] += quantity
+    
+    def complete(self, task, data=None):
+        """
+        Moves a running task to the result store and releases its resources.
+        
+        Parameters:
+        ----------
+        task : Task
+            The task that finished execution.
+        data : bytes, optional
+            The pickled output of the task, as returned by the executor (default is None, pickled by the
+            result store).
+        """
+        _entry = self._index.pop(task.key, None)
+        if _entry is None:
+            return
+        queue_id, _, seq = _entry
+        self._release(queue_id, task)
+        self._positions[queue_id].remove(seq)
+        self.runtimes.observe(task)
+        _detached = task.key in self._detached
+        self._land(task, data)
+        if not _detached:
+            del self._tasks[task.key]
+            self._store(task, data)
     
     def dequeue(self, task):
         """
-        Removes a task from the queue and returns it.
+        Removes a queued or running task from the queue and returns it.
         
         Parameters:
         ----------
@@ -234,25 +1577,131 @@ class TaskQueue(object):
         Task
             The dequeued task.
         """
-        for (_, queue) in self.queues:
-            if len(queue) > 0 and task.task_id == queue[0].task_id:
-                del queue[0]
+        _entry = self._index.pop(task.key, None)
+        if _entry is None:
+            return task
+        queue_id, state, seq = _entry
+        # A deleted leader running for its followers is no longer held.
+        self._tasks.pop(task.key, None)
+        if state == self.QUEUED:
+            self._count_queued(queue_id, task, -1)
+        self._release(queue_id, task)
+        self._positions[queue_id].remove(seq)
+        self._land(task)
         return task
     
-    def execute(self, task):
+    def execute(self, tasks):
         """
-        Executes the specified task using the available resources and algorithm library.
+        Submits the specified micro-batch of tasks to the executor of its queue with the resources allocated to it.
+        
+        The resources also hold the progress callback of the tasks under 'progress' and, for a streaming entry,
+        the chunk sink of its task under 'stream'. If the entry has a timeout, the tasks are stopped with the
+        `TIMED_OUT` status when the execution outlives it.
         
         Parameters:
         ----------
-        task : Task
-            The task to execute.
+        tasks : list of Task
+            The tasks to execute in one call, as started by `schedule`.
         
         Returns:
         -------
-        object
-            The output data generated by the task after execution.
+        concurrent.futures.Future
+            A future resolving to the list of tuples (success, output) of the tasks.
+        """
+        queue_id = self._index[tasks[0].key][0]
+        for task in tasks:
+            task._execute_start()
+            self._emit(task, self.RUNNING)
+            for follower in self._followers.get(task.key, []):
+                follower._execute_start()
+                self._emit(follower, self.RUNNING)
+        try:
+            _loop = asyncio.get_running_loop()
+        except RuntimeError:
+            _loop = None
+        _resources = dict(self._allocations.get(tasks[0].key, {}))
+        _resources['progress'] = ProgressReporter(_loop, partial(self._progress, tasks),
+                                                  interval=self.progress_interval)
+        if self._streaming(tasks[0].algorithm_id):
+            # A streaming entry is never batched.
+            tasks[0].stream = self.results.spool(tasks[0].task_id, notify=partial(self._chunked, _loop, tasks[0]))
+            _resources['stream'] = tasks[0].stream.append
+        future = self.executors[queue_id].submit(tasks[0].algorithm_id, [task.input_data for task in tasks],
+                                                 _resources)
+        self._futures[tasks[0].key] = future
+        _timeout = self._timeout(tasks[0].algorithm_id)
+        if _timeout is not None and _loop is not None:
+            self._timers[tasks[0].key] = _loop.call_later(_timeout, self._expire, tasks)
+        return future
+    
+    def _streaming(self, algorithm_id):
+        """
+        Checks if an entry yields its output in chunks.
+        
+        Parameters:
+        ----------
+        algorithm_id : str
+            The ID of the entry.
+        
+        Returns:
+        -------
+        bool
+            True if the entry is a generator, False otherwise or if it is unknown.
+        """
+        try:
+            return bool(getattr(self.algorithmlib[algorithm_id], 'streaming', False))
+        except Exception:
+            return False
+    
+    def _chunked(self, loop, task):
+        """
+        Notifies the listeners that a streaming task produced output chunks. Called by the thread running the
+        entry; the notifications of the chunks produced within one iteration of the event loop are merged.
+        
+        Parameters:
+        ----------
+        loop : asyncio.AbstractEventLoop or None
+            The event loop the listeners run on, or None to call them directly.
+        task : Task
+            The streaming task.
+        """
+        if task.key in self._chunk_pending:
+            return
+        self._chunk_pending.add(task.key)
+        if loop is None:
+            self._emit_chunk(task)
+        else:
+            loop.call_soon_threadsafe(self._emit_chunk, task)
+    
+    def _emit_chunk(self, task):
+        """
+        Calls the listeners for new output chunks of a streaming task.
+        
+        Parameters:
+        ----------
+        task : Task
+            The streaming task.
+        """
+        self._chunk_pending.discard(task.key)
+        self._emit(task, self.CHUNK)
+    
+    def _progress(self, tasks, fraction, message):
+        """
+        Records a progress report of an execution on its running tasks and their followers.
+        
+        Parameters:
+        ----------
+        tasks : list of Task
+            The tasks of the execution.
+        fraction : float
+            The completed fraction of the work, between 0 and 1.
+        message : str or None
+            A short description of the current step.
         """
-        for (resource, queue) in self.queues:
-            if len(queue) > 0 and task.task_id == queue[0].task_id:
-                return task.execute(algorithmlib=self.algorithmlib, resources=resource)
+        for task in tasks:
+            if not self.is_running(task):
+                continue
+            for _task in [task] + self._followers.get(task.key, []):
+                _task.progress = fraction
+                _task.progress_message = message
+                self._emit(_task, self.PROGRESS)
@@ -0,0 +1,358 @@
+"""
+Remote Worker Module
+--------------------
+
+This module defines the `Worker` class, which runs entries on another host for the task queue of a server. A
+worker connects to the `WorkerHub` of the server (see `easyapi.taskmodel.remote`), registers its resources and
+the entries of its algorithm library, and runs the executions the server leases to it in a thread pool or in
+worker processes, like the local layouts of the server. It sends a heartbeat every few seconds, so the server
+queues its tasks again on the other layouts if it dies. When the connection breaks, the running executions are
+stopped and the worker connects again.
+
+A worker is started from the command line, with the same kind of configuration file as the server (usually one
+listing the same modules), given by the 'easyapi_config' environment variable or `--config`:
+
+    easyapi worker --connect server:7700 --key secret --layout cpu=32,cuda=0
+
+Classes:
+--------
+Worker
+    A remote worker running the executions leased by a server.
+
+Functions:
+----------
+parse_layout(text)
+    Parses the resources of a worker, e.g. 'cpu=32,cuda=0'.
+
+serve(connect, key, layout, executor, name, config, reconnect)
+    Loads the algorithm library from the configuration and runs a worker until it is interrupted.
+"""
+
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, AuthenticationError
+from .taskmodel.executor import ThreadExecutor, ProcessExecutor, pack_results
+from .taskmodel.progress import ProgressThrottle
+
+
+def parse_layout(text):
+    """
+    Parses the resources of a worker, e.g. 'cpu=32,cuda=0'.
+
+    Parameters:
+    ----------
+    text : str
+        Comma-separated pairs of a resource name and its quantity.
+
+    Returns:
+    -------
+    dict
+        A dictionary of resource names and quantities.
+
+    Raises:
+    ------
+    ValueError
+        If a pair has no quantity or the quantity is not a number.
+    """
+    layout = {}
+    for pair in text.split(','):
+        if not pair.strip():
+            continue
+        name, _, quantity = pair.partition('=')
+        quantity = float(quantity)
+        layout[name.strip()] = int(quantity) if quantity.is_integer() else quantity
+    return layout
+
+
+class Worker(object):
+    """
+    A remote worker running the executions leased by a server.
+
+    Attributes:
+    ----------
+    algorithmlib : AlgorithmStack
+        The algorithm library holding the entries.
+    address : tuple or str
+        The address of the hub of the server, (host, port) for TCP or the path of a Unix socket.
+    layout : dict
+        The resources of the worker.
+    name : str
+        The name the worker registers with.
+    reconnect : float or None
+        How many seconds to wait before connecting again after the connection broke, or None to stop.
+    heartbeat : float
+        How often a heartbeat is sent, in seconds, as asked by the server.
+    progress_interval : float
+        The shortest time between two progress reports sent for an execution, in seconds.
+    layout_id : int or None
+        The ID (index) of the layout of the worker on the server.
+    executor : ThreadExecutor or ProcessExecutor
+        The executor running the leased executions.
+    _key : bytes
+        The shared key authenticating the worker.
+    _conn : multiprocessing.connection.Connection or None
+        The connection to the server.
+    _leases : dict
+        The future of each running execution, indexed by lease ID.
+    _lock : threading.Lock
+        Guards the sends on the connection and `_leases`.
+    """
+
+    def __init__(self, algorithmlib, address, key, layout, executor='thread', name=None, reconnect=5.0,
+                 progress_interval=0.25):
+        """
+        Initializes the worker and its executor, with one thread or worker process per CPU of its layout.
+
+        Parameters:
+        ----------
+        algorithmlib : AlgorithmStack
+            The algorithm library holding the entries.
+        address : tuple or str
+            The address of the hub of the server, (host, port) for TCP or the path of a Unix socket.
+        key : str or bytes
+            The shared key authenticating the worker.
+        layout : dict
+            The resources of the worker.
+        executor : str, optional
+            'thread' or 'process' (default is 'thread').
+        name : str, optional
+            The name the worker registers with (default is None, the host name and process ID).
+        reconnect : float or None, optional
+            How many seconds to wait before connecting again after the connection broke, or None to stop
+            (default is 5).
+        progress_interval : float, optional
+            The shortest time between two progress reports sent for an execution, in seconds (default is 0.25).
+
+        Raises:
+        ------
+        TypeError
+            If the specified executor type is not supported.
+        """
+        self.algorithmlib = algorithmlib
+        self.address = address
+        self.layout = layout
+        self.name = name if name is not None else f'{socket.gethostname()}:{os.getpid()}'
+        self.reconnect = reconnect
+        self.heartbeat = 2.0
+        self.progress_interval = progress_interval
+        self.layout_id = None
+        _workers = max(1, int(layout.get('cpu', 1)))
+        if executor == 'thread':
+            self.executor = ThreadExecutor(algorithmlib, workers=_workers)
+        elif executor == 'process':
+            self.executor = ProcessExecutor(algorithmlib, workers=_workers, progress_interval=progress_interval)
+        else:
+            raise TypeError(f'{executor} Not Supported for Executor.')
+        self._key = key.encode() if isinstance(key, str) else key
+        self._conn = None
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """
+        Returns a string representation of the worker.
+
+        Returns:
+        -------
+        str
+            A string representation of the worker, including its name and running executions.
+        """
+        return f'<Worker name:{self.name} leases:{len(self._leases)}>'
+
+    def run(self):
+        """
+        Connects to the server and runs the leased executions, connecting again whenever the connection breaks.
+        """
+        while True:
+            try:
+                conn = Client(self.address, authkey=self._key)
+            except AuthenticationError:
+                logging.getLogger('uvicorn.warning').warning(f'Worker {self.name} refused: authentication failed.')
+                conn = None
+            except OSError as e:
+                logging.getLogger('uvicorn.warning').warning(f'Worker {self.name} cannot connect: {e}')
+                conn = None
+            if conn is not None:
+                self._session(conn)
+            if self.reconnect is None:
+                return
+            time.sleep(self.reconnect)
+
+    def close(self):
+        """
+        Closes the connection and stops the executor.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self.executor.shutdown()
+
+    def _send(self, message):
+        """
+        Sends a message to the server, ignoring a broken connection, which the session notices.
+
+        Parameters:
+        ----------
+        message : object
+            The message.
+        """
+        with self._lock:
+            try:
+                self._conn.send(message)
+            except (AttributeError, OSError, ValueError):
+                pass
+
+    def _session(self, conn):
+        """
+        Registers the worker and runs the leased executions until the connection breaks or the server shuts down.
+
+        Parameters:
+        ----------
+        conn : multiprocessing.connection.Connection
+            The connection to the server.
+        """
+        self._conn = conn
+        self._send(('register', self.name, self.layout, list(self.algorithmlib.entries)))
+        _stop = threading.Event()
+        try:
+            while True:
+                message = conn.recv()
+                if message is None:
+                    logging.getLogger('uvicorn.info').info(f'Worker {self.name}: the server is shutting down.')
+                    break
+                elif message[0] == 'lease':
+                    self._lease(*message[1:])
+                elif message[0] == 'kill':
+                    _future = self._leases.get(message[1])
+                    if _future is not None:
+                        self.executor.kill(_future)
+                elif message[0] == 'registered':
+                    self.layout_id, self.heartbeat = message[1], message[2]
+                    # Beats start once the interval asked by the server is known.
+                    threading.Thread(target=self._beat, args=(_stop,), daemon=True).start()
+                    logging.getLogger('uvicorn.info').info(
+                        f'Worker {self.name} joined as layout {self.layout_id} with {self.layout}.')
+        except (EOFError, OSError):
+            logging.getLogger('uvicorn.warning').warning(f'Worker {self.name} lost the server.')
+        _stop.set()
+        with self._lock:
+            _leases, self._leases = self._leases, {}
+            self._conn = None
+        conn.close()
+        # The server queues the tasks again, so their executions are of no use any more.
+        for future in _leases.values():
+            self.executor.kill(future)
+
+    def _beat(self, stop):
+        """
+        Sends a heartbeat every `heartbeat` seconds until the session ends.
+
+        Parameters:
+        ----------
+        stop : threading.Event
+            Set when the session ends.
+        """
+        while not stop.wait(self.heartbeat):
+            self._send(('heartbeat',))
+
+    def _lease(self, lease_id, algorithm_id, inputs, resources, streaming):
+        """
+        Starts a leased execution.
+
+        Parameters:
+        ----------
+        lease_id : int
+            The ID of the lease.
+        algorithm_id : str
+            The ID of the entry to run.
+        inputs : list of dicts
+            The input parameters of each task.
+        resources : dict
+            The resources allocated to the execution.
+        streaming : bool
+            Whether the output chunks of the entry are sent as they are produced.
+        """
+        _progress = ProgressThrottle(lambda fraction, message: self._send(('progress', lease_id, fraction, message)),
+                                     interval=self.progress_interval)
+        resources = dict(resources, progress=_progress)
+        if streaming:
+            resources['stream'] = lambda chunk: self._send(('chunk', lease_id, chunk))
+        future = self.executor.submit(algorithm_id, inputs, resources)
+        with self._lock:
+            self._leases[lease_id] = future
+        future.add_done_callback(lambda _future: self._finish(lease_id, len(inputs), _future, _progress))
+
+    def _finish(self, lease_id, count, future, progress):
+        """
+        Sends the results of a leased execution to the server.
+
+        Parameters:
+        ----------
+        lease_id : int
+            The ID of the lease.
+        count : int
+            The number of tasks of the execution.
+        future : concurrent.futures.Future
+            The future of the execution.
+        progress : ProgressThrottle
+            The progress callback of the execution, whose held report is sent before the results.
+        """
+        progress.flush()
+        with self._lock:
+            if self._leases.pop(lease_id, None) is None:
+                # The session ended.
+                return
+        try:
+            results = future.result()
+        except BaseException as e:
+            results = [(False, str(e) or 'Execution stopped')] * count
+        try:
+            self._send(('done', lease_id, pack_results(results)))
+        except Exception as e:
+            # The output could not be pickled.
+            self._send(('done', lease_id, [(False, str(e))] * count))
+
+
+def serve(connect, key, layout, executor='thread', name=None, config=None, reconnect=5.0):
+    """
+    Loads the algorithm library from the configuration and runs a worker until it is interrupted or terminated.
+
+    Parameters:
+    ----------
+    connect : str
+        The address of the hub of the server, 'HOST:PORT' for TCP or the path of a Unix socket.
+    key : str
+        The shared key authenticating the worker.
+    layout : str
+        The resources of the worker, e.g. 'cpu=32,cuda=0'.
+    executor : str, optional
+        'thread' or 'process' (default is 'thread').
+    name : str, optional
+        The name the worker registers with (default is None, the host name and process ID).
+    config : str, optional
+        The path of the configuration file (default is None, the 'easyapi_config' environment variable).
+    reconnect : float or None, optional
+        How many seconds to wait before connecting again after the connection broke, or None to stop
+        (default is 5).
+    """
+    from .taskmodel.remote import parse_address
+    os.environ['easyapi_role'] = 'worker'
+    if config is not None:
+        os.environ['easyapi_config'] = config
+    from .settings import algorithmlib
+    worker = Worker(algorithmlib, parse_address(connect), key, parse_layout(layout), executor=executor,
+                    name=name, reconnect=reconnect)
+    # Exit through `close` on SIGTERM too, so the worker processes of the executor are stopped.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
@@ -35,6 +35,9 @@ setup(
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
     packages=find_packages('.'),
+    entry_points={
+        'console_scripts': ['easyapi=easyapi.__main__:main'],
+    },
     platforms=["any"],
     zip_safe=True,
 )
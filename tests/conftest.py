@@ -0,0 +1,75 @@
+"""
+Fixtures shared by the tests: a server started in its own process from a configuration and an algorithm module.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    """
+    Returns a free TCP port on localhost.
+    """
+    with socket.socket() as _sock:
+        _sock.bind(('127.0.0.1', 0))
+        return _sock.getsockname()[1]
+
+
+@pytest.fixture
+def server_env(tmp_path):
+    """
+    The environment of the processes of a server started by `serve`: its configuration file and the path of its
+    algorithm module.
+    """
+    return dict(os.environ, easyapi_config=str(tmp_path / 'config.json'),
+                PYTHONPATH=os.pathsep.join([ROOT, str(tmp_path)]))
+
+
+@pytest.fixture
+def serve(tmp_path, server_env):
+    """
+    Starts servers with `serve(config, source)` and stops them after the test.
+
+    The algorithm module `source` is written next to the configuration and loaded by it; the configuration gets
+    an iolib file and a memory cache in the temporary directory unless it names its own. `serve` returns the
+    base URL of the server and its process.
+    """
+    _servers = []
+
+    def _serve(config, source):
+        (tmp_path / 'entries.py').write_text(textwrap.dedent(source))
+        config = dict(config, modules=['entries'])
+        config.setdefault('iolib', {'file': str(tmp_path / 'iolib.json')})
+        config.setdefault('cache', {'type': 'memory'})
+        (tmp_path / 'config.json').write_text(json.dumps(config))
+        _port = free_port()
+        server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'easyapi:app', '--port', str(_port),
+                                   '--log-level', 'warning'], cwd=str(tmp_path), env=server_env)
+        _servers.append(server)
+        url = f'http://127.0.0.1:{_port}'
+        _deadline = time.monotonic() + 30
+        while True:
+            try:
+                urllib.request.urlopen(url + '/docs', timeout=1)
+                break
+            except OSError:
+                if server.poll() is not None or time.monotonic() > _deadline:
+                    raise RuntimeError('The server did not start')
+                time.sleep(0.1)
+        return url, server
+
+    yield _serve
+    for server in _servers:
+        server.terminate()
+    for server in _servers:
+        server.wait()
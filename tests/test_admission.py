@@ -0,0 +1,69 @@
+"""
+Load test of the admission control: a client flooding a server is refused with 429 and a Retry-After header,
+while the tasks of another client are still admitted and run.
+"""
+
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+_ENTRIES = """
+import time
+from easyapi import register, Types
+
+@register(required_resources={'cpu': 1, 'cuda': 0})
+def snooze(t: Types.Number['t'] = 0.05, resources={}) -> dict[Types.Number['t', 't']]:
+    \"\"\"Snooze\"\"\"
+    time.sleep(t)
+    return dict(t=t)
+"""
+
+_CONFIG = {
+    'server_name': 'admission',
+    'task_queue': {'layouts': [{'cpu': 2, 'cuda': 0}], 'executor': 'thread',
+                   'admission': {'layouts': {'max_queued': 1000}, 'access': {'*': {'max_queued': 20}}}},
+    'authenticator': {'type': 'memory', 'credentials': {'flood': {'key': 'k', 'access': ['*']},
+                                                        'healthy': {'key': 'k', 'access': ['*']}}},
+}
+_FLOOD = {'easyapi-id': 'flood', 'easyapi-key': 'k'}
+_HEALTHY = {'easyapi-id': 'healthy', 'easyapi-key': 'k'}
+
+
+def test_flood_is_refused_with_retry_after_while_others_are_admitted(serve):
+    url, _ = serve(_CONFIG, _ENTRIES)
+
+    async def _run():
+        async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+            _counts = {'queued': 0, 'refused': 0}
+            _retry_after = []
+
+            async def _flooder(n):
+                for i in range(100):
+                    response = await client.post('/entries/snooze', json={'t': 0.05 + (n * 100 + i) * 1e-6},
+                                                 headers=_FLOOD)
+                    if response.status_code == 429:
+                        _counts['refused'] += 1
+                        _retry_after.append(int(response.headers['Retry-After']))
+                    else:
+                        response.raise_for_status()
+                        _counts['queued'] += 1
+
+            await asyncio.gather(*[_flooder(n) for n in range(8)])
+            # The flooder holds its whole quota, and the other client is admitted all the same.
+            _task_ids = []
+            for i in range(5):
+                response = await client.post('/entries/snooze', json={'t': 0.01 + i * 1e-6}, headers=_HEALTHY)
+                assert response.status_code == 200
+                _task_ids.append(response.json()['task_id'])
+            for task_id in _task_ids:
+                _data = (await client.get(f'/tasks/{task_id}', params={'wait': 30}, headers=_HEALTHY)).json()
+                assert _data['success'] is True
+            _stats = (await client.get('/stats', headers=_HEALTHY)).json()
+            return _counts, _retry_after, _stats
+
+    _counts, _retry_after, _stats = asyncio.run(_run())
+    assert _counts['refused'] > 0 and _counts['queued'] >= 20
+    assert all(_seconds >= 1 for _seconds in _retry_after)
+    assert _stats['admission']['rejected'] == _counts['refused']
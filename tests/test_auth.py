@@ -0,0 +1,18 @@
+"""
+Tests of the authenticator: the scheduling fields of the credentials.
+"""
+
+from easyapi.credentials.auth import Authenticator
+
+
+def test_weight_must_be_a_positive_number():
+    authenticator = Authenticator({'a': {'key': 'k', 'access': ['*'], 'weight': 2.5},
+                                   'b': {'key': 'k', 'access': ['*']},
+                                   'zero': {'key': 'k', 'access': ['*'], 'weight': 0},
+                                   'negative': {'key': 'k', 'access': ['*'], 'weight': -3},
+                                   'text': {'key': 'k', 'access': ['*'], 'weight': '2'},
+                                   'infinite': {'key': 'k', 'access': ['*'], 'weight': float('inf')}})
+    assert authenticator.weight('a') == 2.5
+    assert authenticator.weight('b') == 1 and authenticator.weight('unknown') == 1
+    for id in ('zero', 'negative', 'text', 'infinite'):
+        assert authenticator.weight(id) == 1
@@ -0,0 +1,88 @@
+"""
+Tests of the deduplication of the task queue: identical tasks submitted while one of them is queued or running
+follow it, run once and all receive its output.
+"""
+
+import asyncio
+import threading
+
+from easyapi.taskmodel.dispatcher import LayoutDispatcher
+from easyapi.taskmodel.task import Task
+from easyapi.taskmodel.taskqueue import TaskQueue
+
+
+def _task(x, access_id='u'):
+    return Task(access_id=access_id, algorithm_id='double', input_data={'x': x},
+                required_resources={'cpu': 1, 'cuda': 0})
+
+
+def _run(task_queue, tasks, delete=()):
+    """
+    Enqueues the tasks, deletes some of them while they wait, and runs the queue until the others are done.
+    """
+    async def _main():
+        dispatcher = LayoutDispatcher(task_queue, 0)
+        dispatcher.start()
+        try:
+            for task in tasks:
+                task_queue.enqueue(task)
+            for task in delete:
+                del task_queue[task.task_id]
+            dispatcher.notify()
+            _deadline = asyncio.get_running_loop().time() + 5
+            while not all(task.is_done for task in tasks if task not in delete):
+                assert asyncio.get_running_loop().time() < _deadline, 'The tasks did not finish'
+                await asyncio.sleep(0.01)
+        finally:
+            dispatcher.stop()
+
+    asyncio.run(_main())
+
+
+def _queue(dedup=True):
+    _calls = []
+    _gate = threading.Event()
+
+    def _double(params, resources=None):
+        _gate.wait(5)
+        _calls.append(params['x'])
+        return True, {'y': params['x'] * 2}
+
+    task_queue = TaskQueue([{'cpu': 1, 'cuda': 0}], algorithmlib={'double': _double}, executor='thread',
+                           dedup=dedup)
+    # The first task only finishes once every task is enqueued.
+    threading.Timer(0.2, _gate.set).start()
+    return task_queue, _calls
+
+
+def test_identical_tasks_run_once_and_share_the_output():
+    task_queue, _calls = _queue()
+    _tasks = [_task(1), _task(1, access_id='v'), _task(2), _task(1)]
+    _run(task_queue, _tasks)
+    assert sorted(_calls) == [1, 2]
+    assert task_queue.deduplicated == 2 and task_queue.dedup_rate == 0.5
+    assert [task_queue.results.output(task) for task in _tasks] == [{'y': 2}, {'y': 2}, {'y': 4}, {'y': 2}]
+    assert all(task.error is None for task in _tasks)
+
+
+def test_a_deleted_leader_keeps_running_for_its_followers():
+    task_queue, _calls = _queue()
+    _blocker, _leader, _follower = _task(0), _task(1), _task(1)
+    _run(task_queue, [_blocker, _leader, _follower], delete=[_leader])
+    assert sorted(_calls) == [0, 1]
+    assert task_queue.results.output(_follower) == {'y': 2}
+    assert task_queue[_leader.task_id] is None
+
+
+def test_a_deleted_follower_leaves_its_leader_running():
+    task_queue, _calls = _queue()
+    _leader, _follower = _task(1), _task(1)
+    _run(task_queue, [_leader, _follower], delete=[_follower])
+    assert _calls == [1] and task_queue.results.output(_leader) == {'y': 2}
+    assert task_queue[_follower.task_id] is None
+
+
+def test_identical_tasks_all_run_without_dedup():
+    task_queue, _calls = _queue(dedup=False)
+    _run(task_queue, [_task(1), _task(1)])
+    assert _calls == [1, 1] and task_queue.deduplicated == 0
@@ -0,0 +1,84 @@
+"""
+Tests of the layout dispatcher: an error while starting or completing tasks is logged and the layout goes on
+running the tasks queued after it.
+"""
+
+import asyncio
+
+from easyapi.taskmodel.dispatcher import LayoutDispatcher
+from easyapi.taskmodel.task import Task
+from easyapi.taskmodel.taskqueue import TaskQueue
+
+
+def _double(params, resources=None):
+    return True, {'y': params['x'] * 2}
+
+
+def _task(x):
+    return Task(access_id='u', algorithm_id='double', input_data={'x': x}, required_resources={'cpu': 1, 'cuda': 0})
+
+
+async def _done(task, timeout=5):
+    _deadline = asyncio.get_running_loop().time() + timeout
+    while not task.is_done:
+        assert asyncio.get_running_loop().time() < _deadline, 'The task did not finish'
+        await asyncio.sleep(0.01)
+
+
+def _failing(method, errors):
+    def _call(*args, **kwargs):
+        if len(errors) > 0:
+            raise errors.pop()
+        return method(*args, **kwargs)
+    return _call
+
+
+def test_dispatcher_survives_a_failing_pass(monkeypatch):
+    task_queue = TaskQueue([{'cpu': 1, 'cuda': 0}], algorithmlib={'double': _double}, executor='thread')
+    monkeypatch.setattr(task_queue, 'schedule', _failing(task_queue.schedule, [RuntimeError('schedule')]))
+    monkeypatch.setattr(task_queue, 'execute', _failing(task_queue.execute, [RuntimeError('execute')]))
+
+    async def _run():
+        dispatcher = LayoutDispatcher(task_queue, 0)
+        dispatcher.start()
+        try:
+            _tasks = [_task(x) for x in range(3)]
+            for task in _tasks:
+                task_queue.enqueue(task)
+                dispatcher.notify()
+                await asyncio.sleep(0.05)
+            dispatcher.notify()
+            for task in _tasks[1:]:
+                await _done(task)
+            return _tasks, dispatcher.running
+        finally:
+            dispatcher.stop()
+
+    _tasks, _running = asyncio.run(_run())
+    assert _running
+    # The first pass failed before starting anything; the first task then could not be submitted, so it
+    # failed and released its CPU for the others.
+    assert _tasks[0].is_done and _tasks[0].error is not None
+    assert [task_queue.results.output(task) for task in _tasks[1:]] == [{'y': 2}, {'y': 4}]
+    assert task_queue.free_resources[0]['cpu'] == 1
+
+
+def test_dispatcher_is_woken_after_a_failing_completion(monkeypatch):
+    task_queue = TaskQueue([{'cpu': 1, 'cuda': 0}], algorithmlib={'double': _double}, executor='thread')
+    monkeypatch.setattr(task_queue.runtimes, 'observe', _failing(task_queue.runtimes.observe, [KeyError('observe')]))
+
+    async def _run():
+        dispatcher = LayoutDispatcher(task_queue, 0)
+        dispatcher.start()
+        try:
+            _tasks = [_task(x) for x in range(2)]
+            task_queue.enqueue_many(_tasks)
+            dispatcher.notify()
+            # The second task only starts if the dispatcher is woken once the first one has completed.
+            await _done(_tasks[1])
+            return _tasks
+        finally:
+            dispatcher.stop()
+
+    _tasks = asyncio.run(_run())
+    assert task_queue.results.output(_tasks[1]) == {'y': 2}
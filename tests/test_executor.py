@@ -0,0 +1,67 @@
+"""
+Tests of the process executor: the workers are forked by the fork server, and a killed worker is replaced.
+"""
+
+import os
+import time
+
+from easyapi.taskmodel.executor import ProcessExecutor
+
+
+def _whoami(params, resources=None):
+    return True, {'pid': os.getpid(), 'ppid': os.getppid()}
+
+
+def _sleep(params, resources=None):
+    time.sleep(params['t'])
+    return True, {'t': params['t']}
+
+
+def test_workers_are_forked_and_replaced_by_the_fork_server():
+    executor = ProcessExecutor({'whoami': _whoami, 'sleep': _sleep}, workers=1)
+    try:
+        (succ, first, _), = executor.submit('whoami', [{}], {}).result(timeout=10)
+        assert succ
+        # The server process runs threads, so it never forks a worker itself.
+        assert first['ppid'] != os.getpid()
+
+        future = executor.submit('sleep', [{'t': 30}], {})
+        _begin = time.monotonic()
+        while not future.running() and time.monotonic() - _begin < 10:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        assert executor.kill(future)
+        assert future.result(timeout=10) == [(False, 'Execution stopped')]
+
+        (succ, second, _), = executor.submit('whoami', [{}], {}).result(timeout=10)
+        assert succ
+        assert second['pid'] != first['pid'] and second['ppid'] == first['ppid']
+    finally:
+        executor.shutdown()
+
+
+def _chunk(params, resources=None):
+    resources['stream']('x')
+    time.sleep(params['t'])
+    return True, {}
+
+
+def test_a_failed_exchange_resolves_the_future_and_keeps_the_slot_serving():
+    executor = ProcessExecutor({'whoami': _whoami, 'chunk': _chunk}, workers=1)
+    try:
+        (succ, first, _), = executor.submit('whoami', [{}], {}).result(timeout=10)
+        # Inputs that cannot be pickled never reach the worker, which keeps serving.
+        (succ, error), = executor.submit('whoami', [{'f': lambda: None}], {}).result(timeout=10)
+        assert not succ and error
+        (succ, second, _), = executor.submit('whoami', [{}], {}).result(timeout=10)
+        assert succ and second['pid'] == first['pid']
+
+        # A failing chunk sink leaves the worker mid-job, so it is replaced.
+        def _sink(chunk):
+            raise ValueError('sink failed')
+
+        assert executor.submit('chunk', [{'t': 5}], {'stream': _sink}).result(timeout=10) == [(False, 'sink failed')]
+        (succ, third, _), = executor.submit('whoami', [{}], {}).result(timeout=10)
+        assert succ and third['pid'] != first['pid']
+    finally:
+        executor.shutdown()
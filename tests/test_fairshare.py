@@ -0,0 +1,79 @@
+"""
+Tests of the fair queue: priority classes are served in order, and the access IDs of a class share the layout
+in proportion to their weights, whatever the number of tasks each has queued.
+"""
+
+from easyapi.taskmodel.fairqueue import FairQueue
+from easyapi.taskmodel.task import Task
+
+
+def _task(access_id, priority='normal', weight=1):
+    return Task(access_id=access_id, algorithm_id='f', input_data={}, priority=priority, weight=weight)
+
+
+def _serve(queue, started, n, background=True):
+    _order = []
+    for _ in range(n):
+        task = queue.head(background=background)
+        if task is None:
+            break
+        queue.served(task)
+        started.add(task)
+        _order.append(task.access_id)
+    return _order
+
+
+def _queue():
+    started = set()
+    return FairQueue(lambda task: task not in started), started
+
+
+def test_a_flood_does_not_hold_back_a_small_client():
+    queue, started = _queue()
+    for _ in range(100):
+        queue.push(_task('flood'))
+    queue.push(_task('small'))
+    queue.push(_task('small'))
+    # Each access ID gets a turn in alternation, and the small client does not wait for the flood.
+    assert _serve(queue, started, 6) == ['flood', 'small', 'flood', 'small', 'flood', 'flood']
+
+
+def test_access_ids_share_in_proportion_to_their_weights():
+    queue, started = _queue()
+    for _ in range(30):
+        queue.push(_task('heavy', weight=3))
+        queue.push(_task('light', weight=1))
+    _order = _serve(queue, started, 20)
+    assert _order.count('heavy') == 15 and _order.count('light') == 5
+
+
+def test_priority_classes_are_served_in_order():
+    queue, started = _queue()
+    queue.push(_task('u', priority='background'))
+    queue.push(_task('u'))
+    queue.push(_task('v', priority='interactive'))
+    assert _serve(queue, started, 3, background=False) == ['v', 'u']
+    # The background class is only served when the layout may take it.
+    assert queue.head(background=False) is None
+    assert _serve(queue, started, 1) == ['u']
+
+
+def test_an_idle_access_id_keeps_no_credit():
+    queue, started = _queue()
+    for _ in range(10):
+        queue.push(_task('busy'))
+    assert _serve(queue, started, 8) == ['busy'] * 8
+    for _ in range(10):
+        queue.push(_task('late'))
+    # The late client starts from the current virtual time, so it does not take eight turns in a row.
+    assert _serve(queue, started, 4) == ['late', 'busy', 'late', 'busy']
+
+
+def test_cancelled_tasks_are_skipped():
+    queue, started = _queue()
+    _tasks = [_task('u') for _ in range(3)]
+    for task in _tasks:
+        queue.push(task)
+    started.add(_tasks[0])
+    assert queue.head() is _tasks[1]
+    assert list(queue.candidates(10)) == _tasks[1:]
@@ -0,0 +1,53 @@
+"""
+Tests of the pipelines: the resources a pipeline requires and shares between its parallel steps.
+"""
+
+import threading
+import time
+
+from easyapi import Types
+from easyapi.algorithmodel.algorithm import Algorithm
+from easyapi.algorithmodel.algorithm_infer import define_algorithm
+from easyapi.algorithmodel.pipeline import Pipeline
+from easyapi.iotypemodel.iotype_model import IOTypeStack
+
+
+def _diamond(tmp_path, required_resources=None):
+    _iolib = tmp_path / 'iolib.json'
+    _iolib.write_text('{}')
+    _lock = threading.Lock()
+    _running = {'now': 0, 'peak': 0}
+    _shares = []
+
+    def step(x: Types.Number['x'] = 0, resources={}) -> dict[Types.Number['x', 'x']]:
+        with _lock:
+            _running['now'] += 1
+            _running['peak'] = max(_running['peak'], _running['now'])
+            _shares.append(dict(resources))
+        time.sleep(0.1)
+        with _lock:
+            _running['now'] -= 1
+        return dict(x=x + 1)
+
+    _step = Algorithm(**define_algorithm(step, version='0.0.1', references=[], required_resources={'cpu': 1}),
+                      iolib=IOTypeStack(path=str(_iolib)))
+    pipeline = Pipeline({'step': _step}, 'diamond',
+                        steps={'a': 'step', 'b': {'entry': 'step', 'inputs': {'x': 'a.x'}},
+                               'c': {'entry': 'step', 'inputs': {'x': 'a.x'}},
+                               'd': {'entry': 'step', 'inputs': {'x': 'b.x'}}},
+                        outputs={'b': 'd.x', 'c': 'c.x'}, required_resources=required_resources)
+    return pipeline, _running, _shares
+
+
+def test_pipeline_requires_its_parallel_branches_together(tmp_path):
+    pipeline, _running, _shares = _diamond(tmp_path)
+    assert pipeline.required_resources == {'cpu': 2}
+    assert pipeline({'x': 0}, resources={'cpu': 2}) == (True, {'b': 3, 'c': 2})
+    assert _running['peak'] == 2 and _shares == [{'cpu': 1}] * 4
+
+
+def test_pipeline_steps_wait_for_their_share(tmp_path):
+    pipeline, _running, _shares = _diamond(tmp_path, required_resources={'cpu': 1})
+    assert pipeline({'x': 0}, resources={'cpu': 1}) == (True, {'b': 3, 'c': 2})
+    # The branches do not fit together in one CPU: they run one after the other.
+    assert _running['peak'] == 1 and _shares == [{'cpu': 1}] * 4
@@ -0,0 +1,60 @@
+"""
+Tests of the progress reporting: the rate limits keep the latest report instead of dropping it.
+"""
+
+import time
+
+from easyapi.taskmodel.executor import ProcessExecutor
+from easyapi.taskmodel.progress import ProgressReporter, ProgressThrottle
+
+
+def test_throttle_sends_the_held_report_when_the_interval_expires():
+    _sent = []
+    progress = ProgressThrottle(lambda fraction, message: _sent.append((fraction, message)), interval=0.1)
+    progress(0.1, 'a')
+    progress(0.2, 'b')
+    progress(0.3, 'c')
+    assert _sent == [(0.1, 'a')]
+    time.sleep(0.2)
+    # The last report before the quiet step arrives, without waiting for the next report.
+    assert _sent == [(0.1, 'a'), (0.3, 'c')]
+
+
+def test_throttle_flush_sends_the_held_report_before_the_end():
+    _sent = []
+    progress = ProgressThrottle(lambda fraction, message: _sent.append((fraction, message)), interval=10)
+    progress(0.1)
+    progress(1.5, 'done')
+    assert _sent == [(0.1, None), (1.0, 'done')]
+    progress(0.5, 'again')
+    progress.flush()
+    progress.flush()
+    assert _sent[-1] == (0.5, 'again') and len(_sent) == 3
+
+
+def test_reporter_without_a_loop_reports_at_once():
+    _sent = []
+    reporter = ProgressReporter(None, lambda fraction, message: _sent.append((fraction, message)))
+    reporter(-1, 'start')
+    reporter(0.5)
+    assert _sent == [(0.0, 'start'), (0.5, None)]
+
+
+def _steps(params, resources=None):
+    resources['progress'](0.1, 'load')
+    resources['progress'](0.6, 'align')
+    time.sleep(params['t'])
+    return True, {}
+
+
+def test_process_worker_reports_the_last_step_while_it_runs():
+    executor = ProcessExecutor({'steps': _steps}, workers=1, progress_interval=0.1)
+    try:
+        _reports = []
+        future = executor.submit('steps', [{'t': 0.5}], {'progress': lambda *report: _reports.append(report)})
+        time.sleep(0.3)
+        assert not future.done() and _reports == [(0.1, 'load'), (0.6, 'align')]
+        (succ, _, _), = future.result(timeout=10)
+        assert succ
+    finally:
+        executor.shutdown()
@@ -0,0 +1,94 @@
+"""
+Tests of the push endpoints: the task WebSockets and the Server-Sent Events of a task.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+websockets = pytest.importorskip('websockets')
+
+_ENTRIES = """
+import time
+from easyapi import register, Types
+
+@register(required_resources={'cpu': 1, 'cuda': 0})
+def snooze(t: Types.Number['t'] = 0.01, resources={}) -> dict[Types.Number['t', 't']]:
+    \"\"\"Snooze\"\"\"
+    time.sleep(t)
+    return dict(t=t)
+"""
+
+_CONFIG = {
+    'server_name': 'push',
+    'task_queue': {'layouts': [{'cpu': 1, 'cuda': 0}], 'executor': 'thread'},
+    'authenticator': {'type': 'memory', 'credentials': {'u': {'key': 'k', 'access': ['*']},
+                                                        'v': {'key': 'k', 'access': ['*']}}},
+}
+_HEADERS = {'easyapi-id': 'u', 'easyapi-key': 'k'}
+
+
+async def _iterate(ws, timeout=10):
+    while True:
+        try:
+            yield json.loads(await asyncio.wait_for(ws.recv(), timeout))
+        except websockets.ConnectionClosed:
+            return
+
+
+async def _messages(url, task_id, headers=_HEADERS):
+    async with websockets.connect(url.replace('http', 'ws') + f'/tasks/{task_id}/ws',
+                                  additional_headers=list(headers.items())) as ws:
+        return [message async for message in _iterate(ws)]
+
+
+def test_task_ws_pushes_the_current_status_then_closes_when_done(serve):
+    url, _ = serve(_CONFIG, _ENTRIES)
+
+    async def _run():
+        async with httpx.AsyncClient(base_url=url, headers=_HEADERS, timeout=30) as client:
+            _blocker = (await client.post('/entries/snooze', json={'t': 1})).json()['task_id']
+            _queued = (await client.post('/entries/snooze', json={'t': 0.02})).json()['task_id']
+            # The queued task does not change while the blocker runs: its status is pushed without a 'get'.
+            async with websockets.connect(url.replace('http', 'ws') + f'/tasks/{_queued}/ws',
+                                          additional_headers=list(_HEADERS.items())) as ws:
+                _first = json.loads(await asyncio.wait_for(ws.recv(), 0.5))
+                _rest = [message async for message in _iterate(ws)]
+            # A finished task is pushed at once, and the connection is closed.
+            _done = await _messages(url, _blocker)
+            _missing = await _messages(url, _queued, headers={'easyapi-id': 'v', 'easyapi-key': 'k'})
+            return _queued, _first, _rest, _done, _missing
+
+    _queued, _first, _rest, _done, _missing = asyncio.run(_run())
+    assert _first['task_id'] == _queued and 'success' not in _first
+    assert _rest[-1]['success'] is True and _rest[-1]['output'] == {'t': 0.02}
+    assert len(_done) == 1 and _done[0]['success'] is True
+    assert _missing == [{'status': f'Task {_queued} not found', 'success': False}]
+
+
+def test_task_events_end_with_the_result(serve):
+    url, _ = serve(_CONFIG, _ENTRIES)
+    with httpx.Client(base_url=url, headers=_HEADERS, timeout=30) as client:
+        task_id = client.post('/entries/snooze', json={'t': 0.2}).json()['task_id']
+        with client.stream('GET', f'/tasks/{task_id}/events') as response:
+            _events = [line[len('event: '):] for line in response.iter_lines() if line.startswith('event: ')]
+    assert _events[0] in ('queued', 'running') and _events[-1] == 'done'
+
+
+def test_task_events_of_a_vanished_task_report_it_deleted(tmp_path, monkeypatch):
+    (tmp_path / 'config.json').write_text(json.dumps(dict(_CONFIG, modules=[], iolib={'file': 'iolib.json'},
+                                                          cache={'type': 'memory'})))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('easyapi_config', str(tmp_path / 'config.json'))
+    from easyapi.routers import tasks
+
+    async def _run():
+        _events = asyncio.Queue()
+        _sink = lambda task, state: _events.put_nowait(state)
+        # The task was deleted between the ownership check of the route and the first event.
+        return [event async for event in tasks._stream_task_events('0' * 32, _events, _sink)]
+
+    _events = asyncio.run(_run())
+    assert len(_events) == 1 and _events[0].startswith('event: deleted')
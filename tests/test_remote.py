@@ -0,0 +1,84 @@
+"""
+Test of the remote workers on localhost: two `easyapi worker` processes take tasks from a server, and the tasks
+of a worker that is killed are queued again and finished by the others.
+"""
+
+import asyncio
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import free_port
+
+httpx = pytest.importorskip('httpx')
+
+_ENTRIES = """
+import os
+import time
+from easyapi import register, Types
+
+@register(required_resources={'cpu': 1, 'cuda': 0})
+def nap(t: Types.Number['t'] = 0.5, resources={}) -> dict[Types.Number['pid', 'pid']]:
+    \"\"\"Nap\"\"\"
+    time.sleep(t)
+    return dict(pid=os.getpid())
+"""
+
+_HEADERS = {'easyapi-id': 'u', 'easyapi-key': 'k'}
+
+
+def _config(port):
+    return {
+        'server_name': 'remote',
+        'task_queue': {'layouts': [{'cpu': 1, 'cuda': 0}], 'executor': 'thread', 'dedup': False,
+                       'remote': {'host': '127.0.0.1', 'port': port, 'key': 's3cret', 'heartbeat': 0.2,
+                                  'lease_timeout': 1}},
+        'authenticator': {'type': 'memory', 'credentials': {'u': {'key': 'k', 'access': ['*']}}},
+    }
+
+
+def test_tasks_of_a_killed_worker_are_finished_by_the_others(serve, server_env):
+    _port = free_port()
+    url, server = serve(_config(_port), _ENTRIES)
+    workers = [subprocess.Popen([sys.executable, '-m', 'easyapi', 'worker', '--connect', f'127.0.0.1:{_port}',
+                                 '--key', 's3cret', '--layout', 'cpu=2,cuda=0', '--name', f'w{i}',
+                                 '--reconnect', '0.2'], env=server_env, stderr=subprocess.DEVNULL)
+               for i in range(2)]
+
+    async def _stats(client):
+        return (await client.get('/stats')).json()['remote']
+
+    async def _run():
+        async with httpx.AsyncClient(base_url=url, headers=_HEADERS, timeout=60) as client:
+            _deadline = time.monotonic() + 30
+            while len((await _stats(client))['workers']) < 2:
+                assert time.monotonic() < _deadline, 'The workers did not connect'
+                await asyncio.sleep(0.1)
+            _task_ids = [(await client.post('/entries/nap', json={'t': 1 + i * 1e-3})).json()['task_id']
+                         for i in range(10)]
+            _deadline = time.monotonic() + 30
+            while not any(worker['name'] == 'w0' and worker['leases'] > 0
+                          for worker in (await _stats(client))['workers']):
+                assert time.monotonic() < _deadline, 'The worker took no task'
+                await asyncio.sleep(0.05)
+            workers[0].send_signal(signal.SIGKILL)
+            _results = [(await client.get(f'/tasks/{task_id}', params={'wait': 30})).json()
+                        for task_id in _task_ids]
+            return _results, await _stats(client)
+
+    try:
+        _results, _remote = asyncio.run(_run())
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+    assert all(result['success'] is True for result in _results)
+    # The tasks ran in the server and in the worker processes.
+    _pids = {result['output']['pid'] for result in _results}
+    assert server.pid in _pids and len(_pids) >= 2
+    assert _remote['lost'] == 1 and _remote['requeued'] >= 1
+    assert [worker['name'] for worker in _remote['workers']] == ['w1']
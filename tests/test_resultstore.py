@@ -0,0 +1,66 @@
+"""
+Tests of the result store: repeatable reads, the TTL, the LRU eviction within the memory budget and the
+outputs spilled to disk.
+"""
+
+import os
+import time
+
+from easyapi.taskmodel.resultstore import ResultStore
+from easyapi.taskmodel.task import Task
+
+
+def _finished(output):
+    task = Task(access_id='u', algorithm_id='f', input_data={'x': 1}, required_resources={'cpu': 1, 'cuda': 0})
+    task._execute_start()
+    task._execute_finish(True, output)
+    return task
+
+
+def test_results_can_be_read_again_until_deleted(tmp_path):
+    store = ResultStore(spill_dir=str(tmp_path))
+    task = _finished({'y': 2})
+    store.put(task)
+    assert task.input_data is None
+    for _ in range(2):
+        assert store.get(task.key) is task
+        assert store.output(task) == {'y': 2}
+    del store[task.key]
+    assert store.get(task.key) is None and len(store) == 0
+
+
+def test_results_expire_after_the_ttl(tmp_path):
+    store = ResultStore(ttl=0.05, spill_dir=str(tmp_path))
+    task = _finished({'y': 2})
+    store.put(task)
+    assert task.key in store
+    time.sleep(0.1)
+    assert task.key not in store and store.expired == 1
+
+
+def test_least_recently_read_results_are_evicted(tmp_path):
+    store = ResultStore(max_memory=2500, spill_dir=str(tmp_path))
+    first, second, third = (_finished({'y': 'a' * 1000 + str(i)}) for i in range(3))
+    store.put(first)
+    store.put(second)
+    store.get(first.key)
+    store.put(third)
+    assert store.get(second.key) is None
+    assert store.get(first.key) is first and store.get(third.key) is third
+    assert store.evicted == 1 and store.memory <= 2500
+
+
+def test_large_outputs_spill_and_are_not_evicted_for_memory(tmp_path):
+    store = ResultStore(max_memory=3000, spill_size=5000, spill_dir=str(tmp_path))
+    spilled = _finished({'y': 'b' * 10000})
+    store.put(spilled)
+    assert spilled.output_data is None and store.memory == 0
+    assert len(os.listdir(tmp_path)) == 1
+    # Results held in memory overflow the budget: they are evicted, the spilled one is kept on disk.
+    for i in range(5):
+        store.put(_finished({'y': 'a' * 1000 + str(i)}))
+    assert store.evicted > 0 and store.memory <= 3000
+    assert store.get(spilled.key) is spilled
+    assert store.output(spilled) == {'y': 'b' * 10000}
+    del store[spilled.key]
+    assert len(os.listdir(tmp_path)) == 0
@@ -0,0 +1,52 @@
+"""
+Tests of the streaming entries: the chunks of a generator and the decorators it is called through.
+"""
+
+from easyapi import Types, cache, stat
+from easyapi.algorithmodel.algorithm import Algorithm
+from easyapi.algorithmodel.algorithm_infer import define_algorithm
+from easyapi.algorithmodel.cache import AlgorithmCachePool
+from easyapi.iotypemodel.iotype_model import IOTypeStack
+from easyapi.janalytics import JAnalytics
+
+
+def _algorithm(func, tmp_path):
+    _iolib = tmp_path / 'iolib.json'
+    _iolib.write_text('{}')
+    return Algorithm(**define_algorithm(func, version='0.0.1', references=[], required_resources={'cpu': 1}),
+                     iolib=IOTypeStack(path=str(_iolib)))
+
+
+def test_stream_runs_through_stat_and_bypasses_cache(tmp_path, monkeypatch):
+    _calls = []
+    monkeypatch.setattr(JAnalytics, '_stat', classmethod(lambda cls, func, *args, **kwargs: _calls.append(kwargs)))
+    _runs = []
+
+    @stat()
+    @cache()
+    def values(n: Types.Number['n'] = 3, resources={}) -> dict[Types.NumArray['values', 'values']]:
+        _runs.append(n)
+        for i in range(int(n)):
+            yield {'values': [float(i)]}
+
+    algorithm = _algorithm(values, tmp_path)
+    assert algorithm.streaming
+    for _ in range(2):
+        assert algorithm({'n': 3}) == (True, {'values': [0.0, 1.0, 2.0]})
+    # Every call is recorded and computed: the cache would hold the generator itself.
+    assert len(_calls) == 2 and _calls[0]['n'] == 3
+    assert _runs == [3, 3]
+    assert AlgorithmCachePool.fetch('values', n=3) is None
+    assert not getattr(AlgorithmCachePool._bypass, 'active', False)
+
+
+def test_stream_chunks_go_to_the_sink(tmp_path):
+
+    async def letters(n: Types.Number['n'] = 2, resources={}) -> dict[Types.String['text', 'text']]:
+        for i in range(int(n)):
+            yield {'text': 'ab'[i % 2]}
+
+    _chunks = []
+    algorithm = _algorithm(letters, tmp_path)
+    assert algorithm({'n': 3}, resources={'stream': _chunks.append}) == (True, None)
+    assert _chunks == [{'text': 'a'}, {'text': 'b'}, {'text': 'a'}]
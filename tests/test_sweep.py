@@ -0,0 +1,48 @@
+"""
+Tests of the axes of a parameter sweep.
+"""
+
+import pytest
+
+from easyapi.taskmodel.sweep import parse_axis
+
+
+def _values(spec):
+    axis = parse_axis(spec)
+    return [axis[i] for i in range(len(axis))]
+
+
+@pytest.mark.parametrize('spec, count', [
+    ({'start': 1, 'stop': 1.1, 'step': 0.1}, 1),
+    ({'start': 0, 'stop': 0.3, 'step': 0.1}, 3),
+    ({'start': 0, 'stop': 1, 'step': 0.1}, 10),
+    ({'start': 0.1, 'stop': 0.7, 'step': 0.2}, 3),
+    ({'start': 0, 'stop': 1e6, 'step': 0.1}, 10000000),
+])
+def test_step_range_excludes_stop(spec, count):
+    axis = parse_axis(spec)
+    assert len(axis) == count
+    assert axis[count - 1] < spec['stop']
+
+
+def test_step_range_is_half_open():
+    assert _values({'start': 0, 'stop': 3}) == [0, 1, 2]
+    assert _values({'start': 0, 'stop': 2.5, 'step': 1}) == [0, 1, 2]
+    assert _values({'start': 1, 'stop': 0, 'step': -0.25}) == [1, 0.75, 0.5, 0.25]
+    assert len(parse_axis({'start': 0, 'stop': 1, 'step': -1})) == 0
+    with pytest.raises(ValueError):
+        parse_axis({'start': 0, 'stop': 1, 'step': 0})
+
+
+def test_num_range_includes_stop():
+    assert _values({'start': 0, 'stop': 1, 'num': 5}) == [0, 0.25, 0.5, 0.75, 1]
+    assert _values({'start': 1, 'stop': 100, 'num': 3, 'log': True}) == pytest.approx([1, 10, 100])
+    assert _values({'start': 2, 'stop': 3, 'num': 1}) == [2]
+
+
+def test_listed_and_fixed_values():
+    assert _values([3, 'a']) == [3, 'a']
+    assert _values({'values': [1]}) == [1]
+    assert _values(7) == [7]
+    with pytest.raises(ValueError):
+        parse_axis([])
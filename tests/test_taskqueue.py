@@ -0,0 +1,89 @@
+"""
+Tests of the task index of the task queue: lookups, positions and removals do not scan the queue. The timings
+at queue lengths up to 1M are measured by benchmarks/queue_scale.py.
+"""
+
+import sys
+
+from easyapi.taskmodel.task import Task
+from easyapi.taskmodel.taskqueue import TaskQueue
+
+_RESOURCES = {'cpu': 1, 'cuda': 0}
+
+
+def _queue(n):
+    task_queue = TaskQueue([{'cpu': 1, 'cuda': 0}, {'cpu': 2, 'cuda': 0}])
+    tasks = [Task(access_id='u', algorithm_id='f', input_data={'i': i}, required_resources=_RESOURCES)
+             for i in range(n)]
+    task_queue.enqueue_many(tasks)
+    return task_queue, tasks
+
+
+def _steps(task_queue, tasks, monkeypatch, probes=200):
+    """
+    Returns the number of Python lines run and of task comparisons made per lookup, position and removal of
+    tasks spread over the queue. A scan of the queue would show in either: Python loops run lines, and the
+    scans of the built-in containers compare tasks.
+    """
+    _probe = tasks[1::max(1, len(tasks) // probes)]
+    _counts = {'lines': 0, 'compares': 0}
+
+    def _compare(self, other):
+        _counts['compares'] += 1
+        return self is other
+
+    def _trace(frame, event, arg):
+        if event == 'line':
+            _counts['lines'] += 1
+        return _trace
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Task, '__eq__', _compare)
+        sys.settrace(_trace)
+        try:
+            for task in _probe:
+                assert task_queue[task.task_id] is task
+                task_queue.queue_where(task=task)
+            for task in _probe:
+                del task_queue[task.task_id]
+        finally:
+            sys.settrace(None)
+    return {name: count / len(_probe) for name, count in _counts.items()}
+
+
+def test_index_and_positions():
+    task_queue, tasks = _queue(10)
+    assert [task_queue.queue_where(task=task) for task in tasks] == list(range(1, 11))
+    assert task_queue[tasks[3].task_id.upper()] is tasks[3]
+    del task_queue[tasks[3].task_id]
+    assert task_queue[tasks[3].task_id] is None
+    assert task_queue.queue_where(task=tasks[4]) == 4
+    header = task_queue.header(task_queue._index[tasks[0].key][0])
+    assert header is tasks[0]
+
+
+def test_operations_do_not_scan_the_queue(monkeypatch):
+    _small = _steps(*_queue(1000), monkeypatch)
+    _large = _steps(*_queue(100000), monkeypatch)
+    assert _small['compares'] == 0 and _large['compares'] == 0
+    # A scan would run about 100 times more lines; the position index only adds its logarithmic depth.
+    assert _large['lines'] < 1.5 * _small['lines'], (_small, _large)
+
+
+def test_positions_after_a_batch_match_single_enqueues():
+    task_queue, tasks = _queue(3000)
+    _single = TaskQueue([{'cpu': 1, 'cuda': 0}, {'cpu': 2, 'cuda': 0}])
+    _copies = [Task(access_id='u', algorithm_id='f', input_data=task.input_data, required_resources=_RESOURCES,
+                    task_id=task.task_id) for task in tasks]
+    for task in _copies:
+        _single.enqueue(task)
+    for queue in (task_queue, _single):
+        for task in tasks[::7]:
+            del queue[task.task_id]
+    assert [task_queue.queue_where(task=task) for task in tasks] == [_single.queue_where(task=task)
+                                                                     for task in _copies]
+    # The spellings the UUID module accepts find the task; a padded ID does not.
+    _task_id = tasks[1].task_id
+    for spelling in (_task_id.replace('-', ''), '{' + _task_id + '}', 'urn:uuid:' + _task_id.upper()):
+        assert task_queue[spelling] is tasks[1]
+    assert task_queue[' ' + _task_id.replace('-', '')] is None